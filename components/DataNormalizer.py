@@ -1,9 +1,39 @@
 from qgis.PyQt import QtWidgets, uic
-from qgis.PyQt.QtCore import QSettings
+from qgis.PyQt.QtCore import QCoreApplication, QSettings, QTimer
 import os
 from datetime import datetime
-import shutil
+from qgis.core import QgsApplication
 from .. s2g_logging import Survey2GISLogger
+from .FolderWatcher import FolderWatcher
+from .input_files import InputResolver, is_plain_file_list, split_entries
+from .InputFileList import InputFileList
+from .normalize_cache import FragmentCache
+from .normalize_pipeline import INPUT_ENCODINGS, NormalizeOptions, filter_input_files, make_geotag_replacer
+from .NormalizeTask import NormalizeTask
+from .NormalizedFileViewer import NormalizedFileViewer
+from .survey_output import copy_styles
+from .settings_store import DEFAULT_FLUSH_MS, SettingsStore, coerce_value
+from .station_transform import load_transform_table
+from .watch_folder import apply_changes
+
+# NormalizeOptions field -> Normalize tab widget, for recipes; cols_after_id also has a checkbox
+NORMALIZE_OPTION_WIDGETS = {
+    'replace_geotags': 'standard_geotags_checkbox',
+    'search': 'search_character',
+    'replace': 'replace_character',
+    'geotag_rules': 'geotag_rules_input',
+    'fix_lines': 'fix_lines_checkbox',
+    'cols_after_id': 'cols_after_ids_input',
+    'workers': 'normalize_workers_input',
+    'encoding': 'normalize_encoding_input',
+    'write_index': 'normalize_index_checkbox',
+    'merge_column': 'merge_column_input',
+    'merge_numeric': 'merge_numeric_checkbox',
+    'transform_table': 'transform_table_input',
+    'find_duplicates': 'find_duplicates_checkbox',
+    'duplicate_tolerance': 'duplicate_tolerance_input',
+    'drop_duplicates': 'drop_duplicates_checkbox',
+}
 
 FORM_CLASS, _ = uic.loadUiType(
     os.path.join(os.path.dirname(__file__), '..', "s2g_data_processor_dockwidget_base.ui")
@@ -16,7 +46,17 @@ class DataNormalizer:
     def __init__(self):
         self.parent_widget = None
         self.logger = None
+        self.normalize_task = None
+        # Shared by the input file list and the runs, so its folder cache serves both
+        self.input_resolver = InputResolver()
+        self.folder_watcher = None
+        # The running normalization was started by the watch-folder mode
+        self._watch_run = False
+        self._watch_run_pending = False
         self.settings = QSettings('CSGIS', 'Survey2GIS_DataProcessor')
+        # Field changes are collected here and written by a debounce timer
+        self.settings_store = SettingsStore(self.settings)
+        self.settings_flush_timer = None
         
         # Define saveable fields with their settings keys and default values
         self.saveable_fields = {
@@ -34,6 +74,17 @@ class DataNormalizer:
             'epsg_input': ('s2g_normalize/epsg_input', ''),
             'alias_file_input': ('s2g_normalize/alias_file_input', ''), # in process tab !
             'geopackage_name_input': ('s2g_process/geopackage_name_input', ''), # in process tab !
+            'normalize_workers_input': ('s2g_normalize/normalize_workers_input', 1),
+            'normalize_cache_checkbox': ('s2g_normalize/normalize_cache_checkbox', True),
+            'geotag_rules_input': ('s2g_normalize/geotag_rules_input', ''),
+            'normalize_encoding_input': ('s2g_normalize/normalize_encoding_input', 'auto'),
+            'normalize_index_checkbox': ('s2g_normalize/normalize_index_checkbox', False),
+            'merge_column_input': ('s2g_normalize/merge_column_input', 0),
+            'merge_numeric_checkbox': ('s2g_normalize/merge_numeric_checkbox', True),
+            'transform_table_input': ('s2g_normalize/transform_table_input', ''),
+            'find_duplicates_checkbox': ('s2g_normalize/find_duplicates_checkbox', False),
+            'duplicate_tolerance_input': ('s2g_normalize/duplicate_tolerance_input', 0.0),
+            'drop_duplicates_checkbox': ('s2g_normalize/drop_duplicates_checkbox', False),
         }
 
     def setup(self, parent_widget):
@@ -42,42 +93,395 @@ class DataNormalizer:
         self.logger = Survey2GISLogger(parent_widget)
         
         # Setup UI and settings in proper order
+        self._add_input_widgets()
+        self._add_task_widgets()
+        self._add_viewer_widgets()
+        self._add_worker_widgets()
+        self._add_encoding_widgets()
+        self._add_cache_widgets()
+        self._add_watch_folder_widgets()
+        self._add_line_index_widgets()
+        self._add_merge_widgets()
+        self._add_transform_widgets()
+        self._add_duplicate_widgets()
+        self._add_geotag_rule_widgets()
         self._setup_settings_management()
         self.connect_signals()
         
         # Only load settings if persistence is enabled
         if self.parent_widget.save_settings_checkbox.isChecked():
             self._load_persisted_settings()
+        elif self.settings_store.active_profile():
+            # Without persisted values, start from the last selected profile
+            self._apply_settings_profile(self.settings_store.active_profile())
+
+    def _add_task_widgets(self):
+        """Add a cancel button and a progress label below the run button."""
+        self.normalize_cancel_button = QtWidgets.QPushButton("cancel")
+        self.normalize_cancel_button.setToolTip("Stop the running normalization and remove the partial output.")
+        self.normalize_cancel_button.clicked.connect(self.cancel_normalize)
+        self.normalize_progress_label = QtWidgets.QLabel("")
+
+        run_button = self.parent_widget.run_button
+        parent_layout = run_button.parentWidget().layout()
+        if parent_layout is not None:
+            index = parent_layout.indexOf(run_button)
+            parent_layout.insertWidget(index + 1, self.normalize_cancel_button)
+            parent_layout.insertWidget(index + 2, self.normalize_progress_label)
+        self._set_normalize_running(False)
+
+    def _add_input_widgets(self):
+        """Let the input field take folders and patterns, with a folder button and the file list."""
+        self.parent_widget.input_select.setReadOnly(False)
+        self.parent_widget.input_select.setPlaceholderText("files, folders or patterns like C:/dig/**/*.dat; !backup")
+        self.parent_widget.input_select.setToolTip(
+            "Entries separated by '; ': files, folders (searched recursively for .txt/.dat files), "
+            "glob patterns (** = any number of folders) and exclude patterns starting with '!' "
+            "(a name like !backup, or a full path pattern)."
+        )
+        self.parent_widget.input_folder_button = QtWidgets.QPushButton("folder")
+        self.parent_widget.input_folder_button.setToolTip("Add a folder; all .txt/.dat files below it are used.")
+        input_layout = self.parent_widget.input_select.parentWidget().layout()
+        if isinstance(input_layout, QtWidgets.QBoxLayout):
+            input_layout.insertWidget(input_layout.indexOf(self.parent_widget.input_select_button) + 1,
+                                      self.parent_widget.input_folder_button)
+        self.input_file_list = InputFileList(self.logger, self.parent_widget.input_select.text,
+                                             self.input_resolver)
+        input_group = self.parent_widget.input_select.parentWidget()
+        group_layout = input_group.parentWidget().layout() if input_group.parentWidget() is not None else None
+        if isinstance(group_layout, QtWidgets.QBoxLayout):
+            group_layout.insertWidget(group_layout.indexOf(input_group) + 1, self.input_file_list)
+
+    def _add_viewer_widgets(self):
+        """Add the read-only viewer for the normalized file below the progress label, collapsed until needed."""
+        self.file_viewer = NormalizedFileViewer(self.logger, self._viewer_file_path)
+        parent_layout = self.normalize_progress_label.parentWidget().layout()
+        if parent_layout is not None:
+            parent_layout.insertWidget(parent_layout.indexOf(self.normalize_progress_label) + 1,
+                                       self.file_viewer)
+
+    def _options_layout(self):
+        """The grid of the normalize options, or None if the .ui file changed."""
+        options_layout = self.parent_widget.fix_lines_checkbox.parentWidget().layout()
+        return options_layout if isinstance(options_layout, QtWidgets.QGridLayout) else None
+
+    def _add_worker_widgets(self):
+        """Add the number of worker processes to the normalize options."""
+        self.parent_widget.normalize_workers_input = QtWidgets.QSpinBox()
+        self.parent_widget.normalize_workers_input.setRange(1, max(os.cpu_count() or 1, 1))
+        self.parent_widget.normalize_workers_input.setToolTip(
+            "Normalize the input files in parallel worker processes. 1 = single process."
+        )
+        options_layout = self._options_layout()
+        if options_layout is not None:
+            row = options_layout.rowCount()
+            options_layout.addWidget(QtWidgets.QLabel("Worker processes"), row, 0)
+            options_layout.addWidget(self.parent_widget.normalize_workers_input, row, 1)
+
+    def _add_encoding_widgets(self):
+        """Add the input encoding to the normalize options; sniffed per file unless forced."""
+        self.parent_widget.normalize_encoding_input = QtWidgets.QComboBox()
+        self.parent_widget.normalize_encoding_input.addItems(INPUT_ENCODINGS)
+        self.parent_widget.normalize_encoding_input.setToolTip(
+            "Encoding of the input files. 'auto' detects UTF-8, cp1252 or latin-1 per file."
+        )
+        options_layout = self._options_layout()
+        if options_layout is not None:
+            row = options_layout.rowCount()
+            options_layout.addWidget(QtWidgets.QLabel("Input encoding"), row, 0)
+            options_layout.addWidget(self.parent_widget.normalize_encoding_input, row, 1)
+
+    def _add_cache_widgets(self):
+        """Add the fragment cache checkbox and its clear button to the normalize options."""
+        self.parent_widget.normalize_cache_checkbox = QtWidgets.QCheckBox("Reuse unchanged input files (cache)")
+        self.parent_widget.normalize_cache_checkbox.setChecked(True)
+        self.parent_widget.normalize_cache_checkbox.setToolTip(
+            "Only normalize input files that changed since the last run and rebuild "
+            "the merged file from cached results."
+        )
+        self.clear_normalize_cache_button = QtWidgets.QPushButton("clear cache")
+        self.clear_normalize_cache_button.setToolTip("Drop all cached normalization results.")
+        self.clear_normalize_cache_button.clicked.connect(self.clear_normalize_cache)
+        options_layout = self._options_layout()
+        if options_layout is not None:
+            row = options_layout.rowCount()
+            options_layout.addWidget(self.parent_widget.normalize_cache_checkbox, row, 0)
+            options_layout.addWidget(self.clear_normalize_cache_button, row, 1)
+
+    def _add_watch_folder_widgets(self):
+        """Add the watch-folder checkbox and the watcher behind it."""
+        self.parent_widget.watch_folder_checkbox = QtWidgets.QCheckBox("Watch input folder")
+        self.parent_widget.watch_folder_checkbox.setToolTip(
+            "Watch the folder of the input files. New and changed .txt/.dat files are added to the "
+            "selection and normalized with the cache, then the commands in Tab 'Process' that read the "
+            "normalized file run again and their layers are refreshed in place."
+        )
+        self.folder_watcher = FolderWatcher(parent=self.parent_widget)
+        self.folder_watcher.changed.connect(self._handle_folder_changed)
+        options_layout = self._options_layout()
+        if options_layout is not None:
+            row = options_layout.rowCount()
+            options_layout.addWidget(self.parent_widget.watch_folder_checkbox, row, 0, 1, 2)
+
+    def _add_line_index_widgets(self):
+        """Add the line index checkbox; the index maps survey2gis line numbers back to the raw files."""
+        self.parent_widget.normalize_index_checkbox = QtWidgets.QCheckBox("Write line index (.idx)")
+        self.parent_widget.normalize_index_checkbox.setToolTip(
+            "Write <output>.idx next to the normalized file. It records the input file, "
+            "original line number and byte offset of every normalized line."
+        )
+        options_layout = self._options_layout()
+        if options_layout is not None:
+            row = options_layout.rowCount()
+            options_layout.addWidget(self.parent_widget.normalize_index_checkbox, row, 0, 1, 2)
+
+    def _add_merge_widgets(self):
+        """Add the key column to interleave the inputs by instead of concatenating them."""
+        self.parent_widget.merge_column_input = QtWidgets.QSpinBox()
+        self.parent_widget.merge_column_input.setRange(0, 99)
+        self.parent_widget.merge_column_input.setSpecialValueText("off (file order)")
+        self.parent_widget.merge_column_input.setToolTip(
+            "Merge the lines of all input files ordered by this column (1 = first column), "
+            "e.g. the measurement index or a timestamp. Runs in a single process without the cache."
+        )
+        self.parent_widget.merge_numeric_checkbox = QtWidgets.QCheckBox("Numeric key")
+        self.parent_widget.merge_numeric_checkbox.setChecked(True)
+        self.parent_widget.merge_numeric_checkbox.setToolTip(
+            "Compare the merge column as numbers. Uncheck for text keys such as ISO timestamps."
+        )
+        options_layout = self._options_layout()
+        if options_layout is not None:
+            row = options_layout.rowCount()
+            merge_row = QtWidgets.QHBoxLayout()
+            merge_row.addWidget(self.parent_widget.merge_column_input, 1)
+            merge_row.addWidget(self.parent_widget.merge_numeric_checkbox)
+            options_layout.addWidget(QtWidgets.QLabel("Merge by column"), row, 0)
+            options_layout.addLayout(merge_row, row, 1)
+
+    def _add_transform_widgets(self):
+        """Add the sidecar table with per-station offset/Helmert transforms."""
+        self.parent_widget.transform_table_input = QtWidgets.QLineEdit()
+        self.parent_widget.transform_table_input.setPlaceholderText("optional, CSV: file;type;tx;ty;tz;...")
+        self.parent_widget.transform_table_input.setToolTip(
+            "Table with an offset or 2D/3D Helmert transform per input file. The coordinates at "
+            "the end of every line are transformed and keep their decimal places."
+        )
+        self.parent_widget.transform_table_select_button = QtWidgets.QPushButton("...")
+        self.parent_widget.transform_table_reset_button = QtWidgets.QPushButton("reset")
+        options_layout = self._options_layout()
+        if options_layout is not None:
+            row = options_layout.rowCount()
+            transform_row = QtWidgets.QHBoxLayout()
+            transform_row.addWidget(self.parent_widget.transform_table_input, 1)
+            transform_row.addWidget(self.parent_widget.transform_table_select_button)
+            transform_row.addWidget(self.parent_widget.transform_table_reset_button)
+            options_layout.addWidget(QtWidgets.QLabel("Station transforms"), row, 0)
+            options_layout.addLayout(transform_row, row, 1)
+
+    def _add_duplicate_widgets(self):
+        """Add the duplicate point options; duplicates are reported next to the output."""
+        self.parent_widget.find_duplicates_checkbox = QtWidgets.QCheckBox("Find")
+        self.parent_widget.find_duplicates_checkbox.setToolTip(
+            "Report points that repeat an earlier point within the tolerance, in all input files, "
+            "to <output>.duplicates.tsv and the Logs tab. Runs in a single process without the cache."
+        )
+        self.parent_widget.duplicate_tolerance_input = QtWidgets.QDoubleSpinBox()
+        self.parent_widget.duplicate_tolerance_input.setDecimals(4)
+        self.parent_widget.duplicate_tolerance_input.setRange(0.0, 1000.0)
+        self.parent_widget.duplicate_tolerance_input.setSingleStep(0.001)
+        self.parent_widget.duplicate_tolerance_input.setSpecialValueText("exact")
+        self.parent_widget.duplicate_tolerance_input.setToolTip(
+            "Distance in coordinate units up to which two points count as duplicates."
+        )
+        self.parent_widget.drop_duplicates_checkbox = QtWidgets.QCheckBox("Drop")
+        self.parent_widget.drop_duplicates_checkbox.setToolTip(
+            "Drop objects that repeat an earlier object (same tag and first point) and vertices "
+            "repeating the vertex before them. Other duplicates, such as shared vertices, are only reported."
+        )
+        options_layout = self._options_layout()
+        if options_layout is not None:
+            row = options_layout.rowCount()
+            duplicates_row = QtWidgets.QHBoxLayout()
+            duplicates_row.addWidget(self.parent_widget.find_duplicates_checkbox)
+            duplicates_row.addWidget(self.parent_widget.duplicate_tolerance_input, 1)
+            duplicates_row.addWidget(self.parent_widget.drop_duplicates_checkbox)
+            options_layout.addWidget(QtWidgets.QLabel("Duplicate points"), row, 0)
+            options_layout.addLayout(duplicates_row, row, 1)
+
+    def _add_geotag_rule_widgets(self):
+        """Add the editor for extra geotag rules, applied together with "Replace Character"."""
+        self.parent_widget.geotag_rules_input = QtWidgets.QPlainTextEdit()
+        self.parent_widget.geotag_rules_input.setPlaceholderText(
+            "One rule per line: literal|chars|regex <search> [<replace>]\n"
+            "chars .$@ PLA\n"
+            "regex ^(\\d+)_ \\1-"
+        )
+        self.parent_widget.geotag_rules_input.setToolTip(
+            "Extra geotag rules, applied in one pass together with the search/replace "
+            "fields when 'Replace Character' is checked. A replaced text is not matched again."
+        )
+        self.parent_widget.geotag_rules_input.setMaximumHeight(80)
+        options_layout = self._options_layout()
+        if options_layout is not None:
+            row = options_layout.rowCount()
+            options_layout.addWidget(QtWidgets.QLabel("Geotag rules"), row, 0, 1, 2)
+            options_layout.addWidget(self.parent_widget.geotag_rules_input, row + 1, 0, 1, 2)
 
     def _setup_settings_management(self):
         """Setup settings persistence checkbox and load its state."""
         try:
+            # One write per burst of edits instead of a settings file flush per key press
+            self.settings_flush_timer = QTimer(self.parent_widget)
+            self.settings_flush_timer.setSingleShot(True)
+            self.settings_flush_timer.setInterval(DEFAULT_FLUSH_MS)
+            self.settings_flush_timer.timeout.connect(self.flush_settings)
+            app = QCoreApplication.instance()
+            if app is not None:
+                app.aboutToQuit.connect(self.flush_settings)
+
             # Initialize checkbox with saved state
             self.parent_widget.save_settings_checkbox.setChecked(
-                self.settings.value('s2g_normalize/persist_settings', False, type=bool)
+                self.settings_store.value('s2g_normalize/persist_settings', False)
             )
             
             # Connect state change handler
             self.parent_widget.save_settings_checkbox.stateChanged.connect(
                 self._handle_settings_persistence_change
             )
+            self._add_profile_widgets()
         except Exception as e:
             self.logger.log_message(
                 f"Error setting up settings management: {e}", 
                 level="error", to_tab=True, to_gui=True, to_notification=False
             )
 
+    def _add_profile_widgets(self):
+        """Add the settings profile selector below the persistence checkbox."""
+        self.parent_widget.settings_profile_select = QtWidgets.QComboBox()
+        self.parent_widget.settings_profile_select.setToolTip(
+            "Named sets of all Normalize and Process fields, e.g. one per campaign or parser. "
+            "Selecting a profile fills in its values."
+        )
+        self.parent_widget.settings_profile_select.setSizeAdjustPolicy(QtWidgets.QComboBox.AdjustToContents)
+        self.parent_widget.settings_profile_save_button = QtWidgets.QPushButton("save as...")
+        self.parent_widget.settings_profile_save_button.setToolTip("Save the current field values as a profile.")
+        self.parent_widget.settings_profile_delete_button = QtWidgets.QPushButton("delete")
+        self.parent_widget.settings_profile_delete_button.setToolTip("Delete the selected profile.")
+
+        checkbox = self.parent_widget.save_settings_checkbox
+        parent_layout = checkbox.parentWidget().layout()
+        if isinstance(parent_layout, QtWidgets.QBoxLayout):
+            profile_row = QtWidgets.QHBoxLayout()
+            profile_row.addWidget(QtWidgets.QLabel("Profile"))
+            profile_row.addWidget(self.parent_widget.settings_profile_select, 1)
+            profile_row.addWidget(self.parent_widget.settings_profile_save_button)
+            profile_row.addWidget(self.parent_widget.settings_profile_delete_button)
+            parent_layout.insertLayout(parent_layout.indexOf(checkbox) + 1, profile_row)
+
+        self._refresh_profile_select(self.settings_store.active_profile())
+        self.parent_widget.settings_profile_select.currentIndexChanged.connect(self._handle_profile_selected)
+        self.parent_widget.settings_profile_save_button.clicked.connect(self.save_settings_profile)
+        self.parent_widget.settings_profile_delete_button.clicked.connect(self.delete_settings_profile)
+
+    def _refresh_profile_select(self, selected=''):
+        select = self.parent_widget.settings_profile_select
+        select.blockSignals(True)
+        select.clear()
+        select.addItem("(none)", '')
+        for name in self.settings_store.profile_names():
+            select.addItem(name, name)
+        select.setCurrentIndex(max(select.findData(selected), 0))
+        select.blockSignals(False)
+        self.parent_widget.settings_profile_delete_button.setEnabled(bool(selected))
+
+    def _handle_profile_selected(self, index):
+        name = self.parent_widget.settings_profile_select.itemData(index) or ''
+        self.parent_widget.settings_profile_delete_button.setEnabled(bool(name))
+        self.settings_store.set_active_profile(name)
+        if name:
+            self._apply_settings_profile(name)
+        self.schedule_settings_flush()
+
+    def _apply_settings_profile(self, name):
+        """Fill the fields with the values of a profile; fields the profile does not know are kept."""
+        values = self.settings_store.profile(name)
+        if values is None:
+            return
+        for widget_name, (setting_key, default_value) in self.saveable_fields.items():
+            if setting_key in values:
+                self._set_widget_value(getattr(self.parent_widget, widget_name),
+                                       coerce_value(values[setting_key], default_value))
+        self.logger.log_message(
+            f"Settings profile '{name}' applied",
+            level="info", to_tab=True, to_gui=True, to_notification=False
+        )
+
+    def save_settings_profile(self):
+        """Save the current field values under a name given by the user."""
+        current = self.parent_widget.settings_profile_select.currentData() or ''
+        name, ok = QtWidgets.QInputDialog.getText(
+            self.parent_widget, "Save settings profile", "Profile name:", text=current
+        )
+        name = name.strip()
+        if not ok or not name:
+            return
+        values = {}
+        for widget_name, (setting_key, _) in self.saveable_fields.items():
+            value = self._get_widget_value(getattr(self.parent_widget, widget_name))
+            if value is not None:
+                values[setting_key] = value
+        self.settings_store.save_profile(name, values)
+        self.settings_store.set_active_profile(name)
+        self._refresh_profile_select(name)
+        # An explicit save should not wait for the timer
+        self.flush_settings()
+        self.logger.log_message(
+            f"Settings profile '{name}' saved",
+            level="info", to_tab=True, to_gui=True, to_notification=False
+        )
+
+    def delete_settings_profile(self):
+        name = self.parent_widget.settings_profile_select.currentData() or ''
+        if not name or not self.settings_store.delete_profile(name):
+            return
+        self._refresh_profile_select('')
+        self.flush_settings()
+        self.logger.log_message(
+            f"Settings profile '{name}' deleted",
+            level="info", to_tab=True, to_gui=True, to_notification=False
+        )
+
+    def schedule_settings_flush(self):
+        """Write the changed settings once the fields have been quiet for a moment."""
+        if self.settings_flush_timer is not None:
+            self.settings_flush_timer.start()
+        else:
+            self.flush_settings()
+
+    def flush_settings(self):
+        """Write pending settings changes now, e.g. when the dock is closed."""
+        if self.settings_flush_timer is not None:
+            self.settings_flush_timer.stop()
+        try:
+            self.settings_store.flush()
+        except Exception as e:
+            self.logger.log_message(
+                f"Error writing settings: {str(e)}",
+                level="error", to_tab=True, to_gui=True, to_notification=False
+            )
+
     def _handle_settings_persistence_change(self, state):
         """Handle changes to settings persistence state."""
         is_enabled = bool(state)
-        self.settings.setValue('s2g_normalize/persist_settings', is_enabled)
         
         if is_enabled:
+            self.settings_store.set_value('s2g_normalize/persist_settings', True)
             self._save_current_settings()
         else:
             self._clear_persisted_settings()
+            self.settings_store.set_value('s2g_normalize/persist_settings', False)
             
-        self.settings.sync()
+        self.flush_settings()
 
     def _save_current_settings(self):
         """Save current widget values if persistence is enabled."""
@@ -90,9 +494,9 @@ class DataNormalizer:
                 value = self._get_widget_value(widget)
                 
                 if value is not None:
-                    self.settings.setValue(setting_key, value)
+                    self.settings_store.set_value(setting_key, value)
             
-            self.settings.sync()
+            self.schedule_settings_flush()
                 
         except Exception as e:
             self.logger.log_message(
@@ -105,7 +509,7 @@ class DataNormalizer:
         try:
             for widget_name, (setting_key, default_value) in self.saveable_fields.items():
                 widget = getattr(self.parent_widget, widget_name)
-                saved_value = self.settings.value(setting_key, default_value)
+                saved_value = self.settings_store.value(setting_key, default_value)
                 
                 self._set_widget_value(widget, saved_value)
                 
@@ -118,10 +522,8 @@ class DataNormalizer:
     def _clear_persisted_settings(self):
         """Clear all saved settings."""
         try:
-            self.settings.beginGroup('s2g_normalize')
-            self.settings.remove('')
-            self.settings.endGroup()
-            self.settings.sync()
+            self.settings_store.remove('s2g_normalize')
+            self.flush_settings()
         except Exception as e:
             self.logger.log_message(
                 f"Error clearing settings: {str(e)}", 
@@ -134,6 +536,12 @@ class DataNormalizer:
             return widget.text()
         elif isinstance(widget, QtWidgets.QCheckBox):
             return widget.isChecked()
+        elif isinstance(widget, (QtWidgets.QSpinBox, QtWidgets.QDoubleSpinBox)):
+            return widget.value()
+        elif isinstance(widget, QtWidgets.QPlainTextEdit):
+            return widget.toPlainText()
+        elif isinstance(widget, QtWidgets.QComboBox):
+            return widget.currentText()
         return None
 
     def _set_widget_value(self, widget, value):
@@ -142,6 +550,14 @@ class DataNormalizer:
             widget.setText(str(value))
         elif isinstance(widget, QtWidgets.QCheckBox):
             widget.setChecked(bool(value))
+        elif isinstance(widget, QtWidgets.QSpinBox):
+            widget.setValue(int(value))
+        elif isinstance(widget, QtWidgets.QDoubleSpinBox):
+            widget.setValue(float(value))
+        elif isinstance(widget, QtWidgets.QPlainTextEdit):
+            widget.setPlainText(str(value))
+        elif isinstance(widget, QtWidgets.QComboBox):
+            widget.setCurrentText(str(value))
 
     def connect_signals(self):
         """Connect GUI signals including autosave."""
@@ -151,11 +567,14 @@ class DataNormalizer:
         # Connect main UI signals
         button_connections = {
             'input_select_button': (self.select_input_files, None),
+            'input_folder_button': (self.select_input_directory, None),
             'input_data_reset_button': (lambda: self.reset_text_field(self.parent_widget.input_select), None),
             'output_select_button': (self.select_output_directory, None),
             'output_reset_button': (lambda: self.reset_text_field(self.parent_widget.output_select_input), None),
             'styles_input_select_button': (self.select_styles_input_directory, None),
             'styles_reset_button': (lambda: self.reset_text_field(self.parent_widget.styles_folder_path_input), None),
+            'transform_table_select_button': (self.select_transform_table, None),
+            'transform_table_reset_button': (lambda: self.reset_text_field(self.parent_widget.transform_table_input), None),
             'run_button': (self.run_normalize, None)
         }
 
@@ -167,45 +586,72 @@ class DataNormalizer:
             else:
                 button.clicked.connect(slot)
 
+        self.parent_widget.watch_folder_checkbox.toggled.connect(self.toggle_watch_folder)
+        self.parent_widget.input_select.textChanged.connect(self.input_file_list.schedule_refresh)
+
         # Connect text validation signals
         self.parent_widget.output_filename_input.textChanged.connect(self.validate_filename_input)
 
         # Connect all saveable widgets for autosave
-        def create_save_handler(widget_name):
-            def save_handler(*args):
-                if self.parent_widget.save_settings_checkbox.isChecked():
-                    widget = getattr(self.parent_widget, widget_name)
-                    if isinstance(widget, QtWidgets.QLineEdit):
-                        value = widget.text()
-                    elif isinstance(widget, QtWidgets.QCheckBox):
-                        value = widget.isChecked()
-                    else:
-                        return
-                    
-                    setting_key = self.saveable_fields[widget_name][0]
-                    self.settings.setValue(setting_key, value)
-                    self.settings.sync()
-            return save_handler
-
-        # Connect each widget with its own save handler
         for widget_name in self.saveable_fields:
-            widget = getattr(self.parent_widget, widget_name)
-            save_handler = create_save_handler(widget_name)
-            
-            if isinstance(widget, QtWidgets.QLineEdit):
-                widget.textChanged.connect(save_handler)
-            elif isinstance(widget, QtWidgets.QCheckBox):
-                widget.stateChanged.connect(save_handler)
+            self._connect_save_handler(widget_name)
+
+    def _connect_save_handler(self, widget_name):
+        """Store the value of a saveable widget whenever it changes."""
+        def save_handler(*args):
+            if self.parent_widget.save_settings_checkbox.isChecked():
+                value = self._get_widget_value(getattr(self.parent_widget, widget_name))
+                if value is None:
+                    return
+
+                # Kept in memory; the timer writes a burst of key presses at once
+                setting_key = self.saveable_fields[widget_name][0]
+                if self.settings_store.set_value(setting_key, value):
+                    self.schedule_settings_flush()
+
+        widget = getattr(self.parent_widget, widget_name)
+        if isinstance(widget, QtWidgets.QLineEdit):
+            widget.textChanged.connect(save_handler)
+        elif isinstance(widget, QtWidgets.QCheckBox):
+            widget.stateChanged.connect(save_handler)
+        elif isinstance(widget, (QtWidgets.QSpinBox, QtWidgets.QDoubleSpinBox)):
+            widget.valueChanged.connect(save_handler)
+        elif isinstance(widget, QtWidgets.QPlainTextEdit):
+            widget.textChanged.connect(save_handler)
+        elif isinstance(widget, QtWidgets.QComboBox):
+            widget.currentTextChanged.connect(save_handler)
+
+    def register_saveable_field(self, widget_name, setting_key, default_value):
+        """Persist a widget that other components create after setup().
+
+        The field is saved, restored and put into profiles like the ones in
+        saveable_fields.
+        """
+        self.saveable_fields[widget_name] = (setting_key, default_value)
+        self._connect_save_handler(widget_name)
+        if self.parent_widget.save_settings_checkbox.isChecked():
+            self._set_widget_value(getattr(self.parent_widget, widget_name),
+                                   self.settings_store.value(setting_key, default_value))
 
     def select_input_files(self):
             """Open file dialog to select multiple input files and display in input_select field."""
             files, _ = QtWidgets.QFileDialog.getOpenFileNames(
-                self.parent_widget, "Select Input File(s)", "", "Data Files (*.dat *.txt);;All Files (*)"
+                self.parent_widget, "Select Input File(s)", "", "Data Files (*.dat *.txt *.dat.gz *.txt.gz *.dat.bz2 *.txt.bz2 *.dat.zst *.txt.zst);;All Files (*)"
             )
             if files:
                 files_list = "; ".join(files)
                 self.parent_widget.input_select.setText(files_list)
 
+    def select_input_directory(self):
+        """Add a folder to the input entries."""
+        directory = QtWidgets.QFileDialog.getExistingDirectory(
+            self.parent_widget, "Select Input Folder", ""
+        )
+        if directory:
+            entries = split_entries(self.parent_widget.input_select.text())
+            if directory not in entries:
+                self.parent_widget.input_select.setText("; ".join(entries + [directory]))
+
     def select_output_directory(self):
         """Open file dialog to select an output directory."""
         directory = QtWidgets.QFileDialog.getExistingDirectory(
@@ -224,6 +670,14 @@ class DataNormalizer:
             self.parent_widget.styles_folder_path_input.setText(directory)
             self.parent_widget.command_options.styles_folder_path_input = directory
 
+    def select_transform_table(self):
+        """Open file dialog to select the station transform table."""
+        file_path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self.parent_widget, "Select Station Transform Table", "", "Tables (*.csv *.txt);;All Files (*)"
+        )
+        if file_path:
+            self.parent_widget.transform_table_input.setText(file_path)
+
     def reset_text_field(self, field):
         """Reset the text in a given field."""
         field.setText("")
@@ -276,268 +730,289 @@ class DataNormalizer:
 
 
     def run_normalize(self):
+        self._start_normalize(watch_run=False)
+
+    def _start_normalize(self, watch_run):
+        """Start the normalize task; ``watch_run`` is only remembered once the task is started."""
         if (not self.parent_widget.input_select.text().strip() or
             not self.parent_widget.output_select_input.text().strip()):
             self.logger.log_message("Please fill all required fields in Tab 'Normalize'", 
                                   level="error", to_tab=True, to_gui=True, to_notification=True)
             return
 
+        if self.normalize_task is not None:
+            self.logger.log_message("Normalization is already running",
+                                  level="warning", to_tab=False, to_gui=True, to_notification=True)
+            return
+
         try:
             output_directory = self.parent_widget.output_select_input.text().strip()
             # Get filename with potential EPSG code
             output_filename = self.get_concat_filename()
             output_file_path = os.path.join(output_directory, output_filename)
 
-            self._concatenate_files(output_file_path)
-            self._clean_file_content(output_file_path)
-
-            if self.parent_widget.copy_styles_checkbox.isChecked():
-                self._copy_qml_files()
-            
-            if self.parent_widget.standard_geotags_checkbox.isChecked():
-                self._replace_geotag_symbols(output_file_path)
-            
-            if self.parent_widget.fix_lines_checkbox.isChecked():
-                self._fix_line_numbering(output_file_path)
-
-            if (self.parent_widget.cols_after_id_checkbox.isChecked() and 
-                self.parent_widget.cols_after_ids_input.text().strip()):
-                self._add_columns_after_line_number(output_file_path)
-
-            # update the process text field
-            self.parent_widget.process_input_file_input.setText(output_file_path)
-            self.logger.log_message("Files successfully processed!", 
-                                  level="info", to_tab=True, to_gui=True, to_notification=True)
+            input_files = self._get_input_files()
+            cache = None
+            # Watch-folder runs always use the cache, only new and changed files are normalized
+            if self.parent_widget.normalize_cache_checkbox.isChecked() or watch_run:
+                cache = FragmentCache(self._normalize_cache_dir())
+            self.normalize_task = NormalizeTask(
+                input_files, output_file_path, self._get_normalize_options(),
+                on_finished=self._handle_normalize_finished, cache=cache
+            )
+            self.normalize_task.progressText.connect(self.normalize_progress_label.setText)
+            # The viewer maps the old output, which would block replacing it on Windows
+            self.file_viewer.release()
+            self._watch_run = watch_run
+            self._set_normalize_running(True)
+            QgsApplication.taskManager().addTask(self.normalize_task)
 
         except Exception as e:
+            self.normalize_task = None
+            self._watch_run = False
+            self._set_normalize_running(False)
             self.logger.log_message(f"Error during file processing: {e}", 
                                   level="error", to_tab=True, to_gui=True, to_notification=True)
 
-    def _concatenate_files(self, output_file_path):
-        """Concatenate selected .txt or .dat files alphabetically and save the result."""
-        input_files = self.parent_widget.input_select.text().split("; ")
-        input_files = sorted([os.path.normpath(file) for file in input_files if file.endswith(('.txt', '.dat'))])
-        
-        if not input_files:
-            self.logger.log_message("No valid .txt or .dat files selected", 
-                                  level="error", to_tab=True, to_gui=True, to_notification=True)
-            raise FileNotFoundError("No valid .txt or .dat files selected")
-
-        with open(output_file_path, 'w', encoding='utf-8') as output_file:
-            for input_file in input_files:
-                with open(input_file, 'r', encoding='utf-8') as f:
-                    content = f.readlines()
-                    content = [line.strip() for line in content if line.strip()]
-                    if os.path.getsize(output_file_path) > 0:
-                        with open(output_file_path, 'rb+') as check_file:
-                            check_file.seek(-1, os.SEEK_END)
-                            last_char = check_file.read(1).decode()
-                        if last_char != "\n":
-                            output_file.write("\n")
-                    output_file.write("\n".join(content))
-                    if content:
-                        output_file.write("\n")
-
-
-    def _clean_file_content(self, file_path):
-        """
-        Cleans the content of a file by:
-        - Removing empty lines.
-        - Converting multiple spaces or tabs to a single space.
-        """
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
-
-            cleaned_lines = []
-            for line in lines:
-                # Strip leading/trailing whitespaces and reduce multiple spaces/tabs to a single space
-                cleaned_line = ' '.join(line.split())
-                
-                # Only add non-empty lines after cleaning
-                if cleaned_line:
-                    cleaned_lines.append(cleaned_line)
-
-            # Write the cleaned content back to the file
-            with open(file_path, 'w', encoding='utf-8') as file:
-                file.write("\n".join(cleaned_lines) + "\n")
-
-            self.logger.log_message(f"Cleaned file content in {file_path}", level="info", to_tab=True, to_gui=True, to_notification=False)
-
-        except Exception as e:
-            self.logger.log_message(f"Error cleaning file content: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
-
-    def _copy_qml_files(self):
-        """Copy QML style files and SVG folder from the selected styles folder to the output directory."""
-        
-        styles_folder_path = self.parent_widget.styles_folder_path_input.text().strip()
-        if not styles_folder_path or not os.path.isdir(styles_folder_path):
-            self.logger.log_message(f"Styles folder does not exist: {styles_folder_path}", level="error", to_tab=True, to_gui=True, to_notification=True)
+    def toggle_watch_folder(self, checked):
+        """Start or stop watching the folder of the selected input files."""
+        if not checked:
+            if self.folder_watcher.is_active():
+                self.logger.log_message(f"Stopped watching {self.folder_watcher.directory}",
+                                      level="info", to_tab=True, to_gui=True, to_notification=False)
+            self.folder_watcher.stop()
+            self._watch_run_pending = False
             return
 
-        # Get the output folder path and create necessary subfolders
-        output_folder_path = self.parent_widget.output_select_input.text().strip()
-        qml_output_folder = os.path.join(output_folder_path, "qml")
-        svg_output_folder = os.path.join(output_folder_path, "qml", "svg")
+        entries = split_entries(self.parent_widget.input_select.text())
+        input_files = self.input_resolver.resolve(self.parent_widget.input_select.text()).paths
+        output_directory = self.parent_widget.output_select_input.text().strip()
+        if not input_files or not output_directory:
+            self.logger.log_message("Select input files and an output directory in Tab 'Normalize' before watching",
+                                  level="error", to_tab=False, to_gui=True, to_notification=True)
+            self.parent_widget.watch_folder_checkbox.setChecked(False)
+            return
 
-        # Create QML folder
+        folders = [os.path.normpath(entry) for entry in entries if os.path.isdir(entry)]
+        directory = folders[0] if folders else os.path.dirname(input_files[0])
+        # The normalized file may be written into the watched folder itself
+        output_file_path = os.path.join(output_directory, self.get_concat_filename())
         try:
-            os.makedirs(qml_output_folder, exist_ok=True) 
-        except Exception as e:
-            self.logger.log_message(f"Error creating QML folder: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
+            self.folder_watcher.start(directory, ignore=(output_file_path,))
+        except OSError as e:
+            self.logger.log_message(f"Cannot watch {directory}: {e}",
+                                  level="error", to_tab=True, to_gui=True, to_notification=True)
+            self.parent_widget.watch_folder_checkbox.setChecked(False)
             return
-
-        # Copy QML files
-        qml_files = [f for f in os.listdir(styles_folder_path) if f.endswith(".qml")]
-        if not qml_files:
-            self.logger.log_message("No QML files found in the styles folder.", level="warning", to_tab=True, to_gui=True, to_notification=True)
+        self.logger.log_message(f"Watching {directory} for new and changed input files",
+                              level="info", to_tab=True, to_gui=True, to_notification=False)
+
+    def _handle_folder_changed(self, changes):
+        """Update the input selection and normalize again once the watched folder settled."""
+        self.logger.log_message(f"Watched folder {self.folder_watcher.directory}: {changes.summary()}",
+                              level="info", to_tab=True, to_gui=True, to_notification=False)
+        text = self.parent_widget.input_select.text()
+        if is_plain_file_list(split_entries(text)):
+            selected = filter_input_files(split_entries(text))
+            input_files = apply_changes(selected, changes)
+            # Changes to files that are not part of the selection need no run
+            if input_files == selected and not set(changes.modified) & set(selected):
+                return
+            self.parent_widget.input_select.setText("; ".join(input_files))
         else:
-            try:
-                for qml_file in qml_files:
-                    source = os.path.join(styles_folder_path, qml_file)
-                    destination = os.path.join(qml_output_folder, qml_file)
-                    shutil.copy(source, destination)
-                self.logger.log_message(f"Successfully copied {len(qml_files)} QML file(s) to {qml_output_folder}", 
-                                    level="info", to_tab=True, to_gui=True, to_notification=False)
-            except Exception as e:
-                self.logger.log_message(f"Error copying QML files: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
-
-        # Check for and copy SVG folder
-        svg_source_folder = os.path.join(styles_folder_path, "svg")
-        if os.path.exists(svg_source_folder) and os.path.isdir(svg_source_folder):
-            try:
-                # Copy the entire SVG folder
-                if os.path.exists(svg_output_folder):
-                    shutil.rmtree(svg_output_folder)  # Remove existing folder if it exists
-                shutil.copytree(svg_source_folder, svg_output_folder)
-                
-                # Count SVG files for logging
-                svg_files = sum(1 for f in os.listdir(svg_output_folder) if f.endswith(".svg"))
-                self.logger.log_message(f"Successfully copied SVG folder with {svg_files} SVG file(s) to {svg_output_folder}", 
-                                    level="info", to_tab=True, to_gui=True, to_notification=False)
-            except Exception as e:
-                self.logger.log_message(f"Error copying SVG folder: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
-        else:
-            self.logger.log_message("No SVG folder found in the styles folder.", 
-                                level="info", to_tab=True, to_gui=True, to_notification=False)
-    def _replace_geotag_symbols(self, output_file_path):
-            """
-            Replace characters in the specified output file based on search and replace inputs.
-            - If replace is empty: deletes the search string
-            - If no spaces: replaces entire search string with replace string
-            - If spaces present: replaces character by character where matches exist
-            """
-            try:
-                if not self.parent_widget.standard_geotags_checkbox.isChecked():
-                    return
-
-                search_char = self.parent_widget.search_character.text().strip()
-                if not search_char:  # No search character provided, do nothing
-                    return
-
-                replace_char = self.parent_widget.replace_character.text().strip()
-                
-                # Read the contents of the file
-                with open(output_file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-
-                updated_content = content
-                
-                # Case 1: Replace is empty -> delete search string
-                if not replace_char:
-                    updated_content = content.replace(search_char, '')
-                    
-                # Case 2: No spaces -> direct string replacement
-                elif ' ' not in search_char and ' ' not in replace_char:
-                    updated_content = content.replace(search_char, replace_char)
-                    
-                # Case 3: Spaces present -> character by character replacement
-                else:
-                    search_chars = search_char.split()
-                    replace_chars = replace_char.split()
-                    
-                    for i, char in enumerate(search_chars):
-                        if char and i < len(replace_chars):
-                            updated_content = updated_content.replace(char, replace_chars[i])
-
-                # Write the updated content back to the file
-                with open(output_file_path, 'w', encoding='utf-8') as file:
-                    file.write(updated_content)
-
-                self.logger.log_message(
-                    f"Character replacement completed in {output_file_path}", 
-                    level="info", to_tab=True, to_gui=True, to_notification=False
-                )
-
-            except Exception as e:
-                self.logger.log_message(
-                    f"Error updating characters: {e}", 
-                    level="error", to_tab=True, to_gui=True, to_notification=True)
-
-    def _fix_line_numbering(self, output_file_path):
-        """Fix line numbering in the specified file."""
+            # Folders and patterns pick up the new files themselves
+            input_files = self.input_resolver.resolve(text).paths
+        if not input_files:
+            self.logger.log_message("All watched input files were removed, nothing to normalize",
+                                  level="warning", to_tab=True, to_gui=True, to_notification=False)
+            return
+        if self.normalize_task is not None:
+            # Picked up when the running normalization is done
+            self._watch_run_pending = True
+            return
+        self._start_watch_run()
+
+    def _start_watch_run(self):
+        self._watch_run_pending = False
+        self._start_normalize(watch_run=True)
+
+    def _viewer_file_path(self):
+        """The normalized file to show: the Process tab input, else the configured output."""
+        path = self.parent_widget.process_input_file_input.text().strip()
+        if path:
+            return path
+        output_directory = self.parent_widget.output_select_input.text().strip()
+        if not output_directory:
+            return ""
+        return os.path.join(output_directory, self.get_concat_filename())
+
+    def _normalize_cache_dir(self):
+        """Location of the fragment cache inside the QGIS profile folder."""
+        return os.path.join(QgsApplication.qgisSettingsDirPath(), "survey2gis", "normalize_cache")
+
+    def clear_normalize_cache(self):
+        """Invalidate all cached normalization results."""
+        if self.normalize_task is not None:
+            self.logger.log_message("Cannot clear the cache while normalization is running",
+                                  level="warning", to_tab=False, to_gui=True, to_notification=True)
+            return
         try:
-            # Read the content of the file
-            with open(output_file_path, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
-
-            # Process each line: remove erroneous numbering and reassign correct numbering
-            fixed_lines = []
-            for idx, line in enumerate(lines, start=1):
-                # Split each line by spaces and remove the first part (the erroneous numbering)
-                parts = line.strip().split(" ", 1)  # Split into 2 parts, the first part (index) is discarded
-                if len(parts) > 1:
-                    new_line = f"{idx} {parts[1]}"  # Add correct numbering with a space
-                    fixed_lines.append(new_line)
-                else:
-                    fixed_lines.append(line.strip())  # In case the line has no spaces or is invalid
-
-            # Write the fixed content back to the file
-            with open(output_file_path, 'w', encoding='utf-8') as file:
-                file.write("\n".join(fixed_lines) + "\n")
-
-            self.logger.log_message(f"Line numbering fixed in {output_file_path}", 
-                                level="info", to_tab=True, to_gui=True, to_notification=False)
-
+            FragmentCache(self._normalize_cache_dir()).clear()
+            self.logger.log_message("Normalization cache cleared",
+                                  level="info", to_tab=True, to_gui=True, to_notification=True)
         except Exception as e:
-            self.logger.log_message(f"Error fixing line numbering in {output_file_path}: {e}", 
-                                level="error", to_tab=True, to_gui=True, to_notification=True)
+            self.logger.log_message(f"Error clearing normalization cache: {e}",
+                                  level="error", to_tab=True, to_gui=True, to_notification=True)
+
+    def cancel_normalize(self):
+        """Cancel a running normalization; the partial output is removed."""
+        if self.normalize_task is not None:
+            self.normalize_task.cancel()
 
-    def _add_columns_after_line_number(self, output_file_path):
-        """Add columns after line number in the specified file."""
+    def _handle_normalize_finished(self, task, result):
+        """Finish a normalize run on the main thread once the task is done."""
+        self.normalize_task = None
+        self._set_normalize_running(False)
+        watch_run, self._watch_run = self._watch_run, False
         try:
-            # Get the raw input string
-            raw_input = self.parent_widget.cols_after_ids_input.text().rstrip('\n')
-            # Check if input ends with space before we clean it
-            should_add_space = raw_input.endswith(' ')
-            # Remove any trailing spaces for clean processing
-            input_string = raw_input.rstrip()
-            
-            # Read the content of the file
-            with open(output_file_path, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
-
-            updated_lines = []
-            for line in lines:
-                # Split the line into components
-                parts = line.strip().split()
-
-                if parts and parts[0].isdigit():  # Ensure the line starts with a number
-                    remaining_parts = ' '.join(parts[1:])
-                    updated_line = f"{parts[0]} {input_string}{' ' if should_add_space else ''}{remaining_parts}"
-                    updated_lines.append(updated_line)
-                else:
-                    # In case the line doesn't start with a number, leave it unchanged
-                    updated_lines.append(line.strip())
+            self._report_normalize_result(task, result, watch_run)
+        finally:
+            if self._watch_run_pending and self.parent_widget.watch_folder_checkbox.isChecked():
+                self._start_watch_run()
+
+    def _report_normalize_result(self, task, result, watch_run):
+        """Log the outcome; a watch-folder run continues with the commands in Tab 'Process'."""
+        if not result:
+            if task.error is not None:
+                self.logger.log_message(f"Error during file processing: {task.error}", 
+                                      level="error", to_tab=True, to_gui=True, to_notification=True)
+            else:
+                self.logger.log_message("Normalization canceled, partial output removed", 
+                                      level="warning", to_tab=True, to_gui=True, to_notification=True)
+            return
 
-            # Write the updated content back to the file
-            with open(output_file_path, 'w', encoding='utf-8') as file:
-                file.write("\n".join(updated_lines) + "\n")  # Ensure a newline at the end
+        for warning in task.stats.warnings:
+            self.logger.log_message(warning, level="warning", to_tab=True, to_gui=True, to_notification=False)
+        for note in task.stats.notes:
+            self.logger.log_message(note, level="info", to_tab=True, to_gui=True, to_notification=False)
+        encoding_message = task.stats.encoding_message()
+        if encoding_message:
+            self.logger.log_message(encoding_message, level="info", to_tab=True, to_gui=True, to_notification=False)
+        self.logger.log_message(task.stats.throughput_message(),
+                              level="info", to_tab=True, to_gui=True, to_notification=False)
+
+        if self.parent_widget.copy_styles_checkbox.isChecked():
+            self._copy_qml_files()
+
+        # update the process text field
+        self.parent_widget.process_input_file_input.setText(task.output_file_path)
+        if self.file_viewer.isChecked():
+            self.file_viewer.load(task.output_file_path)
+        self.logger.log_message("Files successfully processed!", 
+                              level="info", to_tab=True, to_gui=True, to_notification=not watch_run)
+        if watch_run:
+            self.parent_widget.data_processor.rerun_for_input(task.output_file_path)
+
+    def _set_normalize_running(self, running):
+        """Toggle run/cancel buttons and the progress label."""
+        self.parent_widget.run_button.setEnabled(not running)
+        self.normalize_cancel_button.setVisible(running)
+        self.normalize_progress_label.setVisible(running)
+        if not running:
+            self.normalize_progress_label.setText("")
+
+    def _get_input_files(self):
+        """Return the selected .txt or .dat files in alphabetical order.
+
+        Folders and patterns are resolved with the shared InputResolver,
+        which only reads the folders again if they changed since the last scan.
+        """
+        resolved = self.input_resolver.resolve(self.parent_widget.input_select.text())
+        if resolved.missing:
+            self.logger.log_message(f"Input not found, skipped: {'; '.join(resolved.missing)}",
+                                  level="warning", to_tab=True, to_gui=True, to_notification=False)
+        if self.input_file_list.isChecked():
+            self.input_file_list.show_resolved(resolved)
+        input_files = resolved.paths
+        if not input_files:
+            self.logger.log_message("No valid .txt or .dat files (optionally .gz/.bz2/.zst compressed) selected", 
+                                  level="error", to_tab=True, to_gui=True, to_notification=True)
+            raise FileNotFoundError("No valid .txt or .dat files (optionally .gz/.bz2/.zst compressed) selected")
+        return input_files
+
+    def _get_normalize_options(self):
+        """Collect the enabled normalize steps from the Normalize tab."""
+        cols_after_id = ""
+        if (self.parent_widget.cols_after_id_checkbox.isChecked() and
+            self.parent_widget.cols_after_ids_input.text().strip()):
+            cols_after_id = self.parent_widget.cols_after_ids_input.text()
+
+        replace_geotags = self.parent_widget.standard_geotags_checkbox.isChecked()
+        search = self.parent_widget.search_character.text()
+        replace = self.parent_widget.replace_character.text()
+        geotag_rules = self.parent_widget.geotag_rules_input.toPlainText()
+        if replace_geotags:
+            # Compile the rules as the task will, so errors show before it starts
+            try:
+                make_geotag_replacer(search, replace, geotag_rules)
+            except ValueError as e:
+                raise ValueError(f"Invalid geotag rule: {e}")
+
+        transform_table = self.parent_widget.transform_table_input.text().strip()
+        if transform_table:
+            if not os.path.isfile(transform_table):
+                raise FileNotFoundError(f"Station transform table not found: {transform_table}")
+            try:
+                load_transform_table(transform_table)
+            except ValueError as e:
+                raise ValueError(f"Invalid station transform table: {e}")
+
+        return NormalizeOptions(
+            replace_geotags=replace_geotags,
+            search=search,
+            replace=replace,
+            geotag_rules=geotag_rules,
+            fix_lines=self.parent_widget.fix_lines_checkbox.isChecked(),
+            cols_after_id=cols_after_id,
+            workers=self.parent_widget.normalize_workers_input.value(),
+            encoding=self.parent_widget.normalize_encoding_input.currentText(),
+            write_index=self.parent_widget.normalize_index_checkbox.isChecked(),
+            merge_column=self.parent_widget.merge_column_input.value(),
+            merge_numeric=self.parent_widget.merge_numeric_checkbox.isChecked(),
+            transform_table=transform_table,
+            find_duplicates=self.parent_widget.find_duplicates_checkbox.isChecked(),
+            duplicate_tolerance=self.parent_widget.duplicate_tolerance_input.value(),
+            drop_duplicates=self.parent_widget.drop_duplicates_checkbox.isChecked(),
+        )
 
-            self.logger.log_message(f"Columns added to file: {output_file_path}", 
-                                level="info", to_tab=True, to_gui=True, to_notification=False)
+    def fill_recipe(self, recipe):
+        """Copy the Normalize tab settings into a Recipe."""
+        recipe.inputs = split_entries(self.parent_widget.input_select.text())
+        recipe.output_directory = self.parent_widget.output_select_input.text().strip()
+        recipe.output_filename = self.parent_widget.output_filename_input.text().strip()
+        recipe.normalize = self._get_normalize_options()
+        recipe.styles_folder = self.parent_widget.styles_folder_path_input.text().strip()
+        recipe.copy_styles = self.parent_widget.copy_styles_checkbox.isChecked()
+        recipe.epsg = self.parent_widget.epsg_input.text().strip()
+
+    def apply_recipe(self, recipe):
+        """Fill the Normalize tab from a Recipe."""
+        self.parent_widget.input_select.setText("; ".join(recipe.inputs))
+        self.parent_widget.output_select_input.setText(recipe.output_directory)
+        self.parent_widget.output_filename_input.setText(recipe.output_filename)
+        for option, widget_name in NORMALIZE_OPTION_WIDGETS.items():
+            self._set_widget_value(getattr(self.parent_widget, widget_name), getattr(recipe.normalize, option))
+        self.parent_widget.cols_after_id_checkbox.setChecked(bool(recipe.normalize.cols_after_id))
+        self.parent_widget.styles_folder_path_input.setText(recipe.styles_folder)
+        self.parent_widget.copy_styles_checkbox.setChecked(recipe.copy_styles)
+        self.parent_widget.epsg_input.setText(recipe.epsg)
 
-        except Exception as e:
-            self.logger.log_message(f"Error adding columns to file {output_file_path}: {e}", 
-                                level="error", to_tab=True, to_gui=True, to_notification=True)
-            
+    def _copy_qml_files(self):
+        """Copy QML style files and SVG folder from the selected styles folder to the output directory."""
+        copy_styles(
+            self.parent_widget.styles_folder_path_input.text().strip(),
+            self.parent_widget.output_select_input.text().strip(),
+            lambda message, level: self.logger.log_message(
+                message, level=level, to_tab=True, to_gui=True, to_notification=level in ("error", "warning")
+            ),
+        )
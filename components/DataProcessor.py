@@ -2,16 +2,29 @@ import os
 from qgis.PyQt import QtWidgets, uic, QtCore
 from qgis.core import QgsProject, QgsVectorLayer
 from qgis.core import QgsProject
-from osgeo import ogr, osr
+from osgeo import ogr
 from qgis.core import QgsCoordinateReferenceSystem, QgsPointXY, QgsRectangle
 
 from .. s2g_logging import Survey2GISLogger
+from .ValidateTask import ValidateTask
+from .JobTable import JobTable
+from .PreflightTask import PreflightTask
+from .command_options import CommandList, build_command
+from .job_scheduler import COMMAND, GEOPACKAGE, JobScheduler, default_parallel_runs, plan_jobs
+from .coordinate_outliers import find_outliers, write_outlier_report
+from .geopackage_writer import GeoPackageWriter
+from .input_stats import add_run, collect_input_stats, runtime_message
+from .parser_profile import write_report
+from .point_spacing import suggest_spacing as suggest_point_spacing
+from .recipe import Recipe, RecipeCommand, RecipeError, load_recipe, save_recipe
+from .run_cache import RunCache
+from .survey_output import (count_features, delete_intermediate_files, filter_spatialfiles, geopackage_path,
+                            load_alias_mapping, scan_spatialfiles)
 import os
-from qgis.core import QgsProject, QgsSettings
-import re
-import fnmatch
-import configparser
-from datetime import datetime
+from qgis.core import QgsApplication, QgsProject, QgsSettings
+import dataclasses
+import json
+import time
 
 
 FORM_CLASS, _ = uic.loadUiType(
@@ -26,10 +39,29 @@ class DataProcessor:
         self.parent_widget = parent_widget
         self.logger = Survey2GISLogger(parent_widget)
         self.VALID_EPSG_RANGE = (1000, 99999)
+        # Issues shown in the Logs tab, the report file lists all of them
+        self.VALIDATION_LOG_LIMIT = 50
 
         self.command_history_file = os.path.join(os.path.dirname(__file__), "..", "command_history.txt")
-        self.current_commands = []
-        self.current_command_index = 0
+        # Parsed lines of the command field, kept in sync by _sync_command_list
+        self.command_list = CommandList()
+        # Commands of the running sequence
+        self.current_commands = CommandList()
+        # Jobs of the running command sequence and the QProcess of each running job
+        self.job_scheduler = None
+        # GeoPackage of the running sequence, the layers written to it and their shapefiles
+        self.geopackage_file = None
+        self.written_layers = []
+        self.intermediate_file_dict = {}
+        self._recreate_geopackage = False
+        # Result cache of the running sequence, None if it is switched off
+        self.run_cache = None
+        self.running_processes = {}
+        # Seconds without output after which a survey2gis process is killed
+        self.PROCESS_TIMEOUT = 60
+        self.activity_timer = QtCore.QTimer()
+        self.activity_timer.setInterval(10000)
+        self.activity_timer.timeout.connect(self._check_process_activity)
 
         saved_alias_file = self.parent_widget.alias_file_input.text().strip()
         if saved_alias_file and os.path.exists(saved_alias_file):
@@ -72,7 +104,149 @@ class DataProcessor:
             '-2': self.parent_widget.force_2d_checkbox,
         }
 
+        self.validate_task = None
+        # Running PreflightTasks by description, one of each at a time
+        self.preflight_tasks = {}
+        # Input size and duration of past survey2gis runs, for the runtime estimate
+        self.settings = QtCore.QSettings('CSGIS', 'Survey2GIS_DataProcessor')
+        # A command sequence is running; incremental runs come from the watch-folder mode
+        self.commands_running = False
+        self.incremental_run = False
+        self._pending_rerun_inputs = []
+        self._add_validate_button()
+        self._add_recipe_buttons()
+        self._add_run_options()
+        self._add_job_table()
         self.connect_signals()
+        self._sync_command_list()
+
+    def _add_validate_button(self):
+        """Add the preflight buttons in front of 'add command' and a statistics label below."""
+        self.validate_input_button = QtWidgets.QPushButton("validate input")
+        self.validate_input_button.setToolTip(
+            "Check the input file against the parser profile (field counts, types, "
+            "unique values, geometry tags) before running survey2gis."
+        )
+        self.input_stats_button = QtWidgets.QPushButton("input statistics")
+        self.input_stats_button.setToolTip(
+            "Count lines and objects per geometry tag, measure extent and z range, guess the CRS "
+            "and estimate the survey2gis runtime from past runs. Reads the input file once."
+        )
+        self.suggest_spacing_button = QtWidgets.QPushButton("suggest tolerance/snapping")
+        self.suggest_spacing_button.setToolTip(
+            "Measure the distance of every point to its nearest neighbour per geometry tag and fill "
+            "--tolerance and --snapping with values that fit the spacing. Details go to the Logs tab."
+        )
+        self.outlier_check_checkbox = QtWidgets.QCheckBox("check coordinates first")
+        self.outlier_check_checkbox.setToolTip(
+            "Before a command is added, look for mistyped coordinates (robust median/MAD statistics "
+            "per input file and geometry tag, distance to the object centroid) and report them in the Logs tab."
+        )
+        self.input_stats_label = QtWidgets.QLabel("")
+        self.input_stats_label.setWordWrap(True)
+        self.input_stats_label.setTextInteractionFlags(QtCore.Qt.TextSelectableByMouse)
+        self.input_stats_label.setVisible(False)
+
+        add_button = self.parent_widget.add_command_button
+        top_layout = add_button.parentWidget().layout()
+        # The button sits in a row layout nested in the tab's grid
+        row_layout = self._find_layout(top_layout, add_button) if top_layout is not None else None
+        if isinstance(row_layout, QtWidgets.QBoxLayout):
+            index = row_layout.indexOf(add_button)
+            for offset, widget in enumerate((self.validate_input_button, self.input_stats_button,
+                                             self.suggest_spacing_button, self.outlier_check_checkbox)):
+                row_layout.insertWidget(index + offset, widget)
+        elif top_layout is not None:
+            for widget in (self.validate_input_button, self.input_stats_button, self.suggest_spacing_button,
+                           self.outlier_check_checkbox):
+                top_layout.addWidget(widget)
+        if isinstance(top_layout, QtWidgets.QGridLayout):
+            top_layout.addWidget(self.input_stats_label, top_layout.rowCount(), 0, 1, top_layout.columnCount())
+        elif top_layout is not None:
+            top_layout.addWidget(self.input_stats_label)
+
+    def _add_recipe_buttons(self):
+        """Add recipe save/load buttons next to the command save/load buttons."""
+        self.save_recipe_button = QtWidgets.QPushButton("save recipe")
+        self.save_recipe_button.setToolTip(
+            "Save the whole run (inputs, normalize steps, commands, alias file, GeoPackage name, styles) "
+            "as a .toml or .json recipe. Recipes also run without QGIS, see components/recipe_runner.py."
+        )
+        self.load_recipe_button = QtWidgets.QPushButton("load recipe")
+        self.load_recipe_button.setToolTip("Fill the Normalize and Process tabs from a recipe.")
+        load_button = self.parent_widget.load_commands_button
+        top_layout = load_button.parentWidget().layout()
+        row_layout = self._find_layout(top_layout, load_button) if top_layout is not None else None
+        if isinstance(row_layout, QtWidgets.QBoxLayout):
+            index = row_layout.indexOf(load_button)
+            row_layout.insertWidget(index + 1, self.save_recipe_button)
+            row_layout.insertWidget(index + 2, self.load_recipe_button)
+        elif top_layout is not None:
+            top_layout.addWidget(self.save_recipe_button)
+            top_layout.addWidget(self.load_recipe_button)
+
+    def _add_run_options(self):
+        """Add the size of the process pool and the result cache next to 'stop on errors'.
+
+        The checkbox sits without a layout, so the new widgets are placed beside it.
+        """
+        self.parallel_runs_input = QtWidgets.QSpinBox()
+        self.parallel_runs_input.setRange(1, max(64, default_parallel_runs()))
+        self.parallel_runs_input.setValue(default_parallel_runs())
+        self.parallel_runs_input.setToolTip(
+            "Number of survey2gis commands run at the same time; 1 runs them one after the other. "
+            "Defaults to the number of CPUs."
+        )
+        label = QtWidgets.QLabel("parallel runs")
+        label.setToolTip(self.parallel_runs_input.toolTip())
+        self.run_cache_checkbox = QtWidgets.QCheckBox("reuse unchanged results (cache)")
+        self.run_cache_checkbox.setChecked(True)
+        self.run_cache_checkbox.setToolTip(
+            "Restore the shapefiles and log of an earlier run instead of starting survey2gis when the "
+            "input file, parser, options and binary are unchanged, e.g. after editing only aliases or styles."
+        )
+        self.clear_run_cache_button = QtWidgets.QPushButton("clear cache")
+        self.clear_run_cache_button.setToolTip("Drop all cached survey2gis results.")
+
+        checkbox = self.parent_widget.stop_on_errors
+        container = QtWidgets.QWidget(checkbox.parentWidget())
+        row_layout = QtWidgets.QHBoxLayout(container)
+        row_layout.setContentsMargins(0, 0, 0, 0)
+        for widget in (label, self.parallel_runs_input, self.run_cache_checkbox, self.clear_run_cache_button):
+            row_layout.addWidget(widget)
+        geometry = checkbox.geometry()
+        container.setGeometry(geometry.right() + 10, geometry.top(), container.sizeHint().width(),
+                              max(geometry.height(), container.sizeHint().height()))
+        checkbox.parentWidget().setMinimumHeight(container.geometry().bottom() + 1)
+        self.parent_widget.parallel_runs_input = self.parallel_runs_input
+        self.parent_widget.run_cache_checkbox = self.run_cache_checkbox
+        normalizer = self.parent_widget.data_normalizer
+        normalizer.register_saveable_field('parallel_runs_input', 's2g_process/parallel_runs_input',
+                                           default_parallel_runs())
+        normalizer.register_saveable_field('run_cache_checkbox', 's2g_process/run_cache_checkbox', True)
+
+    def _add_job_table(self):
+        """Add the job table below the command field."""
+        self.job_table = JobTable()
+        command_field = self.parent_widget.command_code_field
+        layout = command_field.parentWidget().layout()
+        if isinstance(layout, QtWidgets.QGridLayout):
+            layout.addWidget(self.job_table, layout.rowCount(), 0, 1, layout.columnCount())
+        elif layout is not None:
+            layout.addWidget(self.job_table)
+
+    @staticmethod
+    def _find_layout(layout, widget):
+        """Return the layout, possibly nested in ``layout``, that holds ``widget``."""
+        for position in range(layout.count()):
+            item = layout.itemAt(position)
+            if item.widget() is widget:
+                return layout
+            if item.layout() is not None:
+                found = DataProcessor._find_layout(item.layout(), widget)
+                if found is not None:
+                    return found
+        return None
 
     def connect_signals(self):
         """Connect GUI elements to their respective methods."""
@@ -109,9 +283,16 @@ class DataProcessor:
         ) 
 
         self.parent_widget.add_command_button.clicked.connect(self.add_command)
+        self.validate_input_button.clicked.connect(self.validate_input)
+        self.input_stats_button.clicked.connect(self.show_input_stats)
+        self.suggest_spacing_button.clicked.connect(self.suggest_spacing)
         self.parent_widget.save_commands_button.clicked.connect(self.save_command_history)
         self.parent_widget.load_commands_button.clicked.connect(self.load_commands_from_file) 
+        self.save_recipe_button.clicked.connect(self.save_recipe)
+        self.load_recipe_button.clicked.connect(self.load_recipe)
         self.parent_widget.run_commands_button.clicked.connect(self.run_commands)
+        self.parent_widget.command_code_field.textChanged.connect(self._sync_command_list)
+        self.clear_run_cache_button.clicked.connect(self.clear_run_cache)
 
 
 
@@ -183,13 +364,21 @@ class DataProcessor:
 
     def add_command(self):
         """Process the files using the survey2gis command line tool."""
-        try:
-            if (not self.parent_widget.process_input_file_input.text().strip() or
-                not self.parent_widget.select_parser_input.text().strip() or
-                not self.parent_widget.name_generated_file_input.text().strip()):
-                self.logger.log_message("Please fill all required fields in Tab 'Process'", level="error", to_tab=False, to_gui=False, to_notification=True)
-                return
+        if (not self.parent_widget.process_input_file_input.text().strip() or
+            not self.parent_widget.select_parser_input.text().strip() or
+            not self.parent_widget.name_generated_file_input.text().strip()):
+            self.logger.log_message("Please fill all required fields in Tab 'Process'", level="error", to_tab=False, to_gui=False, to_notification=True)
+            return
+
+        if self.outlier_check_checkbox.isChecked():
+            # The command is generated once the report is out
+            self.check_outliers()
+            return
+        self._generate_command()
 
+    def _generate_command(self):
+        """Build the survey2gis command from the Process tab and add it to the list."""
+        try:
             self.output_base_name = self.parent_widget.name_generated_file_input.text().strip()
             self.command_options = self.read_options()
             command = self.build_command(
@@ -203,6 +392,194 @@ class DataProcessor:
         except FileNotFoundError as e:
             self.logger.log_message(f"File not found: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
 
+    def _start_preflight_task(self, description, function, button, on_finished):
+        """Run ``function`` on the input file in a PreflightTask; returns False if it was not started.
+
+        ``button`` is disabled while the task runs, ``on_finished(task, result)``
+        is called when it is done.
+        """
+        if description in self.preflight_tasks:
+            self.logger.log_message(f"Already running: {description}",
+                                    level="warning", to_tab=False, to_gui=True, to_notification=True)
+            return False
+        input_file = self.sanitize_path(self.parent_widget.process_input_file_input.text().strip())
+        if not input_file or not os.path.isfile(input_file):
+            self.logger.log_message("Please select an existing input file in Tab 'Process'",
+                                    level="error", to_tab=False, to_gui=False, to_notification=True)
+            return False
+
+        def handle_finished(task, result):
+            self.preflight_tasks.pop(description, None)
+            button.setEnabled(True)
+            on_finished(task, result)
+
+        task = PreflightTask(
+            description, function, input_file,
+            self.sanitize_path(self.parent_widget.select_parser_input.text().strip()),
+            decimal_point=self.parent_widget.decimal_point_input.text().strip() or ".",
+            decimal_group=self.parent_widget.decimal_group_input.text().strip(),
+            on_finished=handle_finished,
+        )
+        self.preflight_tasks[description] = task
+        button.setEnabled(False)
+        QgsApplication.taskManager().addTask(task)
+        return True
+
+    def check_outliers(self):
+        """Check the input file for coordinate outliers in a background task, then add the command."""
+        self._start_preflight_task(
+            "check coordinates for outliers",
+            # find_outliers() groups by the tags only, not by geometry kind
+            lambda path, geom_tags, **kwargs: find_outliers(path, geom_tags.values(), **kwargs),
+            self.parent_widget.add_command_button, self._handle_outliers_finished,
+        )
+
+    def _handle_outliers_finished(self, task, result):
+        """Log the outlier report, write the full list next to the input and add the command."""
+        if not result:
+            if task.error is None:
+                # Canceled, no command either
+                return
+            self.logger.log_message(f"Error checking coordinates: {task.error}",
+                                    level="error", to_tab=True, to_gui=True, to_notification=True)
+        elif not task.report.outlier_count:
+            self.logger.log_message(task.report.summary(), level="success", to_tab=True, to_gui=True, to_notification=False)
+        else:
+            report = task.report
+            report_path = os.path.splitext(task.input_file)[0] + "_outliers.txt"
+            try:
+                write_outlier_report(report, report_path)
+            except OSError as e:
+                report_path = None
+                self.logger.log_message(f"Could not write outlier report: {e}",
+                                        level="warning", to_tab=True, to_gui=True, to_notification=False)
+
+            lines = [f"{report.summary()}" + (f", full list in {report_path}" if report_path else "")]
+            lines += [str(outlier) for outlier in report.outliers[:self.VALIDATION_LOG_LIMIT]]
+            if report.outlier_count > self.VALIDATION_LOG_LIMIT:
+                lines.append(f"... {report.outlier_count - self.VALIDATION_LOG_LIMIT} more")
+            self.logger.log_message("\n".join(lines), level="warning", to_tab=True, to_gui=True, to_notification=False)
+            self.logger.log_message(report.summary(), level="warning", to_tab=False, to_gui=False, to_notification=True)
+        self._generate_command()
+
+    def show_input_stats(self):
+        """Collect the preflight statistics of the input file in a background task."""
+        if self._start_preflight_task("input statistics", collect_input_stats,
+                                      self.input_stats_button, self._handle_input_stats_finished):
+            self.input_stats_label.setText("Collecting input statistics...")
+            self.input_stats_label.setVisible(True)
+
+    def _handle_input_stats_finished(self, task, result):
+        """Show the statistics and the runtime estimate in the Process tab and the Logs tab."""
+        if not result:
+            self.input_stats_label.setText("")
+            self.input_stats_label.setVisible(False)
+            if task.error is not None:
+                self.logger.log_message(f"Error collecting input statistics: {task.error}",
+                                        level="error", to_tab=True, to_gui=True, to_notification=True)
+            return
+
+        stats = task.report
+        lines = stats.summary_lines()
+        epsg_text = self.parent_widget.epsg_input.text().strip()
+        if stats.crs_guess is not None and stats.crs_guess.epsg and epsg_text.isdigit() \
+                and int(epsg_text) != stats.crs_guess.epsg:
+            lines.append(f"The EPSG field says {epsg_text}, the coordinates suggest {stats.crs_guess.epsg}")
+        lines.append(runtime_message(self._run_history(), stats.size))
+        self.input_stats_label.setText("\n".join(lines))
+        self.logger.log_message(f"Input statistics for {task.input_file}:\n" + "\n".join(lines),
+                                level="info", to_tab=True, to_gui=True, to_notification=False)
+
+    def suggest_spacing(self):
+        """Suggest --tolerance and --snapping from the point spacing in a background task."""
+        self._start_preflight_task("tolerance and snapping suggestion", suggest_point_spacing,
+                                   self.suggest_spacing_button, self._handle_spacing_finished)
+
+    def _handle_spacing_finished(self, task, result):
+        """Fill the tolerance and snapping fields and log the spacing per geometry tag."""
+        if not result:
+            if task.error is not None:
+                self.logger.log_message(f"Error measuring the point spacing: {task.error}",
+                                        level="error", to_tab=True, to_gui=True, to_notification=True)
+            return
+
+        report = task.report
+        confidences = []
+        for field, suggestion in ((self.parent_widget.tolerance_input, report.tolerance),
+                                  (self.parent_widget.snapping_input, report.snapping)):
+            if suggestion is None:
+                confidences.append("low")
+                continue
+            field.setText(suggestion.text())
+            field.setToolTip(f"Suggested value, {suggestion.confidence} confidence: {suggestion.note}")
+            confidences.append(suggestion.confidence)
+        self.logger.log_message(f"Point spacing of {task.input_file}:\n" + "\n".join(report.summary_lines()),
+                                level="warning" if "low" in confidences else "info",
+                                to_tab=True, to_gui=True, to_notification=False)
+
+    def _run_history(self):
+        try:
+            return json.loads(self.settings.value('s2g_process/run_history', '[]'))
+        except (TypeError, ValueError):
+            return []
+
+    def _record_run(self, input_bytes, seconds):
+        history = add_run(self._run_history(), input_bytes, seconds)
+        self.settings.setValue('s2g_process/run_history', json.dumps(history))
+
+    def validate_input(self):
+        """Validate the input file against the selected parser profile in a background task."""
+        input_file = self.parent_widget.process_input_file_input.text().strip()
+        parser_file = self.parent_widget.select_parser_input.text().strip()
+        if not input_file or not parser_file:
+            self.logger.log_message("Please select an input file and a parser file in Tab 'Process'",
+                                    level="error", to_tab=False, to_gui=False, to_notification=True)
+            return
+        if self.validate_task is not None:
+            self.logger.log_message("Validation is already running",
+                                    level="warning", to_tab=False, to_gui=True, to_notification=True)
+            return
+
+        self.validate_task = ValidateTask(
+            self.sanitize_path(input_file), self.sanitize_path(parser_file),
+            decimal_point=self.parent_widget.decimal_point_input.text().strip() or ".",
+            decimal_group=self.parent_widget.decimal_group_input.text().strip(),
+            on_finished=self._handle_validate_finished,
+        )
+        self.validate_input_button.setEnabled(False)
+        QgsApplication.taskManager().addTask(self.validate_task)
+
+    def _handle_validate_finished(self, task, result):
+        """Log the validation result and write the full issue list next to the input."""
+        self.validate_task = None
+        self.validate_input_button.setEnabled(True)
+
+        if not result:
+            if task.error is not None:
+                self.logger.log_message(f"Error validating input file: {task.error}",
+                                        level="error", to_tab=True, to_gui=True, to_notification=True)
+            return
+
+        report = task.report
+        if not report.issue_count:
+            self.logger.log_message(report.summary(), level="success", to_tab=True, to_gui=True, to_notification=True)
+            return
+
+        report_path = os.path.splitext(task.input_file)[0] + "_validation.txt"
+        try:
+            write_report(report, report_path)
+        except OSError as e:
+            report_path = None
+            self.logger.log_message(f"Could not write validation report: {e}",
+                                    level="warning", to_tab=True, to_gui=True, to_notification=False)
+
+        lines = [f"{report.summary()}" + (f", full list in {report_path}" if report_path else "")]
+        lines += [str(issue) for issue in report.issues[:self.VALIDATION_LOG_LIMIT]]
+        if report.issue_count > self.VALIDATION_LOG_LIMIT:
+            lines.append(f"... {report.issue_count - self.VALIDATION_LOG_LIMIT} more")
+        self.logger.log_message("\n".join(lines), level="warning", to_tab=True, to_gui=True, to_notification=False)
+        self.logger.log_message(report.summary(), level="warning", to_tab=False, to_gui=False, to_notification=True)
+
     def read_options(self):
             """Read options from UI fields and update command_options."""
             # Read main options
@@ -241,34 +618,8 @@ class DataProcessor:
 
     def build_command(self, generated_input_file):
         """Build the command to execute survey2gis."""
-        binary_path = self.parent_widget.get_binary_path()
-        # Always wrap binary path in quotes
-        command = [f'"{binary_path}"']
-        
-        # Get the command options
-        options = self.parent_widget.command_options.to_command_list()
-        
-        # Process options to wrap paths in quotes where needed
-        i = 0
-        while i < len(options):
-            if options[i] in ['-p', '-o']:  # These options are followed by paths
-                if i + 1 < len(options):
-                    # Wrap the path in quotes, removing any existing quotes first
-                    path = options[i + 1].strip('"')
-                    options[i + 1] = f'"{path}"'
-            i += 1
-        
-        command.extend(options)
-        
-        if hasattr(self.parent_widget.command_options, 'selections'):
-            for selection in self.parent_widget.command_options.selections:
-                command.extend(['-S', selection])
-        
-        # Wrap the input file path in quotes, removing any existing quotes first
-        input_file = self.sanitize_path(generated_input_file)
-        command.append(f'"{input_file}"')
-        
-        return command
+        return build_command(self.parent_widget.get_binary_path(), self.parent_widget.command_options,
+                             self.sanitize_path(generated_input_file))
     
     def process_selection_input(self, text):
         """Process selection input handling both space-separated items and quoted items."""
@@ -302,516 +653,424 @@ class DataProcessor:
 
     def run_commands(self):
         """Get and run all commands from the command code field"""
-        try:
-            commands = [cmd.strip() for cmd in self.parent_widget.command_code_field.toPlainText().split('\n') if cmd.strip()]
-            
-            if not commands:
-                self.logger.log_message("No commands found to execute", level="info", to_tab=True, to_gui=True, to_notification=True)
-                return
+        if self.commands_running:
+            self.logger.log_message("survey2gis commands are already running", level="warning", to_tab=False, to_gui=True, to_notification=True)
+            return
+        commands = list(self.command_list)
+        if not commands:
+            self.logger.log_message("No commands found to execute", level="info", to_tab=True, to_gui=True, to_notification=True)
+            return
+        self._start_command_sequence(commands)
 
-            # Extract output directory from first valid command
-            parts = self._split_command(commands[0])
-            output_dir, _ = self._extract_output_and_basename(parts)
-            
-            if not output_dir:
-                self.logger.log_message("Could not determine output directory from commands", level="error", to_tab=True, to_gui=True, to_notification=True)
-                return
-                
-            self.current_commands = commands
-            self.current_command_index = 0
-            
-            # Create logs directory
-            self.logs_dir = os.path.join(output_dir, 'logs')
-            print(f"Creating logs {self.logs_dir}")
+    def rerun_for_input(self, input_file):
+        """Run the stored commands that read ``input_file`` and refresh their layers in place.
 
-            os.makedirs(self.logs_dir, exist_ok=True)
-            
-            self.logger.log_message(f"Starting {len(commands)} command(s) please wait", level="info", to_tab=False, to_gui=False, to_notification=True)
-            self.logger.log_message(f"\n{'='*3}\nStarting command sequence execution for {len(commands)} command(s)", level="info", to_tab=True, to_gui=True, to_notification=False)
+        Used by the watch-folder mode after the normalized file was rebuilt.
+        Commands reading other files and the other layers of the GeoPackage
+        are left alone.
+        """
+        if self.commands_running:
+            if input_file not in self._pending_rerun_inputs:
+                self._pending_rerun_inputs.append(input_file)
+            return
+        commands = self._commands_for_inputs([input_file])
+        if not commands:
+            self.logger.log_message(f"No stored command reads {input_file}, nothing to rerun",
+                                    level="info", to_tab=True, to_gui=True, to_notification=False)
+            return
+        self._start_command_sequence(commands, incremental=True)
 
-            self.run_next_command()
-            
-        except Exception as e:
-            self.logger.log_message(f"Error preparing commands: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
+    def _sync_command_list(self):
+        """Parse the changed lines of the command field."""
+        self.command_list.update(self.parent_widget.command_code_field.toPlainText())
 
+    def _commands_for_inputs(self, input_files):
+        """The commands of the command field whose input file is one of ``input_files``."""
+        return self.command_list.for_inputs(input_files)
 
-    def run_next_command(self):
-        if self.current_command_index >= len(self.current_commands):
-            self.logger.log_message(f"\n{'='*3}\nAll survey2gis commands finished\n{'='*3}", level="success", to_tab=True, to_gui=True, to_notification=True)
-            self.load_survey_data()
-            self.handle_file_cleanup()
-            return
-                
-        command = self.current_commands[self.current_command_index]
+    def _start_command_sequence(self, commands, incremental=False):
+        """Run ``commands`` as jobs; the output of each basename goes to the GeoPackage once it is written."""
         try:
-            command_parts = self._split_command(command)
-            
-            # Find output base name from command (-n parameter)
-            for i, part in enumerate(command_parts):
-                if part == '-n' and i + 1 < len(command_parts):
-                    base_name = command_parts[i + 1].strip('"')
-                    self.log_file_path = os.path.join(self.logs_dir, f"{base_name}.log")
-                    break
-
-            # Add log file parameter if not already present
-            if '-l' not in command_parts and hasattr(self, 'log_file_path'):
-                command_parts.extend(['-l', self.log_file_path])
-
-            log_output = f"{'=-'*3}\n"
-            log_output += f"<b>Executing command {self.current_command_index + 1}/{len(self.current_commands)}:</b>\n"
-            log_output += " ".join(command_parts)
-            log_output = f"{'='*3}\n"
-            self.logger.log_message(log_output, level="info", to_tab=True, to_gui=True, to_notification=False)
-
-            self.current_command_output = []
-            self.run_process_sequential(command_parts)
-                
-        except Exception as e:
-            self.logger.log_message(f"Error processing command: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
+            # The logs and the GeoPackage go to the output directory of the first command
+            output_dir = commands[0].output_directory
+
+            if not output_dir:
+                self.logger.log_message("Could not determine output directory from commands", level="error", to_tab=True, to_gui=True, to_notification=True)
+                return
 
-    def run_process_sequential(self, command_parts):
-        """Run a single process and handle its completion."""
-        try:
             # Make sure the binary is actually runnable before we launch it.
             # Without this a missing exec-bit (Linux/macOS) or a blocked exe
             # (Windows) makes QProcess.start() fail silently, and the only
             # symptom the user sees is the 60-second inactivity timeout.
             if hasattr(self.parent_widget, "ensure_binary_executable"):
                 if not self.parent_widget.ensure_binary_executable():
-                    self._handle_command_failure(
-                        -1, "survey2gis binary is not executable - aborting."
-                    )
+                    self.logger.log_message("survey2gis binary is not executable - aborting.", level="error", to_tab=True, to_gui=True, to_notification=True)
                     return
 
-            self.process = QtCore.QProcess(self.parent_widget)
+            # Create logs directory
+            self.logs_dir = os.path.join(output_dir, 'logs')
+            os.makedirs(self.logs_dir, exist_ok=True)
 
-            # Initialize timeout tracking
-            self.last_output_time = datetime.now()
-            self.timeout_timer = QtCore.QTimer()
-            self.timeout_timer.setInterval(60000)  # 60 seconds
-            self.timeout_timer.timeout.connect(self._check_process_activity)
+            # A full run writes a new GeoPackage, an incremental one replaces its layers
+            self.geopackage_file = geopackage_path(output_dir,
+                                                   self.parent_widget.geopackage_name_input.text().strip(),
+                                                   self.parent_widget.output_filename_input.text().strip())
+            self._recreate_geopackage = not incremental
+            self.written_layers = []
+            self.intermediate_file_dict = {}
+            self.run_cache = self._open_run_cache() if self.run_cache_checkbox.isChecked() else None
+
+            jobs = plan_jobs(commands, self.logs_dir, self.geopackage_file)
+            self.current_commands = CommandList(commands)
+            self.commands_running = True
+            self.incremental_run = incremental
+            self.job_scheduler = JobScheduler(jobs, self.parallel_runs_input.value(),
+                                              self.parent_widget.stop_on_errors.isChecked())
+            self.running_processes = {}
+
+            at_once = min(self.job_scheduler.max_parallel, len(commands))
+            self.logger.log_message(f"Starting {len(commands)} command(s) please wait", level="info", to_tab=False, to_gui=False, to_notification=True)
+            self.logger.log_message(f"\n{'='*3}\nStarting command sequence execution for {len(commands)} command(s), "
+                                    f"{at_once} at a time", level="info", to_tab=True, to_gui=True, to_notification=False)
+            serialized = [job.label for job in self.job_scheduler.commands if job.after]
+            if serialized and at_once > 1:
+                self.logger.log_message(f"Commands writing the output of an earlier command wait for it: {', '.join(serialized)}",
+                                        level="info", to_tab=True, to_gui=True, to_notification=False)
+
+            self.activity_timer.start()
+            self.job_table.show_jobs(self.job_scheduler)
+            self._start_ready_jobs()
+            
+        except Exception as e:
+            self.logger.log_message(f"Error preparing commands: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
+            self.activity_timer.stop()
+            self._finish_command_sequence()
+
+    def _finish_command_sequence(self):
+        """Mark the sequence as done and start reruns the watch-folder mode queued meanwhile."""
+        self.commands_running = False
+        self.incremental_run = False
+        if self._pending_rerun_inputs:
+            input_files, self._pending_rerun_inputs = self._pending_rerun_inputs, []
+            commands = self._commands_for_inputs(input_files)
+            if commands:
+                self._start_command_sequence(commands, incremental=True)
+
+    def _start_ready_jobs(self):
+        """Start the jobs whose dependencies are done; completes the sequence once every job is done."""
+        ready = self.job_scheduler.take_ready()
+        while ready:
+            for job in ready:
+                self.job_table.job_changed(job)
+                if job.kind == GEOPACKAGE:
+                    self._finish_job(job, self._run_geopackage_job(job), 0, "")
+                elif self._restore_cached_run(job):
+                    self._finish_job(job, True, 0, "")
+                elif not self._start_job(job):
+                    self._finish_job(job, False, -1, "Process failed to start")
+            ready = self.job_scheduler.take_ready()
+        if self.job_scheduler.is_finished:
+            self._complete_command_sequence()
+
+    def _start_job(self, job):
+        """Launch the survey2gis process of ``job``; returns False if it did not start."""
+        log_output = f"{'=-'*3}\n"
+        log_output += f"<b>Executing command {job.index + 1}/{len(self.job_scheduler.commands)}:</b>\n"
+        log_output += " ".join(job.parts)
+        self.logger.log_message(log_output, level="info", to_tab=True, to_gui=True, to_notification=False)
 
-            # Connect signals
-            self.process.readyReadStandardOutput.connect(self.handle_stdout_sequential)
-            self.process.readyReadStandardError.connect(self.handle_stderr_sequential)
-            self.process.finished.connect(self.handle_process_finished_sequential)
+        try:
+            process = QtCore.QProcess(self.parent_widget)
+            process.readyReadStandardOutput.connect(lambda: self.handle_job_output(job, process))
+            process.readyReadStandardError.connect(lambda: self.handle_job_output(job, process, stderr=True))
+            process.finished.connect(
+                lambda exit_code, exit_status: self.handle_job_finished(job, process, exit_code, exit_status))
             # Surface a failed start immediately instead of waiting for timeout.
-            self.process.errorOccurred.connect(self.handle_process_error)
+            process.errorOccurred.connect(lambda error: self.handle_process_error(process, error))
 
-            # Start process and timer.
-            # command_parts[0] is the binary path wrapped in quotes for display;
+            # job.parts[0] is the binary path wrapped in quotes for display;
             # QProcess handles quoting itself, so we must pass the raw path as
             # the program or Qt will look for a file literally named '"..."'.
-            program = command_parts[0].strip('"')
-            arguments = [arg.strip('"') for arg in command_parts[1:]]
-            self.process.start(program, arguments)
-            self.timeout_timer.start()
+            program = job.parts[0].strip('"')
+            arguments = [arg.strip('"') for arg in job.parts[1:]]
+            process.start(program, arguments)
 
             # Confirm the process actually launched. On a failed start this
             # returns quickly and we report a real error.
-            if not self.process.waitForStarted(5000):
-                self.timeout_timer.stop()
+            if not process.waitForStarted(5000):
                 # Avoid double-handling via finished/errorOccurred signals.
                 try:
-                    self.process.finished.disconnect(self.handle_process_finished_sequential)
-                    self.process.errorOccurred.disconnect(self.handle_process_error)
+                    process.finished.disconnect()
+                    process.errorOccurred.disconnect()
                 except Exception:
                     pass
                 self.logger.log_message(
                     f"Process failed to start: {program} "
-                    f"({self.process.errorString()}). "
+                    f"({process.errorString()}). "
                     f"Run 'diagnose binary' in the Logs tab for details.",
                     level="error", to_tab=True, to_gui=True, to_notification=True,
                 )
-                self._handle_command_failure(-1, "Process failed to start")
+                process.deleteLater()
+                return False
+
+            self.running_processes[process] = job
+            return True
 
         except Exception as e:
             self.logger.log_message(f"Failed to start process: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
+            return False
 
-    def handle_process_error(self, error):
+    def handle_process_error(self, process, error):
         """Report QProcess errors (failed start, crash, etc.) right away."""
-        try:
-            if self.timeout_timer:
-                self.timeout_timer.stop()
-        except Exception:
-            pass
-        error_string = self.process.errorString() if self.process else str(error)
+        job = self.running_processes.get(process)
+        # Killed on purpose after a timeout or a failed command, reported there
+        if job is None or job.canceled or error == QtCore.QProcess.Crashed:
+            return
         self.logger.log_message(
-            f"survey2gis process error: {error_string}",
+            f"survey2gis process error in command {job.label}: {process.errorString()}",
             level="error", to_tab=True, to_gui=True, to_notification=True,
         )
 
     def _check_process_activity(self):
-        """Check if process has been inactive for too long."""
-        idle_time = (datetime.now() - self.last_output_time).total_seconds()
-        if idle_time > 60:
-            self.logger.log_message(f"Process inactive for {int(idle_time)} seconds - terminating", 
-                                level="error", to_tab=True, to_gui=True, to_notification=True)
-            self.timeout_timer.stop()
-            self.process.kill()
-            self._handle_command_failure(-1, "Process terminated due to inactivity")
-
-    def handle_stdout_sequential(self):
-        """Handle standard output from the current process."""
-        data = self.process.readAllStandardOutput().data().decode('utf-8', errors='replace')
-        self.current_command_output.append(data)
+        """Kill processes that have been inactive for too long."""
+        now = time.monotonic()
+        for process, job in list(self.running_processes.items()):
+            idle_time = now - job.last_output
+            if idle_time > self.PROCESS_TIMEOUT:
+                self.logger.log_message(f"Command {job.label} inactive for {int(idle_time)} seconds - terminating",
+                                        level="error", to_tab=True, to_gui=True, to_notification=True)
+                # Reported as a failure by handle_job_finished
+                job.last_output = now
+                process.kill()
+
+    def handle_job_output(self, job, process, stderr=False):
+        """Collect the output of a running command; stdout also goes to the Logs tab."""
+        if stderr:
+            data = process.readAllStandardError().data().decode('utf-8', errors='replace')
+        else:
+            data = process.readAllStandardOutput().data().decode('utf-8', errors='replace')
+        job.output.append(data)
+        job.last_output = time.monotonic()
+        if stderr or not data:
+            return
+        if self.job_scheduler.max_parallel > 1:
+            # Output of parallel commands interleaves, so say whose it is
+            data = "".join(f"[{job.label}] {line}\n" for line in data.splitlines())
         self.logger.log_message(f"{data}", level="info", to_tab=True, to_gui=True, to_notification=False)
 
-    def handle_stderr_sequential(self):
-        """Handle standard error from the current process."""
-        data = self.process.readAllStandardError().data().decode('utf-8', errors='replace')
-        self.current_command_output.append(data)
-        # self.logger.log_message(f"{data}", level="info", to_tab=True, to_gui=True, to_notification=False)
-
-    def handle_process_finished_sequential(self, exit_code, exit_status):
-        self.timeout_timer.stop()  # Stop the timer when process finishes normally
-
-        """Handle process completion and read log file"""
+    def handle_job_finished(self, job, process, exit_code, exit_status):
+        """Read the log file of a finished command and start the next ones."""
+        self.running_processes.pop(process, None)
+        process.deleteLater()
+        log_content = ""
         try:
-            log_content = ""
-            if os.path.exists(self.log_file_path):
-                with open(self.log_file_path, 'r', encoding='utf-8', errors='replace') as f:
+            if job.log_file and os.path.exists(job.log_file):
+                with open(job.log_file, 'r', encoding='utf-8', errors='replace') as f:
                     log_content = f.read()
+                if log_content and not job.canceled:
                     self.logger.log_message(log_content, level="info", to_tab=True, to_gui=True, to_notification=False)
-
-            if exit_code == 0 and "ERROR" not in log_content:
-                self.logger.log_message(f"Command {self.current_command_index + 1} completed", 
-                                    level="info", to_tab=True, to_gui=True, to_notification=False)
-                self.current_command_index += 1 
-                self.run_next_command()
-            else:
-                self._handle_command_failure(exit_code, log_content)
-                
+            ok = (exit_code == 0 and exit_status == QtCore.QProcess.NormalExit
+                  and "ERROR" not in log_content and not job.canceled)
         except Exception as e:
             self.logger.log_message(f"Error reading log file: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
+            ok = False
+        self._finish_job(job, ok, exit_code, log_content)
+        self._start_ready_jobs()
 
-    def _handle_command_failure(self, exit_code, output_text):
-        if self.parent_widget.stop_on_errors.isChecked():
-            """Handle the failure of a command."""
-            error_message = (f"Command {self.current_command_index + 1} failed "
-                            f"with exit code {exit_code}")
+    def _finish_job(self, job, ok, exit_code, output_text):
+        """Record the result of a job; a failure stops the scheduler if 'stop on errors' is checked."""
+        if not self.job_scheduler.finish(job, ok):
+            return
+        if job.kind == COMMAND:
+            job.exit_code = exit_code
+            if ok and job.output_dir and job.name:
+                job.features = count_features(job.output_dir, job.name)
+        self.job_table.job_changed(job)
+        if ok:
+            if job.kind == COMMAND and not job.cached:
+                self.logger.log_message(f"Command {job.label} completed in {job.elapsed:.1f} s",
+                                        level="info", to_tab=True, to_gui=True, to_notification=False)
+                if job.input_file and os.path.isfile(job.input_file):
+                    self._record_run(os.path.getsize(job.input_file), job.elapsed)
+                self._store_cached_run(job)
+            return
+        if job.canceled:
+            self.logger.log_message(f"Command {job.label} canceled", level="info", to_tab=True, to_gui=True, to_notification=False)
+            return
+        # Failed GeoPackage jobs were reported by _run_geopackage_job
+        if job.kind == COMMAND:
+            error_message = f"Command {job.label} failed with exit code {exit_code}"
             if "ERROR" in output_text:
                 error_message += f"\nError in survey2gis output detected"
+            self.logger.log_message(error_message, level="error", to_tab=True, to_gui=True,
+                                    to_notification=self.job_scheduler.stop_on_error)
+        if self.job_scheduler.stopped:
+            # Like the sequential run, nothing after a failed command should finish
+            for process, running_job in list(self.running_processes.items()):
+                if not running_job.canceled:
+                    running_job.canceled = True
+                    process.kill()
+
+    def _complete_command_sequence(self):
+        """All jobs are done: add the GeoPackage layers to the project unless the run stopped on an error."""
+        self.activity_timer.stop()
+        self._close_run_cache()
+        self.job_table.finish()
+        scheduler = self.job_scheduler
+        if scheduler.stopped and scheduler.failed:
+            not_run = len(scheduler.skipped) + sum(1 for job in scheduler.done if job.canceled)
+            self.logger.log_message(
+                f"Command sequence stopped: {len(scheduler.failed)} job(s) failed, {not_run} not run; "
+                f"no layers were added to the project",
+                level="error", to_tab=True, to_gui=True, to_notification=False)
+            self._finish_command_sequence()
+            return
 
-            self.logger.log_message(error_message, level="error", to_tab=True, to_gui=True, to_notification=True)
+        summary = "All survey2gis commands finished"
+        if scheduler.failed:
+            summary += f", {len(scheduler.failed)} of {len(scheduler.jobs)} job(s) failed"
+        self.logger.log_message(f"\n{'='*3}\n{summary}\n{'='*3}", level="warning" if scheduler.failed else "success",
+                                to_tab=True, to_gui=True, to_notification=True)
+        if not self.written_layers:
+            self.logger.log_message("No layers were written to the GeoPackage", level="warning",
+                                    to_tab=True, to_gui=True, to_notification=False)
+        elif self.incremental_run:
+            self.refresh_layers_from_geopackage(self.geopackage_file, self.written_layers)
         else:
-            self.current_command_index += 1
-            self.run_next_command()
+            self.add_layers_from_geopackage(self.geopackage_file)
+        self.handle_file_cleanup()
+        self._finish_command_sequence()
 
     # \n=> Save layer from source into geopackage
 
-    def load_survey_data(self):
-        """
-        Load supported survey data formats (shapefiles) and save them to a single GeoPackage.
-        """
-        try:
-            self.logger.log_message(f"\n{'='*3}\nStarting  convert to geopackage", level="info", to_tab=True, to_gui=True, to_notification=False)
-
-            # Get all commands from the command code field
-            commands = [cmd.strip() for cmd in self.parent_widget.command_code_field.toPlainText().split('\n') if cmd.strip()]
-            self.logger.log_message(f"Found {len(commands)} commands to process\n{'='*3}\n", level="info", to_tab=True, to_gui=True, to_notification=False)
-
-            if not commands:
-                self.logger.log_message("No commands found to process\n{'='*30}", level="error", to_tab=True, to_gui=True, to_notification=False)
-                return
-
-            root = QgsProject.instance().layerTreeRoot()
-            processed_basenames = set()
-
-            # Use a single GeoPackage file for all layers
-            output_dir = None  # We'll update this as we extract it from commands
-            gpkg_path = None   # GeoPackage path will be defined when we know output_dir
-
-            for command_index, command in enumerate(commands):
-                self.logger.log_message(f"Processing command {command_index + 1}/{len(commands)}\n", level="info", to_tab=True, to_gui=True, to_notification=False)
-                self.logger.log_message(f"{command}\n", level="info", to_tab=True, to_gui=True, to_notification=False)
-
-                # Split the command while preserving quoted strings
-                parts = self._split_command(command)
-
-                # Extract output directory and basename from command
-                current_output_dir, basename = self._extract_output_and_basename(parts)
-                if not current_output_dir or not basename:
-                    self.logger.log_message(f"Missing output directory or basename in command: {command}", level="info", to_tab=True, to_gui=True, to_notification=False)
-                    continue
-
-                # Set the output directory and GeoPackage path
-                if output_dir is None:
-                    output_dir = current_output_dir
-                    geopackage_filename = self.parent_widget.geopackage_name_input.text().strip()
-                    custom_filename = self.parent_widget.output_filename_input.text().strip()
-                    if geopackage_filename:
-                        gpkg_path = os.path.join(output_dir, f"{geopackage_filename}.gpkg")
-                    elif custom_filename:
-                        gpkg_path = os.path.join(output_dir, f"{custom_filename}.gpkg")
-                    else:
-                        gpkg_path = os.path.join(output_dir, f"s2g_merged_data_{datetime.now().strftime('%Y-%m-%d')}.gpkg")
-
-                # Skip if already processed
-                if basename in processed_basenames:
-                    self.logger.log_message(f"Skipping already processed basename: {basename}", level="info", to_tab=True, to_gui=True, to_notification=False)
-                    continue
+    def _run_cache_dir(self):
+        """Location of the survey2gis result cache inside the QGIS profile folder."""
+        return os.path.join(QgsApplication.qgisSettingsDirPath(), "survey2gis", "run_cache")
 
-                processed_basenames.add(basename)
-
-            
-            # => Save all layers (from all basenames) to a single GeoPackage if any were loaded
- 
-            all = self.scan_directory_for_spatialfiles(current_output_dir)
-            self.logger.log_message(f"Created files are {str(all)}", level="info", to_tab=True, to_gui=False, to_notification=False)
-            self.logger.log_message(f"gpg path ist {str(gpkg_path)}", level="info", to_tab=True, to_gui=False, to_notification=False)
-
-            self.iter_found_files_and_pass_to_geopackage(all, gpkg_path)
-            self.logger.log_message("=== Completed load_survey_data function ===", level="info", to_tab=True, to_gui=False, to_notification=False)
-
-        except Exception as e:
-            self.logger.log_message(f"Error: {str(e)}", level="error", to_tab=True, to_gui=True, to_notification=True)
-
-    def scan_directory_for_spatialfiles(self, directory):
-
-        # Initialize an empty dictionary with 'shp' as top-level key
-        grouped_files = {
-            'shp': {}
-        }
-
-        # Compile regex to match the keywords polygon, point, label or line (case-insensitive)
-        keyword_pattern = re.compile(r'(poly|point|line|labels)', re.IGNORECASE)
-
-        # Define valid file extensions
-        valid_extensions = ['*.shp']
-
-        # Walk through the directory and find matching files
-        for root, dirs, files in os.walk(directory):
-            for extension in valid_extensions:
-                for file in fnmatch.filter(files, extension):
-                    # Check if the file name contains any of the keywords
-                    match = keyword_pattern.search(file)
-                    if match:
-                        file_lower = file.lower()
-                        # Split the filename after the first underscore
-                        prefix = file.split('_', 1)[0]
-                        # Determine the file type ('shp')
-                        file_type = 'shp'
-                        
-                        # Ensure the prefix exists under the correct file type
-                        if prefix not in grouped_files[file_type]:
-                            grouped_files[file_type][prefix] = {'polygon': [], 'line': [], 'point': [], 'labels': []}
-
-                        # Classify and add the file to the appropriate list under the file type and prefix
-                        file_path = os.path.join(root, file)
-                        if 'poly' in file_lower:
-                            grouped_files[file_type][prefix]['polygon'].append(file_path)
-                        elif 'line' in file_lower:
-                            grouped_files[file_type][prefix]['line'].append(file_path)
-                        elif 'point' in file_lower:
-                            grouped_files[file_type][prefix]['point'].append(file_path)
-                        elif 'labels' in file_lower:
-                            grouped_files[file_type][prefix]['labels'].append(file_path)
-
-        # Convert the dictionary to the desired format: type -> prefix -> list with [polygons, lines, points, labels]
-        result = {}
-        for file_type, prefixes in grouped_files.items():
-            result[file_type] = {}
-            for prefix, file_dict in prefixes.items():
-                # Combine the lists into the desired order: polygons first, lines second, points third, labels last
-                result[file_type][prefix] = file_dict['polygon'] + file_dict['line'] + file_dict['point'] + file_dict['labels']
-
-        self.intermediate_file_dict = result
-
-        return result
-
-    def iter_found_files_and_pass_to_geopackage(self, data, output_gpkg):
-
-        # Create the output GPKG file only once
-        drv = ogr.GetDriverByName('GPKG')
-        out_ds = drv.CreateDataSource(output_gpkg)
-
-        if os.path.exists(output_gpkg):
-            self.logger.log_message(f"geopackage exists: {output_gpkg}", level="info", to_tab=True, to_gui=False, to_notification=False)
-
-            # os.remove(output_gpkg)  # Remove existing file if present
-            group_name = "My Merged Data"
-            self.logger.log_message(f"{str(data.items())}", level="info", to_tab=True, to_gui=False, to_notification=False)
-
-            for file_type, groups in data.items():
-                for group, file_list in groups.items():
-                    self.logger.log_message(f"Processing Group: {group}", level="info", to_tab=True, to_gui=False, to_notification=False)
-                    self.logger.log_message(f"list is {file_list}", level="info", to_tab=True, to_gui=False, to_notification=False)
+    def _open_run_cache(self):
+        try:
+            return RunCache(self._run_cache_dir())
+        except OSError as e:
+            self.logger.log_message(f"survey2gis result cache not available: {e}", level="warning",
+                                    to_tab=True, to_gui=True, to_notification=False)
+            return None
 
-                    # Pass the open GeoPackage data source (out_ds) to the function
-                    self.shapefiles_to_gpkg(file_list, out_ds)
+    def _restore_cached_run(self, job):
+        """Copy the cached result of ``job`` into its output folder; returns False on a miss."""
+        if self.run_cache is None:
+            return False
+        try:
+            job.cache_key = self.run_cache.key_for(job.command.binary, job.command.options, job.command.input_file)
+            if job.cache_key is None or self.run_cache.lookup(job.cache_key) is None:
+                return False
+            restored = self.run_cache.restore(job.cache_key, job.output_dir, job.log_file)
+        except OSError as e:
+            self.logger.log_message(f"Command {job.label}: result cache not used: {e}", level="warning",
+                                    to_tab=True, to_gui=True, to_notification=False)
+            return False
+        job.cached = True
+        self.logger.log_message(f"Command {job.label} unchanged, {len(restored)} file(s) restored from the result cache",
+                                level="info", to_tab=True, to_gui=True, to_notification=False)
+        return True
 
-            self.add_layers_from_geopackage(output_gpkg)
+    def _store_cached_run(self, job):
+        if self.run_cache is None or not job.cache_key:
+            return
+        try:
+            self.run_cache.store(job.cache_key, job.name, job.output_dir, job.log_file, since=job.started_at)
+        except OSError as e:
+            self.logger.log_message(f"Command {job.label}: result not cached: {e}", level="warning",
+                                    to_tab=True, to_gui=True, to_notification=False)
+
+    def _close_run_cache(self):
+        """Report hits and misses, evict old results and write the manifest."""
+        if self.run_cache is None:
+            return
+        self.logger.log_message(self.run_cache.summary(), level="info", to_tab=True, to_gui=True, to_notification=False)
+        try:
+            self.run_cache.evict()
+            self.run_cache.save()
+        except OSError as e:
+            self.logger.log_message(f"Error writing the survey2gis result cache: {e}", level="warning",
+                                    to_tab=True, to_gui=True, to_notification=False)
+        self.run_cache = None
+
+    def clear_run_cache(self):
+        """Invalidate all cached survey2gis results."""
+        if self.commands_running:
+            self.logger.log_message("Cannot clear the cache while survey2gis commands are running",
+                                    level="warning", to_tab=False, to_gui=True, to_notification=True)
+            return
+        try:
+            RunCache(self._run_cache_dir()).clear()
+            self.logger.log_message("survey2gis result cache cleared",
+                                    level="info", to_tab=True, to_gui=True, to_notification=True)
+        except OSError as e:
+            self.logger.log_message(f"Error clearing survey2gis result cache: {e}",
+                                    level="error", to_tab=True, to_gui=True, to_notification=True)
 
-            # Cleanup: Close the GeoPackage
-            del out_ds
+    def _run_geopackage_job(self, job):
+        """Copy the shapefiles of one basename into the GeoPackage; returns False if that failed.
 
+        Runs as soon as the commands writing the basename are done. The layers
+        are replaced, so the other layers of the GeoPackage are kept; a full
+        run starts from a new GeoPackage with its first basename.
+        """
+        data = filter_spatialfiles(scan_spatialfiles(job.output_dir), [job.name])
+        if not any(data.values()):
+            self.logger.log_message(f"survey2gis wrote no shapefiles for {job.name}", level="warning",
+                                    to_tab=True, to_gui=True, to_notification=False)
+            return True
+        try:
+            if self._recreate_geopackage:
+                self._recreate_geopackage = False
+                if os.path.exists(self.geopackage_file):
+                    ogr.GetDriverByName('GPKG').DeleteDataSource(self.geopackage_file)
+            layer_names = self._geopackage_writer().write(data, self.geopackage_file, replace=True)
+        except (OSError, RuntimeError) as e:
+            self.logger.log_message(f"{job.label} failed: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
+            return False
+        self.written_layers.extend(name for name in layer_names if name not in self.written_layers)
+        for file_type, groups in data.items():
+            self.intermediate_file_dict.setdefault(file_type, {}).update(groups)
+        self.logger.log_message(f"{job.label}: {len(layer_names)} layer(s) written to {self.geopackage_file}",
+                                level="info", to_tab=True, to_gui=True, to_notification=False)
+        return True
 
     def _get_crs_from_command(self, layer_name):
+        """EPSG code from --proj-out of the command that wrote ``layer_name``, or None.
+
+        Looks in the commands of the running sequence, else in the command field.
         """
-        Extract CRS from command line that matches the layer name.
-        Returns (srs, epsg_code) tuple or (None, None) if not found.
-        """
-        try:
-            # Get commands from command field
-            commands = [cmd.strip() for cmd in self.parent_widget.command_code_field.toPlainText().split('\n') if cmd.strip()]
-            
-            # Find command with matching layer name
-            for command in commands:
-                if f'-n {layer_name}' in command or f'-n "{layer_name}"' in command:
-                    # Check for --proj-out parameter
-                    proj_match = re.search(r'--proj-out=(?:epsg:)?(\d+)', command.lower())
-                    if proj_match:
-                        epsg_code = int(proj_match.group(1))
-                        srs = osr.SpatialReference()
-                        srs.ImportFromEPSG(epsg_code)
-                        self.logger.log_message(
-                            f"- Using CRS from command line --proj-out for {layer_name}: EPSG:{epsg_code}", 
-                            level="info", to_tab=True, to_gui=True, to_notification=False
-                        )
-                        return srs, epsg_code
-            return None, None
-        except Exception as e:
+        commands = self.current_commands if self.commands_running else self.command_list
+        epsg_code = commands.layer_epsg(layer_name)
+        if epsg_code is not None:
             self.logger.log_message(
-                f"Error parsing command line CRS: {str(e)}", 
-                level="warning", to_tab=True, to_gui=True, to_notification=False
+                f"- Using CRS from command line --proj-out for {layer_name}: EPSG:{epsg_code}",
+                level="info", to_tab=True, to_gui=True, to_notification=False
             )
-            return None, None
-
-    def shapefiles_to_gpkg(self, files, out_ds, use_project_crs=True):
-        """
-        Add layers from GeoJSON/Shapefile files to a GeoPackage with renamed fields.
-        Checks CRS sources in order: command line, epsg_input field.
-        """
-        created_layers = []
-
-        for file in files:
-            ds = ogr.Open(file)
-            if ds is None:
-                self.logger.log_message(f"Could not open {file}", 
-                                    level="error", to_tab=True, to_gui=True, to_notification=True)
-                continue
+        return epsg_code
 
-            lyr = ds.GetLayer()
-            layer_name = os.path.splitext(os.path.basename(file))[0]
-            # If this group contains only a single geometry type, drop the
-            # survey2gis geometry suffix (_poly/_line/_point/_labels) so the
-            # layer name matches the name the user entered (and its .qml style).
-            # If the group has multiple geometry types, keep the suffix to
-            # avoid name collisions inside the GeoPackage.
-            if len(files) == 1:
-                layer_name = re.sub(r'_(poly|line|point|labels)$', '', layer_name,
-                                    flags=re.IGNORECASE)
-            srs = None
-            epsg_code = None
-
-            # Priority 1: Check command line for this layer
-            srs, epsg_code = self._get_crs_from_command(layer_name)
-
-            # Priority 2: Check epsg_input if no command line CRS found
-            if not srs:
-                epsg_text = self.parent_widget.epsg_input.text().strip()
-                if epsg_text:
-                    try:
-                        epsg_code = int(epsg_text)
-                        srs = osr.SpatialReference()
-                        srs.ImportFromEPSG(epsg_code)
-                        self.logger.log_message(
-                            f"- Using CRS from EPSG input for {layer_name}: EPSG:{epsg_code}", 
-                            level="info", to_tab=True, to_gui=True, to_notification=False
-                        )
-                    except (ValueError, TypeError) as e:
-                        self.logger.log_message(
-                            f"- Invalid EPSG code in input: {epsg_text}", 
-                            level="warning", to_tab=True, to_gui=True, to_notification=True
-                        )
-
-            # Create new layer with SRS if specified
-            new_layer_defn = self.get_renamed_layer_defn(lyr)
-            if srs:
-                new_layer = out_ds.CreateLayer(layer_name, srs, lyr.GetGeomType())
-                self.logger.log_message(
-                    f"- Created layer {layer_name} with CRS EPSG:{epsg_code}", 
-                    level="info", to_tab=True, to_gui=False, to_notification=False
-                )
-            else:
-                new_layer = out_ds.CreateLayer(layer_name, geom_type=lyr.GetGeomType())
-                self.logger.log_message(
-                    f"- Created layer {layer_name} without CRS", 
-                    level="info", to_tab=True, to_gui=False, to_notification=False
-                )
+    def _log_output(self, message, level="info"):
+        """Log callback for the GUI-free survey_output and geopackage_writer helpers."""
+        self.logger.log_message(message, level=level, to_tab=True, to_gui=True,
+                                to_notification=level in ("error", "warning"))
 
-            # Add fields and copy features
-            for i in range(new_layer_defn.GetFieldCount()):
-                new_layer.CreateField(new_layer_defn.GetFieldDefn(i))
-
-            for feature in lyr:
-                new_feature = ogr.Feature(new_layer.GetLayerDefn())
-                for i in range(lyr.GetLayerDefn().GetFieldCount()):
-                    original_field_name = lyr.GetLayerDefn().GetFieldDefn(i).GetName()
-                    alias_field_name = self.alias_mapping.get(original_field_name, original_field_name)
-                    new_feature.SetField(alias_field_name, feature.GetField(original_field_name))
-
-                new_feature.SetGeometry(feature.GetGeometryRef())
-                new_layer.CreateFeature(new_feature)
-                new_feature = None
-
-            created_layers.append(layer_name)
-            ds = None
-
-        return created_layers
-
-
-    def get_renamed_layer_defn(self, layer):
-        """Create a new LayerDefn with renamed fields based on the alias mapping."""
-        layer_defn = layer.GetLayerDefn()
-        new_layer_defn = ogr.FeatureDefn()
-        
-        for i in range(layer_defn.GetFieldCount()):
-            field_defn = layer_defn.GetFieldDefn(i)
-            original_name = field_defn.GetName()
-            alias_name = self.alias_mapping.get(original_name, original_name)  # Use alias if available
-            
-            new_field_defn = ogr.FieldDefn(alias_name, field_defn.GetType())
-            new_layer_defn.AddFieldDefn(new_field_defn)
-            
-        return new_layer_defn
+    def _geopackage_writer(self):
+        """A GeoPackageWriter with the alias mapping and the CRS sources of the Process tab.
 
+        CRS sources in order: --proj-out of the command that wrote the layer,
+        then the epsg_input field.
+        """
+        return GeoPackageWriter(
+            alias_mapping=self.alias_mapping,
+            default_epsg=self.parent_widget.epsg_input.text().strip(),
+            layer_epsg=self._get_crs_from_command,
+            log=self._log_output,
+        )
 
     # ---> helper ?
 
-    def _split_command(self, command):
-        """Helper function to split a command while preserving quoted strings."""
-        parts = []
-        current_part = ''
-        in_quotes = False
-
-        for char in command:
-            if char == '"':
-                in_quotes = not in_quotes
-            elif char == ' ' and not in_quotes:
-                if current_part:
-                    parts.append(current_part)
-                    current_part = ''
-            else:
-                current_part += char
-        if current_part:
-            parts.append(current_part)
-
-        return parts
-
-    def _extract_output_and_basename(self, parts):
-        """Helper function to extract the output directory and basename from a command."""
-        output_dir, basename = None, None
-
-        for i, part in enumerate(parts):
-            if part == '-o' and i + 1 < len(parts):
-                output_dir = parts[i + 1].strip('"')
-            elif part == '-n' and i + 1 < len(parts):
-                basename = parts[i + 1].strip('"')
-
-        return output_dir, basename
-
     def add_layers_from_geopackage(self, gpkg_path):
         """Main function to add layers from GeoPackage with styling."""
         conn = None
@@ -844,6 +1103,52 @@ class DataProcessor:
             if has_svg_dir:
                 self._handle_svg_paths(svg_dir, add=False)
 
+    def refresh_layers_from_geopackage(self, gpkg_path, layer_names):
+        """Reload the loaded layers among ``layer_names`` in place and add the missing ones."""
+        gpkg_key = os.path.normcase(os.path.abspath(gpkg_path))
+        loaded = {}
+        for layer in QgsProject.instance().mapLayers().values():
+            source = layer.source().split('|')
+            if len(source) < 2 or os.path.normcase(os.path.abspath(source[0])) != gpkg_key:
+                continue
+            for option in source[1:]:
+                if option.startswith('layername='):
+                    loaded.setdefault(option[len('layername='):], []).append(layer)
+
+        conn = None
+        has_svg_dir = False
+        try:
+            conn = self._open_geopackage(gpkg_path)
+            if not conn:
+                return
+            directories = self._setup_directories(gpkg_path)
+            _, has_svg_dir, _, svg_dir = directories
+            if has_svg_dir:
+                self._handle_svg_paths(svg_dir, add=True)
+
+            group_dict = {}
+            for i in range(conn.GetLayerCount()):
+                layer_name = conn.GetLayerByIndex(i).GetName()
+                if layer_name not in layer_names:
+                    continue
+                if layer_name not in loaded:
+                    self._process_layer(conn, i, group_dict, directories)
+                    continue
+                for layer in loaded[layer_name]:
+                    layer.dataProvider().reloadData()
+                    layer.updateExtents()
+                    layer.triggerRepaint()
+                self.logger.log_message(f"-- Reloaded layer: {layer_name}",
+                                    level="info", to_tab=True, to_gui=True, to_notification=False)
+        except Exception as e:
+            self.logger.log_message(f"Error in refresh_layers_from_geopackage: {str(e)}",
+                                level="error", to_tab=True, to_gui=True, to_notification=True)
+        finally:
+            if conn:
+                del conn
+            if has_svg_dir:
+                self._handle_svg_paths(svg_dir, add=False)
+
     def _open_geopackage(self, gpkg_path):
         """Open and validate GeoPackage connection."""
         conn = ogr.Open(gpkg_path)
@@ -1148,6 +1453,71 @@ class DataProcessor:
             self.logger.log_message(f"Error loading commands: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
 
 
+    def current_recipe(self):
+        """The settings of both tabs and the commands of the command field as a Recipe."""
+        recipe = Recipe()
+        self.parent_widget.data_normalizer.fill_recipe(recipe)
+        recipe.alias_file = self.parent_widget.alias_file_input.text().strip()
+        recipe.geopackage_name = self.parent_widget.geopackage_name_input.text().strip()
+        recipe.stop_on_error = self.parent_widget.stop_on_errors.isChecked()
+        normalized_file = os.path.normcase(os.path.abspath(recipe.normalized_file)) if recipe.normalized_file else None
+        for command in self.command_list:
+            options, input_file = dataclasses.replace(command.options), command.input_file
+            # Commands reading the normalized file follow the recipe's output
+            if input_file and os.path.normcase(os.path.abspath(input_file)) == normalized_file:
+                input_file = ""
+            recipe.commands.append(RecipeCommand(options, input_file))
+        return recipe
+
+    def save_recipe(self):
+        """Save the current run configuration as a .toml or .json recipe."""
+        try:
+            file_path, _ = QtWidgets.QFileDialog.getSaveFileName(
+                self.parent_widget, "Save Recipe", "recipe.toml",
+                "Recipes (*.toml *.json);;All Files (*)"
+            )
+            if not file_path:
+                return
+            if not os.path.splitext(file_path)[1]:
+                file_path += '.toml'
+            recipe = self.current_recipe()
+            recipe.name = recipe.name or os.path.splitext(os.path.basename(file_path))[0]
+            save_recipe(recipe, file_path)
+            self.logger.log_message(f"Recipe with {len(recipe.commands)} command(s) saved to {file_path}",
+                                    level="success", to_tab=True, to_gui=True, to_notification=True)
+        except Exception as e:
+            self.logger.log_message(f"Error saving recipe: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
+
+    def load_recipe(self):
+        """Fill both tabs and the command field from a recipe."""
+        file_path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self.parent_widget, "Load Recipe", "", "Recipes (*.toml *.json);;All Files (*)"
+        )
+        if not file_path:
+            return
+        try:
+            recipe = load_recipe(file_path)
+        except (OSError, RecipeError) as e:
+            self.logger.log_message(f"Error loading recipe: {e}", level="error", to_tab=True, to_gui=True, to_notification=True)
+            return
+        self.apply_recipe(recipe)
+        self.logger.log_message(f"Recipe '{recipe.name or file_path}' loaded with {len(recipe.commands)} command(s)",
+                                level="success", to_tab=True, to_gui=True, to_notification=True)
+
+    def apply_recipe(self, recipe):
+        self.parent_widget.data_normalizer.apply_recipe(recipe)
+        self.parent_widget.alias_file_input.setText(recipe.alias_file)
+        self.alias_mapping = self.load_alias_mapping(recipe.alias_file) if recipe.alias_file else {}
+        self.parent_widget.geopackage_name_input.setText(recipe.geopackage_name)
+        self.parent_widget.stop_on_errors.setChecked(recipe.stop_on_error)
+        binary_path = self.parent_widget.get_binary_path()
+        lines = []
+        for command in recipe.commands:
+            options = dataclasses.replace(command.options,
+                                          output_directory=recipe.command_output_directory(command))
+            lines.append(" ".join(build_command(binary_path, options, recipe.command_input(command))))
+        self.parent_widget.command_code_field.setPlainText("\n".join(lines))
+
     def handle_file_cleanup(self):
         """
         Clean up generated files unless keep_files exists.
@@ -1163,52 +1533,15 @@ class DataProcessor:
 
         # Step 3: If `keep_files` does not exist, delete files listed in the dictionary
         if not os.path.exists(keep_files_path):
-            for file_type, groups in self.intermediate_file_dict.items():
-                for group, file_list in groups.items():
-                    for file_path in file_list:
-                        if file_path.lower().endswith('.shp'):
-                            # Handle shapefile and its associated files
-                            self._delete_shapefile_set(file_path)
-                        else:
-                            # Handle regular file deletion
-                            self._delete_single_file(file_path)
+            delete_intermediate_files(self.intermediate_file_dict, self._log_output)
         else:
             self.logger.log_message(f"keep_files file found, skipping deletion.", 
                                 level="info", to_tab=True, to_gui=False, to_notification=False)
 
-    def _delete_shapefile_set(self, shp_path):
-        """Delete a shapefile and all its associated files."""
-        # Common shapefile extensions
-        extensions = ['.shp', '.shx', '.dbf', '.prj', '.cpg', '.sbn', '.sbx', '.shp.xml', '.qix', '.gva']
-        base_path = os.path.splitext(shp_path)[0]
-        
-        for ext in extensions:
-            associated_file = base_path + ext
-            self._delete_single_file(associated_file)
-
-    def _delete_single_file(self, file_path):
-        """Delete a single file with proper error handling and logging."""
-        try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                self.logger.log_message(f"Deleted: {file_path}", 
-                                    level="info", to_tab=True, to_gui=False, to_notification=False)
-            else:
-                pass
-                # self.logger.log_message(f"File not found, could not delete: {file_path}", 
-                #                     level="info", to_tab=True, to_gui=True, to_notification=False)
-        except Exception as e:
-            self.logger.log_message(f"Error deleting {file_path}: {str(e)}", 
-                                level="error", to_tab=True, to_gui=True, to_notification=True)
-                              
     def load_alias_mapping(self, alias_file):
-
+        """Load alias mappings from an .ini file."""
         if not os.path.exists(alias_file):
             return {}
         
         self.logger.log_message(f"Using alias file {alias_file}", level="info", to_tab=True, to_gui=True, to_notification=False)
-
-        """Load alias mappings from an .ini file."""
-        config = configparser.ConfigParser()
-        config.read(alias_file)
-        return dict(config['aliases']) if 'aliases' in config else {}
\ No newline at end of file
+        return load_alias_mapping(alias_file)
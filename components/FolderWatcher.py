@@ -0,0 +1,77 @@
+import os
+
+from qgis.PyQt.QtCore import QFileSystemWatcher, QObject, QTimer, pyqtSignal
+
+from .watch_folder import DEFAULT_DEBOUNCE_MS, FolderState
+
+
+class FolderWatcher(QObject):
+    """Watches a folder for new and changed input files.
+
+    Every event of the QFileSystemWatcher restarts a single-shot timer, so
+    a burst of events leads to one check once the folder has been quiet
+    for ``debounce_ms``. ``changed`` is emitted with a FolderChanges when
+    files were added, changed or removed; files that are still growing
+    keep the timer running until they are complete.
+    """
+
+    changed = pyqtSignal(object)
+
+    def __init__(self, debounce_ms=DEFAULT_DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.state = None
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._schedule_check)
+        # Files appended to in place do not always change the folder itself
+        self.watcher.fileChanged.connect(self._schedule_check)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.check)
+
+    @property
+    def directory(self):
+        return self.state.directory if self.state is not None else None
+
+    def is_active(self):
+        return self.state is not None
+
+    def start(self, directory, ignore=()):
+        """Watch ``directory``; files present now are the baseline and not reported."""
+        self.stop()
+        self.state = FolderState(directory, ignore)
+        self.watcher.addPath(directory)
+        self._watch_files()
+
+    def stop(self):
+        self.timer.stop()
+        paths = self.watcher.directories() + self.watcher.files()
+        if paths:
+            self.watcher.removePaths(paths)
+        self.state = None
+
+    def _watch_files(self):
+        files = set(self.watcher.files())
+        missing = [path for path in self.state.known if path not in files and os.path.exists(path)]
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def _schedule_check(self, *args):
+        if self.state is not None:
+            self.timer.start()
+
+    def check(self):
+        """Compare the folder with the last state and emit the stable changes."""
+        if self.state is None:
+            return
+        try:
+            changes = self.state.check()
+        except OSError:
+            # The folder is gone or not reachable right now (network share), try again later
+            self.timer.start()
+            return
+        if changes.pending:
+            self.timer.start()
+        self._watch_files()
+        if changes:
+            self.changed.emit(changes)
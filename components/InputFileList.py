@@ -0,0 +1,163 @@
+import os
+from datetime import datetime
+
+from qgis.PyQt import QtWidgets
+from qgis.PyQt.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer
+
+from .input_files import InputResolver
+
+
+class InputFileModel(QAbstractTableModel):
+    """Read-only table of resolved input files with size and modification time.
+
+    The entries are a plain list of InputEntry tuples; the view only asks
+    for the visible rows, so hundreds or thousands of files stay cheap.
+    """
+
+    COLUMNS = ("File", "Size", "Modified")
+
+    def __init__(self, entries=(), root=None, parent=None):
+        super().__init__(parent)
+        self.entries = list(entries)
+        # Paths are shown relative to the common folder of all files
+        self.root = root
+
+    def set_entries(self, entries):
+        self.beginResetModel()
+        self.entries = list(entries)
+        paths = [entry.path for entry in self.entries]
+        try:
+            self.root = os.path.commonpath([os.path.dirname(path) for path in paths]) if paths else None
+        except ValueError:
+            # Files on different drives
+            self.root = None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.ToolTipRole:
+            return entry.path
+        if role == Qt.TextAlignmentRole and index.column() == 1:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role != Qt.DisplayRole:
+            return None
+        if index.column() == 0:
+            return os.path.relpath(entry.path, self.root) if self.root else entry.path
+        if index.column() == 1:
+            return format_size(entry.size)
+        return datetime.fromtimestamp(entry.mtime / 1e9).strftime("%Y-%m-%d %H:%M:%S")
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            return str(section + 1)
+        return self.COLUMNS[section]
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        key = (lambda entry: entry.path.lower(), lambda entry: entry.size, lambda entry: entry.mtime)[column]
+        self.layoutAboutToBeChanged.emit()
+        self.entries.sort(key=key, reverse=order == Qt.DescendingOrder)
+        self.layoutChanged.emit()
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class InputFileList(QtWidgets.QGroupBox):
+    """Collapsible list of the files the Normalize tab input field resolves to.
+
+    Directories and glob patterns in the field are resolved with an
+    InputResolver, whose cache is shared with the normalize run, so a
+    run right after looking at the list does not read the folders again.
+    """
+
+    def __init__(self, logger, text_provider, resolver=None, parent=None):
+        super().__init__("Input files", parent)
+        self.logger = logger
+        self.text_provider = text_provider
+        self.resolver = resolver or InputResolver()
+
+        self.setCheckable(True)
+        self.setChecked(False)
+        self.toggled.connect(self._handle_toggled)
+
+        self.content = QtWidgets.QWidget(self)
+        self.model = InputFileModel(parent=self)
+        self.table_view = QtWidgets.QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table_view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table_view.setSortingEnabled(True)
+        self.table_view.setWordWrap(False)
+        self.table_view.setMinimumHeight(200)
+        self.table_view.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        self.table_view.verticalHeader().setDefaultSectionSize(self.table_view.fontMetrics().height() + 4)
+        self.table_view.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        self.table_view.horizontalHeader().setSectionResizeMode(1, QtWidgets.QHeaderView.ResizeToContents)
+        self.table_view.horizontalHeader().setSectionResizeMode(2, QtWidgets.QHeaderView.ResizeToContents)
+        self.status_label = QtWidgets.QLabel("")
+        self.status_label.setWordWrap(True)
+        self.refresh_button = QtWidgets.QPushButton("refresh")
+        self.refresh_button.setToolTip("Read the folders again, e.g. after copying files into them.")
+        self.refresh_button.clicked.connect(lambda: self.refresh(force=True))
+
+        status_row = QtWidgets.QHBoxLayout()
+        status_row.addWidget(self.status_label, 1)
+        status_row.addWidget(self.refresh_button)
+        content_layout = QtWidgets.QVBoxLayout(self.content)
+        content_layout.setContentsMargins(0, 0, 0, 0)
+        content_layout.addLayout(status_row)
+        content_layout.addWidget(self.table_view)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.content)
+        self.content.setVisible(False)
+
+        # Typing a pattern should not read a folder tree on every key press
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(500)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def _handle_toggled(self, checked):
+        self.content.setVisible(checked)
+        if checked:
+            self.refresh()
+
+    def schedule_refresh(self, *args):
+        """Refresh once the input field stopped changing, if the list is open."""
+        if self.isChecked():
+            self.refresh_timer.start()
+
+    def refresh(self, force=False):
+        if force:
+            self.resolver.clear()
+        try:
+            resolved = self.resolver.resolve(self.text_provider())
+        except OSError as e:
+            self.status_label.setText(f"Cannot read the input folders: {e}")
+            return
+        self.show_resolved(resolved)
+
+    def show_resolved(self, resolved):
+        """Show an already resolved file set, e.g. the one of a normalize run."""
+        self.model.set_entries(resolved.entries)
+        text = f"{len(resolved.entries):,} file(s), {format_size(resolved.total_size)}"
+        if resolved.cached:
+            text += ", folders unchanged since the last scan"
+        if resolved.missing:
+            text += f"; not found: {', '.join(resolved.missing[:5])}" + (" ..." if len(resolved.missing) > 5 else "")
+        self.status_label.setText(text)
@@ -0,0 +1,193 @@
+import os
+from datetime import datetime
+
+from qgis.PyQt import QtWidgets
+from qgis.PyQt.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer, QUrl
+from qgis.PyQt.QtGui import QBrush, QColor, QDesktopServices, QFont
+
+from .InputFileList import format_size
+from .job_scheduler import CACHED, CANCELED, FAILED, RUNNING, SKIPPED
+
+
+STATE_COLORS = {
+    RUNNING: QColor(30, 110, 200),
+    CACHED: QColor(90, 90, 90),
+    FAILED: QColor(200, 40, 40),
+    SKIPPED: QColor(150, 120, 40),
+    CANCELED: QColor(150, 120, 40),
+}
+
+
+def _clock(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M:%S") if timestamp else ""
+
+
+class JobTableModel(QAbstractTableModel):
+    """Read-only table of the jobs of a command sequence, one row per job.
+
+    The rows are the CommandJob objects of the JobScheduler itself, so a
+    row shows the job as it is now; the dock only says which row changed.
+    The view only asks for the visible rows, so thousands of jobs stay cheap.
+    """
+
+    COLUMNS = ("Job", "State", "Start", "End", "Duration", "Input", "Features", "Exit code", "Log")
+    LOG_COLUMN = 8
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.jobs = []
+
+    def set_jobs(self, jobs):
+        self.beginResetModel()
+        self.jobs = list(jobs)
+        self.endResetModel()
+
+    def job_changed(self, job):
+        # Jobs are planned with their row as index
+        row = job.index
+        if 0 <= row < len(self.jobs) and self.jobs[row] is job:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+
+    def refresh(self):
+        """Repaint all rows, e.g. for the duration of running jobs; the view only redraws visible ones."""
+        if self.jobs:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.jobs) - 1, len(self.COLUMNS) - 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.jobs)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        job = self.jobs[index.row()]
+        column = index.column()
+        if role == Qt.ToolTipRole:
+            if column == self.LOG_COLUMN and job.log_file:
+                return f"{job.log_file}\nDouble-click to open"
+            return " ".join(job.parts) if job.parts else job.label
+        if role == Qt.ForegroundRole:
+            if column == 1 and job.state in STATE_COLORS:
+                return QBrush(STATE_COLORS[job.state])
+            if column == self.LOG_COLUMN:
+                return QBrush(QColor(30, 110, 200))
+            return None
+        if role == Qt.FontRole and column == self.LOG_COLUMN and job.log_file:
+            font = QFont()
+            font.setUnderline(True)
+            return font
+        if role == Qt.TextAlignmentRole and column in (4, 5, 6, 7):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role != Qt.DisplayRole:
+            return None
+        if column == 0:
+            return job.label
+        if column == 1:
+            return job.state
+        if column == 2:
+            return _clock(job.started_at)
+        if column == 3:
+            return _clock(job.finished_at)
+        if column == 4:
+            return f"{job.elapsed:.1f} s" if job.started is not None else ""
+        if column == 5:
+            return format_size(job.input_bytes) if job.input_bytes is not None else ""
+        if column == 6:
+            return f"{job.features:,}" if job.features is not None else ""
+        if column == 7:
+            return "" if job.exit_code is None else str(job.exit_code)
+        return os.path.basename(job.log_file) if job.log_file else ""
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            return str(section + 1)
+        return self.COLUMNS[section]
+
+
+class JobTable(QtWidgets.QGroupBox):
+    """Collapsible table of the running command sequence with a progress line.
+
+    show_jobs() is called when a sequence starts, job_changed() whenever a
+    job starts or finishes and finish() at the end; while jobs run the
+    durations and the progress line are updated once a second.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__("Jobs", parent)
+        self.scheduler = None
+        self.setCheckable(True)
+        self.setChecked(True)
+        self.toggled.connect(self._handle_toggled)
+
+        self.content = QtWidgets.QWidget(self)
+        self.model = JobTableModel(parent=self)
+        self.table_view = QtWidgets.QTableView()
+        self.table_view.setModel(self.model)
+        self.table_view.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table_view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table_view.setWordWrap(False)
+        self.table_view.setMinimumHeight(160)
+        self.table_view.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        self.table_view.verticalHeader().setDefaultSectionSize(self.table_view.fontMetrics().height() + 4)
+        header = self.table_view.horizontalHeader()
+        header.setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        for column in range(1, len(JobTableModel.COLUMNS)):
+            # Fixed widths: ResizeToContents would measure every row on each update
+            header.setSectionResizeMode(column, QtWidgets.QHeaderView.Interactive)
+            header.resizeSection(column, self.table_view.fontMetrics().horizontalAdvance("00:00:00") + 16)
+        self.table_view.doubleClicked.connect(self._open_log)
+        self.status_label = QtWidgets.QLabel("")
+        self.status_label.setWordWrap(True)
+
+        content_layout = QtWidgets.QVBoxLayout(self.content)
+        content_layout.setContentsMargins(0, 0, 0, 0)
+        content_layout.addWidget(self.status_label)
+        content_layout.addWidget(self.table_view)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.content)
+        # Nothing to show before the first run
+        self.setVisible(False)
+
+        self.update_timer = QTimer(self)
+        self.update_timer.setInterval(1000)
+        self.update_timer.timeout.connect(self.refresh)
+
+    def _handle_toggled(self, checked):
+        self.content.setVisible(checked)
+        if checked:
+            self.refresh()
+
+    def show_jobs(self, scheduler):
+        """Show the jobs of a starting sequence."""
+        self.scheduler = scheduler
+        self.model.set_jobs(scheduler.jobs)
+        self.setVisible(True)
+        self.update_timer.start()
+        self.refresh()
+
+    def job_changed(self, job):
+        if self.isChecked():
+            self.model.job_changed(job)
+
+    def refresh(self):
+        if self.scheduler is None:
+            return
+        self.status_label.setText(self.scheduler.summary())
+        if self.isChecked():
+            self.model.refresh()
+
+    def finish(self):
+        """The sequence is done: stop the live updates after a last one."""
+        self.update_timer.stop()
+        self.refresh()
+
+    def _open_log(self, index):
+        if index.column() != JobTableModel.LOG_COLUMN:
+            return
+        log_file = self.model.jobs[index.row()].log_file
+        if log_file and os.path.exists(log_file):
+            QDesktopServices.openUrl(QUrl.fromLocalFile(log_file))
@@ -0,0 +1,38 @@
+from qgis.core import QgsTask
+
+from .line_index import LineOffsetIndex
+
+
+class LineIndexTask(QgsTask):
+    """Builds the line checkpoints of a file for the viewer in the background.
+
+    run() executes in a worker thread and only touches the index; the
+    viewer picks it up in on_finished on the main thread.
+    """
+
+    def __init__(self, path, on_finished=None):
+        super().__init__("Survey2GIS: index file for viewing", QgsTask.CanCancel)
+        self.path = path
+        self.on_finished = on_finished
+        self.index = None
+        self.error = None
+
+    def run(self):
+        index = None
+        try:
+            index = LineOffsetIndex(self.path)
+            index.build(progress_callback=self.setProgress, is_canceled=self.isCanceled)
+            self.index = index
+            return True
+        except Exception as e:
+            if index is not None:
+                index.close()
+            self.error = e
+            return False
+
+    def finished(self, result):
+        if self.on_finished:
+            self.on_finished(self, result)
+        elif self.index is not None:
+            # Nobody is waiting for the index any more
+            self.index.close()
@@ -1,8 +1,10 @@
 from qgis.PyQt import QtWidgets
 import importlib
+import os
 
 from .. s2g_logging import Survey2GISLogger
 from . import binary_utils
+from .provenance import ProvenanceIndex, index_path_for
 
 
 def _fresh_binary_utils():
@@ -52,6 +54,11 @@ class LogTab:
             "Launch the binary once (survey2gis --help) to check it actually "
             "starts - catches macOS Gatekeeper blocks and missing DLLs."
         )
+        self.raw_line_button = QtWidgets.QPushButton("go to raw line")
+        self.raw_line_button.setToolTip(
+            "Show where a line number reported by survey2gis came from: input file, "
+            "original line and its raw content. Needs the line index (.idx) of the input file."
+        )
 
         parent_layout = reset_button.parentWidget().layout()
         if parent_layout is not None:
@@ -60,10 +67,12 @@ class LogTab:
                 parent_layout.insertWidget(index + 1, self.diagnose_binary_button)
                 parent_layout.insertWidget(index + 2, self.make_executable_button)
                 parent_layout.insertWidget(index + 3, self.test_run_button)
+                parent_layout.insertWidget(index + 4, self.raw_line_button)
             else:
                 parent_layout.addWidget(self.diagnose_binary_button)
                 parent_layout.addWidget(self.make_executable_button)
                 parent_layout.addWidget(self.test_run_button)
+                parent_layout.addWidget(self.raw_line_button)
 
     def connect_signals(self):
         # reset logs
@@ -75,10 +84,54 @@ class LogTab:
             self.make_executable_button.clicked.connect(self.make_binary_executable)
         if hasattr(self, "test_run_button"):
             self.test_run_button.clicked.connect(self.test_run_binary)
+        if hasattr(self, "raw_line_button"):
+            self.raw_line_button.clicked.connect(self.show_raw_line)
 
     def reset_logs(self):
         self.parent_widget.output_log.setText("")
 
+    # -- line provenance ----------------------------------------------------
+
+    def show_raw_line(self):
+        """Ask for a normalized line number and log where it came from."""
+        input_file = self.parent_widget.process_input_file_input.text().strip()
+        index_path = index_path_for(input_file)
+        if not input_file or not os.path.isfile(index_path):
+            self.logger.log_message(
+                "No line index for the input file. Enable 'Write line index (.idx)' "
+                "in the Normalize tab and normalize again.",
+                level="warning",
+                to_tab=True,
+                to_gui=True,
+                to_notification=True,
+            )
+            return
+        line_number, ok = QtWidgets.QInputDialog.getInt(
+            self.parent_widget, "Go to raw line", "Line number in the normalized file:", 1, 1, 2**31 - 1
+        )
+        if not ok:
+            return
+        try:
+            with ProvenanceIndex(index_path) as index:
+                provenance, raw = index.read_raw_line(line_number)
+            self.logger.log_message(
+                f"Line {line_number} of {os.path.basename(input_file)} comes from "
+                f"{provenance.path}:{provenance.line_number} (byte offset {provenance.offset}):\n"
+                f"    {raw.decode('utf-8', errors='replace')}",
+                level="info",
+                to_tab=True,
+                to_gui=True,
+                to_notification=False,
+            )
+        except (OSError, ValueError, IndexError) as error:
+            self.logger.log_message(
+                f"Could not look up line {line_number}: {error}",
+                level="error",
+                to_tab=True,
+                to_gui=True,
+                to_notification=True,
+            )
+
     # -- binary diagnostics -------------------------------------------------
 
     def _resolve_binary_path(self):
@@ -0,0 +1,52 @@
+from qgis.core import QgsTask
+from qgis.PyQt.QtCore import pyqtSignal
+
+from .normalize_pipeline import NormalizeCanceled, normalize_files
+
+
+class NormalizeTask(QgsTask):
+    """Runs the normalize pipeline in a QGIS background task.
+
+    The task must not touch widgets: run() executes in a worker thread.
+    Progress text is handed to the GUI through the progressText signal,
+    which Qt delivers on the main thread.
+    """
+
+    progressText = pyqtSignal(str)
+
+    def __init__(self, input_files, output_file_path, options, on_finished=None, cache=None):
+        super().__init__("Survey2GIS: normalize input files", QgsTask.CanCancel)
+        self.input_files = input_files
+        self.output_file_path = output_file_path
+        self.options = options
+        self.on_finished = on_finished
+        self.cache = cache
+        self.stats = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.stats = normalize_files(
+                self.input_files, self.output_file_path, self.options,
+                progress_callback=self._report_progress,
+                is_canceled=self.isCanceled,
+                cache=self.cache,
+            )
+            return True
+        except NormalizeCanceled:
+            return False
+        except Exception as e:
+            self.error = e
+            return False
+
+    def _report_progress(self, progress):
+        self.setProgress(progress.percent)
+        self.progressText.emit(
+            f"File {progress.source + 1}/{len(progress.input_files)}: "
+            f"{progress.file_bytes / (1024 * 1024):.1f} of {progress.file_size / (1024 * 1024):.1f} MB, "
+            f"{progress.file_lines} line(s)"
+        )
+
+    def finished(self, result):
+        if self.on_finished:
+            self.on_finished(self, result)
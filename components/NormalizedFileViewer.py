@@ -0,0 +1,232 @@
+import os
+
+from qgis.PyQt import QtWidgets
+from qgis.PyQt.QtCore import QAbstractTableModel, QModelIndex, Qt
+from qgis.core import QgsApplication
+
+from .line_index import LineIndexCanceled
+from .LineIndexTask import LineIndexTask
+from .provenance import ProvenanceIndex, index_path_for
+
+
+class NormalizedFileModel(QAbstractTableModel):
+    """Read-only table over a LineOffsetIndex; rows are fetched on demand.
+
+    Only the rows the view asks for are decoded, so the model works the
+    same for a few lines and for files far larger than memory. With a
+    line index from the normalizer a second column shows where each
+    line came from.
+    """
+
+    def __init__(self, line_index, provenance=None, parent=None):
+        super().__init__(parent)
+        self.line_index = line_index
+        self.provenance = provenance
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.line_index)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return 2 if self.provenance is not None else 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        if index.column() == 0:
+            return self.line_index.line(index.row())
+        source = self.provenance.lookup(index.row() + 1)
+        if role == Qt.ToolTipRole:
+            return f"{source.path}, line {source.line_number}, byte offset {source.offset}"
+        return f"{os.path.basename(source.path)}:{source.line_number}"
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Vertical:
+            return str(section + 1)
+        return ("Content", "Source")[section]
+
+
+class NormalizedFileViewer(QtWidgets.QGroupBox):
+    """Collapsible viewer for the normalized file in the Normalize tab.
+
+    The line checkpoints are built in a LineIndexTask; afterwards scrolling,
+    jumping and searching work on the memory-mapped file. release() must be
+    called before the file is written again, Windows cannot replace a
+    mapped file.
+    """
+
+    def __init__(self, logger, path_provider, parent=None):
+        super().__init__("View normalized file", parent)
+        self.logger = logger
+        self.path_provider = path_provider
+        self.index_task = None
+        self.line_index = None
+        self.provenance = None
+
+        self.setCheckable(True)
+        self.setChecked(False)
+        self.toggled.connect(self._handle_toggled)
+
+        self.content = QtWidgets.QWidget(self)
+        self.path_label = QtWidgets.QLabel("")
+        self.path_label.setWordWrap(True)
+        self.reload_button = QtWidgets.QPushButton("reload")
+        self.reload_button.setToolTip("Index the normalized file again, e.g. after a new run.")
+        self.line_input = QtWidgets.QSpinBox()
+        self.line_input.setRange(1, 1)
+        self.line_input.setToolTip("Line number as survey2gis reports it.")
+        self.jump_button = QtWidgets.QPushButton("go to line")
+        self.search_input = QtWidgets.QLineEdit()
+        self.search_input.setPlaceholderText("Search text")
+        self.case_checkbox = QtWidgets.QCheckBox("Match case")
+        self.find_button = QtWidgets.QPushButton("find next")
+        self.status_label = QtWidgets.QLabel("")
+
+        self.table_view = QtWidgets.QTableView()
+        self.table_view.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table_view.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table_view.setWordWrap(False)
+        self.table_view.setMinimumHeight(300)
+        # Fixed row heights keep the view from measuring millions of rows
+        self.table_view.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        self.table_view.verticalHeader().setDefaultSectionSize(
+            self.table_view.fontMetrics().height() + 4
+        )
+        self.table_view.horizontalHeader().setStretchLastSection(True)
+
+        path_row = QtWidgets.QHBoxLayout()
+        path_row.addWidget(self.path_label, 1)
+        path_row.addWidget(self.reload_button)
+        jump_row = QtWidgets.QHBoxLayout()
+        jump_row.addWidget(self.line_input, 1)
+        jump_row.addWidget(self.jump_button)
+        search_row = QtWidgets.QHBoxLayout()
+        search_row.addWidget(self.search_input, 1)
+        search_row.addWidget(self.case_checkbox)
+        search_row.addWidget(self.find_button)
+
+        content_layout = QtWidgets.QVBoxLayout(self.content)
+        content_layout.setContentsMargins(0, 0, 0, 0)
+        content_layout.addLayout(path_row)
+        content_layout.addLayout(jump_row)
+        content_layout.addLayout(search_row)
+        content_layout.addWidget(self.table_view)
+        content_layout.addWidget(self.status_label)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addWidget(self.content)
+        self.content.setVisible(False)
+
+        self.reload_button.clicked.connect(lambda: self.load())
+        self.jump_button.clicked.connect(self.jump_to_line)
+        self.line_input.editingFinished.connect(self.jump_to_line)
+        self.find_button.clicked.connect(self.find_next)
+        self.search_input.returnPressed.connect(self.find_next)
+        self._set_controls_enabled(False)
+
+    def _handle_toggled(self, checked):
+        self.content.setVisible(checked)
+        if checked:
+            self.load()
+        else:
+            self.release()
+
+    def _set_controls_enabled(self, enabled):
+        for widget in (self.line_input, self.jump_button, self.search_input,
+                       self.case_checkbox, self.find_button):
+            widget.setEnabled(enabled)
+
+    def load(self, path=None):
+        """Index a file in the background and show it once that is done."""
+        path = path or self.path_provider()
+        self.release()
+        if not path or not os.path.isfile(path):
+            self.path_label.setText("No normalized file yet. Run the normalization first.")
+            return
+        self.path_label.setText(path)
+        self.status_label.setText("Indexing lines...")
+        self.index_task = LineIndexTask(path, on_finished=self._handle_index_finished)
+        self.index_task.progressChanged.connect(
+            lambda progress: self.status_label.setText(f"Indexing lines... {progress:.0f}%")
+        )
+        QgsApplication.taskManager().addTask(self.index_task)
+
+    def release(self):
+        """Drop the model and unmap the file."""
+        if self.index_task is not None:
+            self.index_task.on_finished = None
+            self.index_task.cancel()
+            self.index_task = None
+        self.table_view.setModel(None)
+        if self.line_index is not None:
+            self.line_index.close()
+            self.line_index = None
+        if self.provenance is not None:
+            self.provenance.close()
+            self.provenance = None
+        self._set_controls_enabled(False)
+        self.status_label.setText("")
+
+    def _handle_index_finished(self, task, result):
+        self.index_task = None
+        if not result:
+            if task.error is not None and not isinstance(task.error, LineIndexCanceled):
+                self.status_label.setText("")
+                self.logger.log_message(f"Could not open {task.path} for viewing: {task.error}",
+                                        level="error", to_tab=True, to_gui=True, to_notification=True)
+            return
+
+        self.line_index = task.index
+        self.provenance = self._open_provenance(task.path, len(self.line_index))
+        self.table_view.setModel(NormalizedFileModel(self.line_index, self.provenance, self.table_view))
+        self.line_input.setRange(1, max(len(self.line_index), 1))
+        self._set_controls_enabled(len(self.line_index) > 0)
+        self.status_label.setText(f"{len(self.line_index):,} lines")
+
+    def _open_provenance(self, path, line_count):
+        """Open the normalizer's line index if it belongs to this file."""
+        index_path = index_path_for(path)
+        if not os.path.isfile(index_path):
+            return None
+        try:
+            provenance = ProvenanceIndex(index_path)
+        except (OSError, ValueError):
+            return None
+        if len(provenance) != line_count:
+            # Left over from another run
+            provenance.close()
+            return None
+        return provenance
+
+    def _select_line(self, line_number):
+        model_index = self.table_view.model().index(line_number, 0)
+        self.table_view.scrollTo(model_index, QtWidgets.QAbstractItemView.PositionAtCenter)
+        self.table_view.selectRow(line_number)
+
+    def jump_to_line(self):
+        if self.line_index is None or not len(self.line_index):
+            return
+        self._select_line(self.line_input.value() - 1)
+
+    def find_next(self):
+        """Find the search text after the selected line, wrapping at the end."""
+        text = self.search_input.text()
+        if self.line_index is None or not text:
+            return
+        selected = self.table_view.selectionModel().selectedRows()
+        start = selected[0].row() + 1 if selected else 0
+        case_sensitive = self.case_checkbox.isChecked()
+        found = self.line_index.find(text, start, case_sensitive)
+        wrapped = False
+        if found < 0 and start > 0:
+            found = self.line_index.find(text, 0, case_sensitive)
+            wrapped = found >= 0
+        if found < 0:
+            self.status_label.setText(f"'{text}' not found")
+            return
+        self._select_line(found)
+        self.status_label.setText(
+            f"'{text}' found in line {found + 1}" + (" (search wrapped to the top)" if wrapped else "")
+        )
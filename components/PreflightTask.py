@@ -0,0 +1,50 @@
+from qgis.core import QgsTask
+
+from .parser_profile import ParserProfileError, load_parser_profile
+
+
+class PreflightTask(QgsTask):
+    """Runs a preflight check on a normalized file in the background.
+
+    ``function`` is called as ``function(input_file, geom_tags, decimal_point=,
+    decimal_group=, progress_callback=, is_canceled=)`` with the geometry tags
+    of the parser profile and returns a report, or None when canceled. Like
+    ValidateTask, run() executes in a worker thread and must not touch
+    widgets; the result is handed back through on_finished on the main thread.
+    """
+
+    def __init__(self, description, function, input_file, parser_file="", decimal_point=".", decimal_group="",
+                 on_finished=None):
+        super().__init__(f"Survey2GIS: {description}", QgsTask.CanCancel)
+        self.function = function
+        self.input_file = input_file
+        self.parser_file = parser_file
+        self.decimal_point = decimal_point
+        self.decimal_group = decimal_group
+        self.on_finished = on_finished
+        self.report = None
+        self.error = None
+
+    def run(self):
+        try:
+            geom_tags = {}
+            if self.parser_file:
+                try:
+                    geom_tags = load_parser_profile(self.parser_file).geom_tags
+                except (OSError, ParserProfileError):
+                    # Points are still read, just not grouped by geometry tag
+                    geom_tags = {}
+            self.report = self.function(
+                self.input_file, geom_tags,
+                decimal_point=self.decimal_point, decimal_group=self.decimal_group,
+                progress_callback=self.setProgress,
+                is_canceled=self.isCanceled,
+            )
+            return self.report is not None
+        except Exception as e:
+            self.error = e
+            return False
+
+    def finished(self, result):
+        if self.on_finished:
+            self.on_finished(self, result)
@@ -0,0 +1,38 @@
+from qgis.core import QgsTask
+
+from .parser_profile import load_parser_profile, validate_file
+
+
+class ValidateTask(QgsTask):
+    """Validates a normalized input file against a parser profile in the background.
+
+    Like NormalizeTask, run() executes in a worker thread and must not touch
+    widgets; the result is handed back through on_finished on the main thread.
+    """
+
+    def __init__(self, input_file, parser_file, decimal_point=".", decimal_group="", on_finished=None):
+        super().__init__("Survey2GIS: validate input file", QgsTask.CanCancel)
+        self.input_file = input_file
+        self.parser_file = parser_file
+        self.decimal_point = decimal_point
+        self.decimal_group = decimal_group
+        self.on_finished = on_finished
+        self.report = None
+        self.error = None
+
+    def run(self):
+        try:
+            profile = load_parser_profile(self.parser_file)
+            self.report = validate_file(
+                self.input_file, profile, self.decimal_point, self.decimal_group,
+                progress_callback=self.setProgress,
+                is_canceled=self.isCanceled,
+            )
+            return self.report is not None
+        except Exception as e:
+            self.error = e
+            return False
+
+    def finished(self, result):
+        if self.on_finished:
+            self.on_finished(self, result)
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+The survey2gis options of one command and the command line built from them.
+
+CommandOptions holds what the Process tab collects for a command. The
+same class is used by the dock, which shows the command line in the
+command field, and by headless recipe runs (see recipe_runner), which
+start survey2gis directly, so both build identical command lines.
+
+The other way round, ParsedCommand reads one line of the command field
+back into CommandOptions, and CommandList keeps the parsed lines of the
+whole field, so running, rerunning and the GeoPackage CRS lookup ask it
+instead of splitting the text again.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+
+
+# Options followed by a path
+PATH_OPTIONS = ('-p', '-o')
+# Options followed by a value; all other options are flags or --key=value
+VALUE_OPTIONS = ('-p', '-o', '-n', '-S', '-l')
+
+_EPSG = re.compile(r'^(?:epsg:)?(\d+)$', re.IGNORECASE)
+_GEOMETRY_SUFFIX = re.compile(r'_(poly|line|point|labels)$', re.IGNORECASE)
+
+
+@dataclass
+class CommandOptions:
+    parser_path: str = ""
+    label_mode: str = ""
+    output_directory: str = ""
+    output_base_name: str = ""
+    additional_options: dict = field(default_factory=dict)
+    flag_options: dict = field(default_factory=dict)
+    # Values of -S, one per selection
+    selections: list = field(default_factory=list)
+
+    def to_command_list(self) -> list:
+        command = []
+        if self.parser_path:
+            command.extend(["-p", os.path.normpath(self.parser_path)])
+        if self.label_mode:
+            command.append(f"--label-mode-line={self.label_mode}")
+        if self.output_directory:
+            command.extend(["-o", os.path.normpath(self.output_directory)])
+        if self.output_base_name:
+            command.extend(["-n", self.output_base_name])
+
+        for key, value in self.additional_options.items():
+            if value:
+                command.append(f"{key}={value}")
+
+        for flag, is_set in self.flag_options.items():
+            if is_set:
+                command.append(flag)
+
+        return command
+
+    @classmethod
+    def from_arguments(cls, arguments):
+        """Read the options back from survey2gis arguments without the binary.
+
+        Returns (options, input_file); the input file is the last argument
+        unless that is an option. A -l log file is dropped, runs add their own.
+        """
+        arguments = [argument.strip('"') for argument in arguments]
+        input_file = ""
+        if arguments and not arguments[-1].startswith('-') and \
+                (len(arguments) < 2 or arguments[-2] not in VALUE_OPTIONS):
+            input_file = arguments.pop()
+        options = cls()
+        index = 0
+        while index < len(arguments):
+            argument = arguments[index]
+            value = arguments[index + 1] if index + 1 < len(arguments) else ""
+            if argument in VALUE_OPTIONS:
+                index += 2
+                if argument == '-p':
+                    options.parser_path = value
+                elif argument == '-o':
+                    options.output_directory = value
+                elif argument == '-n':
+                    options.output_base_name = value
+                elif argument == '-S':
+                    options.selections.append(value)
+                continue
+            index += 1
+            key, has_value, value = argument.partition('=')
+            if key == '--label-mode-line':
+                options.label_mode = value
+            elif has_value:
+                options.additional_options[key] = value
+            else:
+                options.flag_options[argument] = True
+        return options, input_file
+
+
+def split_command(command):
+    """Split a line of the command field at spaces outside double quotes; the quotes are dropped."""
+    parts = []
+    current_part = ''
+    in_quotes = False
+
+    for char in command:
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ' ' and not in_quotes:
+            if current_part:
+                parts.append(current_part)
+                current_part = ''
+        else:
+            current_part += char
+    if current_part:
+        parts.append(current_part)
+
+    return parts
+
+
+def build_command(binary_path, options, input_file):
+    """The command as shown in the command field: binary, options and input, paths in quotes."""
+    command = [f'"{binary_path}"']
+    arguments = options.to_command_list()
+    for index in range(1, len(arguments)):
+        if arguments[index - 1] in PATH_OPTIONS:
+            # Wrap the path in quotes, removing any existing quotes first
+            arguments[index] = f'"{arguments[index].strip(chr(34))}"'
+    command.extend(arguments)
+    for selection in options.selections:
+        command.extend(['-S', f'"{selection.strip(chr(34))}"'])
+    command.append(f'"{input_file.strip(chr(34))}"')
+    return command
+
+
+def command_arguments(binary_path, options, input_file):
+    """The same command as an argument list for subprocess or QProcess, without quotes."""
+    return [part.strip('"') for part in build_command(binary_path, options, input_file)]
+
+
+def epsg_from_proj(value):
+    """The EPSG code of a --proj-in/--proj-out value such as 'epsg:25832' or '25832', else None."""
+    match = _EPSG.match((value or "").strip())
+    return int(match.group(1)) if match else None
+
+
+def _path_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+@dataclass
+class ParsedCommand:
+    """One line of the command field: its arguments split once and read into CommandOptions."""
+    text: str
+    # split_command(text): binary, options and input file without quotes
+    parts: list = field(default_factory=list)
+    options: CommandOptions = field(default_factory=CommandOptions)
+    input_file: str = ""
+    # Value of an explicit -l, which CommandOptions does not keep
+    log_file: str = ""
+
+    @classmethod
+    def parse(cls, text):
+        text = text.strip()
+        parts = split_command(text)
+        if not parts:
+            return cls(text)
+        options, input_file = CommandOptions.from_arguments(parts[1:])
+        log_file = parts[parts.index('-l') + 1] if '-l' in parts[1:-1] else ""
+        return cls(text, parts, options, input_file, log_file)
+
+    @property
+    def binary(self):
+        return self.parts[0] if self.parts else ""
+
+    @property
+    def output_directory(self):
+        return self.options.output_directory
+
+    @property
+    def name(self):
+        return self.options.output_base_name
+
+    @property
+    def selections(self):
+        return self.options.selections
+
+    @property
+    def flags(self):
+        return [flag for flag, is_set in self.options.flag_options.items() if is_set]
+
+    @property
+    def proj_out(self):
+        """EPSG code of --proj-out, or None."""
+        return epsg_from_proj(self.options.additional_options.get('--proj-out'))
+
+
+class CommandList:
+    """The parsed, non-empty lines of the command field.
+
+    update() is called with the field text whenever it changes; lines seen
+    before are not parsed again. Lookups by output name and input file use
+    indexes built once per change.
+    """
+
+    def __init__(self, commands=()):
+        self.text = None
+        self._parsed = {}
+        self._set(list(commands))
+
+    def _set(self, commands):
+        self.commands = commands
+        self._by_name = {}
+        self._by_input = {}
+        for command in commands:
+            if command.name:
+                self._by_name.setdefault(command.name, []).append(command)
+            if command.input_file:
+                self._by_input.setdefault(_path_key(command.input_file), []).append(command)
+
+    def update(self, text):
+        """Re-parse ``text`` if it changed; returns the commands."""
+        if text == self.text:
+            return self.commands
+        self.text = text
+        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        parsed = {line: self._parsed.get(line) or ParsedCommand.parse(line) for line in lines}
+        self._parsed = parsed
+        self._set([parsed[line] for line in lines])
+        return self.commands
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __iter__(self):
+        return iter(self.commands)
+
+    def by_name(self, name):
+        return self._by_name.get(name, [])
+
+    def for_inputs(self, input_files):
+        """The commands reading one of ``input_files``, in field order."""
+        wanted = {_path_key(path) for path in input_files}
+        return [command for command in self.commands
+                if command.input_file and _path_key(command.input_file) in wanted]
+
+    def layer_epsg(self, layer_name):
+        """--proj-out EPSG code of the command that wrote ``layer_name``, or None.
+
+        Layers are named after -n, with a geometry suffix if a command wrote several.
+        """
+        commands = self.by_name(layer_name) or self.by_name(_GEOMETRY_SUFFIX.sub('', layer_name))
+        for command in commands:
+            if command.proj_out is not None:
+                return command.proj_out
+        return None
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Transparent reading of gzip, bzip2 and Zstandard compressed input files.
+
+Field data is often archived compressed. open_input() detects the format
+from the magic bytes at the start of the file (not from the extension) and
+returns a stream of the decompressed bytes, so the normalizer reads
+archives directly without a temporary copy. gzip and bzip2 come with
+Python; Zstandard needs Python 3.14 or the ``zstandard`` package.
+"""
+
+import bz2
+import gzip
+import os
+
+try:
+    # Python 3.14+
+    from compression import zstd as _zstd
+except ImportError:
+    _zstd = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.zst')
+
+_MAGIC_BYTES = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bzip2"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+
+
+class UnsupportedCompressionError(ValueError):
+    """Raised when a compressed input cannot be read in this environment."""
+
+
+def strip_compression_suffix(path):
+    """Return the path without a trailing .gz/.bz2/.zst extension."""
+    root, extension = os.path.splitext(path)
+    return root if extension.lower() in COMPRESSED_EXTENSIONS else path
+
+
+def detect_compression(head):
+    """Return "gzip", "bzip2", "zstd" or None for the first bytes of a file."""
+    for magic, name in _MAGIC_BYTES:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def _open_zstd(raw):
+    if _zstd is not None:
+        return _zstd.ZstdFile(raw)
+    if zstandard is not None:
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=False)
+    raise UnsupportedCompressionError(
+        "Reading .zst input needs Python 3.14 or the 'zstandard' package"
+    )
+
+
+_OPENERS = {
+    "gzip": lambda raw: gzip.GzipFile(fileobj=raw, mode='rb'),
+    "bzip2": lambda raw: bz2.BZ2File(raw, mode='rb'),
+    "zstd": _open_zstd,
+}
+
+
+class InputStream:
+    """Binary reader over the decompressed content of an input file.
+
+    Offsets (tell, seek) refer to the decompressed bytes; raw_position()
+    is how far the file on disk has been read, which is what progress
+    against the file size needs.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.raw = open(path, 'rb')
+        try:
+            self.compression = detect_compression(self.raw.read(4))
+            self.raw.seek(0)
+            self.stream = _OPENERS[self.compression](self.raw) if self.compression else self.raw
+        except BaseException:
+            self.raw.close()
+            raise
+        self.position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.position += len(data)
+        return data
+
+    def readline(self):
+        data = self.stream.readline()
+        self.position += len(data)
+        return data
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset):
+        """Move to a decompressed offset; compressed streams read up to it."""
+        if self.compression is None or offset < self.position:
+            if self.compression is not None:
+                # Decompressors cannot go back, start over
+                self.stream.close()
+                self.raw.seek(0)
+                self.stream = _OPENERS[self.compression](self.raw)
+                self.position = 0
+            else:
+                self.raw.seek(offset)
+                self.position = offset
+                return
+        while self.position < offset:
+            if not self.read(min(offset - self.position, 1024 * 1024)):
+                break
+
+    def raw_position(self):
+        return self.raw.tell()
+
+    def close(self):
+        if self.stream is not self.raw:
+            self.stream.close()
+        self.raw.close()
+
+
+def open_input(path):
+    """Open an input file for reading, decompressing it if needed."""
+    return InputStream(path)
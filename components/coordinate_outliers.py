@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Preflight check for mistyped coordinates in a normalized file.
+
+A single coordinate with a missing digit moves a point by kilometres,
+blows up the extent and makes survey2gis topology runs slow and wrong.
+find_outliers() reads the coordinates at the end of every line (see
+survey_points.PointReader) into NumPy arrays and flags points
+with robust statistics, separately for every input file and geometry tag:
+
+- per axis, the modified z-score ``0.6745 * |v - median| / MAD``
+- the distance of a vertex to the centroid of its object (a line or
+  polygon record and the coordinate-only lines after it), scored the
+  same way against the other vertices of that object, so a stray vertex
+  stands out even when it stays inside the extent of the file
+
+Median and MAD are not dragged along by the outliers they are meant to
+find, unlike mean and standard deviation. Input files are told apart with
+the line index (``<file>.idx``) if the normalizer wrote one.
+"""
+
+import os
+from dataclasses import dataclass, field
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .provenance import ProvenanceIndex, index_path_for
+from .survey_points import PointReader
+
+
+# Modified z-score above which a value is an outlier (Iglewicz and Hoaglin)
+DEFAULT_THRESHOLD = 3.5
+# Groups with fewer points have no meaningful median
+MIN_GROUP_POINTS = 5
+# Outliers kept in memory; the total count is tracked beyond that
+DEFAULT_MAX_OUTLIERS = 10000
+
+_MAD_SCALE = 0.6745
+# Mean absolute deviation to MAD for normal data, used where the MAD is 0
+_MEAN_DEVIATION_SCALE = 0.7979
+_AXES = ("X", "Y", "Z")
+# A vertex must also be this many times further from the centroid than the median vertex
+_CENTROID_FACTOR = 3.0
+
+
+class OutlierCheckError(ValueError):
+    """Raised when the outlier check cannot run."""
+
+
+@dataclass
+class CoordinateOutlier:
+    line_number: int
+    # "<input file> / <geometry tag>"
+    group: str
+    # "X", "Y", "Z" or "centroid"
+    check: str
+    value: float
+    # Median of the group, or the distance to the object centroid
+    reference: float
+    score: float
+
+    def __str__(self):
+        if self.check == "centroid":
+            return (f"line {self.line_number} [{self.group}]: vertex is {self.value:,.3f} away from the "
+                    f"centroid of its object, {self.score:.1f} MAD above the typical {self.reference:,.3f}")
+        return (f"line {self.line_number} [{self.group}]: {self.check} {self.value:.3f} is {self.score:.1f} MAD "
+                f"from the median {self.reference:.3f}")
+
+
+@dataclass
+class OutlierReport:
+    points: int = 0
+    groups: int = 0
+    threshold: float = DEFAULT_THRESHOLD
+    outlier_count: int = 0
+    outliers: list = field(default_factory=list)
+
+    @property
+    def truncated(self):
+        return self.outlier_count > len(self.outliers)
+
+    def summary(self):
+        if not self.outlier_count:
+            return f"No coordinate outliers in {self.points} point(s) ({self.groups} group(s))"
+        lines = len({outlier.line_number for outlier in self.outliers})
+        return (f"{self.outlier_count} coordinate outlier(s) in {lines}{'+' if self.truncated else ''} line(s) "
+                f"of {self.points} point(s), modified z-score above {self.threshold:g}")
+
+
+def require_numpy():
+    if np is None:
+        raise OutlierCheckError("The coordinate outlier check needs NumPy, which is not available")
+
+
+def _line_sources(path, line_count):
+    """Input file name of every line from the line index, or None without a matching one."""
+    index_path = index_path_for(path)
+    if not os.path.isfile(index_path):
+        return None
+    try:
+        with ProvenanceIndex(index_path) as index:
+            if len(index) != line_count:
+                # Left over from another run
+                return None
+            return index.sources, index.line_sources()
+    except (OSError, ValueError):
+        return None
+
+
+def read_points(path, geom_tags=(), decimal_point=".", decimal_group="", progress_callback=None,
+                is_canceled=None):
+    """Read the coordinates of a normalized file.
+
+    Returns the arrays of PointReader.read() plus ``group`` (input file and
+    geometry tag of every point) and the group names, or None when
+    canceled.
+    """
+    require_numpy()
+    reader = PointReader(geom_tags, decimal_point, decimal_group)
+    points = reader.read(path, progress_callback, is_canceled)
+    if points is None:
+        return None
+    tag_names = reader.tag_names
+
+    line_sources = _line_sources(path, reader.line_count)
+    if line_sources is None:
+        points["group"] = points["tag"]
+        names = tag_names
+    else:
+        sources, per_line = line_sources
+        point_sources = np.array(per_line, dtype=np.int64)[points["line"] - 1]
+        points["group"] = point_sources * len(tag_names) + points["tag"]
+        names = [f"{os.path.basename(source)} / {tag_name}" for source in sources for tag_name in tag_names]
+    return points, names
+
+
+def _group_medians(values, groups, counts):
+    """Median of every group; ``groups`` are dense ids 0..n-1 with ``counts`` members each."""
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    starts = np.cumsum(counts) - counts
+    return (sorted_values[starts + (counts - 1) // 2] + sorted_values[starts + counts // 2]) / 2
+
+
+def robust_scores(values, groups):
+    """Modified z-scores of values within their groups, plus the group median of every value.
+
+    All groups are handled in one sort instead of a loop over the groups.
+    Groups smaller than MIN_GROUP_POINTS score 0.
+    """
+    scores = np.zeros(len(values))
+    if not len(values):
+        return scores, np.zeros(0)
+    _, groups = np.unique(groups, return_inverse=True)
+    groups = groups.ravel()
+    counts = np.bincount(groups)
+    medians = _group_medians(values, groups, counts)[groups]
+    deviations = np.abs(values - medians)
+    spread = _group_medians(deviations, groups, counts) / _MAD_SCALE
+    # More than half the values are equal, e.g. a constant height
+    fallback = np.bincount(groups, weights=deviations) / counts / _MEAN_DEVIATION_SCALE
+    spread = np.where(spread > 0, spread, fallback)[groups]
+    valid = (counts[groups] >= MIN_GROUP_POINTS) & (spread > 0)
+    scores[valid] = deviations[valid] / spread[valid]
+    return scores, medians
+
+
+def centroid_distances(points):
+    """Distance of every point to the centroid of its object."""
+    objects = points["object"]
+    if not len(objects):
+        return np.zeros(0)
+    counts = np.bincount(objects)
+    distances = np.zeros(len(objects))
+    for axis in ("x", "y", "z"):
+        centroid = np.bincount(objects, weights=points[axis]) / np.maximum(counts, 1)
+        distances += (points[axis] - centroid[objects]) ** 2
+    return np.sqrt(distances)
+
+
+def find_outliers(path, geom_tags=(), threshold=DEFAULT_THRESHOLD, decimal_point=".", decimal_group="",
+                  max_outliers=DEFAULT_MAX_OUTLIERS, progress_callback=None, is_canceled=None):
+    """Check a normalized file for coordinate outliers; returns an OutlierReport or None if canceled."""
+    result = read_points(path, geom_tags, decimal_point, decimal_group, progress_callback, is_canceled)
+    if result is None:
+        return None
+    points, names = result
+    groups = points["group"]
+    report = OutlierReport(points=len(groups), groups=len(np.unique(groups)), threshold=threshold)
+
+    found = []
+    for axis, name in zip(("x", "y", "z"), _AXES):
+        values = points[axis]
+        mask = points["has_z"] if axis == "z" else np.ones(len(values), dtype=bool)
+        scores, medians = robust_scores(values[mask], groups[mask])
+        hits = np.flatnonzero(scores > threshold)
+        positions = np.flatnonzero(mask)[hits]
+        found.append((positions, name, values[positions], medians[hits], scores[hits]))
+
+    # Only vertices far beyond the typical one of their object count, the
+    # ends of an unevenly measured wall are not an error
+    distances = centroid_distances(points)
+    scores, medians = robust_scores(distances, points["object"])
+    positions = np.flatnonzero((scores > threshold) & (distances > _CENTROID_FACTOR * medians))
+    found.append((positions, "centroid", distances[positions], medians[positions], scores[positions]))
+
+    report.outlier_count = sum(len(positions) for positions, *_ in found)
+    for positions, check, values, references, scores in found:
+        for position, value, reference, score in zip(positions.tolist(), values.tolist(),
+                                                      references.tolist(), scores.tolist()):
+            report.outliers.append(CoordinateOutlier(
+                int(points["line"][position]), names[groups[position]], check, value, reference, score,
+            ))
+    report.outliers.sort(key=lambda outlier: (outlier.line_number, -outlier.score))
+    del report.outliers[max_outliers:]
+    return report
+
+
+def write_outlier_report(report, path):
+    """Write all collected outliers, one per line, for the Logs tab link."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(report.summary() + "\n")
+        for outlier in report.outliers:
+            f.write(f"{outlier}\n")
+        if report.truncated:
+            f.write(f"... {report.outlier_count - len(report.outliers)} more outlier(s) not listed\n")
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Find points that were measured or imported twice.
+
+DuplicateDetector is a normalize stage that bins the coordinates of every
+line (see station_transform.coordinate_pattern) into a spatial hash grid.
+With a tolerance ``t`` the cells are ``2t`` wide, so all points within
+``t`` lie in the point's own cell or the three neighbours on its nearer
+sides: each point costs four dictionary lookups, whatever the size of the
+file, instead of a comparison with every other point. A tolerance of 0
+finds exact duplicates with one lookup.
+
+Each point is compared with the points written before it, across all
+input files. A duplicate is reported with both line numbers and ids in
+a tab separated report file and is optionally dropped. The closing vertex
+of a line or polygon, which repeats the first vertex of its object on
+purpose, is not a duplicate.
+"""
+
+import math
+import os
+from array import array
+
+from .station_transform import coordinate_pattern
+
+
+REPORT_HEADER = ("line", "id", "file", "x", "y", "z", "kind", "distance",
+                 "first_line", "first_id", "first_file", "action")
+
+# Duplicates listed in the Logs tab, the report has all of them
+LOG_EXAMPLES = 10
+
+
+def duplicates_path_for(output_path):
+    """Location of the duplicate report belonging to a normalized file."""
+    return output_path + ".duplicates.tsv"
+
+
+class DuplicateDetector:
+    """Stage that flags, and optionally drops, duplicate points.
+
+    It must see the blocks in output order and before any stage that
+    renumbers lines, as it counts the output line numbers itself. Call
+    close() after the last block, or abort() if the run failed.
+
+    Dropping only removes what cannot be part of an intended geometry: an
+    object whose tag and first point repeat an earlier object (with all of
+    its lines) and a vertex that repeats the vertex right before it. Points
+    that merely coincide, e.g. vertices shared by neighbouring polygons,
+    are reported and kept.
+    """
+
+    def __init__(self, tolerance, drop, input_files, report_path):
+        if tolerance < 0:
+            raise ValueError("The duplicate tolerance must not be negative")
+        self.tolerance = tolerance
+        self.drop = drop
+        self.input_files = input_files
+        self.report_path = report_path
+        self.cell_size = 2 * tolerance
+        self.duplicates = 0
+        self.exact = 0
+        self.dropped = 0
+        self.examples = []
+        self.line_number = 0
+
+        # Kept points; cells map to the newest point, _next chains older ones
+        self._cells = {}
+        self._next = array('q')
+        self._xs = array('d')
+        self._ys = array('d')
+        self._zs = array('d')
+        self._lines = array('q')
+        self._sources = array('q')
+        self._ids = []
+        self._tags = []
+        # First and last kept point of the current object, -1 outside one
+        self._object_start = -1
+        self._previous = -1
+        self._dropping_object = False
+        self._report = open(report_path, 'w', encoding='utf-8', newline='\n')
+        self._report.write("\t".join(REPORT_HEADER) + "\n")
+
+    def _cell_keys(self, x, y):
+        """Keys of the cells that can hold points within the tolerance."""
+        size = self.cell_size
+        fx = x / size
+        fy = y / size
+        cx = math.floor(fx)
+        cy = math.floor(fy)
+        nx = cx + 1 if fx - cx >= 0.5 else cx - 1
+        ny = cy + 1 if fy - cy >= 0.5 else cy - 1
+        return (cx, cy), ((nx, cy), (cx, ny), (nx, ny))
+
+    def _distance(self, index, x, y, z):
+        return math.sqrt((self._xs[index] - x) ** 2 + (self._ys[index] - y) ** 2 + (self._zs[index] - z) ** 2)
+
+    def _find(self, x, y, z):
+        """Return the cell key of a point and the nearest earlier point within tolerance (-1 if none)."""
+        if not self.tolerance:
+            return (x, y, z), self._cells.get((x, y, z), -1)
+        own, neighbours = self._cell_keys(x, y)
+        cells = self._cells
+        xs, ys, zs, chain = self._xs, self._ys, self._zs, self._next
+        best, best_distance = -1, self.tolerance * self.tolerance
+        for key in (own,) + neighbours:
+            index = cells.get(key, -1)
+            while index >= 0:
+                distance = (xs[index] - x) ** 2 + (ys[index] - y) ** 2 + (zs[index] - z) ** 2
+                # Ties go to the earliest point, chains run from new to old
+                if distance < best_distance or (distance == best_distance and (best < 0 or index < best)):
+                    best, best_distance = index, distance
+                index = chain[index]
+        return own, best
+
+    def _keep(self, key, x, y, z, identifier, tag, source):
+        index = len(self._ids)
+        if self.tolerance:
+            self._next.append(self._cells.get(key, -1))
+            self._cells[key] = index
+        else:
+            self._next.append(-1)
+            self._cells.setdefault(key, index)
+        self._xs.append(x)
+        self._ys.append(y)
+        self._zs.append(z)
+        self._lines.append(self.line_number)
+        self._sources.append(-1 if source is None else source)
+        self._ids.append(identifier)
+        self._tags.append(tag)
+        return index
+
+    def _file_name(self, source):
+        if source is None or not 0 <= source < len(self.input_files):
+            return ""
+        return os.path.basename(self.input_files[source])
+
+    def __call__(self, block):
+        match_line = coordinate_pattern(3).match
+        tolerance = self.tolerance
+        sources = block.sources
+        dropped = []
+        report_rows = []
+        for row, line in enumerate(block.lines):
+            match = match_line(line)
+            if match is None:
+                # Lines without coordinates are records of their own
+                self._object_start = self._previous = -1
+                self._dropping_object = False
+                self.line_number += 1
+                continue
+            identifier, _, tag = match[1].partition(" ")
+            # A tag after the id starts a new object, coordinate-only lines continue it
+            if tag:
+                self._object_start = self._previous = -1
+                self._dropping_object = False
+            elif self._dropping_object:
+                dropped.append(row)
+                self.dropped += 1
+                continue
+
+            source = sources[row] if sources is not None else block.source
+            x, y = float(match[3]), float(match[5])
+            z = float(match[7]) if match[7] is not None else 0.0
+            key, index = self._find(x, y, z)
+            drop = False
+            if not tag and self._previous >= 0 and self._distance(self._previous, x, y, z) <= tolerance:
+                # The same vertex twice in a row
+                index = self._previous
+                drop = self.drop
+            elif not tag and self._object_start >= 0 and self._distance(self._object_start, x, y, z) <= tolerance:
+                # Closing vertex of a line or polygon
+                index = -1
+            elif index >= 0 and tag and tag == self._tags[index]:
+                # The same object once more
+                drop = self.drop
+                self._dropping_object = drop
+
+            if index >= 0:
+                distance = self._distance(index, x, y, z)
+                self.duplicates += 1
+                if distance == 0.0:
+                    self.exact += 1
+                report_rows.append("\t".join((
+                    "" if drop else str(self.line_number + 1), identifier, self._file_name(source),
+                    match[3], match[5], match[7] or "", "exact" if distance == 0.0 else "near", f"{distance:.6g}",
+                    str(self._lines[index]), self._ids[index], self._file_name(self._sources[index]),
+                    "dropped" if drop else "kept",
+                )))
+                if len(self.examples) < LOG_EXAMPLES:
+                    self.examples.append(
+                        f"Point {identifier} ({self._file_name(source)}) duplicates point {self._ids[index]} "
+                        f"in output line {self._lines[index]}, distance {distance:.6g}"
+                        + (", dropped" if drop else "")
+                    )
+                if drop:
+                    dropped.append(row)
+                    self.dropped += 1
+                    continue
+
+            self.line_number += 1
+            kept = self._keep(key, x, y, z, identifier, tag, source)
+            if tag:
+                self._object_start = kept
+            self._previous = kept
+
+        if report_rows:
+            self._report.write("\n".join(report_rows) + "\n")
+        if dropped:
+            _drop_rows(block, dropped)
+        return block
+
+    def summary(self, report_path=None):
+        """Messages for the Logs tab."""
+        near = self.duplicates - self.exact
+        messages = [
+            f"Found {self.duplicates} duplicate point(s): {self.exact} exact, {near} within "
+            f"{self.tolerance:g}; {self.dropped} line(s) dropped. Report: {report_path or self.report_path}"
+        ]
+        messages.extend(self.examples)
+        return messages
+
+    def close(self):
+        self._report.close()
+        self._cells = {}
+
+    def abort(self):
+        """Close and remove the report of a failed run."""
+        self.close()
+        if os.path.exists(self.report_path):
+            os.remove(self.report_path)
+
+
+def _drop_rows(block, rows):
+    """Remove lines from a block, along with their line index entries."""
+    drop = set(rows)
+    keep = [row for row in range(len(block.lines)) if row not in drop]
+    block.lines = [block.lines[row] for row in keep]
+    for name in ("line_numbers", "offsets", "sources"):
+        values = getattr(block, name)
+        if values is not None:
+            setattr(block, name, [values[row] for row in keep])
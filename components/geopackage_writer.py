@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Copy the shapefiles of a survey2gis run into a GeoPackage with OGR.
+
+Fields are renamed with the alias mapping, and every layer gets a CRS:
+the --proj-out EPSG code of the command that wrote it if there is one,
+else the EPSG code entered for the whole run. The writer needs GDAL but
+no QGIS, so the dock and headless recipe runs use the same code; adding
+the layers to a project stays in DataProcessor.
+"""
+
+import os
+import re
+
+from osgeo import ogr, osr
+
+
+def _no_log(message, level="info"):
+    pass
+
+
+class GeoPackageWriter:
+    """Writes shapefile groups as GeoPackage layers.
+
+    ``layer_epsg`` is a callable returning the EPSG code for a layer name
+    or None, ``default_epsg`` the code used otherwise (text from the EPSG
+    field, may be empty).
+    """
+
+    def __init__(self, alias_mapping=None, default_epsg="", layer_epsg=None, log=_no_log):
+        self.alias_mapping = alias_mapping or {}
+        self.default_epsg = default_epsg
+        self.layer_epsg = layer_epsg or (lambda layer_name: None)
+        self.log = log
+
+    def layer_srs(self, layer_name):
+        """(srs, epsg_code) for a layer, or (None, None) without any CRS source."""
+        epsg_code = self.layer_epsg(layer_name)
+        if epsg_code is None:
+            epsg_text = str(self.default_epsg or "").strip()
+            if not epsg_text:
+                return None, None
+            try:
+                epsg_code = int(epsg_text)
+            except (ValueError, TypeError):
+                self.log(f"- Invalid EPSG code in input: {epsg_text}", "warning")
+                return None, None
+            self.log(f"- Using CRS from EPSG input for {layer_name}: EPSG:{epsg_code}", "info")
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(epsg_code)
+        return srs, epsg_code
+
+    def renamed_layer_defn(self, layer):
+        """A LayerDefn with the fields of ``layer`` renamed by the alias mapping."""
+        layer_defn = layer.GetLayerDefn()
+        new_layer_defn = ogr.FeatureDefn()
+        for i in range(layer_defn.GetFieldCount()):
+            field_defn = layer_defn.GetFieldDefn(i)
+            alias_name = self.alias_mapping.get(field_defn.GetName(), field_defn.GetName())
+            new_layer_defn.AddFieldDefn(ogr.FieldDefn(alias_name, field_defn.GetType()))
+        return new_layer_defn
+
+    def write_layers(self, files, out_ds, replace=False):
+        """Add the shapefiles of one group to the open GeoPackage; returns the layer names.
+
+        With ``replace`` an existing layer of the same name is deleted first.
+        """
+        created_layers = []
+        for file in files:
+            ds = ogr.Open(file)
+            if ds is None:
+                self.log(f"Could not open {file}", "error")
+                continue
+
+            lyr = ds.GetLayer()
+            layer_name = os.path.splitext(os.path.basename(file))[0]
+            # If this group contains only a single geometry type, drop the
+            # survey2gis geometry suffix (_poly/_line/_point/_labels) so the
+            # layer name matches the name the user entered (and its .qml style).
+            # If the group has multiple geometry types, keep the suffix to
+            # avoid name collisions inside the GeoPackage.
+            if len(files) == 1:
+                layer_name = re.sub(r'_(poly|line|point|labels)$', '', layer_name, flags=re.IGNORECASE)
+            srs, epsg_code = self.layer_srs(layer_name)
+
+            if replace:
+                for index in range(out_ds.GetLayerCount()):
+                    if out_ds.GetLayerByIndex(index).GetName() == layer_name:
+                        out_ds.DeleteLayer(index)
+                        break
+
+            new_layer_defn = self.renamed_layer_defn(lyr)
+            if srs:
+                new_layer = out_ds.CreateLayer(layer_name, srs, lyr.GetGeomType())
+                self.log(f"- Created layer {layer_name} with CRS EPSG:{epsg_code}", "info")
+            else:
+                new_layer = out_ds.CreateLayer(layer_name, geom_type=lyr.GetGeomType())
+                self.log(f"- Created layer {layer_name} without CRS", "info")
+
+            for i in range(new_layer_defn.GetFieldCount()):
+                new_layer.CreateField(new_layer_defn.GetFieldDefn(i))
+
+            for feature in lyr:
+                new_feature = ogr.Feature(new_layer.GetLayerDefn())
+                for i in range(lyr.GetLayerDefn().GetFieldCount()):
+                    original_field_name = lyr.GetLayerDefn().GetFieldDefn(i).GetName()
+                    alias_field_name = self.alias_mapping.get(original_field_name, original_field_name)
+                    new_feature.SetField(alias_field_name, feature.GetField(original_field_name))
+                new_feature.SetGeometry(feature.GetGeometryRef())
+                new_layer.CreateFeature(new_feature)
+                new_feature = None
+
+            created_layers.append(layer_name)
+            ds = None
+
+        return created_layers
+
+    def write(self, data, gpkg_path, replace=True):
+        """Write all groups of scan_spatialfiles() to ``gpkg_path``; returns the layer names.
+
+        An existing GeoPackage is opened for update, so its other layers are
+        kept; with ``replace`` layers of the same name are overwritten.
+        """
+        if os.path.exists(gpkg_path):
+            out_ds = ogr.Open(gpkg_path, 1)
+        else:
+            out_ds = ogr.GetDriverByName('GPKG').CreateDataSource(gpkg_path)
+        if out_ds is None:
+            raise OSError(f"Could not open GeoPackage for update: {gpkg_path}")
+        layer_names = []
+        try:
+            for file_type, groups in data.items():
+                for group, file_list in groups.items():
+                    layer_names += self.write_layers(file_list, out_ds, replace=replace)
+        finally:
+            out_ds = None
+        return layer_names
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Resolve the entries of the Normalize tab input field to input files.
+
+The field holds entries separated by "; ". An entry is
+
+- a file,
+- a directory, searched recursively for .txt/.dat input files,
+- a glob pattern such as ``/dig/**/day*.dat`` (``**`` matches any number
+  of directories), or
+- an exclude pattern starting with ``!``: ``!backup`` skips every file or
+  directory named like that, ``!/dig/**/old/*.dat`` is matched against
+  the full path.
+
+Directory trees are read with os.scandir in a thread pool, one directory
+per task, since most of the time goes into waiting on the file system
+(network shares, synced folders). InputResolver caches the file set of
+the last entries together with the modification time of every directory
+it read. A later run only stats those directories: adding, removing or
+renaming a file changes the modification time of its directory, so an
+unchanged tree is not walked again.
+"""
+
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from .normalize_pipeline import filter_input_files, is_input_file
+
+
+ENTRY_SEPARATOR = "; "
+EXCLUDE_PREFIX = "!"
+# Threads reading directories at once
+DEFAULT_SCAN_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+InputEntry = namedtuple("InputEntry", ["path", "size", "mtime"])
+
+_MAGIC = re.compile(r"[*?[]")
+
+
+def split_entries(text):
+    """The non-empty entries of the input field text."""
+    return [entry.strip() for entry in text.split(ENTRY_SEPARATOR.strip()) if entry.strip()]
+
+
+def is_pattern(entry):
+    return bool(_MAGIC.search(entry))
+
+
+def is_plain_file_list(entries):
+    """True if all entries are files, the way the file dialog fills the field."""
+    return not any(entry.startswith(EXCLUDE_PREFIX) or is_pattern(entry) or os.path.isdir(entry)
+                   for entry in entries)
+
+
+def _posix(path):
+    return path.replace(os.sep, "/")
+
+
+def _component_regex(component):
+    """Regex for one path component of a glob pattern; wildcards do not cross '/'."""
+    result = []
+    position = 0
+    while position < len(component):
+        char = component[position]
+        position += 1
+        if char == "*":
+            result.append("[^/]*")
+        elif char == "?":
+            result.append("[^/]")
+        elif char == "[":
+            end = component.find("]", position + 1 if component[position:position + 1] in ("!", "]") else position)
+            if end < 0:
+                result.append(re.escape(char))
+                continue
+            chars = component[position:end]
+            position = end + 1
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            result.append(f"[{chars.replace(chr(92), chr(92) * 2)}]")
+        else:
+            result.append(re.escape(char))
+    return "".join(result)
+
+
+def glob_regex(pattern):
+    """Compiled regex for a '/'-separated glob pattern with ``**`` for any number of directories."""
+    parts = []
+    components = pattern.split("/")
+    for index, component in enumerate(components):
+        last = index == len(components) - 1
+        if component == "**":
+            parts.append(".*" if last else "(?:[^/]*/)*")
+        else:
+            parts.append(_component_regex(component) + ("" if last else "/"))
+    return re.compile("".join(parts) + r"\Z", re.IGNORECASE if os.name == "nt" else 0)
+
+
+def split_glob(pattern):
+    """Split a glob entry into its base directory and the pattern relative to it."""
+    components = _posix(os.path.normpath(pattern)).split("/")
+    for index, component in enumerate(components):
+        if is_pattern(component) or component == "**":
+            base = "/".join(components[:index]) or ("/" if pattern.startswith(("/", os.sep)) else ".")
+            return os.path.normpath(base), "/".join(components[index:])
+    return os.path.normpath(pattern), ""
+
+
+class Excludes:
+    """The ``!`` entries: names skip files and whole directories, path patterns match full paths."""
+
+    def __init__(self, patterns):
+        self.names = [glob_regex(pattern) for pattern in patterns if "/" not in _posix(pattern)]
+        self.paths = [glob_regex(_posix(os.path.normpath(pattern))) for pattern in patterns if "/" in _posix(pattern)]
+
+    def __call__(self, path, name):
+        if any(regex.match(name) for regex in self.names):
+            return True
+        posix_path = _posix(path)
+        return any(regex.match(posix_path) for regex in self.paths)
+
+
+@dataclass
+class ScanRoot:
+    directory: str
+    # Relative glob pattern, None for all input files
+    pattern: str = None
+    # Directory levels below the root to read, None for no limit
+    max_depth: int = None
+
+
+def _read_directory(directory):
+    """Files (path, size, mtime) and sub-directories of one directory, plus its own mtime."""
+    files = []
+    directories = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    directories.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    files.append(InputEntry(os.path.normpath(entry.path), stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                continue
+    return os.stat(directory).st_mtime_ns, files, directories
+
+
+def scan_roots(roots, excludes, workers=DEFAULT_SCAN_WORKERS):
+    """Walk the roots in parallel; returns the matching entries and the mtime of every directory read."""
+    found = {}
+    signatures = {}
+    matchers = [glob_regex(root.pattern) if root.pattern else None for root in roots]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        for index, root in enumerate(roots):
+            if os.path.isdir(root.directory):
+                pending[executor.submit(_read_directory, root.directory)] = (index, root.directory, 0)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, directory, depth = pending.pop(future)
+                root = roots[index]
+                try:
+                    mtime, files, directories = future.result()
+                except OSError:
+                    # Removed or unreadable meanwhile
+                    continue
+                signatures[directory] = mtime
+                matcher = matchers[index]
+                for entry in files:
+                    if not is_input_file(entry.path) or excludes(entry.path, os.path.basename(entry.path)):
+                        continue
+                    relative = _posix(os.path.relpath(entry.path, root.directory))
+                    if matcher is None or matcher.match(relative):
+                        found[entry.path] = entry
+                if root.max_depth is not None and depth >= root.max_depth:
+                    continue
+                for subdirectory in directories:
+                    if not excludes(subdirectory, os.path.basename(subdirectory)):
+                        pending[executor.submit(_read_directory, subdirectory)] = (index, subdirectory, depth + 1)
+    return found, signatures
+
+
+@dataclass
+class ResolvedInputs:
+    entries: list = field(default_factory=list)
+    # File entries that do not exist
+    missing: list = field(default_factory=list)
+    # The directory trees were not read again
+    cached: bool = False
+
+    @property
+    def paths(self):
+        return [entry.path for entry in self.entries]
+
+    @property
+    def total_size(self):
+        return sum(entry.size for entry in self.entries)
+
+
+class InputResolver:
+    """Resolves input field text to InputEntry lists and caches the directory scan."""
+
+    def __init__(self, workers=DEFAULT_SCAN_WORKERS):
+        self.workers = workers
+        self._cache_key = None
+        self._cached_paths = None
+        self._signatures = {}
+
+    def clear(self):
+        self._cache_key = None
+        self._cached_paths = None
+        self._signatures = {}
+
+    def _cache_valid(self, key):
+        if key != self._cache_key or self._cached_paths is None:
+            return False
+        try:
+            return all(os.stat(directory).st_mtime_ns == mtime for directory, mtime in self._signatures.items())
+        except OSError:
+            return False
+
+    def resolve(self, text):
+        """Resolve the field text; files are sorted by path like filter_input_files()."""
+        entries = split_entries(text)
+        excludes = Excludes([entry[len(EXCLUDE_PREFIX):] for entry in entries if entry.startswith(EXCLUDE_PREFIX)])
+        files = []
+        roots = []
+        result = ResolvedInputs()
+        for entry in entries:
+            if entry.startswith(EXCLUDE_PREFIX):
+                continue
+            if is_pattern(entry):
+                directory, pattern = split_glob(entry)
+                depth = None if "**" in pattern.split("/") else pattern.count("/")
+                roots.append(ScanRoot(directory, pattern, depth))
+            elif os.path.isdir(entry):
+                roots.append(ScanRoot(os.path.normpath(entry)))
+            elif os.path.isfile(entry):
+                files.append(os.path.normpath(entry))
+            else:
+                result.missing.append(entry)
+
+        key = (tuple(entries), self.workers)
+        known = {}
+        if roots and self._cache_valid(key):
+            stat_paths = list(self._cached_paths)
+            result.cached = True
+        else:
+            stat_paths = []
+            if roots:
+                known, self._signatures = scan_roots(roots, excludes, self.workers)
+                self._cache_key, self._cached_paths = key, list(known)
+        stat_paths += [path for path in files if not excludes(path, os.path.basename(path))]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for path, entry in zip(stat_paths, executor.map(_try_stat, stat_paths)):
+                if entry is None:
+                    if result.cached and path in self._cached_paths:
+                        # Vanished without its directory changing (coarse mtimes), read the trees again
+                        self.clear()
+                        return self.resolve(text)
+                    result.missing.append(path)
+                else:
+                    known[path] = entry
+        result.entries = [known[path] for path in filter_input_files(known)]
+        return result
+
+
+def _try_stat(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return InputEntry(path, stat.st_size, stat.st_mtime_ns)
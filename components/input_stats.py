@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Preflight statistics for a normalized file and a survey2gis runtime estimate.
+
+collect_input_stats() reads the file once with survey_points.PointReader
+and keeps only running totals: line and point counts, objects per
+geometry tag, extent and z range. From the coordinate magnitudes it
+guesses the CRS, which catches a wrong EPSG code or swapped axes before
+a long run. The runtime estimate divides the input size by the median
+throughput (bytes per second) of past survey2gis runs.
+"""
+
+import os
+import statistics
+import time
+from dataclasses import dataclass, field
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .survey_points import NO_TAG, PointReader
+
+
+# Past runs kept for the runtime estimate
+RUN_HISTORY_SIZE = 20
+
+
+class InputStatsError(ValueError):
+    """Raised when the statistics cannot be collected."""
+
+
+@dataclass
+class CrsGuess:
+    label: str
+    # None when the magnitudes do not point to one code
+    epsg: int = None
+
+
+@dataclass
+class InputStats:
+    path: str
+    size: int = 0
+    lines: int = 0
+    points: int = 0
+    points_with_z: int = 0
+    # Geometry tag -> number of objects
+    objects: dict = field(default_factory=dict)
+    # Geometry tag -> kind ("point", "line", "poly") from the parser profile
+    kinds: dict = field(default_factory=dict)
+    # (xmin, ymin, xmax, ymax), None without points
+    extent: tuple = None
+    # (zmin, zmax), None without z values
+    z_range: tuple = None
+    crs_guess: CrsGuess = None
+    elapsed: float = 0.0
+
+    def object_summary(self):
+        parts = []
+        for tag, count in sorted(self.objects.items(), key=lambda item: -item[1]):
+            kind = self.kinds.get(tag)
+            name = f"{kind} ({tag})" if kind else ("untagged" if tag == NO_TAG else tag)
+            parts.append(f"{count:,} {name}")
+        return ", ".join(parts) or "none"
+
+    def summary_lines(self):
+        """Lines for the Process tab and the Logs tab."""
+        lines = [
+            f"{self.lines:,} line(s), {self.points:,} point(s), {self.size / (1024 * 1024):.1f} MB "
+            f"(read in {self.elapsed:.1f} s)",
+            f"Objects: {self.object_summary()}",
+        ]
+        if self.extent is not None:
+            xmin, ymin, xmax, ymax = self.extent
+            lines.append(f"Extent: X {xmin:,.3f} .. {xmax:,.3f} ({xmax - xmin:,.1f}), "
+                         f"Y {ymin:,.3f} .. {ymax:,.3f} ({ymax - ymin:,.1f})")
+        if self.z_range is not None:
+            lines.append(f"Z range: {self.z_range[0]:,.3f} .. {self.z_range[1]:,.3f} "
+                         f"({self.points_with_z:,} point(s) with z)")
+        if self.crs_guess is not None:
+            lines.append(f"CRS guess: {self.crs_guess.label}")
+        return lines
+
+
+def _within(low, high, minimum, maximum):
+    return minimum <= low and high <= maximum
+
+
+def guess_crs(extent):
+    """Guess the CRS from the magnitudes of an extent (xmin, ymin, xmax, ymax)."""
+    if extent is None:
+        return None
+    xmin, ymin, xmax, ymax = extent
+    if _within(xmin, xmax, -180, 180) and _within(ymin, ymax, -90, 90):
+        return CrsGuess("geographic longitude/latitude, e.g. WGS 84 (EPSG:4326)", 4326)
+    if _within(xmin, xmax, 0, 100000) and _within(ymin, ymax, 0, 100000):
+        return CrsGuess("local or site grid, no georeference")
+    for zone, epsg in ((2, 31466), (3, 31467), (4, 31468), (5, 31469)):
+        if _within(xmin, xmax, zone * 1000000 + 200000, zone * 1000000 + 800000) and \
+                _within(ymin, ymax, 5000000, 6200000):
+            return CrsGuess(f"DHDN / 3-degree Gauss-Kruger zone {zone} (EPSG:{epsg})", epsg)
+    for zone, epsg in ((31, 5649), (32, 4647), (33, 5650)):
+        if _within(xmin, xmax, zone * 1000000 + 100000, zone * 1000000 + 900000) and \
+                _within(ymin, ymax, 0, 9400000):
+            return CrsGuess(f"ETRS89 / UTM zone {zone}N with zone prefix (EPSG:{epsg})", epsg)
+    if _within(xmin, xmax, 100000, 900000) and _within(ymin, ymax, 0, 10000000):
+        return CrsGuess("projected metres, likely UTM; the zone is not encoded in the coordinates")
+    if _within(ymin, ymax, 100000, 5999999) and _within(xmin, xmax, 5000000, 6200000):
+        return CrsGuess("x and y look swapped (northing first), check the coordinate columns")
+    return CrsGuess("unknown, the coordinates do not match a common CRS (check for outliers)")
+
+
+def collect_input_stats(path, geom_tags=None, decimal_point=".", decimal_group="", progress_callback=None,
+                        is_canceled=None):
+    """Collect the statistics of a normalized file in one pass; None if canceled.
+
+    ``geom_tags`` maps geometry kinds to tags like the ``geom_tags`` of a
+    ParserProfile (``{"poly": "@"}``).
+    """
+    if np is None:
+        raise InputStatsError("Input statistics need NumPy, which is not available")
+    started = time.monotonic()
+    geom_tags = geom_tags or {}
+    stats = InputStats(path=path, size=os.path.getsize(path),
+                       kinds={tag: kind for kind, tag in geom_tags.items() if tag})
+    reader = PointReader(stats.kinds, decimal_point, decimal_group)
+    objects = np.zeros(0, dtype=np.int64)
+    extent = [np.inf, np.inf, -np.inf, -np.inf]
+    z_range = [np.inf, -np.inf]
+    for block in reader.blocks(path, progress_callback, is_canceled):
+        stats.points += len(block["x"])
+        extent = [min(extent[0], block["x"].min()), min(extent[1], block["y"].min()),
+                  max(extent[2], block["x"].max()), max(extent[3], block["y"].max())]
+        z = block["z"][block["has_z"]]
+        if len(z):
+            stats.points_with_z += len(z)
+            z_range = [min(z_range[0], z.min()), max(z_range[1], z.max())]
+        counts = np.bincount(block["tag"][block["starts"]], minlength=len(reader.tag_codes))
+        objects = np.pad(objects, (0, len(counts) - len(objects))) + counts
+    if reader.canceled:
+        return None
+
+    stats.lines = reader.line_count
+    stats.objects = {tag: int(objects[code]) for tag, code in reader.tag_codes.items()
+                     if code < len(objects) and objects[code]}
+    if stats.points:
+        stats.extent = tuple(float(value) for value in extent)
+    if stats.points_with_z:
+        stats.z_range = (float(z_range[0]), float(z_range[1]))
+    stats.crs_guess = guess_crs(stats.extent)
+    stats.elapsed = time.monotonic() - started
+    return stats
+
+
+def add_run(history, input_bytes, seconds, keep=RUN_HISTORY_SIZE):
+    """Return the run history with one more [input bytes, seconds] entry."""
+    if input_bytes <= 0 or seconds <= 0:
+        return list(history)
+    return (list(history) + [[int(input_bytes), float(seconds)]])[-keep:]
+
+
+def estimate_runtime(history, input_bytes):
+    """Estimated seconds for an input of this size and the throughput used, or None without history."""
+    throughputs = [size / seconds for size, seconds in history if size > 0 and seconds > 0]
+    if not throughputs:
+        return None
+    throughput = statistics.median(throughputs)
+    return input_bytes / throughput, throughput
+
+
+def format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f} s"
+    if seconds < 3600:
+        return f"{seconds // 60:.0f} min {seconds % 60:.0f} s"
+    return f"{seconds // 3600:.0f} h {seconds % 3600 // 60:.0f} min"
+
+
+def runtime_message(history, input_bytes):
+    estimate = estimate_runtime(history, input_bytes)
+    if estimate is None:
+        return "Estimated survey2gis runtime: unknown, no past runs recorded yet"
+    seconds, throughput = estimate
+    return (f"Estimated survey2gis runtime: about {format_duration(seconds)} "
+            f"(median of {len(history)} past run(s), {throughput / (1024 * 1024):.2f} MB/s)")
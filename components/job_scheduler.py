@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Dependency-aware scheduling of survey2gis commands and GeoPackage steps.
+
+Every parsed line of the command field (see command_options.CommandList)
+becomes a job declaring what it reads
+(its input file) and writes (the shapefiles <-o>/<-n>_* and its log
+file). For every output basename a GeoPackage job reads those shapefiles
+and writes the GeoPackage. plan_jobs() links the jobs into a DAG:
+
+- a job needs the earlier jobs writing what it reads; if one of them
+  failed it is skipped,
+- a job runs after the last earlier job writing the same output, so
+  conflicting writers run in the order of the command field,
+- jobs sharing a lock never run at the same time, in any order; the
+  GeoPackage jobs all lock the GeoPackage file.
+
+Everything else starts as soon as its dependencies are done, so the
+GeoPackage job of a basename runs once its shapefiles exist instead of
+after the last command. JobScheduler only decides which job may start
+and collects the results; starting processes and writing the GeoPackage
+stays in DataProcessor. At most ``max_parallel`` survey2gis processes run
+at once; with 1 the commands run one after the other.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+
+from .command_options import ParsedCommand
+
+
+COMMAND = "command"
+GEOPACKAGE = "geopackage"
+
+# Job states, see CommandJob.state
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+CACHED = "cached"
+FAILED = "failed"
+SKIPPED = "skipped"
+CANCELED = "canceled"
+
+
+def default_parallel_runs():
+    """Number of commands to run at once if the user did not choose: one per CPU."""
+    return os.cpu_count() or 1
+
+
+def path_key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def shapefiles_key(output_dir, name):
+    """Stands for all shapefiles survey2gis writes for ``name`` (<name>_poly.shp, <name>_line.shp, ...)."""
+    return path_key(os.path.join(output_dir, name)) + "_*"
+
+
+@dataclass
+class CommandJob:
+    # Position in the plan; commands keep their line number in the command field, 0-based
+    index: int
+    # ParsedCommand of a command job
+    command: ParsedCommand = None
+    kind: str = COMMAND
+    # Split command line as executed, with -l
+    parts: list = field(default_factory=list)
+    # Output base name (-n), also names the log file
+    name: str = ""
+    output_dir: str = ""
+    log_file: str = ""
+    input_file: str = None
+    # Path keys read and written, see path_key() and shapefiles_key()
+    inputs: set = field(default_factory=set)
+    outputs: set = field(default_factory=set)
+    # Held while the job runs, without ordering the jobs sharing it
+    locks: set = field(default_factory=set)
+    # Indices of jobs to wait for; a failure among ``needs`` skips this job, ``after`` only orders
+    needs: set = field(default_factory=set)
+    after: set = field(default_factory=set)
+    started: float = None
+    finished: float = None
+    # Wall-clock start and end, time.time()
+    started_at: float = None
+    finished_at: float = None
+    last_output: float = None
+    ok: bool = None
+    # Key in the survey2gis result cache, and whether the result was restored from it
+    cache_key: str = None
+    cached: bool = False
+    # Killed because another job failed and the scheduler stops on errors
+    canceled: bool = False
+    # Not started: a job it needs failed, or the scheduler stopped
+    skipped: bool = False
+    exit_code: int = None
+    input_bytes: int = None
+    # Features in the shapefiles the command wrote
+    features: int = None
+    output: list = field(default_factory=list)
+
+    @property
+    def label(self):
+        if self.kind == GEOPACKAGE:
+            return f"GeoPackage {self.name}"
+        return f"{self.index + 1} ({self.name})" if self.name else str(self.index + 1)
+
+    @property
+    def state(self):
+        if self.canceled:
+            return CANCELED
+        if self.skipped:
+            return SKIPPED
+        if self.ok is None:
+            return QUEUED if self.started is None else RUNNING
+        if not self.ok:
+            return FAILED
+        return CACHED if self.cached else DONE
+
+    @property
+    def in_pool(self):
+        """Only survey2gis processes take a pool slot; GeoPackage jobs run in the dock itself."""
+        return self.kind == COMMAND
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished if self.finished is not None else time.monotonic()) - self.started
+
+
+def command_job(index, command, logs_dir):
+    """A job for a ParsedCommand; the log goes to the -l given or logs_dir/<-n>.log."""
+    job = CommandJob(index, command, parts=list(command.parts), name=command.name,
+                     output_dir=command.output_directory, input_file=command.input_file or None,
+                     log_file=command.log_file)
+    if not job.log_file and job.name:
+        job.log_file = os.path.join(logs_dir, f"{job.name}.log")
+        job.parts.extend(['-l', job.log_file])
+    if job.input_file:
+        job.inputs.add(path_key(job.input_file))
+        if os.path.isfile(job.input_file):
+            job.input_bytes = os.path.getsize(job.input_file)
+    if job.output_dir and job.name:
+        job.outputs.add(shapefiles_key(job.output_dir, job.name))
+    if job.log_file:
+        job.outputs.add(path_key(job.log_file))
+    return job
+
+
+def link_jobs(jobs):
+    """Fill ``needs`` and ``after`` from the declared inputs and outputs, in list order."""
+    writers = {}
+    for job in jobs:
+        for key in job.inputs:
+            job.needs.update(writers.get(key, ()))
+        for key in job.outputs:
+            if key in writers:
+                job.after.add(writers[key][-1])
+            writers.setdefault(key, []).append(job.index)
+    return jobs
+
+
+def plan_jobs(commands, logs_dir, geopackage=None):
+    """Jobs for ParsedCommands and, with a GeoPackage path, one GeoPackage job per output basename."""
+    jobs = [command_job(index, command, logs_dir) for index, command in enumerate(commands)]
+    if geopackage:
+        basenames = {}
+        for job in jobs:
+            if job.output_dir and job.name:
+                basenames.setdefault(shapefiles_key(job.output_dir, job.name), job)
+        for key, first in basenames.items():
+            # Writes the layers named after the basename; layers of other basenames may be written before
+            jobs.append(CommandJob(len(jobs), kind=GEOPACKAGE, name=first.name, output_dir=first.output_dir,
+                                   inputs={key}, outputs={f"{path_key(geopackage)}|{first.name}"},
+                                   locks={path_key(geopackage)}))
+    return link_jobs(jobs)
+
+
+class JobScheduler:
+    """Hands out jobs whose dependencies are done while fewer than ``max_parallel`` processes run.
+
+    A failed job stops the scheduler if ``stop_on_error`` is set: no further
+    job is started and the ones not started yet are marked as skipped.
+    """
+
+    def __init__(self, jobs, max_parallel=1, stop_on_error=True):
+        self.jobs = list(jobs)
+        self.max_parallel = max(1, int(max_parallel))
+        self.stop_on_error = stop_on_error
+        self.pending = list(self.jobs)
+        self.running = []
+        self.done = []
+        self.skipped = []
+        self.stopped = False
+        # index -> succeeded, for finished and skipped jobs
+        self._results = {}
+
+    @property
+    def commands(self):
+        return [job for job in self.jobs if job.kind == COMMAND]
+
+    @property
+    def running_processes(self):
+        return sum(1 for job in self.running if job.in_pool)
+
+    def take_ready(self):
+        """Jobs to start now; they count as running until finish() is called."""
+        ready = []
+        changed = True
+        while changed and not self.stopped:
+            changed = False
+            for job in list(self.pending):
+                if any(index not in self._results for index in job.needs | job.after):
+                    continue
+                if not all(self._results[index] for index in job.needs):
+                    # What it reads was not written; this may unblock jobs waiting for it
+                    self.pending.remove(job)
+                    self.skipped.append(job)
+                    job.skipped = True
+                    self._results[job.index] = False
+                    changed = True
+                    continue
+                if job.in_pool and self.running_processes >= self.max_parallel:
+                    continue
+                if any(job.locks & other.locks for other in self.running):
+                    continue
+                self.pending.remove(job)
+                job.started = job.last_output = time.monotonic()
+                job.started_at = time.time()
+                self.running.append(job)
+                ready.append(job)
+        return ready
+
+    def finish(self, job, ok):
+        """Record the result of a running job; returns False if it was already finished."""
+        if job not in self.running:
+            return False
+        self.running.remove(job)
+        job.ok = ok
+        job.finished = time.monotonic()
+        job.finished_at = time.time()
+        self.done.append(job)
+        self._results[job.index] = ok
+        if not ok and not job.canceled and self.stop_on_error:
+            self.stop()
+        return True
+
+    def stop(self):
+        """Start no further jobs; running jobs still have to be finished."""
+        self.stopped = True
+        for job in self.pending:
+            job.skipped = True
+        self.skipped.extend(self.pending)
+        self.pending.clear()
+
+    @property
+    def is_finished(self):
+        return not self.running and not self.pending
+
+    @property
+    def succeeded(self):
+        return [job for job in self.done if job.ok]
+
+    @property
+    def failed(self):
+        return [job for job in self.done if not job.ok and not job.canceled]
+
+    def summary(self, now=None):
+        """Progress and throughput of the command jobs, e.g. for a status line."""
+        commands = self.commands
+        finished = [job for job in commands if job.ok is not None]
+        counts = {}
+        for job in commands:
+            counts[job.state] = counts.get(job.state, 0) + 1
+        text = f"{len(finished)}/{len(commands)} command(s) finished"
+        text += "".join(f", {counts[state]} {state}" for state in (RUNNING, CACHED, FAILED, SKIPPED, CANCELED)
+                        if counts.get(state))
+        started = [job.started_at for job in commands if job.started_at is not None]
+        if not started or not finished:
+            return text
+        elapsed = max((now or time.time()) - min(started), 1e-6)
+        processed = sum(job.input_bytes or 0 for job in finished if job.ok)
+        text += f", {len(finished) / elapsed * 60:.1f} commands/min"
+        if processed:
+            text += f", {processed / elapsed / (1024 * 1024):.2f} MB/s input"
+        return text
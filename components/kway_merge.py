@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Interleave the lines of several input files by a key column.
+
+When several instruments record on the same day, concatenating their files
+by name puts the measurements out of order. KeyMerger instead sorts every
+file by a key column (e.g. the measurement index or a timestamp) and merges
+all files with a k-way heap merge.
+
+Memory stays bounded: lines are collected in runs of at most ``run_lines``
+lines, each run is sorted (Timsort is linear on already sorted input) and,
+once more than ``run_lines`` lines are held in memory, written to a spill
+file. The merge then streams from all runs at once.
+
+The merge is stable: equal keys keep the file order and, within a file, the
+original line order. Lines without a usable key (e.g. coordinate-only
+records) take the key of the preceding line, so they stay with it.
+"""
+
+import heapq
+import os
+import tempfile
+from itertools import chain, islice, repeat
+from operator import itemgetter
+
+
+DEFAULT_RUN_LINES = 500000
+
+# Separates the fields of a spilled entry; cleaned lines never contain it
+_SPILL_SEPARATOR = "\x1f"
+_SPILL_BATCH = 8192
+_SPILL_READ_HINT = 1024 * 1024
+
+_entry_key = itemgetter(0)
+
+
+def make_merge_key(column, numeric=True):
+    """Return a function that extracts the merge key of a cleaned line, or None.
+
+    ``column`` is 1-based. Numeric keys are compared as numbers, anything
+    else as text (which also orders ISO timestamps correctly).
+    """
+    if column < 1:
+        raise ValueError("The merge key column must be 1 or larger")
+    index = column - 1
+
+    def key(line):
+        parts = line.split(" ", column)
+        if len(parts) <= index:
+            return None
+        value = parts[index]
+        if not numeric:
+            return value
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        # NaN does not order, treat it as missing
+        return number if number == number else None
+
+    key.numeric = numeric
+    return key
+
+
+class KeyMerger:
+    """Collects the lines of all inputs in sorted runs and merges them.
+
+    Call add() with the lines of one source at a time, finish_source() after
+    each source, then iterate iter_entries() once and close(). Up to
+    ``run_lines`` lines are kept in sorted runs in memory plus one run
+    being collected; everything else is spilled.
+    """
+
+    def __init__(self, key, run_lines=DEFAULT_RUN_LINES, spill_dir=None):
+        self.key = key
+        self.run_lines = max(run_lines, 1)
+        self.spill_dir = spill_dir
+        self.runs = []
+        self.spilled_runs = 0
+        self._in_memory = 0
+        self._run = []
+        self._source = None
+        self._first_key = float("-inf") if getattr(key, "numeric", True) else ""
+        self._last_key = self._first_key
+        self._spill_paths = []
+
+    def add(self, source, lines, line_numbers=None, offsets=None):
+        """Add lines of one source in their original order."""
+        if source != self._source:
+            self.finish_source()
+            self._source = source
+        keys = list(map(self.key, lines))
+        if None in keys:
+            last_key = self._last_key
+            for position, line_key in enumerate(keys):
+                if line_key is None:
+                    keys[position] = last_key
+                else:
+                    last_key = line_key
+        if keys:
+            self._last_key = keys[-1]
+        entries = zip(keys, lines, repeat(source),
+                      repeat(0) if line_numbers is None else line_numbers,
+                      repeat(0) if offsets is None else offsets)
+        while True:
+            self._run.extend(islice(entries, self.run_lines - len(self._run)))
+            if len(self._run) < self.run_lines:
+                break
+            self._close_run()
+
+    def finish_source(self):
+        """Close the current source; its keys do not carry into the next one."""
+        self._close_run()
+        self._source = None
+        self._last_key = self._first_key
+
+    def _close_run(self):
+        if not self._run:
+            return
+        run, self._run = self._run, []
+        run.sort(key=_entry_key)
+        if self._in_memory + len(run) <= self.run_lines:
+            self._in_memory += len(run)
+            self.runs.append(run)
+        else:
+            self.runs.append(self._spill(run))
+
+    def _spill(self, run):
+        handle, path = tempfile.mkstemp(prefix=".s2g_merge_", suffix=".run", dir=self.spill_dir)
+        self._spill_paths.append(path)
+        separator = _SPILL_SEPARATOR
+        with os.fdopen(handle, 'w', encoding='utf-8', newline='\n') as run_file:
+            for start in range(0, len(run), _SPILL_BATCH):
+                run_file.write("".join([
+                    f"{key}{separator}{line}{separator}{source}{separator}{number}{separator}{offset}\n"
+                    for key, line, source, number, offset in run[start:start + _SPILL_BATCH]
+                ]))
+        self.spilled_runs += 1
+        return path
+
+    def _read_spilled(self, path):
+        """Yield batches of entries read back from a spill file."""
+        separator = _SPILL_SEPARATOR
+        numeric = isinstance(self._first_key, float)
+        with open(path, 'r', encoding='utf-8', newline='\n') as run_file:
+            while True:
+                rows = [entry[:-1].split(separator) for entry in run_file.readlines(_SPILL_READ_HINT)]
+                if not rows:
+                    break
+                yield [(float(key) if numeric else key, line, int(source), int(number), int(offset))
+                       for key, line, source, number, offset in rows]
+
+    def iter_entries(self):
+        """Return an iterator of (key, line, source, line number, offset) in merged order."""
+        self.finish_source()
+        if not self.spilled_runs:
+            # Everything is in memory: Timsort merges the sorted runs in C,
+            # and keeps equal keys in run order just like the heap merge
+            entries = list(chain.from_iterable(self.runs))
+            self.runs = []
+            entries.sort(key=_entry_key)
+            return iter(entries)
+        streams = [
+            chain.from_iterable(self._read_spilled(run)) if isinstance(run, str) else iter(run)
+            for run in self.runs
+        ]
+        return heapq.merge(*streams, key=_entry_key)
+
+    def close(self):
+        """Drop the runs and remove the spill files."""
+        self.runs = []
+        self._run = []
+        for path in self._spill_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self._spill_paths = []
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Random access to the lines of large text files.
+
+LineOffsetIndex memory-maps a file and records the byte offset of every
+``stride``-th line in one scan. A line is then found by jumping to the
+nearest checkpoint and splitting at most ``stride`` lines, so viewing
+any part of a file of several hundred MB only touches the pages that are
+shown and the index itself stays small (8 bytes per ``stride`` lines).
+"""
+
+import bisect
+import mmap
+import operator
+import re
+from array import array
+from collections import OrderedDict
+from itertools import accumulate, repeat
+
+
+LINE_INDEX_STRIDE = 64
+SCAN_CHUNK_SIZE = 4 * 1024 * 1024
+BLOCK_CACHE_SIZE = 64
+
+
+class LineIndexCanceled(Exception):
+    """Raised when building the index was canceled."""
+
+
+class LineOffsetIndex:
+    """Line checkpoints over a memory-mapped file.
+
+    Line numbers are 0-based here; the viewer adds one when showing them.
+    Lines are decoded as UTF-8 (the normalizer's output encoding), with
+    broken bytes replaced instead of failing.
+    """
+
+    def __init__(self, path, stride=LINE_INDEX_STRIDE):
+        self.path = path
+        self.stride = stride
+        self.line_count = 0
+        self.checkpoints = array('Q', [0])
+        self._blocks = OrderedDict()
+        self._file = open(path, 'rb')
+        self._map = None
+        self.size = 0
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.size = len(self._map)
+        except ValueError:
+            # Empty files cannot be mapped, they simply have no lines
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.line_count
+
+    def close(self):
+        self._blocks.clear()
+        if self._map is not None and not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def build(self, progress_callback=None, is_canceled=None):
+        """Scan the file once and record the line checkpoints."""
+        checkpoints = array('Q', [0])
+        newlines = 0
+        for chunk_start in range(0, self.size, SCAN_CHUNK_SIZE):
+            if is_canceled is not None and is_canceled():
+                raise LineIndexCanceled()
+            pieces = self._map[chunk_start:chunk_start + SCAN_CHUNK_SIZE].split(b"\n")
+            # Start of the line after each newline, relative to the chunk
+            starts = list(accumulate(map(operator.add, map(len, pieces[:-1]), repeat(1))))
+            first = (-(newlines + 1)) % self.stride
+            checkpoints.extend(chunk_start + start for start in starts[first::self.stride])
+            newlines += len(starts)
+            if progress_callback is not None:
+                progress_callback(100.0 * min(chunk_start + SCAN_CHUNK_SIZE, self.size) / self.size)
+
+        self.line_count = newlines
+        if self.size and self._map[self.size - 1:self.size] != b"\n":
+            self.line_count += 1
+        if len(checkpoints) > 1 and checkpoints[-1] >= self.size:
+            # The "line" after a final newline does not exist
+            checkpoints.pop()
+        self.checkpoints = checkpoints
+        self._blocks.clear()
+        return self
+
+    def _block(self, block):
+        """Decoded lines of one checkpoint block, kept in a small LRU cache."""
+        lines = self._blocks.get(block)
+        if lines is not None:
+            self._blocks.move_to_end(block)
+            return lines
+        start = self.checkpoints[block]
+        end = self.checkpoints[block + 1] if block + 1 < len(self.checkpoints) else self.size
+        raw = self._map[start:end]
+        if raw.endswith(b"\n"):
+            raw = raw[:-1]
+        lines = [line.rstrip(b"\r").decode('utf-8', errors='replace') for line in raw.split(b"\n")]
+        self._blocks[block] = lines
+        if len(self._blocks) > BLOCK_CACHE_SIZE:
+            self._blocks.popitem(last=False)
+        return lines
+
+    def line(self, line_number):
+        """Text of one line without its line break."""
+        if not 0 <= line_number < self.line_count:
+            raise IndexError(f"Line {line_number + 1} is outside the file (1-{self.line_count})")
+        return self._block(line_number // self.stride)[line_number % self.stride]
+
+    def line_offset(self, line_number):
+        """Byte offset at which a line starts."""
+        if not 0 <= line_number < self.line_count:
+            raise IndexError(f"Line {line_number + 1} is outside the file (1-{self.line_count})")
+        offset = self.checkpoints[line_number // self.stride]
+        for _ in range(line_number % self.stride):
+            offset = self._map.find(b"\n", offset) + 1
+        return offset
+
+    def line_at_offset(self, offset):
+        """Number of the line that contains the given byte offset."""
+        block = bisect.bisect_right(self.checkpoints, offset) - 1
+        return block * self.stride + self._map[self.checkpoints[block]:offset].count(b"\n")
+
+    def find(self, text, start_line=0, case_sensitive=False):
+        """Return the first line at or after start_line containing text, else -1.
+
+        The search runs on the mapped bytes; case folding only covers ASCII.
+        """
+        if not text or not self.line_count or start_line >= self.line_count:
+            return -1
+        pattern = re.compile(re.escape(text.encode('utf-8')), 0 if case_sensitive else re.IGNORECASE)
+        match = pattern.search(self._map, self.line_offset(max(start_line, 0)))
+        return self.line_at_offset(match.start()) if match else -1
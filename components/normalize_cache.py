@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of normalized per-file fragments.
+
+A fragment is the normalized content of one input file as written by
+normalize_pipeline.normalize_fragment(). It is keyed by the input path,
+size, modification time and content hash plus the normalize options that
+shape it. When one new field file is added to a campaign, only that file
+is normalized again and the merged output is rebuilt from the cached
+fragments of the others.
+
+Entries are evicted least-recently-used once the cache grows past its size
+limit. clear() drops everything.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from .provenance import INDEX_SUFFIX, index_path_for
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FragmentCache:
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    # -- manifest -----------------------------------------------------------
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.cache_dir, self.MANIFEST_NAME)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if isinstance(manifest.get("entries"), dict) and isinstance(manifest.get("hashes"), dict):
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {"entries": {}, "hashes": {}}
+
+    def save(self):
+        """Write the manifest atomically."""
+        partial_path = self.manifest_path + ".part"
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(partial_path, self.manifest_path)
+
+    # -- keys ---------------------------------------------------------------
+
+    def content_hash(self, path, size, mtime_ns):
+        """Content hash of an input, re-read only if size or mtime changed."""
+        known = self.manifest["hashes"].get(path)
+        if known and known["size"] == size and known["mtime_ns"] == mtime_ns:
+            return known["sha256"]
+        sha256 = file_digest(path)
+        self.manifest["hashes"][path] = {"size": size, "mtime_ns": mtime_ns, "sha256": sha256}
+        return sha256
+
+    def key_for(self, path, signature):
+        """Cache key of one input file normalized with the given options."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        fingerprint = [path, st.st_size, st.st_mtime_ns,
+                       self.content_hash(path, st.st_size, st.st_mtime_ns), signature]
+        return hashlib.sha256(json.dumps(fingerprint).encode('utf-8')).hexdigest()
+
+    def _fragment_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.frag")
+
+    def _entry_paths(self, key, entry):
+        paths = [self._fragment_path(key)]
+        if entry.get("index"):
+            paths.append(index_path_for(paths[0]))
+        return paths
+
+    # -- lookup / store -----------------------------------------------------
+
+    def lookup(self, key):
+        """Return (fragment path, lines, bytes read, encoding) for a hit, else None."""
+        entry = self.manifest["entries"].get(key)
+        if entry and all(os.path.exists(path) for path in self._entry_paths(key, entry)):
+            entry["last_used"] = time.time()
+            return self._fragment_path(key), entry["lines"], entry["bytes_read"], entry.get("encoding", "utf-8")
+        self.manifest["entries"].pop(key, None)
+        return None
+
+    def store(self, key, fragment_path, lines, bytes_read, encoding="utf-8"):
+        """Move a freshly written fragment into the cache; return its new path.
+
+        A line index written next to the fragment (see provenance) moves along.
+        """
+        target = self._fragment_path(key)
+        shutil.move(fragment_path, target)
+        size = os.path.getsize(target)
+        has_index = os.path.exists(index_path_for(fragment_path))
+        if has_index:
+            shutil.move(index_path_for(fragment_path), index_path_for(target))
+            size += os.path.getsize(index_path_for(target))
+        self.manifest["entries"][key] = {
+            "lines": lines,
+            "bytes_read": bytes_read,
+            "encoding": encoding,
+            "index": has_index,
+            "size": size,
+            "last_used": time.time(),
+        }
+        return target
+
+    def new_fragment_path(self, key, source=0):
+        """Scratch path inside the cache dir, so store() is a cheap rename."""
+        return os.path.join(self.cache_dir, f"{key}.{source}.frag.part")
+
+    # -- eviction -----------------------------------------------------------
+
+    def total_size(self):
+        return sum(entry["size"] for entry in self.manifest["entries"].values())
+
+    def evict(self):
+        """Drop least recently used fragments until the size limit is met."""
+        entries = self.manifest["entries"]
+        total = self.total_size()
+        evicted = 0
+        for key in sorted(entries, key=lambda k: entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entries[key]["size"]
+            self._remove_fragment(key)
+            del entries[key]
+            evicted += 1
+
+        # Forget content hashes of inputs that no longer exist
+        hashes = self.manifest["hashes"]
+        for path in [path for path in hashes if not os.path.exists(path)]:
+            del hashes[path]
+        return evicted
+
+    def clear(self):
+        """Invalidate the whole cache."""
+        for key in list(self.manifest["entries"]):
+            self._remove_fragment(key)
+        for name in os.listdir(self.cache_dir):
+            if name.endswith((".frag", ".frag.part", ".frag" + INDEX_SUFFIX, ".frag.part" + INDEX_SUFFIX)):
+                os.remove(os.path.join(self.cache_dir, name))
+        self.manifest = {"entries": {}, "hashes": {}}
+        self.save()
+
+    def _remove_fragment(self, key):
+        for path in (self._fragment_path(key), index_path_for(self._fragment_path(key))):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
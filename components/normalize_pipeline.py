@@ -0,0 +1,912 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming normalization pipeline behind the Normalize tab.
+
+Every normalize step (concatenate, clean, geotag replacement, line
+renumbering and column insertion) is a stage over a stream of line blocks.
+Each input file is read once, the merged file is written once, and only one
+block of lines is held in memory at a time. The result is byte-identical to
+the former approach of rewriting the merged file once per step.
+
+Input files are read as bytes in large chunks that end on a line boundary.
+The encoding of each file is sniffed from a prefix sample (UTF-8, otherwise
+cp1252 or latin-1, which are common for total station exports) and every
+chunk is decoded in one call, so no stage pays a per-line decode cost.
+gzip, bzip2 and Zstandard compressed inputs are decompressed on the fly,
+see compressed_input.
+
+This module has no Qt/QGIS imports so it can run in worker threads,
+worker processes and tests alike.
+"""
+
+import codecs
+import hashlib
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field, replace
+from itertools import islice
+from operator import itemgetter
+
+from .compressed_input import open_input, strip_compression_suffix
+from .duplicate_points import DuplicateDetector, duplicates_path_for
+from .geotag_rules import GeotagRuleSet, parse_rules, rules_from_search_replace
+from .kway_merge import DEFAULT_RUN_LINES, KeyMerger, make_merge_key
+from .provenance import ProvenanceWriter, index_path_for
+from .station_transform import make_transform_stage
+
+
+INPUT_EXTENSIONS = ('.txt', '.dat')
+
+# Bump when the fragment layout changes, so cached fragments are not reused
+FRAGMENT_FORMAT = 3
+
+# "auto" sniffs every file, the others force one encoding for all inputs
+INPUT_ENCODINGS = ("auto", "utf-8", "cp1252", "latin-1")
+
+# Tried in this order when sniffing, latin-1 decodes any byte sequence
+FALLBACK_ENCODINGS = ("utf-8", "cp1252", "latin-1")
+
+SNIFF_SIZE = 64 * 1024
+READ_CHUNK_SIZE = 256 * 1024
+
+# Number of lines handed from stage to stage in one go. Large enough to keep
+# the per-block overhead negligible, small enough to keep memory bounded.
+DEFAULT_BLOCK_SIZE = 8192
+
+
+@dataclass
+class NormalizeOptions:
+    replace_geotags: bool = False
+    search: str = ""
+    replace: str = ""
+    # Additional rules in the format documented in geotag_rules
+    geotag_rules: str = ""
+    fix_lines: bool = False
+    cols_after_id: str = ""
+    block_size: int = DEFAULT_BLOCK_SIZE
+    # More than one worker normalizes the input files in a process pool
+    workers: int = 1
+    # One of INPUT_ENCODINGS
+    encoding: str = "auto"
+    # Write a line index next to the output, see provenance
+    write_index: bool = False
+    # 1-based column to interleave all inputs by, see kway_merge;
+    # 0 concatenates the files in name order
+    merge_column: int = 0
+    # Compare the merge key as a number, otherwise as text
+    merge_numeric: bool = True
+    # Lines held in memory while sorting before runs are spilled to disk
+    merge_run_lines: int = DEFAULT_RUN_LINES
+    # Sidecar table with per-station transforms, see station_transform
+    transform_table: str = ""
+    # Report points that repeat an earlier point, see duplicate_points
+    find_duplicates: bool = False
+    # Distance up to which points count as duplicates, 0 = exact only
+    duplicate_tolerance: float = 0.0
+    # Drop repeated objects and vertices instead of only reporting them
+    drop_duplicates: bool = False
+
+
+@dataclass
+class NormalizeStats:
+    files: int = 0
+    lines: int = 0
+    bytes_read: int = 0
+    elapsed: float = 0.0
+    cached_files: int = 0
+    warnings: list = field(default_factory=list)
+    # Results worth a line in the Logs tab that are not warnings
+    notes: list = field(default_factory=list)
+    # Input path -> encoding it was read with
+    encodings: dict = field(default_factory=dict)
+
+    def merge(self, other):
+        """Add the counters of a per-file run (e.g. from a worker process)."""
+        self.files += other.files
+        self.bytes_read += other.bytes_read
+        self.warnings.extend(other.warnings)
+        self.notes.extend(other.notes)
+        self.encodings.update(other.encodings)
+
+    def encoding_message(self):
+        """Name the inputs that were not read as UTF-8, or return None."""
+        others = [f"{os.path.basename(path)} ({encoding})"
+                  for path, encoding in self.encodings.items() if encoding != "utf-8"]
+        if not others:
+            return None
+        return f"Input file(s) not in UTF-8, transcoded: {', '.join(others)}"
+
+    def throughput_message(self):
+        """Human readable summary for the Logs tab."""
+        elapsed = max(self.elapsed, 1e-6)
+        megabytes = self.bytes_read / (1024 * 1024)
+        cached = f", {self.cached_files} from cache" if self.cached_files else ""
+        return (f"Normalized {self.lines} line(s), {megabytes:.1f} MB from {self.files} file(s){cached} "
+                f"in {self.elapsed:.1f} s ({self.lines / elapsed:,.0f} lines/s, "
+                f"{megabytes / elapsed:.1f} MB/s)")
+
+
+class NormalizeCanceled(Exception):
+    """Raised inside the pipeline when the caller asked to stop."""
+
+
+class PoolUnavailable(Exception):
+    """Raised when no Python interpreter can be found for worker processes."""
+
+
+class NormalizeProgress:
+    """Tracks bytes and lines read per input file and reports them.
+
+    The callback receives this object after every block, so it can read
+    ``path``, ``file_bytes``, ``file_size``, ``file_lines`` and ``percent``.
+    """
+
+    def __init__(self, input_files, callback=None):
+        self.input_files = input_files
+        self.callback = callback
+        self.sizes = [os.path.getsize(path) for path in input_files]
+        self.total_bytes = sum(self.sizes)
+        self.done_bytes = 0
+        self.source = 0
+        self.file_bytes = 0
+        self.file_lines = 0
+
+    @property
+    def path(self):
+        return self.input_files[self.source]
+
+    @property
+    def file_size(self):
+        return self.sizes[self.source]
+
+    @property
+    def percent(self):
+        if not self.total_bytes:
+            return 100.0
+        return 100.0 * (self.done_bytes + self.file_bytes) / self.total_bytes
+
+    def start_file(self, source):
+        self.source = source
+        self.file_bytes = 0
+        self.file_lines = 0
+
+    def update(self, file_bytes, file_lines):
+        self.file_bytes = min(file_bytes, self.file_size)
+        self.file_lines = file_lines
+        if self.callback:
+            self.callback(self)
+
+    def finish_file(self, file_lines):
+        self.update(self.file_size, file_lines)
+        self.done_bytes += self.file_size
+        self.file_bytes = 0
+
+
+class LineBlock:
+    """A run of cleaned lines that all come from the same input file.
+
+    When the line index is written, ``line_numbers`` and ``offsets`` hold the
+    original line number and byte offset of every line. Stages that drop
+    lines must drop the matching entries as well. Blocks of a merge by key
+    column mix input files; they carry the input file per line in ``sources``.
+    """
+
+    __slots__ = ("source", "lines", "line_numbers", "offsets", "sources")
+
+    def __init__(self, source, lines, line_numbers=None, offsets=None, sources=None):
+        self.source = source
+        self.lines = lines
+        self.line_numbers = line_numbers
+        self.offsets = offsets
+        self.sources = sources
+
+
+def is_input_file(path):
+    """True for .txt/.dat paths; compressed inputs such as ``day1.dat.gz`` count by their inner extension."""
+    return strip_compression_suffix(path).endswith(INPUT_EXTENSIONS)
+
+
+def filter_input_files(paths):
+    """Return the normalized, alphabetically sorted .txt/.dat input paths."""
+    return sorted(os.path.normpath(path) for path in paths if is_input_file(path))
+
+
+def clean_line(line):
+    """Strip a line and collapse runs of spaces/tabs to a single space."""
+    return ' '.join(line.split())
+
+
+def sniff_encoding(sample, complete=False):
+    """Guess the encoding of a file from a prefix sample of its bytes.
+
+    ``complete`` tells that the sample is the whole file, so a multibyte
+    sequence cut off at its end is an error rather than a truncation.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.isascii():
+        return "utf-8"
+    for encoding in FALLBACK_ENCODINGS[:-1]:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample, complete)
+            return encoding
+        except UnicodeDecodeError:
+            pass
+    return FALLBACK_ENCODINGS[-1]
+
+
+def iter_line_chunks(input_file, chunk_size=READ_CHUNK_SIZE, head=b""):
+    """Yield (chunk, end offset) pairs of complete lines read from a binary file.
+
+    Every chunk but the last ends in a line terminator. A trailing ``\r`` is
+    held back, as its ``\n`` may arrive with the next read. ``head`` is data
+    already read from the file (e.g. the encoding sample) that comes first;
+    it lets streams that cannot seek back be read in one pass.
+    """
+    carry = b""
+    while True:
+        data = head or input_file.read(chunk_size)
+        head = b""
+        if not data:
+            break
+        if carry:
+            data = carry + data
+        cut = max(data.rfind(b"\n"), data.rfind(b"\r"))
+        if cut == len(data) - 1 and data[cut] == 0x0d:
+            cut = max(data.rfind(b"\n", 0, cut), data.rfind(b"\r", 0, cut))
+        carry = data[cut + 1:]
+        if cut >= 0:
+            yield data[:cut + 1], input_file.tell() - len(carry)
+    if carry:
+        yield carry, input_file.tell()
+
+
+class ChunkCleaner:
+    """Decodes a chunk of raw lines in one go and cleans every line.
+
+    With ``auto`` a chunk that is not valid in the sniffed encoding switches
+    the rest of the file to the next fallback encoding and records a warning.
+    Earlier chunks were valid in the sniffed encoding, so they stay as read.
+    """
+
+    def __init__(self, path, encoding, auto=False, stats=None):
+        self.path = path
+        self.encoding = encoding
+        self.auto = auto
+        self.stats = stats
+
+    def _split(self, chunk):
+        text = self._decode(chunk)
+        if "\r" in text:
+            # Only \n, \r and \r\n end a line, as in the former text mode reads
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        return text.split("\n")
+
+    def clean(self, chunk):
+        return list(filter(None, [' '.join(line.split()) for line in self._split(chunk)]))
+
+    def clean_tracked(self, chunk, chunk_offset, first_line):
+        """Like clean(), also returning the line numbers and byte offsets of the kept lines.
+
+        Returns (lines, line numbers, offsets, number of raw lines in the chunk).
+        """
+        raw_lines = chunk.splitlines(keepends=True)
+        lines, line_numbers, offsets = [], [], []
+        offset = chunk_offset
+        # bytes.splitlines() ends lines at the same \n, \r and \r\n as _split()
+        for line_number, (raw, text) in enumerate(zip(raw_lines, self._split(chunk)), start=first_line):
+            cleaned = ' '.join(text.split())
+            if cleaned:
+                lines.append(cleaned)
+                line_numbers.append(line_number)
+                offsets.append(offset)
+            offset += len(raw)
+        return lines, line_numbers, offsets, len(raw_lines)
+
+    def _decode(self, chunk):
+        while True:
+            try:
+                return chunk.decode(self.encoding)
+            except UnicodeDecodeError:
+                if not self.auto or self.encoding not in FALLBACK_ENCODINGS[:-1]:
+                    raise
+                failed = self.encoding
+                self.encoding = FALLBACK_ENCODINGS[FALLBACK_ENCODINGS.index(failed) + 1]
+                if self.stats is not None:
+                    self.stats.warnings.append(
+                        f"{os.path.basename(self.path)} is not valid {failed} throughout, "
+                        f"reading the rest of it as {self.encoding}"
+                    )
+
+
+def read_clean_blocks(path, source=0, block_size=DEFAULT_BLOCK_SIZE, stats=None, progress=None,
+                      encoding="auto", track_lines=False):
+    """Yield the non-empty, cleaned lines of one input file as LineBlocks.
+
+    With ``track_lines`` every block also carries the original line numbers
+    and byte offsets of its lines, see LineBlock.
+    """
+    if progress is not None:
+        progress.start_file(source)
+    line_count = 0
+    raw_line_count = 0
+    pending = []
+    pending_numbers = []
+    pending_offsets = []
+    with open_input(path) as input_file:
+        auto = encoding == "auto"
+        head = b""
+        if auto:
+            head = input_file.read(SNIFF_SIZE)
+            encoding = sniff_encoding(head, complete=len(head) < SNIFF_SIZE)
+            if encoding == "utf-8-sig":
+                # Drop the byte order mark once instead of per chunk
+                encoding = "utf-8"
+                head = head[len(codecs.BOM_UTF8):]
+        cleaner = ChunkCleaner(path, encoding, auto, stats)
+
+        for chunk, position in iter_line_chunks(input_file, head=head):
+            if track_lines:
+                lines, line_numbers, offsets, raw_lines = cleaner.clean_tracked(
+                    chunk, position - len(chunk), raw_line_count + 1
+                )
+                raw_line_count += raw_lines
+                pending.extend(lines)
+                pending_numbers.extend(line_numbers)
+                pending_offsets.extend(offsets)
+            else:
+                pending.extend(cleaner.clean(chunk))
+            full = len(pending) - len(pending) % block_size
+            for start in range(0, full, block_size):
+                end = start + block_size
+                if track_lines:
+                    yield LineBlock(source, pending[start:end], pending_numbers[start:end], pending_offsets[start:end])
+                else:
+                    yield LineBlock(source, pending[start:end])
+            line_count += full
+            pending = pending[full:]
+            if track_lines:
+                pending_numbers = pending_numbers[full:]
+                pending_offsets = pending_offsets[full:]
+            if progress is not None and full:
+                # Progress is measured on the file as stored, compressed or not
+                progress.update(input_file.raw_position(), line_count)
+    if pending:
+        line_count += len(pending)
+        if track_lines:
+            yield LineBlock(source, pending, pending_numbers, pending_offsets)
+        else:
+            yield LineBlock(source, pending)
+    if progress is not None:
+        progress.finish_file(line_count)
+    if stats is not None:
+        stats.files += 1
+        stats.bytes_read += os.path.getsize(path)
+        stats.encodings[path] = cleaner.encoding
+
+
+def make_geotag_replacer(search, replace, rules_text=""):
+    """Build the geotag replacement stage, or None if there is nothing to do.
+
+    The classic search/replace fields and the rule editor text are compiled
+    into one GeotagRuleSet, so every line is scanned once no matter how many
+    rules there are. Raises ValueError for malformed rules.
+    """
+    rule_set = GeotagRuleSet(rules_from_search_replace(search, replace) + parse_rules(rules_text))
+    if not rule_set:
+        return None
+
+    def replace_geotags(block):
+        block.lines = rule_set.apply_lines(block.lines)
+        return block
+
+    return replace_geotags
+
+
+class LineRenumberer:
+    """Stage that replaces the leading id of every line with a running index."""
+
+    def __init__(self, start=1):
+        self.next_index = start
+
+    def __call__(self, block):
+        index = self.next_index
+        fixed_lines = []
+        for line in block.lines:
+            # The first part (the erroneous numbering) is discarded
+            parts = line.strip().split(" ", 1)
+            if len(parts) > 1:
+                fixed_lines.append(f"{index} {parts[1]}")
+            else:
+                fixed_lines.append(parts[0])
+            index += 1
+        self.next_index = index
+        block.lines = fixed_lines
+        return block
+
+
+class ColumnInserter:
+    """Stage that inserts fixed columns right after the line number."""
+
+    def __init__(self, raw_input):
+        # A trailing space in the input means "separate with a space"
+        self.separator = ' ' if raw_input.endswith(' ') else ''
+        self.input_string = raw_input.rstrip()
+
+    def insert_line(self, line):
+        parts = line.strip().split()
+        if parts and parts[0].isdigit():
+            remaining_parts = ' '.join(parts[1:])
+            return f"{parts[0]} {self.input_string}{self.separator}{remaining_parts}"
+        # In case the line doesn't start with a number, leave it unchanged
+        return line.strip()
+
+    def __call__(self, block):
+        insert_line = self.insert_line
+        block.lines = [insert_line(line) for line in block.lines]
+        return block
+
+
+def make_column_inserter(raw_input):
+    """Build the stage that inserts columns after the line number, or None."""
+    raw_input = raw_input.rstrip('\n')
+    if not raw_input.strip():
+        return None
+    return ColumnInserter(raw_input)
+
+
+class FragmentNumberer:
+    """Per-file stand-in for LineRenumberer used by the parallel mode.
+
+    A worker cannot know the global line index, so it marks each line instead:
+    ``#`` lines get ``"<index> "`` prepended in the ordered merge, ``=`` lines
+    are copied verbatim. Column insertion happens here already, using the
+    fact that a renumbered line always starts with a digit-only id.
+    """
+
+    def __init__(self, inserter=None):
+        self.inserter = inserter
+
+    def __call__(self, block):
+        inserter = self.inserter
+        marked_lines = []
+        for line in block.lines:
+            parts = line.strip().split(" ", 1)
+            if len(parts) > 1:
+                if inserter:
+                    # "0" stands in for the real index and is cut off again
+                    marked_lines.append("#" + inserter.insert_line("0 " + parts[1])[2:])
+                else:
+                    marked_lines.append("#" + parts[1])
+            else:
+                marked_lines.append("=" + (inserter.insert_line(parts[0]) if inserter else parts[0]))
+        block.lines = marked_lines
+        return block
+
+
+def build_stages(options, per_file=False, detector=None):
+    """Return the enabled stages in the order the Normalize tab applies them.
+
+    With ``per_file`` the renumbering is left to merge_fragments(). A
+    DuplicateDetector runs before the renumbering, as it may drop lines.
+    """
+    stages = []
+    if options.replace_geotags:
+        replacer = make_geotag_replacer(options.search, options.replace, options.geotag_rules)
+        if replacer:
+            stages.append(replacer)
+    if detector is not None:
+        stages.append(detector)
+    inserter = make_column_inserter(options.cols_after_id)
+    if options.fix_lines:
+        if per_file:
+            return stages + [FragmentNumberer(inserter)]
+        stages.append(LineRenumberer())
+    if inserter:
+        stages.append(inserter)
+    return stages
+
+
+def iter_normalized_blocks(input_files, options, stats=None, progress=None, is_canceled=None, detector=None):
+    """Yield the fully normalized blocks of all input files in order.
+
+    ``is_canceled`` is polled once per block; if it returns True the
+    pipeline stops with NormalizeCanceled.
+    """
+    stages = build_stages(options, detector=detector)
+    transformer = make_transform_stage(options.transform_table, input_files,
+                                       stats.warnings if stats is not None else None)
+    if transformer:
+        stages.insert(0, transformer)
+    for source, path in enumerate(input_files):
+        for block in read_clean_blocks(path, source, options.block_size, stats, progress, options.encoding,
+                                       track_lines=options.write_index):
+            if is_canceled is not None and is_canceled():
+                raise NormalizeCanceled()
+            for stage in stages:
+                block = stage(block)
+            yield block
+
+
+_entry_line = itemgetter(1)
+
+
+def iter_merged_blocks(input_files, options, stats=None, progress=None, is_canceled=None, spill_dir=None,
+                       detector=None):
+    """Yield the normalized blocks of all inputs interleaved by the merge key.
+
+    Lines are cleaned, transformed and geotags replaced per file first, so
+    the key is read from the cleaned line. Renumbering and column insertion run on the
+    merged order, as they depend on the final line position.
+    """
+    per_file_stages = []
+    transformer = make_transform_stage(options.transform_table, input_files,
+                                       stats.warnings if stats is not None else None)
+    if transformer:
+        per_file_stages.append(transformer)
+    if options.replace_geotags:
+        replacer = make_geotag_replacer(options.search, options.replace, options.geotag_rules)
+        if replacer:
+            per_file_stages.append(replacer)
+    stages = build_stages(replace(options, replace_geotags=False), detector=detector)
+    merger = KeyMerger(make_merge_key(options.merge_column, options.merge_numeric),
+                       options.merge_run_lines, spill_dir)
+    try:
+        for source, path in enumerate(input_files):
+            for block in read_clean_blocks(path, source, options.block_size, stats, progress, options.encoding,
+                                           track_lines=options.write_index):
+                if is_canceled is not None and is_canceled():
+                    raise NormalizeCanceled()
+                for stage in per_file_stages:
+                    block = stage(block)
+                merger.add(source, block.lines, block.line_numbers, block.offsets)
+            merger.finish_source()
+
+        entries = merger.iter_entries()
+        while True:
+            if is_canceled is not None and is_canceled():
+                raise NormalizeCanceled()
+            chunk = list(islice(entries, options.block_size))
+            if not chunk:
+                break
+            if options.write_index:
+                _, lines, sources, line_numbers, offsets = map(list, zip(*chunk))
+                block = LineBlock(None, lines, line_numbers, offsets, sources)
+            else:
+                block = LineBlock(None, list(map(_entry_line, chunk)))
+            for stage in stages:
+                block = stage(block)
+            yield block
+        if stats is not None and merger.spilled_runs:
+            stats.warnings.append(f"Merge by key column spilled {merger.spilled_runs} sorted run(s) to disk")
+    finally:
+        merger.close()
+
+
+def write_blocks(blocks, output_file_path, stats=None, provenance=None):
+    """Write blocks to the output file, one line per entry.
+
+    With a ProvenanceWriter the line numbers and offsets of every block are
+    added to the line index.
+    """
+    lines_written = 0
+    with open(output_file_path, 'w', encoding='utf-8') as output_file:
+        for block in blocks:
+            if provenance is not None:
+                if block.sources is not None:
+                    provenance.add_interleaved(block.sources, block.line_numbers, block.offsets)
+                else:
+                    provenance.add(block.source, block.line_numbers, block.offsets)
+            output_file.write("\n".join(block.lines))
+            output_file.write("\n")
+            lines_written += len(block.lines)
+        if not lines_written:
+            # Matches the old behaviour: an empty merge still ends in a newline
+            output_file.write("\n")
+    if stats is not None:
+        stats.lines = lines_written
+    return lines_written
+
+
+def normalize_fragment(path, fragment_path, options):
+    """Worker entry point: normalize one input file into a fragment file.
+
+    Returns the NormalizeStats of this file. Renumbering is deferred to
+    merge_fragments(), see FragmentNumberer. With ``options.write_index``
+    the line index of the fragment goes to index_path_for(fragment_path).
+    """
+    stats = NormalizeStats()
+    stages = build_stages(options, per_file=True)
+    transformer = make_transform_stage(options.transform_table, [path], stats.warnings)
+    if transformer:
+        stages.insert(0, transformer)
+    provenance = ProvenanceWriter(index_path_for(fragment_path)) if options.write_index else None
+    try:
+        with open(fragment_path, 'w', encoding='utf-8', newline='\n') as fragment:
+            for block in read_clean_blocks(path, 0, options.block_size, stats, encoding=options.encoding,
+                                           track_lines=options.write_index):
+                for stage in stages:
+                    block = stage(block)
+                if provenance is not None:
+                    provenance.add(0, block.line_numbers, block.offsets)
+                fragment.write("\n".join(block.lines))
+                fragment.write("\n")
+                stats.lines += len(block.lines)
+        if provenance is not None:
+            provenance.close([path])
+    except BaseException:
+        if provenance is not None:
+            provenance.abort()
+        raise
+    return stats
+
+
+def merge_fragments(fragment_paths, output_file_path, fix_lines, total_lines):
+    """Concatenate fragments in order, applying the global line numbering."""
+    with open(output_file_path, 'w', encoding='utf-8') as output_file:
+        index = 1
+        for fragment_path in fragment_paths:
+            with open(fragment_path, 'r', encoding='utf-8', newline='\n') as fragment:
+                if not fix_lines:
+                    shutil.copyfileobj(fragment, output_file)
+                    continue
+                buffer = []
+                for line in fragment:
+                    if line[0] == '#':
+                        buffer.append(f"{index} {line[1:]}")
+                    else:
+                        buffer.append(line[1:])
+                    index += 1
+                    if len(buffer) >= DEFAULT_BLOCK_SIZE:
+                        output_file.writelines(buffer)
+                        buffer = []
+                output_file.writelines(buffer)
+        if not total_lines:
+            output_file.write("\n")
+    return total_lines
+
+
+def _process_pool_context():
+    """Return a spawn context whose workers run a real Python interpreter.
+
+    Inside QGIS ``sys.executable`` points to the QGIS application itself,
+    which would open a new QGIS window per worker. In that case the Python
+    interpreter bundled with QGIS is used instead.
+    """
+    context = multiprocessing.get_context("spawn")
+    executable = os.path.basename(sys.executable).lower()
+    if executable.startswith("python"):
+        return context
+
+    candidates = [
+        os.path.join(sys.exec_prefix, "pythonw.exe"),
+        os.path.join(sys.exec_prefix, "python.exe"),
+        os.path.join(sys.exec_prefix, "bin", "python3"),
+        os.path.join(sys.exec_prefix, "bin", "python"),
+        shutil.which("python3") or "",
+    ]
+    for candidate in candidates:
+        if candidate and os.path.isfile(candidate):
+            context.set_executable(candidate)
+            return context
+    raise PoolUnavailable("no Python interpreter found for worker processes")
+
+
+def fragment_signature(options):
+    """Options that shape a fragment, used in the fragment cache key."""
+    return {
+        "format": FRAGMENT_FORMAT,
+        "search": options.search.strip() if options.replace_geotags else "",
+        "replace": options.replace.strip() if options.replace_geotags else "",
+        "geotag_rules": options.geotag_rules.strip() if options.replace_geotags else "",
+        "cols_after_id": options.cols_after_id.rstrip('\n'),
+        "fix_lines": options.fix_lines,
+        "encoding": options.encoding,
+        "write_index": options.write_index,
+        "transform_table": _file_digest(options.transform_table),
+    }
+
+
+def _file_digest(path):
+    """Content hash of a side file such as the transform table, "" without one."""
+    if not path:
+        return ""
+    with open(path, 'rb') as side_file:
+        return hashlib.sha256(side_file.read()).hexdigest()
+
+
+def _normalize_fragments(input_files, output_file_path, options, stats, progress, is_canceled, cache=None,
+                         index_path=None):
+    """Normalize every input file into a fragment, then merge them in order.
+
+    Fragments found in the cache are reused as they are. The others are
+    written by worker processes when ``options.workers > 1``, otherwise
+    in this process. With ``index_path`` the fragment line indexes are
+    merged into one line index.
+    """
+    fragment_dir = tempfile.mkdtemp(prefix=".s2g_fragments_", dir=os.path.dirname(output_file_path) or None)
+    try:
+        fragment_paths = [None] * len(input_files)
+        line_counts = [0] * len(input_files)
+        keys = [None] * len(input_files)
+        todo = []
+
+        signature = fragment_signature(options)
+        for source, path in enumerate(input_files):
+            if cache is not None:
+                keys[source] = cache.key_for(path, signature)
+                hit = cache.lookup(keys[source])
+                if hit:
+                    fragment_paths[source], line_counts[source], bytes_read, encoding = hit
+                    stats.files += 1
+                    stats.cached_files += 1
+                    stats.bytes_read += bytes_read
+                    stats.encodings[path] = encoding
+                    progress.start_file(source)
+                    progress.finish_file(line_counts[source])
+                    continue
+                fragment_paths[source] = cache.new_fragment_path(keys[source], source)
+            else:
+                fragment_paths[source] = os.path.join(fragment_dir, f"{source}.txt")
+            todo.append(source)
+
+        def fragment_done(source, fragment_stats):
+            line_counts[source] = fragment_stats.lines
+            stats.merge(fragment_stats)
+            if cache is not None:
+                fragment_paths[source] = cache.store(
+                    keys[source], fragment_paths[source], fragment_stats.lines,
+                    fragment_stats.bytes_read, fragment_stats.encodings.get(input_files[source], "utf-8"),
+                )
+            progress.start_file(source)
+            progress.finish_file(fragment_stats.lines)
+
+        if options.workers > 1 and len(todo) > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=min(options.workers, len(todo)),
+                mp_context=_process_pool_context(),
+            )
+            try:
+                futures = {
+                    executor.submit(normalize_fragment, input_files[source], fragment_paths[source], options): source
+                    for source in todo
+                }
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    if is_canceled is not None and is_canceled():
+                        raise NormalizeCanceled()
+                    for future in done:
+                        fragment_done(futures[future], future.result())
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            for source in todo:
+                if is_canceled is not None and is_canceled():
+                    raise NormalizeCanceled()
+                fragment_done(source, normalize_fragment(input_files[source], fragment_paths[source], options))
+
+        stats.lines = merge_fragments(fragment_paths, output_file_path, options.fix_lines, sum(line_counts))
+        if index_path:
+            provenance = ProvenanceWriter(index_path)
+            try:
+                for source, fragment_path in enumerate(fragment_paths):
+                    provenance.add_index(source, index_path_for(fragment_path))
+                provenance.close(input_files)
+            except BaseException:
+                provenance.abort()
+                raise
+    finally:
+        if cache is not None:
+            for path in fragment_paths:
+                if path and path.endswith(".part"):
+                    for leftover in (path, index_path_for(path)):
+                        if os.path.exists(leftover):
+                            os.remove(leftover)
+            cache.evict()
+            cache.save()
+        shutil.rmtree(fragment_dir, ignore_errors=True)
+
+
+def _normalize_sequential(input_files, output_file_path, options, stats, progress, is_canceled, index_path=None,
+                          detector=None):
+    if options.merge_column:
+        blocks = iter_merged_blocks(input_files, options, stats, progress, is_canceled,
+                                    os.path.dirname(output_file_path) or None, detector)
+    else:
+        blocks = iter_normalized_blocks(input_files, options, stats, progress, is_canceled, detector)
+    if not index_path:
+        write_blocks(blocks, output_file_path, stats)
+        return
+    provenance = ProvenanceWriter(index_path)
+    try:
+        write_blocks(blocks, output_file_path, stats, provenance)
+        provenance.close(input_files)
+    except BaseException:
+        provenance.abort()
+        raise
+
+
+def normalize_files(input_files, output_file_path, options, progress_callback=None, is_canceled=None,
+                    cache=None):
+    """Run the whole normalize pipeline and return NormalizeStats.
+
+    The output is written to a ``.part`` file first and only moved into place
+    once complete, so a canceled or failed run never leaves a truncated
+    output behind.
+
+    With ``options.workers > 1`` the files are normalized in a process pool;
+    if the pool cannot be started the run falls back to a single process and
+    records a warning in the stats. With a FragmentCache only changed inputs
+    are normalized again. A merge by key column (``options.merge_column``)
+    and the duplicate check (``options.find_duplicates``) need all lines at
+    once and always run in this process without the cache. With
+    ``options.write_index`` the line index is written to
+    index_path_for(output_file_path), the duplicate report goes to
+    duplicates_path_for(output_file_path); stale ones from an earlier run
+    are removed otherwise.
+    """
+    input_files = filter_input_files(input_files)
+    if not input_files:
+        raise FileNotFoundError("No valid .txt or .dat files selected")
+
+    started = time.monotonic()
+    stats = NormalizeStats()
+    partial_path = output_file_path + ".part"
+    index_path = index_path_for(output_file_path) if options.write_index else None
+    if options.merge_column or options.find_duplicates:
+        # Both need the lines of all files at once, fragments don't apply
+        cache = None
+        options = replace(options, workers=1)
+    duplicates_path = duplicates_path_for(output_file_path)
+    detector = None
+    if options.find_duplicates:
+        detector = DuplicateDetector(options.duplicate_tolerance, options.drop_duplicates, input_files,
+                                     duplicates_path + ".part")
+    try:
+        done = False
+        if options.workers > 1 and len(input_files) > 1:
+            try:
+                _normalize_fragments(input_files, partial_path, options, stats,
+                                     NormalizeProgress(input_files, progress_callback), is_canceled, cache,
+                                     index_path)
+                done = True
+            except (BrokenProcessPool, PoolUnavailable) as e:
+                stats = NormalizeStats(warnings=[f"Parallel normalization unavailable ({e}), using a single process"])
+                options = replace(options, workers=1)
+        if not done:
+            if cache is not None:
+                _normalize_fragments(input_files, partial_path, options, stats,
+                                     NormalizeProgress(input_files, progress_callback), is_canceled, cache,
+                                     index_path)
+            else:
+                _normalize_sequential(input_files, partial_path, options, stats,
+                                      NormalizeProgress(input_files, progress_callback), is_canceled,
+                                      index_path, detector)
+        os.replace(partial_path, output_file_path)
+        stale_index = index_path_for(output_file_path)
+        if not index_path and os.path.exists(stale_index):
+            os.remove(stale_index)
+        if detector is not None:
+            detector.close()
+            os.replace(detector.report_path, duplicates_path)
+            if detector.duplicates:
+                stats.warnings.extend(detector.summary(duplicates_path))
+            else:
+                stats.notes.append("No duplicate points found")
+        elif os.path.exists(duplicates_path):
+            os.remove(duplicates_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        if detector is not None:
+            detector.abort()
+        raise
+    stats.elapsed = time.monotonic() - started
+    return stats
@@ -0,0 +1,478 @@
+# -*- coding: utf-8 -*-
+"""
+Parser profiles and a preflight validator for normalized input files.
+
+A parser profile is the survey2gis parser description passed with ``-p``:
+one ``[Parser]`` section followed by one ``[Field]`` section per field, as
+in ``demo_data/parser_desc_min.txt``. load_parser_profile() reads it and
+ProfileValidator checks every line of a normalized file against it in one
+streaming pass:
+
+- field count and separators
+- numeric types (``integer``, ``double``)
+- ``empty_allowed`` and ``unique`` per field, ``key_unique`` for the key field
+- geometry tags and the number of vertices per line/polygon (modes
+  ``min`` and ``max``; in mode ``end`` records are not grouped)
+
+The result is a list of ValidationIssues with line numbers, available in
+seconds instead of after a full binary run. The checks follow the parser
+description format, they do not replace survey2gis' own validation.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+
+
+TAGGING_MODES = ("min", "max", "end", "none")
+GEOMETRY_KINDS = ("point", "line", "poly")
+MIN_VERTICES = {"point": 1, "line": 2, "poly": 3}
+
+# Issues kept in memory; the total count is tracked beyond that
+DEFAULT_MAX_ISSUES = 10000
+
+
+class ParserProfileError(ValueError):
+    """Raised for parser descriptions that cannot be used for validation."""
+
+
+def _is_yes(value):
+    return value.strip().lower() in ("yes", "y", "true", "1")
+
+
+def _unquote(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+@dataclass
+class FieldSpec:
+    name: str
+    type: str = "text"
+    empty_allowed: bool = True
+    separator: str = None
+    merge_separators: bool = False
+    unique: bool = False
+    skip: bool = False
+    persistent: bool = False
+    # Pseudo fields with a constant value are not read from the input
+    value: str = None
+
+    @property
+    def separator_chars(self):
+        if self.separator is None:
+            return None
+        if self.separator.lower() == "space":
+            return " \t"
+        if self.separator.lower() == "tab":
+            return "\t"
+        return self.separator
+
+
+@dataclass
+class ParserProfile:
+    name: str = ""
+    tagging_mode: str = "none"
+    tag_field: str = None
+    key_field: str = None
+    key_unique: bool = False
+    tag_strict: bool = False
+    no_data: str = None
+    comment_mark: str = None
+    coor_x: str = None
+    coor_y: str = None
+    coor_z: str = None
+    # Geometry kind -> tag, e.g. {"poly": "@"}
+    geom_tags: dict = field(default_factory=dict)
+    fields: list = field(default_factory=list)
+
+    @property
+    def input_fields(self):
+        """Fields read from the input, in order."""
+        return [spec for spec in self.fields if spec.value is None]
+
+    @property
+    def coordinate_fields(self):
+        return [name for name in (self.coor_x, self.coor_y, self.coor_z) if name]
+
+
+def _read_profile_text(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+
+def load_parser_profile(path):
+    """Read a survey2gis parser description into a ParserProfile."""
+    profile = ParserProfile()
+    section = None
+    for line_number, line in enumerate(_read_profile_text(path).splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('[') and line.endswith(']'):
+            section = line[1:-1].strip().lower()
+            if section == "field":
+                profile.fields.append(FieldSpec(name=""))
+            elif section != "parser":
+                raise ParserProfileError(f"{os.path.basename(path)}:{line_number}: unknown section [{section}]")
+            continue
+        if line.startswith('@'):
+            # Value labels of a field, not relevant for validation
+            continue
+        if '=' not in line or section is None:
+            raise ParserProfileError(f"{os.path.basename(path)}:{line_number}: expected 'key = value'")
+        key, value = (part.strip() for part in line.split('=', 1))
+        key = key.lower()
+        value = _unquote(value)
+
+        if section == "parser":
+            if key.startswith("geom_tag_"):
+                profile.geom_tags[key[len("geom_tag_"):]] = value
+            elif key in ("key_unique", "tag_strict"):
+                setattr(profile, key, _is_yes(value))
+            elif key == "tagging_mode":
+                profile.tagging_mode = value.lower()
+            elif key in ("name", "tag_field", "key_field", "no_data", "comment_mark", "coor_x", "coor_y", "coor_z"):
+                setattr(profile, key, value)
+        else:
+            spec = profile.fields[-1]
+            if key in ("empty_allowed", "merge_separators", "unique", "skip", "persistent"):
+                setattr(spec, key, _is_yes(value))
+            elif key == "type":
+                spec.type = value.lower()
+            elif key in ("name", "separator", "value"):
+                setattr(spec, key, value)
+
+    _check_profile(profile, os.path.basename(path))
+    return profile
+
+
+def _check_profile(profile, label):
+    if profile.tagging_mode not in TAGGING_MODES:
+        raise ParserProfileError(f"{label}: unknown tagging_mode '{profile.tagging_mode}'")
+    input_fields = profile.input_fields
+    if not input_fields:
+        raise ParserProfileError(f"{label}: no [Field] sections")
+    names = set()
+    for spec in profile.fields:
+        if not spec.name:
+            raise ParserProfileError(f"{label}: a [Field] section has no name")
+        if spec.name.upper() in names:
+            raise ParserProfileError(f"{label}: field '{spec.name}' is defined twice")
+        names.add(spec.name.upper())
+    for spec in input_fields[:-1]:
+        if not spec.separator:
+            raise ParserProfileError(f"{label}: field '{spec.name}' needs a separator (only the last field has none)")
+    for key in ("tag_field", "key_field", "coor_x", "coor_y", "coor_z"):
+        name = getattr(profile, key)
+        if name and name.upper() not in names:
+            raise ParserProfileError(f"{label}: {key} '{name}' is not a defined field")
+    if profile.tagging_mode != "none" and not profile.tag_field:
+        raise ParserProfileError(f"{label}: tagging_mode '{profile.tagging_mode}' needs a tag_field")
+
+
+@dataclass
+class ValidationIssue:
+    line_number: int
+    message: str
+    field: str = None
+
+    def __str__(self):
+        where = f" [{self.field}]" if self.field else ""
+        return f"line {self.line_number}{where}: {self.message}"
+
+
+@dataclass
+class ValidationReport:
+    lines: int = 0
+    records: int = 0
+    issue_count: int = 0
+    issues: list = field(default_factory=list)
+
+    @property
+    def truncated(self):
+        return self.issue_count > len(self.issues)
+
+    def summary(self):
+        if not self.issue_count:
+            return f"Validation passed: {self.records} record(s) in {self.lines} line(s)"
+        return (f"Validation found {self.issue_count} issue(s) in {self.records} record(s) "
+                f"({self.lines} line(s))")
+
+
+class _Schema:
+    """Splits a line into the values of a list of fields and checks them.
+
+    Valid lines are recognised by one compiled regular expression that
+    encodes separators, types and empty_allowed, so the common case costs a
+    single regex match. Only lines that fail it are split field by field to
+    tell what is wrong.
+    """
+
+    def __init__(self, fields, no_data=None, decimal_point=".", decimal_group=""):
+        self.fields = fields
+        self.no_data = no_data
+        self.decimal_point = decimal_point
+        self.decimal_group = decimal_group
+        self.patterns = []
+        for spec in fields[:-1]:
+            chars = re.escape(spec.separator_chars)
+            self.patterns.append(re.compile(f"[{chars}]+" if spec.merge_separators else f"[{chars}]"))
+        self.unique_fields = [(index, spec.name) for index, spec in enumerate(fields) if spec.unique]
+
+        # Group separators are accepted in the integer part only
+        digits = "0-9" + re.escape(decimal_group)
+        point = re.escape(decimal_point)
+        self.number_patterns = {
+            "integer": f"[+-]?[0-9][{digits}]*",
+            "double": f"[+-]?(?:[0-9][{digits}]*(?:{point}[0-9]*)?|{point}[0-9]+)(?:[eE][+-]?[0-9]+)?",
+        }
+        self.number_checks = {kind: re.compile(f"(?:{pattern})\\Z") for kind, pattern in self.number_patterns.items()}
+        self.fast = self._compile_fast()
+
+    def _compile_fast(self):
+        """Build the whole-line pattern, or None if it could not match like split() does."""
+        numbers = self.number_patterns
+        number_chars = set("0123456789+-eE") | set(self.decimal_point) | set(self.decimal_group)
+        parts = []
+        for index, spec in enumerate(self.fields):
+            separator = spec.separator_chars if index < len(self.fields) - 1 else None
+            if spec.type in numbers:
+                # A number must never swallow its separator, otherwise the
+                # pattern could accept a line that split() cuts differently.
+                if separator and number_chars & set(separator):
+                    return None
+                value = numbers[spec.type]
+                if self.no_data:
+                    if separator and set(separator) & set(self.no_data):
+                        return None
+                    value = f"{value}|{re.escape(self.no_data)}"
+                value = f"(?:{value})" if not spec.empty_allowed else f"(?:{value})?"
+            elif separator:
+                value = f"[^{re.escape(separator)}]" + ("*" if spec.empty_allowed else "+")
+            else:
+                value = ".*" if spec.empty_allowed else ".+"
+            parts.append(f"({value})")
+            if separator:
+                separator = re.escape(separator)
+                # A merged run is consumed whole, like split() does
+                parts.append(f"[{separator}]+(?![{separator}])" if spec.merge_separators else f"[{separator}]")
+        return re.compile("".join(parts) + r"\Z")
+
+    def parse(self, line):
+        """Return the values of a valid line, else None."""
+        if self.fast is not None:
+            match = self.fast.match(line)
+            return match.groups() if match else None
+        values = self.split(line)
+        if values is None or self.issues(values):
+            return None
+        return values
+
+    def split(self, line):
+        """Return the field values, or None if the line has too few separators."""
+        values = []
+        position = 0
+        for pattern in self.patterns:
+            match = pattern.search(line, position)
+            if match is None:
+                return None
+            values.append(line[position:match.start()])
+            position = match.end()
+        values.append(line[position:])
+        return values
+
+    def issues(self, values):
+        """Return (field name, message) pairs for the split values of a line."""
+        issues = []
+        last = self.fields[-1]
+        for spec, value in zip(self.fields, values):
+            if not value:
+                if not spec.empty_allowed:
+                    issues.append((spec.name, "empty value is not allowed"))
+                continue
+            error = self.type_error(spec, value)
+            if error and spec is last and ' ' in value:
+                error = f"more fields than the profile defines: '{value}'"
+            if error:
+                issues.append((spec.name, error))
+        return issues
+
+    def type_error(self, spec, value):
+        check = self.number_checks.get(spec.type)
+        if check is None or not value or value == self.no_data or check.match(value):
+            return None
+        return f"'{value}' is not a valid {spec.type}"
+
+
+class ProfileValidator:
+    """Validates normalized lines against a ParserProfile.
+
+    Feed every line with check_line() and call finish() at the end; issues
+    are collected in ``report``. Memory grows only with the values of
+    ``unique`` fields and the stored issues.
+    """
+
+    def __init__(self, profile, decimal_point=".", decimal_group="", max_issues=DEFAULT_MAX_ISSUES):
+        self.profile = profile
+        self.max_issues = max_issues
+        self.report = ValidationReport()
+        self.record_schema = _Schema(profile.input_fields, profile.no_data, decimal_point, decimal_group)
+
+        # In "min" mode only the first record of a geometry is complete, the
+        # others hold the persistent fields and the coordinates.
+        self.vertex_schema = None
+        if profile.tagging_mode == "min":
+            by_name = {spec.name.upper(): spec for spec in profile.input_fields}
+            vertex_fields = [FieldSpec(spec.name, spec.type, spec.empty_allowed, "space", True, spec.unique)
+                             for spec in profile.input_fields if spec.persistent]
+            vertex_fields += [FieldSpec(name, by_name[name.upper()].type, False, "space", True)
+                              for name in profile.coordinate_fields if name.upper() in by_name]
+            if vertex_fields:
+                vertex_fields[-1].separator = None
+                self.vertex_schema = _Schema(vertex_fields, profile.no_data, decimal_point, decimal_group)
+
+        names = [spec.name.upper() for spec in profile.input_fields]
+        self.tag_index = self._field_index(names, profile.tag_field)
+        self.key_index = self._field_index(names, profile.key_field)
+        self.tags = {tag: kind for kind, tag in profile.geom_tags.items() if tag}
+        self.unique_values = {spec.name: {} for spec in profile.input_fields if spec.unique}
+        self.keys = {}
+        # Open geometry: [kind, start line, vertices, key]
+        self.geometry = None
+
+    @staticmethod
+    def _field_index(names, name):
+        if name and name.upper() in names:
+            return names.index(name.upper())
+        return None
+
+    def add_issue(self, line_number, message, field_name=None):
+        self.report.issue_count += 1
+        if len(self.report.issues) < self.max_issues:
+            self.report.issues.append(ValidationIssue(line_number, message, field_name))
+
+    def check_line(self, line_number, line):
+        self.report.lines = line_number
+        line = line.strip()
+        if not line:
+            return
+        if self.profile.comment_mark and line.startswith(self.profile.comment_mark):
+            return
+        self.report.records += 1
+
+        values = self.record_schema.parse(line)
+        if values is not None:
+            self._check_unique(line_number, self.record_schema, values)
+            self._check_geometry(line_number, values)
+            return
+
+        if self.vertex_schema is not None:
+            values = self.vertex_schema.parse(line)
+            if values is not None:
+                self._check_unique(line_number, self.vertex_schema, values)
+                self._add_vertex(line_number)
+                return
+
+        values = self.record_schema.split(line)
+        if values is None:
+            self.add_issue(line_number, f"expected {len(self.record_schema.fields)} fields, "
+                                        f"the separators for some are missing")
+            return
+        for field_name, message in self.record_schema.issues(values):
+            self.add_issue(line_number, message, field_name)
+
+    def _check_unique(self, line_number, schema, values):
+        for index, name in schema.unique_fields:
+            value = values[index]
+            if not value:
+                continue
+            first = self.unique_values[name].setdefault(value, line_number)
+            if first != line_number:
+                self.add_issue(line_number, f"value '{value}' must be unique, already used in line {first}", name)
+
+    def _check_geometry(self, line_number, values):
+        profile = self.profile
+        mode = profile.tagging_mode
+        if mode == "end":
+            # The tag only marks the end of a geometry, records are not grouped here
+            return
+        key = values[self.key_index] if self.key_index is not None else None
+        kind = "point"
+        if mode != "none":
+            tag_value = values[self.tag_index] if self.tag_index is not None else ""
+            if tag_value not in self.tags:
+                self.add_issue(line_number, f"unknown geometry tag '{tag_value}'", profile.tag_field)
+                return
+            kind = self.tags[tag_value]
+
+        if mode == "max" and self.geometry and self.geometry[0] == kind != "point" and self.geometry[3] == key:
+            self.geometry[2] += 1
+            return
+        self._close_geometry()
+        self._check_key(line_number, key)
+        self.geometry = [kind, line_number, 1, key]
+
+    def _check_key(self, line_number, key):
+        if not self.profile.key_unique or not key:
+            return
+        first = self.keys.setdefault(key, line_number)
+        if first != line_number:
+            self.add_issue(line_number, f"key '{key}' already used by the geometry in line {first}",
+                           self.profile.key_field)
+
+    def _add_vertex(self, line_number):
+        if self.geometry is None or self.geometry[0] == "point":
+            self.add_issue(line_number, "coordinates without a preceding line or polygon record")
+            return
+        self.geometry[2] += 1
+
+    def _close_geometry(self):
+        if self.geometry is None:
+            return
+        kind, start, vertices, _ = self.geometry
+        if vertices < MIN_VERTICES[kind]:
+            self.add_issue(start, f"{kind} geometry has {vertices} vertex(es), needs at least {MIN_VERTICES[kind]}")
+        self.geometry = None
+
+    def finish(self):
+        self._close_geometry()
+        self.report.issues.sort(key=lambda issue: issue.line_number)
+        return self.report
+
+
+def validate_file(path, profile, decimal_point=".", decimal_group="", max_issues=DEFAULT_MAX_ISSUES,
+                  progress_callback=None, is_canceled=None):
+    """Validate a normalized input file in one streaming pass.
+
+    ``progress_callback`` receives the percentage read every few thousand
+    lines; ``is_canceled`` is polled at the same interval and stops the run
+    early by returning None.
+    """
+    validator = ProfileValidator(profile, decimal_point, decimal_group, max_issues)
+    size = max(os.path.getsize(path), 1)
+    with open(path, 'r', encoding='utf-8', errors='replace') as input_file:
+        for line_number, line in enumerate(input_file, start=1):
+            if line_number % 8192 == 0:
+                if is_canceled is not None and is_canceled():
+                    return None
+                if progress_callback is not None:
+                    progress_callback(100.0 * input_file.buffer.tell() / size)
+            validator.check_line(line_number, line)
+    return validator.finish()
+
+
+def write_report(report, path):
+    """Write all collected issues, one per line, for the Logs tab link."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(report.summary() + "\n")
+        for issue in report.issues:
+            f.write(f"{issue}\n")
+        if report.truncated:
+            f.write(f"... {report.issue_count - len(report.issues)} more issue(s) not listed\n")
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+Suggested --tolerance and --snapping values from the point spacing.
+
+suggest_spacing() reads the points of a normalized file (see
+survey_points.PointReader), finds the distance from every point to its
+nearest neighbour of the same geometry tag and bins these distances on a
+logarithmic scale. Repeated measurements of one point lie far closer to
+each other than distinct points, so a gap in the histogram separates the
+two:
+
+- the tolerance (points closer than this are one point) goes into that
+  gap; without a clear gap a value well below the closest 1% of
+  distances is suggested with low confidence
+- the snapping distance for lines and polygons stays at half the spacing
+  of the closest 5% of distinct vertices, so snapping never joins two
+  real vertices
+
+With SciPy the neighbours come from a KD-tree (cKDTree). Without it a
+uniform grid sized to the typical distance between consecutive points is
+searched, which is exact for all distances up to the cell size; longer
+ones only matter for the shape of the histogram and are left out.
+"""
+
+import math
+import time
+from dataclasses import dataclass, field
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+from .survey_points import NO_TAG, PointReader
+
+
+# Histogram bins per decade of distance
+BINS_PER_DECADE = 10
+# Fewer distinct distances than this give no suggestion
+MIN_DISTANCES = 20
+# Points searched by the grid fallback; more are sampled
+MAX_GRID_QUERIES = 200000
+# Candidate pairs compared at once by the grid fallback
+_GRID_PAIRS_PER_CHUNK = 4000000
+# Valley depth (valley count / smaller peak) for a high and a medium confidence gap
+_HIGH_GAP_RATIO = 0.1
+_MEDIUM_GAP_RATIO = 0.5
+_TOLERANCE_QUANTILE = 0.01
+_SNAPPING_QUANTILE = 0.05
+
+
+class PointSpacingError(ValueError):
+    """Raised when the spacing cannot be measured."""
+
+
+@dataclass
+class SpacingHistogram:
+    tag: str
+    kind: str = None
+    points: int = 0
+    # Points at exactly the same place as another one
+    zero: int = 0
+    # Points without a neighbour found by the grid fallback within its cell size
+    unresolved: int = 0
+    # Lower bin edges (distance) and the number of points per bin
+    edges: list = field(default_factory=list)
+    counts: list = field(default_factory=list)
+    median: float = None
+
+    @property
+    def name(self):
+        if self.kind:
+            return f"{self.kind} ({self.tag})"
+        return "untagged" if self.tag == NO_TAG else self.tag
+
+
+@dataclass
+class Suggestion:
+    value: float
+    # "high", "medium" or "low"
+    confidence: str
+    note: str
+
+    def text(self):
+        return f"{self.value:g}"
+
+
+@dataclass
+class SpacingReport:
+    method: str
+    points: int = 0
+    histograms: list = field(default_factory=list)
+    tolerance: Suggestion = None
+    snapping: Suggestion = None
+    elapsed: float = 0.0
+
+    def summary_lines(self):
+        """Lines for the Logs tab."""
+        lines = [f"Nearest-neighbour distances of {self.points:,} point(s) ({self.method}, {self.elapsed:.1f} s)"]
+        for histogram in self.histograms:
+            line = f"{histogram.name}: {histogram.points:,} point(s)"
+            if histogram.median is not None:
+                line += f", median spacing {histogram.median:.4g}"
+            if histogram.zero:
+                line += f", {histogram.zero:,} at the same place as another point"
+            if histogram.unresolved:
+                line += f", {histogram.unresolved:,} without a close neighbour"
+            lines.append(line)
+        for option, suggestion in (("--tolerance", self.tolerance), ("--snapping", self.snapping)):
+            if suggestion is None:
+                lines.append(f"{option}: no suggestion, too few points")
+            else:
+                lines.append(f"{option} {suggestion.text()} ({suggestion.confidence} confidence): {suggestion.note}")
+        return lines
+
+
+def nice_value(value):
+    """Round down to 1, 2 or 5 times a power of ten."""
+    if value <= 0:
+        return 0.0
+    exponent = math.floor(math.log10(value))
+    for mantissa in (5, 2, 1):
+        if mantissa * 10.0 ** exponent <= value * (1 + 1e-9):
+            return float(f"{mantissa}e{exponent}")
+    return float(f"1e{exponent}")
+
+
+def consecutive_spacing(xy):
+    """Median distance between consecutive distinct points, the typical survey step."""
+    steps = np.hypot(*np.diff(xy, axis=0).T) if len(xy) > 1 else np.zeros(0)
+    steps = steps[steps > 0]
+    return float(np.median(steps)) if len(steps) else 0.0
+
+
+def kdtree_nearest(xy):
+    """Distance of every point to its nearest neighbour, with a KD-tree."""
+    distances, _ = cKDTree(xy).query(xy, k=2)
+    return distances[:, 1]
+
+
+def grid_nearest(xy, cell, queries=None):
+    """Nearest-neighbour distances of the ``queries`` (indices, default all) on a grid.
+
+    Neighbours are searched in the 3x3 cells around a point, so every
+    distance up to ``cell`` is exact; points without a neighbour that
+    close get ``inf``.
+    """
+    if queries is None:
+        queries = np.arange(len(xy))
+    result = np.full(len(queries), np.inf)
+    if len(xy) < 2 or not len(queries):
+        return result
+    cells = np.floor((xy - xy.min(axis=0)) / cell).astype(np.int64)
+    # One spare row between columns keeps neighbour keys from wrapping
+    stride = int(cells[:, 1].max()) + 2
+    keys = cells[:, 0] * stride + cells[:, 1]
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    offsets = [dx * stride + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+    query_keys = keys[queries]
+    ranges = [(np.searchsorted(sorted_keys, query_keys + offset, 'left'),
+               np.searchsorted(sorted_keys, query_keys + offset, 'right')) for offset in offsets]
+    pairs = sum(high - low for low, high in ranges)
+    # Split the queries so a dense spot never needs more than a chunk of pairs at once
+    chunk_ids = np.cumsum(pairs) // _GRID_PAIRS_PER_CHUNK
+    bounds = np.concatenate(([0], np.flatnonzero(np.diff(chunk_ids)) + 1, [len(queries)]))
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        chunk = queries[start:end]
+        best = result[start:end]
+        for low, high in ranges:
+            counts = high[start:end] - low[start:end]
+            total = int(counts.sum())
+            if not total:
+                continue
+            owner = np.repeat(np.arange(len(chunk)), counts)
+            position = np.repeat(low[start:end] - (np.cumsum(counts) - counts), counts) + np.arange(total)
+            candidates = order[position]
+            distances = np.hypot(*(xy[candidates] - xy[chunk[owner]]).T)
+            distances[candidates == chunk[owner]] = np.inf
+            np.minimum.at(best, owner, distances)
+    result[result > cell] = np.inf
+    return result
+
+
+def nearest_distances(xy, use_kdtree=True):
+    """Nearest-neighbour distances and the number of points without a close neighbour."""
+    if len(xy) < 2:
+        return np.zeros(0), 0
+    if use_kdtree and cKDTree is not None:
+        return kdtree_nearest(xy), 0
+    cell = consecutive_spacing(xy)
+    if cell <= 0:
+        # All points at one place
+        return np.zeros(len(xy)), 0
+    queries = None
+    if len(xy) > MAX_GRID_QUERIES:
+        queries = np.sort(np.random.default_rng(0).choice(len(xy), MAX_GRID_QUERIES, replace=False))
+    distances = grid_nearest(xy, cell, queries)
+    unresolved = int(np.count_nonzero(np.isinf(distances)))
+    return distances[np.isfinite(distances)], unresolved
+
+
+def log_histogram(distances):
+    """Lower edges and counts of the positive distances in BINS_PER_DECADE bins per decade."""
+    positive = distances[distances > 0]
+    if not len(positive):
+        return np.zeros(0), np.zeros(0, dtype=np.int64)
+    logs = np.log10(positive)
+    first = math.floor(logs.min() * BINS_PER_DECADE)
+    last = math.floor(logs.max() * BINS_PER_DECADE)
+    bins = np.floor(logs * BINS_PER_DECADE).astype(np.int64) - first
+    counts = np.bincount(bins, minlength=last - first + 1)
+    edges = 10.0 ** (np.arange(first, last + 1) / BINS_PER_DECADE)
+    return edges, counts
+
+
+def find_gap(edges, counts):
+    """The deepest valley below the main peak: (distance, depth ratio, points below), or None."""
+    if len(counts) < 3:
+        return None
+    cumulative = np.cumsum(counts)
+    median_bin = int(np.searchsorted(cumulative, counts.sum() / 2))
+    main = median_bin + int(np.argmax(counts[median_bin:]))
+    # A few stray close pairs are no cluster of repeated measurements
+    min_below = max(3, int(counts.sum()) // 1000)
+    best = None
+    for valley in range(1, main):
+        if cumulative[valley - 1] < min_below:
+            continue
+        left_peak = counts[:valley].max()
+        ratio = counts[valley] / min(left_peak, counts[main])
+        if best is None or ratio < best[1]:
+            best = (valley, ratio, [valley])
+        elif ratio == best[1] and valley == best[2][-1] + 1:
+            # A run of equally deep bins, the middle of it is chosen below
+            best[2].append(valley)
+    if best is None:
+        return None
+    _, ratio, run = best
+    middle = run[len(run) // 2]
+    # Geometric centre of the bin
+    distance = edges[middle] * 10.0 ** (0.5 / BINS_PER_DECADE)
+    return distance, float(ratio), int(counts[:run[0]].sum())
+
+
+def suggest_tolerance(distances):
+    """Tolerance that merges repeated measurements but no distinct points."""
+    positive = distances[distances > 0]
+    if len(positive) < MIN_DISTANCES:
+        return None
+    gap = find_gap(*log_histogram(positive))
+    if gap is not None and gap[1] <= _MEDIUM_GAP_RATIO:
+        distance, ratio, below = gap
+        confidence = "high" if ratio <= _HIGH_GAP_RATIO else "medium"
+        return Suggestion(nice_value(distance), confidence,
+                          f"{below:,} point(s) lie closer to a neighbour than the gap at {distance:.3g}, "
+                          f"the other {len(positive) - below:,} are distinct points")
+    closest = float(np.quantile(positive, _TOLERANCE_QUANTILE))
+    return Suggestion(nice_value(closest / 2), "low",
+                      f"no gap between repeated and distinct points, half of the closest 1% "
+                      f"of distances ({closest:.3g})")
+
+
+def suggest_snapping(distances, tolerance, kinds_known=True):
+    """Snapping distance of half the spacing of the closest distinct vertices."""
+    distinct = distances[distances > (tolerance.value if tolerance is not None else 0)]
+    if len(distinct) < MIN_DISTANCES:
+        return None
+    closest = float(np.quantile(distinct, _SNAPPING_QUANTILE))
+    value = nice_value(closest / 2)
+    if tolerance is not None:
+        value = max(value, tolerance.value)
+    confidence = "medium" if kinds_known and len(distinct) >= 20 * MIN_DISTANCES else "low"
+    note = f"half the spacing of the closest 5% of distinct line and polygon vertices ({closest:.3g})"
+    if not kinds_known:
+        note += "; the parser profile has no geometry tags, all points were used"
+    return Suggestion(value, confidence, note)
+
+
+def suggest_spacing(path, geom_tags=None, decimal_point=".", decimal_group="", progress_callback=None,
+                    is_canceled=None, use_kdtree=True):
+    """Measure the spacing of a normalized file and suggest --tolerance and --snapping.
+
+    ``geom_tags`` maps geometry kinds to tags like the ``geom_tags`` of a
+    ParserProfile. Returns a SpacingReport, or None if canceled.
+    """
+    if np is None:
+        raise PointSpacingError("The spacing suggestion needs NumPy, which is not available")
+    started = time.monotonic()
+    geom_tags = geom_tags or {}
+    kinds = {tag: kind for kind, tag in geom_tags.items() if tag}
+    reader = PointReader(kinds, decimal_point, decimal_group)
+    points = reader.read(path, progress_callback, is_canceled)
+    if points is None:
+        return None
+
+    report = SpacingReport("KD-tree" if use_kdtree and cKDTree is not None else "grid", len(points["x"]))
+    xy = np.column_stack((points["x"], points["y"]))
+    all_distances = []
+    snapping_distances = []
+    for code, tag in enumerate(reader.tag_names):
+        if is_canceled is not None and is_canceled():
+            return None
+        selected = xy[points["tag"] == code]
+        if not len(selected):
+            continue
+        distances, unresolved = nearest_distances(selected, use_kdtree)
+        edges, counts = log_histogram(distances)
+        report.histograms.append(SpacingHistogram(
+            tag, kinds.get(tag), len(selected), int(np.count_nonzero(distances == 0)), unresolved,
+            edges.tolist(), counts.tolist(), float(np.median(distances)) if len(distances) else None,
+        ))
+        all_distances.append(distances)
+        if kinds.get(tag) in ("line", "poly") or not kinds:
+            snapping_distances.append(distances)
+
+    all_distances = np.concatenate(all_distances) if all_distances else np.zeros(0)
+    report.tolerance = suggest_tolerance(all_distances)
+    report.snapping = suggest_snapping(
+        np.concatenate(snapping_distances) if snapping_distances else np.zeros(0), report.tolerance,
+        kinds_known=bool(kinds),
+    )
+    report.elapsed = time.monotonic() - started
+    return report
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+"""
+Sidecar index that maps normalized lines back to the raw input files.
+
+After concatenation, cleaning and renumbering, the line numbers survey2gis
+reports refer to the normalized file. The normalizer can write
+``<output>.idx`` next to it, and ProvenanceIndex answers for every
+normalized line which input file it came from, its original line number
+there and the byte offset of that line. Reading the raw line is then a
+single seek, however large the input is. For compressed inputs the offset
+counts decompressed bytes, so reaching it means decompressing up to there.
+
+File layout (all integers little-endian)::
+
+    b"S2GIDX1\\n"
+    uint32[count]   original line number of every normalized line
+    uint64[count]   byte offset of that line in its input file
+    uint32[count]   input file of every line, only if "interleaved"
+    JSON trailer    {"count", "sources", "source_starts", "interleaved"}
+    uint64          length of the JSON trailer
+
+Normally input files occupy consecutive runs of normalized lines, so the
+source of a line is found by bisecting ``source_starts`` instead of storing
+it per line. Only when lines of several files are interleaved (merge by key
+column) the source is stored per line.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from collections import namedtuple
+from itertools import repeat
+
+from .compressed_input import open_input
+
+
+MAGIC = b"S2GIDX1\n"
+INDEX_SUFFIX = ".idx"
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+_TRAILER_LENGTH = struct.Struct("<Q")
+
+Provenance = namedtuple("Provenance", ["path", "line_number", "offset"])
+
+
+def index_path_for(output_file_path):
+    """Path of the sidecar index written next to a normalized file."""
+    return output_file_path + INDEX_SUFFIX
+
+
+def _little_endian(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+class ProvenanceWriter:
+    """Streams (line number, offset) pairs to a sidecar index.
+
+    The two columns go to scratch files while the normalizer runs and are
+    joined into the final layout by close(), so memory stays bounded.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.source_starts = []
+        self._sources_seen = set()
+        self._scratch_dir = tempfile.mkdtemp(prefix=".s2g_index_", dir=os.path.dirname(path) or None)
+        self._line_numbers = open(os.path.join(self._scratch_dir, "lines"), 'wb')
+        self._offsets = open(os.path.join(self._scratch_dir, "offsets"), 'wb')
+        # Only opened once lines of several sources get interleaved
+        self._sources = None
+
+    def _start_source(self, source):
+        if source not in self._sources_seen:
+            self._sources_seen.add(source)
+            # Sources without any lines share the start of the next one
+            while len(self.source_starts) <= source:
+                self.source_starts.append(self.count)
+
+    def add(self, source, line_numbers, offsets):
+        """Append the provenance of a run of normalized lines from one source."""
+        self._start_source(source)
+        if self._sources is not None:
+            self._write_sources(source, len(line_numbers))
+        _little_endian(array('I', line_numbers)).tofile(self._line_numbers)
+        _little_endian(array('Q', offsets)).tofile(self._offsets)
+        self.count += len(line_numbers)
+
+    def add_interleaved(self, sources, line_numbers, offsets):
+        """Append normalized lines whose sources are given per line."""
+        if self._sources is None:
+            self._sources = open(os.path.join(self._scratch_dir, "sources"), 'wb')
+            # Lines added so far came in consecutive runs per source
+            starts = self.source_starts + [self.count]
+            for source in range(len(self.source_starts)):
+                self._write_sources(source, starts[source + 1] - starts[source])
+        for source in sorted(set(sources) - self._sources_seen):
+            self._start_source(source)
+        _little_endian(array('I', sources)).tofile(self._sources)
+        _little_endian(array('I', line_numbers)).tofile(self._line_numbers)
+        _little_endian(array('Q', offsets)).tofile(self._offsets)
+        self.count += len(line_numbers)
+
+    def _write_sources(self, source, count):
+        for start in range(0, count, COPY_CHUNK_SIZE // 4):
+            _little_endian(array('I', [source]) * min(COPY_CHUNK_SIZE // 4, count - start)).tofile(self._sources)
+
+    def add_index(self, source, index_path):
+        """Append a complete single-source index, e.g. one written for a fragment."""
+        with ProvenanceIndex(index_path) as index:
+            self._start_source(source)
+            if self._sources is not None:
+                self._write_sources(source, len(index))
+            index.copy_columns(self._line_numbers, self._offsets)
+            self.count += len(index)
+
+    def close(self, sources):
+        """Write the index for the given input paths and remove the scratch files."""
+        try:
+            while len(self.source_starts) < len(sources):
+                self.source_starts.append(self.count)
+            self._line_numbers.close()
+            self._offsets.close()
+            interleaved = self._sources is not None
+            columns = ["lines", "offsets"]
+            if interleaved:
+                self._sources.close()
+                columns.append("sources")
+            trailer = json.dumps({
+                "count": self.count,
+                "sources": [os.path.abspath(path) for path in sources],
+                "source_starts": self.source_starts,
+                "interleaved": interleaved,
+            }).encode('utf-8')
+            partial_path = self.path + ".part"
+            with open(partial_path, 'wb') as index_file:
+                index_file.write(MAGIC)
+                for name in columns:
+                    with open(os.path.join(self._scratch_dir, name), 'rb') as column:
+                        shutil.copyfileobj(column, index_file)
+                index_file.write(trailer)
+                index_file.write(_TRAILER_LENGTH.pack(len(trailer)))
+            os.replace(partial_path, self.path)
+        finally:
+            self.abort()
+
+    def abort(self):
+        """Drop the scratch files without writing the index."""
+        self._line_numbers.close()
+        self._offsets.close()
+        if self._sources is not None:
+            self._sources.close()
+        shutil.rmtree(self._scratch_dir, ignore_errors=True)
+        if os.path.exists(self.path + ".part"):
+            os.remove(self.path + ".part")
+
+
+class ProvenanceIndex:
+    """Read access to a sidecar index; lookups are O(1) on a memory map."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._file.close()
+            raise ValueError(f"Not a line index: {path}")
+        if self._map[:len(MAGIC)] != MAGIC or len(self._map) < len(MAGIC) + _TRAILER_LENGTH.size:
+            self.close()
+            raise ValueError(f"Not a line index: {path}")
+        (trailer_length,) = _TRAILER_LENGTH.unpack_from(self._map, len(self._map) - _TRAILER_LENGTH.size)
+        trailer_start = len(self._map) - _TRAILER_LENGTH.size - trailer_length
+        trailer = json.loads(self._map[trailer_start:trailer_start + trailer_length].decode('utf-8'))
+        self.count = trailer["count"]
+        self.sources = trailer["sources"]
+        self.source_starts = trailer["source_starts"]
+        self.interleaved = trailer.get("interleaved", False)
+        self._lines_start = len(MAGIC)
+        self._offsets_start = self._lines_start + 4 * self.count
+        self._sources_start = self._offsets_start + 8 * self.count
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def copy_columns(self, line_numbers_file, offsets_file, chunk_size=COPY_CHUNK_SIZE):
+        """Copy the line number and offset columns to two open files, a chunk at a time."""
+        for target, start, end in ((line_numbers_file, self._lines_start, self._offsets_start),
+                                   (offsets_file, self._offsets_start, self._offsets_start + 8 * self.count)):
+            for position in range(start, end, chunk_size):
+                target.write(self._map[position:min(position + chunk_size, end)])
+
+    def line_sources(self):
+        """Input file index of every normalized line, as an array('I')."""
+        if self.interleaved:
+            sources = array('I')
+            sources.frombytes(self._map[self._sources_start:self._sources_start + 4 * self.count])
+            return _little_endian(sources)
+        sources = array('I')
+        for source, start in enumerate(self.source_starts):
+            end = self.source_starts[source + 1] if source + 1 < len(self.source_starts) else self.count
+            sources.extend(repeat(source, end - start))
+        return sources
+
+    def lookup(self, line_number):
+        """Provenance of a normalized line (1-based, as survey2gis reports it)."""
+        if not 1 <= line_number <= self.count:
+            raise IndexError(f"Line {line_number} is outside the normalized file (1-{self.count})")
+        position = line_number - 1
+        if self.interleaved:
+            (source,) = struct.unpack_from("<I", self._map, self._sources_start + 4 * position)
+        else:
+            source = bisect.bisect_right(self.source_starts, position) - 1
+        (raw_line,) = struct.unpack_from("<I", self._map, self._lines_start + 4 * position)
+        (offset,) = struct.unpack_from("<Q", self._map, self._offsets_start + 8 * position)
+        return Provenance(self.sources[source], raw_line, offset)
+
+    def read_raw_line(self, line_number):
+        """Return the provenance and the raw bytes of the original line."""
+        provenance = self.lookup(line_number)
+        with open_input(provenance.path) as raw_file:
+            raw_file.seek(provenance.offset)
+            raw = raw_file.readline()
+        # readline() only knows \n, a lone \r also ends a line here
+        return provenance, raw.split(b"\r", 1)[0].rstrip(b"\n")
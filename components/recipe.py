@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline recipes: a whole run configuration in one JSON or TOML file.
+
+A recipe holds what the Normalize and Process tabs hold for a run: the
+input entries and normalize steps, the survey2gis commands (CommandOptions),
+the alias file, the GeoPackage name and the styles. The dock saves and
+loads recipes; recipe_runner executes them without QGIS. Example::
+
+    name = "Campaign 2024"
+    inputs = ["raw/**/*.dat", "!backup"]
+    output_directory = "out"
+    output_filename = "campaign_2024"
+    epsg = "25832"
+    alias_file = "aliases.ini"
+    styles_folder = "styles"
+    copy_styles = true
+
+    [normalize]
+    fix_lines = true
+    replace_geotags = true
+    search = "."
+    replace = "PLA"
+
+    [[commands]]
+    parser = "parser/standard.ini"
+    name = "walls"
+    flags = ["-c"]
+    selections = ["wall"]
+
+    [commands.options]
+    "--topology" = "full"
+    "--tolerance" = "0.01"
+
+Relative paths are relative to the recipe file. A command without
+``input`` reads the normalized file, and one without ``output_directory``
+writes to the recipe's output directory. Reading TOML needs Python 3.11
+or the tomli package; JSON always works.
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field, fields
+
+from .command_options import CommandOptions
+from .normalize_pipeline import NormalizeOptions
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+
+# Name of the normalized file if the recipe sets none, as in the Normalize tab
+DEFAULT_NORMALIZED_NAME = "s2g_merged_input_files"
+
+_COMMAND_KEYS = ("parser", "label_mode", "output_directory", "name", "input", "selections", "flags", "options")
+_BARE_KEY = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+class RecipeError(ValueError):
+    """The recipe file cannot be read or contains unknown keys or wrong types."""
+
+
+@dataclass
+class RecipeCommand:
+    options: CommandOptions = field(default_factory=CommandOptions)
+    # Empty to read the normalized file of the recipe
+    input_file: str = ""
+
+
+@dataclass
+class Recipe:
+    name: str = ""
+    # Input field entries: files, folders, glob and exclude patterns, see input_files
+    inputs: list = field(default_factory=list)
+    output_directory: str = ""
+    # Name of the normalized file without .txt; also names the GeoPackage if geopackage_name is empty
+    output_filename: str = ""
+    normalize: NormalizeOptions = field(default_factory=NormalizeOptions)
+    styles_folder: str = ""
+    copy_styles: bool = False
+    # EPSG code for layers whose command has no --proj-out
+    epsg: str = ""
+    alias_file: str = ""
+    geopackage_name: str = ""
+    commands: list = field(default_factory=list)
+    stop_on_error: bool = True
+    # Fragment cache folder for the normalize step; empty for no cache
+    cache_dir: str = ""
+    # Keep the shapefiles after they were copied into the GeoPackage
+    keep_intermediate: bool = False
+
+    @property
+    def normalized_file(self):
+        """The normalized file the recipe writes, or "" if it has no inputs."""
+        if not self.inputs:
+            return ""
+        return os.path.join(self.output_directory, f"{self.output_filename or DEFAULT_NORMALIZED_NAME}.txt")
+
+    def command_input(self, command):
+        return command.input_file or self.normalized_file
+
+    def command_output_directory(self, command):
+        return command.options.output_directory or self.output_directory
+
+    def to_dict(self, base_dir=None):
+        """The recipe as plain data; empty values and default normalize options are left out."""
+        data = {"name": self.name,
+                "inputs": [_input_entry(entry, base_dir, _relative) for entry in self.inputs],
+                "output_directory": _relative(self.output_directory, base_dir),
+                "output_filename": self.output_filename,
+                "epsg": self.epsg,
+                "alias_file": _relative(self.alias_file, base_dir),
+                "geopackage_name": self.geopackage_name,
+                "styles_folder": _relative(self.styles_folder, base_dir),
+                "copy_styles": self.copy_styles,
+                "stop_on_error": self.stop_on_error,
+                "cache_dir": _relative(self.cache_dir, base_dir),
+                "keep_intermediate": self.keep_intermediate}
+        # stop_on_error defaults to true, so false has to be written
+        data = {key: value for key, value in data.items() if value or key == "stop_on_error"}
+        default = NormalizeOptions()
+        normalize = {option.name: getattr(self.normalize, option.name) for option in fields(NormalizeOptions)
+                     if getattr(self.normalize, option.name) != getattr(default, option.name)}
+        if normalize.get("transform_table"):
+            normalize["transform_table"] = _relative(normalize["transform_table"], base_dir)
+        data["normalize"] = normalize
+        data["commands"] = [_command_dict(command, base_dir) for command in self.commands]
+        return data
+
+
+def _relative(path, base_dir):
+    """``path`` relative to the recipe folder if it lies inside it, with '/' separators."""
+    if not path or not base_dir or not os.path.isabs(path):
+        return path
+    try:
+        relative = os.path.relpath(path, base_dir)
+    except ValueError:
+        # Another drive
+        return path
+    if relative.startswith(os.pardir):
+        return path
+    return relative.replace(os.sep, "/")
+
+
+def _absolute(path, base_dir):
+    if not path or not base_dir:
+        return path
+    path = os.path.expanduser(path)
+    return path if os.path.isabs(path) else os.path.normpath(os.path.join(base_dir, path))
+
+
+def _input_entry(entry, base_dir, convert):
+    # Exclude names like !backup stay names, exclude paths are converted like other entries
+    if entry.startswith("!"):
+        return "!" + convert(entry[1:], base_dir) if "/" in entry.replace(os.sep, "/") else entry
+    return convert(entry, base_dir)
+
+
+def _command_dict(command, base_dir):
+    options = command.options
+    data = {"parser": _relative(options.parser_path, base_dir),
+            "label_mode": options.label_mode,
+            "output_directory": _relative(options.output_directory, base_dir),
+            "name": options.output_base_name,
+            "input": _relative(command.input_file, base_dir),
+            "selections": [selection.strip('"') for selection in options.selections],
+            "flags": [flag for flag, is_set in options.flag_options.items() if is_set],
+            "options": {key: value for key, value in options.additional_options.items() if value}}
+    return {key: value for key, value in data.items() if value}
+
+
+def _check_type(value, expected, where):
+    if expected is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if expected is str and isinstance(value, (int, float)) and not isinstance(value, bool):
+        # e.g. epsg = 25832
+        return str(value)
+    if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+        raise RecipeError(f"{where} must be of type {expected.__name__}, not {value!r}")
+    return value
+
+
+def _string_list(value, where):
+    value = _check_type(value, list, where)
+    return [_check_type(item, str, where) for item in value]
+
+
+def recipe_from_dict(data, base_dir=None):
+    """Build a Recipe from parsed JSON/TOML; relative paths are resolved against ``base_dir``."""
+    if not isinstance(data, dict):
+        raise RecipeError("A recipe must be a table/object at the top level")
+    recipe = Recipe()
+    simple = {option.name: option.type for option in fields(Recipe)
+              if option.name not in ("inputs", "normalize", "commands")}
+    for key, value in data.items():
+        if key == "inputs":
+            recipe.inputs = [_input_entry(entry, base_dir, _absolute) for entry in _string_list(value, key)]
+        elif key == "normalize":
+            recipe.normalize = _normalize_from_dict(_check_type(value, dict, key), base_dir)
+        elif key == "commands":
+            recipe.commands = [_command_from_dict(_check_type(command, dict, f"commands[{index}]"), index, base_dir)
+                               for index, command in enumerate(_check_type(value, list, key))]
+        elif key in simple:
+            setattr(recipe, key, _check_type(value, simple[key], key))
+        else:
+            raise RecipeError(f"Unknown recipe key: {key}")
+    for key in ("output_directory", "styles_folder", "alias_file", "cache_dir"):
+        setattr(recipe, key, _absolute(getattr(recipe, key), base_dir))
+    return recipe
+
+
+def _normalize_from_dict(data, base_dir):
+    default = NormalizeOptions()
+    values = {}
+    known = {option.name for option in fields(NormalizeOptions)}
+    for key, value in data.items():
+        if key not in known:
+            raise RecipeError(f"Unknown normalize option: {key}")
+        values[key] = _check_type(value, type(getattr(default, key)), f"normalize.{key}")
+    if values.get("transform_table"):
+        values["transform_table"] = _absolute(values["transform_table"], base_dir)
+    return NormalizeOptions(**values)
+
+
+def _command_from_dict(data, index, base_dir):
+    where = f"commands[{index}]"
+    unknown = sorted(set(data) - set(_COMMAND_KEYS))
+    if unknown:
+        raise RecipeError(f"Unknown key in {where}: {', '.join(unknown)}")
+    options = CommandOptions(
+        parser_path=_absolute(_check_type(data.get("parser", ""), str, f"{where}.parser"), base_dir),
+        label_mode=_check_type(data.get("label_mode", ""), str, f"{where}.label_mode"),
+        output_directory=_absolute(_check_type(data.get("output_directory", ""), str, f"{where}.output_directory"),
+                                   base_dir),
+        output_base_name=_check_type(data.get("name", ""), str, f"{where}.name"),
+        selections=_string_list(data.get("selections", []), f"{where}.selections"),
+        flag_options={flag: True for flag in _string_list(data.get("flags", []), f"{where}.flags")},
+        additional_options={key: _check_type(value, str, f"{where}.options.{key}")
+                            for key, value in _check_type(data.get("options", {}), dict, f"{where}.options").items()},
+    )
+    if not options.output_base_name:
+        raise RecipeError(f"{where} needs a name (-n)")
+    return RecipeCommand(options, _absolute(_check_type(data.get("input", ""), str, f"{where}.input"), base_dir))
+
+
+def loads(text, fmt="json", base_dir=None):
+    """Parse recipe text in ``fmt`` ('json' or 'toml')."""
+    if fmt == "toml":
+        if tomllib is None:
+            raise RecipeError("Reading TOML recipes needs Python 3.11 or the tomli package")
+        try:
+            data = tomllib.loads(text)
+        except tomllib.TOMLDecodeError as e:
+            raise RecipeError(f"Invalid TOML: {e}")
+    else:
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            raise RecipeError(f"Invalid JSON: {e}")
+    return recipe_from_dict(data, base_dir)
+
+
+def _format(path):
+    return "toml" if path.lower().endswith(".toml") else "json"
+
+
+def load_recipe(path):
+    """Read a .json or .toml recipe; relative paths in it are relative to its folder."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    return loads(text, _format(path), os.path.dirname(os.path.abspath(path)))
+
+
+def dumps(recipe, fmt="json", base_dir=None):
+    data = recipe.to_dict(base_dir)
+    if fmt == "toml":
+        return dumps_toml(data)
+    return json.dumps(data, indent=2, ensure_ascii=False) + "\n"
+
+
+def save_recipe(recipe, path):
+    """Write a recipe as JSON, or TOML for a .toml path; paths inside its folder are stored relative."""
+    text = dumps(recipe, _format(path), os.path.dirname(os.path.abspath(path)))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _toml_key(key):
+    return key if _BARE_KEY.match(key) else json.dumps(key, ensure_ascii=False)
+
+
+def _toml_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, list):
+        return "[" + ", ".join(_toml_value(item) for item in value) + "]"
+    # JSON string escapes are valid in TOML basic strings
+    return json.dumps(str(value), ensure_ascii=False)
+
+
+def _toml_table(data, prefix, lines):
+    for key, value in data.items():
+        if not isinstance(value, (dict, list)) or (isinstance(value, list) and
+                                                   not any(isinstance(item, dict) for item in value)):
+            lines.append(f"{_toml_key(key)} = {_toml_value(value)}")
+    for key, value in data.items():
+        name = f"{prefix}{_toml_key(key)}"
+        if isinstance(value, dict):
+            lines += ["", f"[{name}]"]
+            _toml_table(value, name + ".", lines)
+        elif isinstance(value, list) and any(isinstance(item, dict) for item in value):
+            for item in value:
+                lines += ["", f"[[{name}]]"]
+                _toml_table(item, name + ".", lines)
+
+
+def dumps_toml(data):
+    """TOML for the nested dicts and lists of Recipe.to_dict()."""
+    lines = []
+    _toml_table(data, "", lines)
+    return "\n".join(lines).lstrip("\n") + "\n"
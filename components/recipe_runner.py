@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Run a recipe without QGIS: normalize, survey2gis, GeoPackage.
+
+The steps use the same code as the dock (normalize_pipeline, CommandOptions,
+survey_output, geopackage_writer); survey2gis is started with subprocess
+instead of QProcess and the GeoPackage is written but not loaded into a
+project. Recipes without commands only need Python; writing the
+GeoPackage needs the GDAL Python bindings (osgeo), e.g. from the OSGeo4W
+shell or the python of a QGIS installation.
+
+Batch use, with the folder holding the plugin on PYTHONPATH::
+
+    python -m s2g_data_processor.components.recipe_runner campaign_*.toml
+
+All recipes are run even if one fails; the exit code is 1 if any failed.
+"""
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field, replace
+
+from .binary_utils import resolve_binary_path
+from .command_options import command_arguments, epsg_from_proj
+from .input_files import ENTRY_SEPARATOR, InputResolver
+from .normalize_cache import FragmentCache
+from .normalize_pipeline import normalize_files
+from .recipe import RecipeError, load_recipe
+from .survey_output import (copy_styles, delete_intermediate_files, filter_spatialfiles, geopackage_path,
+                            load_alias_mapping, scan_spatialfiles)
+
+
+def _print_log(message, level="info"):
+    stream = sys.stderr if level in ("error", "warning") else sys.stdout
+    print(f"[{level}] {message}" if level != "info" else message, file=stream)
+
+
+class RecipeFailed(Exception):
+    """A step of the recipe failed and the recipe stops on errors."""
+
+
+@dataclass
+class RecipeResult:
+    normalized_file: str = ""
+    geopackage: str = ""
+    layers: list = field(default_factory=list)
+    # Names (-n) of the commands that succeeded and failed
+    succeeded: list = field(default_factory=list)
+    failed: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def ok(self):
+        return not self.failed
+
+
+def run_command(binary_path, options, input_file, log_file):
+    """Run one survey2gis command; returns (succeeded, log text).
+
+    A command fails on a non-zero exit code or an ERROR in its log, the same
+    rule the dock applies.
+    """
+    arguments = command_arguments(binary_path, options, input_file) + ["-l", log_file]
+    completed = subprocess.run(arguments, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    log_text = ""
+    if os.path.exists(log_file):
+        with open(log_file, "r", encoding="utf-8", errors="replace") as f:
+            log_text = f.read()
+    if not log_text:
+        log_text = completed.stdout.decode("utf-8", errors="replace")
+    return completed.returncode == 0 and "ERROR" not in log_text, log_text
+
+
+def run_recipe(recipe, binary_path=None, log=_print_log, is_canceled=None):
+    """Execute all steps of ``recipe``; returns a RecipeResult.
+
+    Raises RecipeFailed if a step fails and ``recipe.stop_on_error`` is set,
+    and FileNotFoundError/ValueError for a recipe that cannot run at all.
+    """
+    started = time.monotonic()
+    result = RecipeResult()
+
+    if recipe.inputs:
+        if not recipe.output_directory:
+            raise RecipeError("The recipe has inputs but no output_directory")
+        resolved = InputResolver().resolve(ENTRY_SEPARATOR.join(recipe.inputs))
+        if resolved.missing:
+            log(f"Input not found, skipped: {'; '.join(resolved.missing)}", "warning")
+        os.makedirs(recipe.output_directory, exist_ok=True)
+        result.normalized_file = recipe.normalized_file
+        cache = FragmentCache(recipe.cache_dir) if recipe.cache_dir else None
+        stats = normalize_files(resolved.paths, result.normalized_file, recipe.normalize,
+                                is_canceled=is_canceled, cache=cache)
+        for warning in stats.warnings:
+            log(warning, "warning")
+        for note in stats.notes:
+            log(note, "info")
+        log(stats.throughput_message(), "info")
+        if recipe.copy_styles:
+            copy_styles(recipe.styles_folder, recipe.output_directory, log)
+
+    if not recipe.commands:
+        result.elapsed = time.monotonic() - started
+        return result
+
+    binary_path = binary_path or resolve_binary_path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    output_dir = None
+    layer_epsg = {}
+    for index, command in enumerate(recipe.commands):
+        options = command.options
+        name = options.output_base_name
+        input_file = recipe.command_input(command)
+        command_output = recipe.command_output_directory(command)
+        if not input_file or not command_output:
+            raise RecipeError(f"Command {name} has no input file or output directory")
+        if options.output_directory != command_output:
+            options = replace(options, output_directory=command_output)
+        # The GeoPackage goes next to the output of the first command, as in the dock
+        output_dir = output_dir or command_output
+        logs_dir = os.path.join(command_output, "logs")
+        os.makedirs(logs_dir, exist_ok=True)
+
+        log(f"Command {index + 1}/{len(recipe.commands)}: {name}", "info")
+        succeeded, log_text = run_command(binary_path, options, input_file, os.path.join(logs_dir, f"{name}.log"))
+        if log_text.strip():
+            log(log_text.rstrip(), "info")
+        if succeeded:
+            result.succeeded.append(name)
+            epsg = epsg_from_proj(options.additional_options.get("--proj-out"))
+            if epsg is not None:
+                layer_epsg[name] = epsg
+            continue
+        result.failed.append(name)
+        log(f"Command {name} failed", "error")
+        if recipe.stop_on_error:
+            raise RecipeFailed(f"Command {name} failed, see {os.path.join(logs_dir, name + '.log')}")
+
+    data = filter_spatialfiles(scan_spatialfiles(output_dir), result.succeeded)
+    if any(data.values()):
+        # Only imported here so recipes without survey2gis output run without GDAL
+        from .geopackage_writer import GeoPackageWriter
+        result.geopackage = geopackage_path(output_dir, recipe.geopackage_name, recipe.output_filename)
+
+        def command_epsg(layer_name):
+            # Layers are named after -n, with a geometry suffix if a command wrote several
+            for name, epsg in layer_epsg.items():
+                if layer_name == name or layer_name.startswith(name + "_"):
+                    return epsg
+            return None
+
+        writer = GeoPackageWriter(load_alias_mapping(recipe.alias_file), recipe.epsg, command_epsg, log)
+        result.layers = writer.write(data, result.geopackage, replace=True)
+        log(f"{len(result.layers)} layer(s) written to {result.geopackage}", "info")
+        if not recipe.keep_intermediate:
+            delete_intermediate_files(data, lambda message, level: None)
+    else:
+        log("survey2gis wrote no shapefiles, no GeoPackage written", "warning")
+
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run survey2gis pipeline recipes (.json/.toml) without QGIS.")
+    parser.add_argument("recipes", nargs="+", help="recipe files; glob patterns are expanded")
+    parser.add_argument("--binary", help="survey2gis binary, default: the one bundled with the plugin")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for pattern in args.recipes:
+        paths += sorted(glob.glob(pattern)) or [pattern]
+    failed = []
+    for path in paths:
+        _print_log(f"=== {path}")
+        try:
+            result = run_recipe(load_recipe(path), args.binary)
+        except (OSError, ValueError, RecipeFailed) as e:
+            _print_log(f"{path}: {e}", "error")
+            failed.append(path)
+            continue
+        if not result.ok:
+            failed.append(path)
+        _print_log(f"{path}: finished in {result.elapsed:.1f} s")
+    if failed:
+        _print_log(f"{len(failed)} of {len(paths)} recipe(s) failed: {', '.join(failed)}", "error")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Content-addressed cache of survey2gis results.
+
+A run is keyed by the content of its input file and parser profile, the
+normalized survey2gis options and the size and modification time of the
+binary. The output folder and the log file are not part of the key, so a
+result can be restored anywhere. On a hit the shapefiles and the log of
+the earlier run are copied into the output folder instead of starting
+survey2gis again, e.g. when only an alias file or a style changed.
+
+Entries are evicted least-recently-used once the cache grows past its
+size limit, like the fragments of normalize_cache. clear() drops
+everything.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from .normalize_cache import file_digest
+from .survey_output import basename_files
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# Name of the stored log inside an entry folder
+LOG_NAME = "survey2gis.log"
+
+
+class RunCache:
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+        # Lookups since the cache was opened, for the Logs tab
+        self.hits = 0
+        self.misses = 0
+
+    # -- manifest -----------------------------------------------------------
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.cache_dir, self.MANIFEST_NAME)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if isinstance(manifest.get("entries"), dict) and isinstance(manifest.get("hashes"), dict):
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {"entries": {}, "hashes": {}}
+
+    def save(self):
+        """Write the manifest atomically."""
+        partial_path = self.manifest_path + ".part"
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f)
+        os.replace(partial_path, self.manifest_path)
+
+    # -- keys ---------------------------------------------------------------
+
+    def content_hash(self, path):
+        """Content hash of a file, re-read only if its size or mtime changed."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        known = self.manifest["hashes"].get(path)
+        if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+            return known["sha256"]
+        sha256 = file_digest(path)
+        self.manifest["hashes"][path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256}
+        return sha256
+
+    def key_for(self, binary_path, options, input_file):
+        """Cache key of running ``binary_path`` with CommandOptions on ``input_file``, or None.
+
+        Commands without an existing input file, parser or name are not cached.
+        """
+        if not options.output_base_name or not input_file or not os.path.isfile(input_file) \
+                or not options.parser_path or not os.path.isfile(options.parser_path) \
+                or not os.path.isfile(binary_path):
+            return None
+        binary = os.stat(binary_path)
+        fingerprint = {
+            "input": self.content_hash(input_file),
+            "parser": self.content_hash(options.parser_path),
+            "binary": [binary.st_size, binary.st_mtime_ns],
+            "name": options.output_base_name,
+            "label_mode": options.label_mode,
+            # Selections are applied in order, the other options are not
+            "selections": options.selections,
+            "options": sorted((key, value) for key, value in options.additional_options.items() if value),
+            "flags": sorted(flag for flag, is_set in options.flag_options.items() if is_set),
+        }
+        return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    # -- lookup / store -----------------------------------------------------
+
+    def lookup(self, key):
+        """Return the entry for a hit, else None; counts hits and misses."""
+        entry = self.manifest["entries"].get(key)
+        if entry and all(os.path.exists(os.path.join(self._entry_dir(key), name)) for name in entry["files"]):
+            entry["last_used"] = time.time()
+            self.hits += 1
+            return entry
+        if entry:
+            self._remove_entry(key)
+        self.misses += 1
+        return None
+
+    def restore(self, key, output_dir, log_file=""):
+        """Copy the stored result of ``key`` into ``output_dir`` and its log to ``log_file``.
+
+        Returns the restored shapefile paths.
+        """
+        entry = self.manifest["entries"][key]
+        os.makedirs(output_dir, exist_ok=True)
+        restored = []
+        for name in entry["files"]:
+            target = os.path.join(output_dir, name)
+            shutil.copy2(os.path.join(self._entry_dir(key), name), target)
+            restored.append(target)
+        stored_log = os.path.join(self._entry_dir(key), LOG_NAME)
+        if log_file and os.path.exists(stored_log):
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+            shutil.copyfile(stored_log, log_file)
+        return restored
+
+    def store(self, key, name, output_dir, log_file="", since=None):
+        """Copy the shapefiles a run wrote for ``name`` and its log into the cache.
+
+        ``since`` (time.time() at the start of the run) keeps leftovers of
+        earlier runs out. Returns the number of files stored.
+        """
+        files = basename_files(output_dir, name, since)
+        if not files:
+            return 0
+        entry_dir = self._entry_dir(key)
+        partial_dir = entry_dir + ".part"
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        os.makedirs(partial_dir)
+        size = 0
+        for path in files:
+            shutil.copy2(path, partial_dir)
+            size += os.path.getsize(path)
+        if log_file and os.path.exists(log_file):
+            shutil.copyfile(log_file, os.path.join(partial_dir, LOG_NAME))
+            size += os.path.getsize(log_file)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(partial_dir, entry_dir)
+        self.manifest["entries"][key] = {
+            "name": name,
+            "files": [os.path.basename(path) for path in files],
+            "size": size,
+            "last_used": time.time(),
+        }
+        return len(files)
+
+    # -- eviction -----------------------------------------------------------
+
+    def total_size(self):
+        return sum(entry["size"] for entry in self.manifest["entries"].values())
+
+    def evict(self):
+        """Drop least recently used results until the size limit is met."""
+        entries = self.manifest["entries"]
+        total = self.total_size()
+        evicted = 0
+        for key in sorted(entries, key=lambda k: entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= entries[key]["size"]
+            self._remove_entry(key)
+            evicted += 1
+
+        # Forget content hashes of inputs that no longer exist
+        hashes = self.manifest["hashes"]
+        for path in [path for path in hashes if not os.path.exists(path)]:
+            del hashes[path]
+        return evicted
+
+    def clear(self):
+        """Invalidate the whole cache."""
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+        self.manifest = {"entries": {}, "hashes": {}}
+        self.save()
+
+    def _remove_entry(self, key):
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+        self.manifest["entries"].pop(key, None)
+
+    def summary(self):
+        """Hit/miss line for the Logs tab."""
+        return f"survey2gis result cache: {self.hits} hit(s), {self.misses} miss(es)"
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory settings layer over QSettings, plus named settings profiles.
+
+Writing a QSettings value and calling sync() on every key press flushes the
+whole settings file each time. SettingsStore keeps the values in a dict,
+remembers which keys changed and writes them in one go when flush() is
+called; the Normalize tab calls it from a debounce timer and when the dock
+is closed.
+
+Profiles are named sets of field values, e.g. one per campaign or parser.
+All profiles are stored as one JSON value and read once, so switching to
+another profile only applies a dict that is already in memory.
+
+The backend only needs the QSettings methods value(), setValue(), remove()
+and sync(), which keeps this module free of Qt.
+"""
+
+import json
+
+
+# Quiet time after the last change before the values are written
+DEFAULT_FLUSH_MS = 1000
+
+PROFILES_KEY = 's2g_profiles/profiles'
+ACTIVE_PROFILE_KEY = 's2g_profiles/active'
+
+
+def coerce_value(value, default):
+    """Convert a stored value to the type of its default.
+
+    QSettings returns booleans and numbers from the settings file as
+    strings ('true', '3'); a value that cannot be converted gives the
+    default.
+    """
+    if value is None:
+        return default
+    try:
+        if isinstance(default, bool):
+            if isinstance(value, str):
+                return value.strip().lower() in ('true', '1', 'yes')
+            return bool(value)
+        if isinstance(default, int):
+            return int(float(value))
+        if isinstance(default, float):
+            return float(value)
+        if isinstance(default, str):
+            return str(value)
+    except (TypeError, ValueError):
+        return default
+    return value
+
+
+class SettingsStore:
+    """Caches settings values and writes the changed ones on flush()."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._values = {}
+        # Keys changed since the last flush; None marks a removed key
+        self._dirty = {}
+        self._profiles = None
+
+    def value(self, key, default=None):
+        """The value of ``key``, read from the backend once and converted to the type of ``default``."""
+        if key in self._dirty:
+            value = self._dirty[key]
+            return default if value is None else coerce_value(value, default)
+        if self._in_removed_group(key):
+            return default
+        if key not in self._values:
+            self._values[key] = self.backend.value(key, None)
+        return coerce_value(self._values[key], default)
+
+    def _in_removed_group(self, key):
+        return any(value is None and key.startswith(removed + '/') for removed, value in self._dirty.items())
+
+    def _mark(self, key, value):
+        # Re-insert so flush() writes the keys in the order they were changed
+        self._dirty.pop(key, None)
+        self._dirty[key] = value
+
+    def set_value(self, key, value):
+        """Remember a new value; returns True if it differs from the known one."""
+        if key in self._dirty:
+            if self._dirty[key] == value:
+                return False
+        elif key in self._values and self._values[key] == value:
+            return False
+        self._mark(key, value)
+        return True
+
+    def remove(self, key):
+        """Remove a key, or a group with all its keys, like QSettings.remove()."""
+        prefix = key + '/'
+        for known in [known for known in self._values if known.startswith(prefix)]:
+            del self._values[known]
+        for pending in [pending for pending in self._dirty if pending.startswith(prefix)]:
+            del self._dirty[pending]
+        self._values.pop(key, None)
+        self._mark(key, None)
+        if key == PROFILES_KEY or PROFILES_KEY.startswith(prefix):
+            self._profiles = None
+
+    def is_dirty(self):
+        return bool(self._dirty)
+
+    def flush(self):
+        """Write the changed keys and sync once; returns the number of keys written."""
+        if not self._dirty:
+            return 0
+        dirty, self._dirty = self._dirty, {}
+        for key, value in dirty.items():
+            if value is None:
+                self.backend.remove(key)
+                self._values[key] = None
+            else:
+                self.backend.setValue(key, value)
+                self._values[key] = value
+        self.backend.sync()
+        return len(dirty)
+
+    # Profiles
+
+    def _load_profiles(self):
+        if self._profiles is None:
+            raw = self.value(PROFILES_KEY, '')
+            try:
+                profiles = json.loads(raw) if raw else {}
+            except ValueError:
+                profiles = {}
+            self._profiles = profiles if isinstance(profiles, dict) else {}
+        return self._profiles
+
+    def _store_profiles(self):
+        self.set_value(PROFILES_KEY, json.dumps(self._profiles, sort_keys=True))
+
+    def profile_names(self):
+        return sorted(self._load_profiles(), key=str.lower)
+
+    def profile(self, name):
+        """The values of a profile (settings key -> value), or None if there is none of that name."""
+        values = self._load_profiles().get(name)
+        return dict(values) if values is not None else None
+
+    def save_profile(self, name, values):
+        self._load_profiles()[name] = dict(values)
+        self._store_profiles()
+
+    def delete_profile(self, name):
+        if self._load_profiles().pop(name, None) is None:
+            return False
+        self._store_profiles()
+        if self.value(ACTIVE_PROFILE_KEY, '') == name:
+            self.set_active_profile('')
+        return True
+
+    def active_profile(self):
+        name = self.value(ACTIVE_PROFILE_KEY, '')
+        return name if name in self._load_profiles() else ''
+
+    def set_active_profile(self, name):
+        self.set_value(ACTIVE_PROFILE_KEY, name)
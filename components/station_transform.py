@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+Per-station coordinate transforms for the normalizer.
+
+Each station setup may record in its own local coordinate system. A
+sidecar table assigns an offset or a 2D/3D Helmert transform to input
+files by name, and the normalizer applies it to the coordinates of every
+line of that file in one vectorized NumPy step per block.
+
+The table is a CSV file (``,``, ``;`` or tab separated, ``#`` starts a
+comment) with a header row. Only ``file`` is required::
+
+    file;type;tx;ty;tz;rotation;scale;rx;ry;rz;dims
+    station_a.dat;offset;3513000;5279000;0
+    station_b.dat;helmert2d;3513012.5;5279003.1;;12.5;1.0002
+    station_c.dat;helmert3d;10;20;1.5;;1;0;0;0.25
+
+``type`` is ``offset`` (default), ``helmert2d`` or ``helmert3d``. Angles
+are in degrees; ``rotation`` turns about the z axis (2D), ``rx``/``ry``/
+``rz`` are the 3D rotations, applied in that order. ``scale`` is a factor.
+
+Coordinates are the up to three numbers at the end of a line:
+"1 7_wall $ 1.0 2.0", "68 3513037.116 5279880.877 399.590" and, with axis
+labels in between, "67 1_GR_W_0 @ X 3513037.664 Y 5279881.392 Z 399.563".
+The first token is the line id and never a coordinate. Lines with only x
+and y are transformed with z = 0 and keep having two values. For 2D files
+whose last attribute is a number, set ``dims`` to 2 so that it is not taken
+for x. Every value is written back with as many decimal places as it had
+before, so survey2gis sees the precision it expects.
+"""
+
+import csv
+import io
+import math
+import os
+import re
+from dataclasses import dataclass
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .compressed_input import strip_compression_suffix
+
+
+TRANSFORM_TYPES = ("offset", "helmert2d", "helmert3d")
+
+_NUMBER_PATTERN = r"[-+]?(?:\d+\.?\d*|\.\d+)"
+
+
+class TransformTableError(ValueError):
+    """Raised for a malformed transform table."""
+
+
+@dataclass
+class StationTransform:
+    kind: str = "offset"
+    tx: float = 0.0
+    ty: float = 0.0
+    tz: float = 0.0
+    # Degrees about the z axis, used by helmert2d
+    rotation: float = 0.0
+    scale: float = 1.0
+    # Degrees about the x, y and z axes, used by helmert3d
+    rx: float = 0.0
+    ry: float = 0.0
+    rz: float = 0.0
+    # Coordinates per line in this file: 3 (x y z, z optional) or 2 (x y)
+    dims: int = 3
+
+    def matrix(self):
+        """Return the scaled 3x3 rotation matrix and the translation vector."""
+        if self.kind == "offset":
+            rotation = np.eye(3)
+            scale = 1.0
+        elif self.kind == "helmert2d":
+            # Only the plane is rotated and scaled, heights just get tz
+            angle = math.radians(self.rotation)
+            cos_scaled = self.scale * math.cos(angle)
+            sin_scaled = self.scale * math.sin(angle)
+            rotation = np.array([
+                [cos_scaled, -sin_scaled, 0.0],
+                [sin_scaled, cos_scaled, 0.0],
+                [0.0, 0.0, 1.0],
+            ])
+            scale = 1.0
+        else:
+            ax, ay, az = (math.radians(value) for value in (self.rx, self.ry, self.rz))
+            rot_x = np.array([[1, 0, 0], [0, math.cos(ax), -math.sin(ax)], [0, math.sin(ax), math.cos(ax)]])
+            rot_y = np.array([[math.cos(ay), 0, math.sin(ay)], [0, 1, 0], [-math.sin(ay), 0, math.cos(ay)]])
+            rot_z = np.array([[math.cos(az), -math.sin(az), 0], [math.sin(az), math.cos(az), 0], [0, 0, 1]])
+            rotation = rot_z @ rot_y @ rot_x
+            scale = self.scale
+        return scale * rotation, np.array([self.tx, self.ty, self.tz])
+
+    def apply(self, points):
+        """Transform an (n, 3) array of points."""
+        matrix, translation = self.matrix()
+        if self.kind == "offset":
+            return points + translation
+        return points @ matrix.T + translation
+
+
+def require_numpy():
+    if np is None:
+        raise TransformTableError("Station transforms need NumPy, which is not available")
+
+
+def _float(row, name, line_number, default):
+    value = (row.get(name) or "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise TransformTableError(f"Transform table line {line_number}: '{name}' is not a number: '{value}'")
+
+
+def parse_transform_table(text):
+    """Parse the table text into {file name: StationTransform}."""
+    lines = [line for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+    if not lines:
+        return {}
+    delimiter = max(";,\t", key=lines[0].count)
+    reader = csv.DictReader(io.StringIO("\n".join(lines)), delimiter=delimiter)
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+    if "file" not in reader.fieldnames:
+        raise TransformTableError("Transform table needs a 'file' column")
+
+    transforms = {}
+    for line_number, row in enumerate(reader, start=2):
+        name = (row.get("file") or "").strip()
+        if not name:
+            raise TransformTableError(f"Transform table line {line_number}: missing file name")
+        kind = (row.get("type") or "offset").strip().lower() or "offset"
+        if kind not in TRANSFORM_TYPES:
+            raise TransformTableError(
+                f"Transform table line {line_number}: unknown type '{kind}', use one of {', '.join(TRANSFORM_TYPES)}"
+            )
+        dims = (row.get("dims") or "3").strip() or "3"
+        if dims not in ("2", "3"):
+            raise TransformTableError(f"Transform table line {line_number}: 'dims' must be 2 or 3")
+        transforms[name] = StationTransform(
+            kind=kind,
+            dims=int(dims),
+            **{
+                field_name: _float(row, field_name, line_number, default)
+                for field_name, default in (("tx", 0.0), ("ty", 0.0), ("tz", 0.0), ("rotation", 0.0),
+                                            ("scale", 1.0), ("rx", 0.0), ("ry", 0.0), ("rz", 0.0))
+            },
+        )
+    return transforms
+
+
+def load_transform_table(path):
+    with open(path, 'r', encoding='utf-8-sig') as table_file:
+        return parse_transform_table(table_file.read())
+
+
+def find_transform(transforms, input_path):
+    """Look up the transform of an input file by name, also without .gz/.bz2/.zst."""
+    name = os.path.basename(input_path)
+    transform = transforms.get(name)
+    if transform is None:
+        transform = transforms.get(strip_compression_suffix(name))
+    return transform
+
+
+_coordinate_patterns = {}
+
+
+def coordinate_pattern(dims=3):
+    """Regex for a line ending in up to ``dims`` coordinates.
+
+    The lazy head keeps at least the line id and grows until the rest of the
+    line is only coordinates, each optionally preceded by an axis label.
+    Groups: head, label x, x, label y, y and, for 3 dims, label z, z.
+    """
+    if dims not in _coordinate_patterns:
+        label = r"( [XYZxyz])?"
+        pattern = rf"(\S+.*?){label} ({_NUMBER_PATTERN}){label} ({_NUMBER_PATTERN})"
+        if dims == 3:
+            pattern += rf"(?:{label} ({_NUMBER_PATTERN}))?"
+        _coordinate_patterns[dims] = re.compile(pattern + r"\Z")
+    return _coordinate_patterns[dims]
+
+
+def _format_like(value, token):
+    """Format a value with the decimal places of the token it replaces."""
+    text = f"{value:.{len(token.partition('.')[2])}f}"
+    # Rounding noise must not turn 0 into "-0.000"
+    if text[0] == "-" and not text.strip("-0."):
+        text = text[1:]
+    return text
+
+
+class CoordinateTransformer:
+    """Stage that transforms the coordinates of each block by its source file.
+
+    ``transforms`` maps the source index of a block to its StationTransform;
+    sources without an entry pass through unchanged. Finding the coordinates
+    is one regex match per line, the transform itself one NumPy operation
+    per block.
+    """
+
+    def __init__(self, transforms):
+        require_numpy()
+        self.transforms = transforms
+
+    def __call__(self, block):
+        transform = self.transforms.get(block.source)
+        if transform is None:
+            return block
+        lines = block.lines
+        matches = [(row, match) for row, match in enumerate(map(coordinate_pattern(transform.dims).match, lines))
+                   if match]
+        if not matches:
+            return block
+
+        # Groups: head, label x, x, label y, y[, label z, z]
+        coordinates = [(match[3], match[5], match.group(7) if transform.dims == 3 else None)
+                       for _, match in matches]
+        points = transform.apply(np.array([(x, y, z or "0") for x, y, z in coordinates], dtype=float))
+        for (row, match), (x, y, z), (new_x, new_y, new_z) in zip(matches, coordinates, points.tolist()):
+            parts = [match[1], match[2] or "", " ", _format_like(new_x, x),
+                     match[4] or "", " ", _format_like(new_y, y)]
+            if z is not None:
+                parts += [match[6] or "", " ", _format_like(new_z, z)]
+            lines[row] = "".join(parts)
+        return block
+
+
+def make_transform_stage(table_path, input_files, warnings=None):
+    """Build the transform stage for the given inputs, or None without a table.
+
+    Inputs that are not in the table are reported in ``warnings``.
+    """
+    if not table_path:
+        return None
+    require_numpy()
+    transforms = load_transform_table(table_path)
+    by_source = {}
+    for source, path in enumerate(input_files):
+        transform = find_transform(transforms, path)
+        if transform is None:
+            if warnings is not None:
+                warnings.append(f"No station transform for {os.path.basename(path)}, coordinates left as they are")
+        else:
+            by_source[source] = transform
+    return CoordinateTransformer(by_source) if by_source else None
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Files around a survey2gis run: the shapefiles it wrote, the GeoPackage
+they are merged into, styles, aliases and the cleanup afterwards.
+
+None of this needs QGIS or a widget; the dock and headless recipe runs
+(see recipe_runner) share it. Messages go to an optional ``log(message,
+level)`` callable.
+"""
+
+import configparser
+import fnmatch
+import os
+import re
+import shutil
+import struct
+from datetime import datetime
+
+
+# Shapefile side files removed together with the .shp
+SHAPEFILE_EXTENSIONS = ('.shp', '.shx', '.dbf', '.prj', '.cpg', '.sbn', '.sbx', '.shp.xml', '.qix', '.gva')
+
+_GEOMETRY_KEYWORDS = re.compile(r'(poly|point|line|labels)', re.IGNORECASE)
+
+
+def _no_log(message, level="info"):
+    pass
+
+
+def _output_pattern(basenames):
+    """Matches the file names survey2gis writes for ``basenames``, e.g. walls_poly.shp but not walls_b_poly.shp."""
+    names = "|".join(re.escape(basename) for basename in basenames)
+    return re.compile(rf'^(?:{names})_(poly|line|point|labels)\.', re.IGNORECASE)
+
+
+def scan_spatialfiles(directory):
+    """Shapefiles written by survey2gis below ``directory``: {'shp': {prefix: [paths]}}.
+
+    Files are grouped by the part of the name before the first underscore,
+    polygons first, then lines, points and labels.
+    """
+    grouped_files = {'shp': {}}
+    for root, dirs, files in os.walk(directory):
+        for file in fnmatch.filter(files, '*.shp'):
+            if not _GEOMETRY_KEYWORDS.search(file):
+                continue
+            file_lower = file.lower()
+            prefix = file.split('_', 1)[0]
+            groups = grouped_files['shp'].setdefault(prefix, {'polygon': [], 'line': [], 'point': [], 'labels': []})
+            file_path = os.path.join(root, file)
+            if 'poly' in file_lower:
+                groups['polygon'].append(file_path)
+            elif 'line' in file_lower:
+                groups['line'].append(file_path)
+            elif 'point' in file_lower:
+                groups['point'].append(file_path)
+            elif 'labels' in file_lower:
+                groups['labels'].append(file_path)
+
+    return {file_type: {prefix: groups['polygon'] + groups['line'] + groups['point'] + groups['labels']
+                        for prefix, groups in prefixes.items()}
+            for file_type, prefixes in grouped_files.items()}
+
+
+def basename_files(output_dir, basename, since=None):
+    """The shapefiles and side files survey2gis wrote for ``basename`` directly in ``output_dir``.
+
+    With ``since`` (a time.time() value) leftovers of earlier runs are left out.
+    """
+    pattern = _output_pattern([basename])
+    try:
+        names = sorted(os.listdir(output_dir))
+    except FileNotFoundError:
+        return []
+    files = []
+    for name in names:
+        path = os.path.join(output_dir, name)
+        if not pattern.match(name) or not name.lower().endswith(SHAPEFILE_EXTENSIONS) or not os.path.isfile(path):
+            continue
+        # Allow for file systems that store modification times in whole seconds
+        if since is not None and os.path.getmtime(path) < since - 2:
+            continue
+        files.append(path)
+    return files
+
+
+def dbf_record_count(path):
+    """Number of records in a .dbf file, read from its header; None if it is not readable."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(8)
+    except OSError:
+        return None
+    if len(header) < 8:
+        return None
+    return struct.unpack('<I', header[4:8])[0]
+
+
+def count_features(output_dir, basename):
+    """Features in the shapefiles written for ``basename``, summed over the geometry types."""
+    counts = [dbf_record_count(path) for path in basename_files(output_dir, basename)
+              if path.lower().endswith('.dbf')]
+    return sum(count for count in counts if count is not None)
+
+
+def filter_spatialfiles(data, basenames):
+    """Keep only the files of scan_spatialfiles() written for ``basenames``."""
+    pattern = _output_pattern(basenames) if basenames else None
+    result = {}
+    for file_type, groups in data.items():
+        result[file_type] = {}
+        for group, file_list in groups.items():
+            files = [path for path in file_list if pattern and pattern.match(os.path.basename(path))]
+            if files:
+                result[file_type][group] = files
+    return result
+
+
+def geopackage_path(output_dir, geopackage_name="", output_filename="", today=None):
+    """The GeoPackage of a run: the configured name, else the normalized file name, else a dated default."""
+    if geopackage_name:
+        return os.path.join(output_dir, f"{geopackage_name}.gpkg")
+    if output_filename:
+        return os.path.join(output_dir, f"{output_filename}.gpkg")
+    today = today or datetime.now()
+    return os.path.join(output_dir, f"s2g_merged_data_{today.strftime('%Y-%m-%d')}.gpkg")
+
+
+def load_alias_mapping(alias_file):
+    """Field name aliases from the [aliases] section of an .ini file; {} if there is none."""
+    if not alias_file or not os.path.exists(alias_file):
+        return {}
+    config = configparser.ConfigParser()
+    config.read(alias_file)
+    return dict(config['aliases']) if 'aliases' in config else {}
+
+
+def copy_styles(styles_folder, output_folder, log=_no_log):
+    """Copy the .qml files and the svg folder of ``styles_folder`` to ``output_folder``/qml.
+
+    Returns False if the styles folder does not exist or the qml folder
+    cannot be created.
+    """
+    if not styles_folder or not os.path.isdir(styles_folder):
+        log(f"Styles folder does not exist: {styles_folder}", "error")
+        return False
+
+    qml_output_folder = os.path.join(output_folder, "qml")
+    svg_output_folder = os.path.join(output_folder, "qml", "svg")
+    try:
+        os.makedirs(qml_output_folder, exist_ok=True)
+    except Exception as e:
+        log(f"Error creating QML folder: {e}", "error")
+        return False
+
+    qml_files = [f for f in os.listdir(styles_folder) if f.endswith(".qml")]
+    if not qml_files:
+        log("No QML files found in the styles folder.", "warning")
+    else:
+        try:
+            for qml_file in qml_files:
+                shutil.copy(os.path.join(styles_folder, qml_file), os.path.join(qml_output_folder, qml_file))
+            log(f"Successfully copied {len(qml_files)} QML file(s) to {qml_output_folder}", "info")
+        except Exception as e:
+            log(f"Error copying QML files: {e}", "error")
+
+    svg_source_folder = os.path.join(styles_folder, "svg")
+    if os.path.isdir(svg_source_folder):
+        try:
+            if os.path.exists(svg_output_folder):
+                shutil.rmtree(svg_output_folder)
+            shutil.copytree(svg_source_folder, svg_output_folder)
+            svg_files = sum(1 for f in os.listdir(svg_output_folder) if f.endswith(".svg"))
+            log(f"Successfully copied SVG folder with {svg_files} SVG file(s) to {svg_output_folder}", "info")
+        except Exception as e:
+            log(f"Error copying SVG folder: {e}", "error")
+    else:
+        log("No SVG folder found in the styles folder.", "info")
+    return True
+
+
+def delete_intermediate_files(data, log=_no_log):
+    """Delete the files of scan_spatialfiles(), shapefiles with all their side files."""
+    for file_type, groups in data.items():
+        for group, file_list in groups.items():
+            for file_path in file_list:
+                if file_path.lower().endswith('.shp'):
+                    base_path = os.path.splitext(file_path)[0]
+                    for extension in SHAPEFILE_EXTENSIONS:
+                        _delete_file(base_path + extension, log)
+                else:
+                    _delete_file(file_path, log)
+
+
+def _delete_file(file_path, log):
+    try:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            log(f"Deleted: {file_path}", "info")
+    except Exception as e:
+        log(f"Error deleting {file_path}: {str(e)}", "error")
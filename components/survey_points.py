@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming reader for the points of a normalized survey file.
+
+PointReader reads the coordinates at the end of every line (see
+station_transform.coordinate_pattern) together with the geometry tag and
+the object each point belongs to, and hands them out in blocks of NumPy
+arrays. A record with a tag after its id starts an object, the
+coordinate-only lines after it are its further vertices. The preflight
+checks (coordinate_outliers, input_stats) are built on it.
+"""
+
+import os
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .station_transform import coordinate_pattern
+
+
+# Points per block handed out by PointReader.blocks()
+DEFAULT_BLOCK_POINTS = 65536
+
+# Group of records without a known geometry tag
+NO_TAG = "-"
+
+
+class PointReader:
+    """Reads a normalized file once, block by block.
+
+    ``geom_tags`` are the geometry tags of the parser profile; the last of
+    them found in a record is its tag. Coordinates written with another
+    ``decimal_point`` or with a ``decimal_group`` are read as well. After
+    iterating blocks() ``line_count`` holds the number of lines and
+    ``canceled`` whether ``is_canceled`` stopped the read early.
+    """
+
+    def __init__(self, geom_tags=(), decimal_point=".", decimal_group=""):
+        self.geom_tags = set(geom_tags)
+        self.decimal_point = decimal_point
+        self.decimal_group = decimal_group
+        self.tag_codes = {NO_TAG: 0}
+        self.line_count = 0
+        self.object_count = 0
+        self.canceled = False
+
+    @property
+    def tag_names(self):
+        """Tag of every tag code, in code order."""
+        return sorted(self.tag_codes, key=self.tag_codes.get)
+
+    def blocks(self, path, progress_callback=None, is_canceled=None, block_points=DEFAULT_BLOCK_POINTS):
+        """Yield dicts of NumPy arrays: ``line`` (1-based), ``x``, ``y``, ``z``,
+        ``has_z``, ``object``, ``tag`` and ``starts`` (first point of an object).
+        """
+        match_line = coordinate_pattern(3).match
+        translate = self.decimal_point != "." or self.decimal_group
+        geom_tags = self.geom_tags
+        tag_codes = self.tag_codes
+        tag = 0
+        current_object = -1
+        columns = _new_columns()
+        size = max(os.path.getsize(path), 1)
+        with open(path, 'r', encoding='utf-8', errors='replace') as input_file:
+            for line_number, line in enumerate(input_file, start=1):
+                if line_number % 8192 == 0:
+                    if is_canceled is not None and is_canceled():
+                        self.canceled = True
+                        return
+                    if progress_callback is not None:
+                        progress_callback(100.0 * input_file.buffer.tell() / size)
+                self.line_count = line_number
+                line = line.strip()
+                if translate:
+                    if self.decimal_group:
+                        line = line.replace(self.decimal_group, "")
+                    line = line.replace(self.decimal_point, ".")
+                match = match_line(line)
+                if match is None:
+                    current_object = -1
+                    continue
+                record = match[1].split(" ")
+                starts = len(record) > 1 or current_object < 0
+                if starts:
+                    current_object = self.object_count
+                    self.object_count += 1
+                    found = [token for token in record[1:] if token in geom_tags]
+                    tag = tag_codes.setdefault(found[-1] if found else NO_TAG, len(tag_codes))
+                columns["line"].append(line_number)
+                columns["x"].append(float(match[3]))
+                columns["y"].append(float(match[5]))
+                columns["z"].append(float(match[7]) if match[7] is not None else 0.0)
+                columns["has_z"].append(match[7] is not None)
+                columns["object"].append(current_object)
+                columns["tag"].append(tag)
+                columns["starts"].append(starts)
+                if len(columns["line"]) >= block_points:
+                    yield _to_arrays(columns)
+                    columns = _new_columns()
+        if len(columns["line"]):
+            yield _to_arrays(columns)
+
+    def read(self, path, progress_callback=None, is_canceled=None):
+        """All points at once, in the layout of blocks(), or None when canceled."""
+        blocks = list(self.blocks(path, progress_callback, is_canceled))
+        if self.canceled:
+            return None
+        if not blocks:
+            return _to_arrays(_new_columns())
+        return {name: np.concatenate([block[name] for block in blocks]) for name in blocks[0]}
+
+
+def _new_columns():
+    return {
+        "line": array('q'), "x": array('d'), "y": array('d'), "z": array('d'), "has_z": array('b'),
+        "object": array('q'), "tag": array('q'), "starts": array('b'),
+    }
+
+
+def _to_arrays(columns):
+    points = {name: np.array(columns[name], dtype=np.float64) for name in ("x", "y", "z")}
+    for name in ("line", "object", "tag"):
+        points[name] = np.array(columns[name], dtype=np.int64)
+    for name in ("has_z", "starts"):
+        points[name] = np.array(columns[name], dtype=bool)
+    return points
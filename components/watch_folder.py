@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Change detection for the watch-folder mode.
+
+Sync clients write a new field file in several steps, and an event of
+QFileSystemWatcher only says that something in the folder changed. The
+FolderWatcher therefore waits until a burst of events is over and then
+compares two snapshots of the folder (name, size and modification time
+of every input file, read with one os.scandir() call). FolderState only
+reports a file once it looks the same in two snapshots in a row, so a
+file that is still being written is picked up on a later check instead of
+being normalized half-way.
+"""
+
+import os
+from dataclasses import dataclass, field
+
+from .normalize_pipeline import filter_input_files
+
+
+# Quiet time after the last change event before the folder is checked
+DEFAULT_DEBOUNCE_MS = 2000
+
+
+def scan_folder(directory, ignore=()):
+    """Snapshot of the input files in ``directory``: path -> (size, mtime in ns).
+
+    Hidden and temporary files (``.name``, ``~name``) and the paths in
+    ``ignore``, such as the normalized output, are left out.
+    """
+    ignore = {os.path.normcase(os.path.normpath(path)) for path in ignore}
+    candidates = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith(('.', '~')):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                # Removed while scanning
+                continue
+            candidates[os.path.normpath(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+    return {path: candidates[path] for path in filter_input_files(candidates)
+            if os.path.normcase(path) not in ignore}
+
+
+@dataclass
+class FolderChanges:
+    added: list = field(default_factory=list)
+    modified: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    # Files still being written, checked again later
+    pending: list = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.modified or self.removed)
+
+    def summary(self):
+        parts = [f"{len(files)} {label}" for label, files in
+                 (("new", self.added), ("changed", self.modified), ("removed", self.removed)) if files]
+        return ", ".join(parts) or "no changes"
+
+
+class FolderState:
+    """Remembers the last reported snapshot of a folder and reports stable changes."""
+
+    def __init__(self, directory, ignore=()):
+        self.directory = directory
+        self.ignore = tuple(ignore)
+        self.known = scan_folder(directory, self.ignore)
+        # The previous snapshot, to tell finished files from growing ones
+        self._last_seen = dict(self.known)
+
+    def check(self):
+        """Compare the folder with the known state; only stable files count as changed."""
+        current = scan_folder(self.directory, self.ignore)
+        changes = FolderChanges()
+        for path, signature in current.items():
+            if self.known.get(path) == signature:
+                continue
+            if self._last_seen.get(path) != signature:
+                changes.pending.append(path)
+                continue
+            (changes.modified if path in self.known else changes.added).append(path)
+            self.known[path] = signature
+        for path in sorted(set(self.known) - set(current)):
+            changes.removed.append(path)
+            del self.known[path]
+        self._last_seen = current
+        return changes
+
+
+def apply_changes(selected, changes):
+    """The input selection after ``changes``: new files are added, removed ones dropped."""
+    selected = filter_input_files(selected)
+    removed = set(changes.removed)
+    return filter_input_files([path for path in selected if path not in removed] +
+                              [path for path in changes.added if path not in selected])
@@ -140,6 +140,11 @@ class S2gDataProcessor:
             self.settings.remove('')
             self.settings.endGroup()
 
+            # Clean up settings profiles
+            self.settings.beginGroup('s2g_profiles')
+            self.settings.remove('')
+            self.settings.endGroup()
+
             # Force settings to be written to disk
             self.settings.sync()
 
@@ -2,7 +2,6 @@ import os
 import platform
 import logging
 from qgis.PyQt import QtWidgets, uic, QtCore, QtGui
-from dataclasses import dataclass, field
 from osgeo import ogr
 from qgis.gui import QgsMessageBar
 from qgis.core import Qgis
@@ -19,36 +18,8 @@ from .components.DataNormalizer import DataNormalizer
 from .components.DataProcessor import DataProcessor
 from .components.LogTab import LogTab
 from .components import binary_utils
+from .components.command_options import CommandOptions
 
-@dataclass
-class CommandOptions:
-    parser_path: str = ""
-    label_mode: str = ""
-    output_directory: str = ""
-    output_base_name: str = ""
-    additional_options: dict = field(default_factory=dict)
-    flag_options: dict = field(default_factory=dict)
-
-    def to_command_list(self) -> list:
-        command = []
-        if self.parser_path:
-            command.extend(["-p", os.path.normpath(self.parser_path)])
-        if self.label_mode:
-            command.append(f"--label-mode-line={self.label_mode}")
-        if self.output_directory:
-            command.extend(["-o", os.path.normpath(self.output_directory)])
-        if self.output_base_name:
-            command.extend(["-n", self.output_base_name])
-
-        for key, value in self.additional_options.items():
-            if value:
-                command.append(f"{key}={value}")
-
-        for flag, is_set in self.flag_options.items():
-            if is_set:
-                command.append(flag)
-
-        return command
 
 class S2gDataProcessorDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
     closingPlugin = QtCore.pyqtSignal()
@@ -78,6 +49,7 @@ class S2gDataProcessorDockWidget(QtWidgets.QDockWidget, FORM_CLASS):
         self.command_options = CommandOptions()
 
     def closeEvent(self, event):
+        self.data_normalizer.flush_settings()
         self.closingPlugin.emit()
         event.accept()
 
@@ -0,0 +1,39 @@
+import os
+
+from ..components.command_options import CommandList, ParsedCommand
+
+
+WALLS = '"/bin/survey2gis" -p "/p/parser.ini" -o "/out" -n walls --proj-out=epsg:25832 -S "pit 2" -c "/data/a.txt"'
+FINDS = '"/bin/survey2gis" -o "/out" -n finds -l "/logs/finds.log" "/data/b.txt"'
+
+
+def test_parsed_command():
+    command = ParsedCommand.parse(WALLS)
+    assert command.binary == "/bin/survey2gis"
+    assert (command.output_directory, command.name, command.input_file) == ("/out", "walls", "/data/a.txt")
+    assert command.proj_out == 25832
+    assert command.selections == ["pit 2"] and command.flags == ["-c"]
+    assert command.parts[-1] == "/data/a.txt" and not command.log_file
+    finds = ParsedCommand.parse(FINDS)
+    assert finds.log_file == "/logs/finds.log" and finds.proj_out is None
+
+def test_command_list_parses_changed_lines_only():
+    commands = CommandList()
+    first = commands.update(f"{WALLS}\n\n  {FINDS}  \n")
+    assert [command.name for command in first] == ["walls", "finds"]
+    walls = first[0]
+    assert commands.update(f"{WALLS}\n\n  {FINDS}  \n") is first
+    changed = commands.update(f"{WALLS}\n{FINDS.replace('finds', 'pits')}")
+    assert changed[0] is walls
+    assert [command.name for command in changed] == ["walls", "pits"]
+    assert commands.by_name("finds") == []
+
+def test_command_list_lookups():
+    commands = CommandList([ParsedCommand.parse(WALLS), ParsedCommand.parse(FINDS)])
+    assert len(commands) == 2
+    assert [command.name for command in commands.for_inputs([os.path.join("/data", "b.txt")])] == ["finds"]
+    assert commands.layer_epsg("walls") == 25832
+    # Layers of a command that wrote several geometry types keep the suffix
+    assert commands.layer_epsg("walls_poly") == 25832
+    assert commands.layer_epsg("finds") is None
+    assert commands.layer_epsg("other") is None
@@ -0,0 +1,68 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ..components.coordinate_outliers import find_outliers, robust_scores, write_outlier_report
+from ..components.normalize_pipeline import NormalizeOptions, normalize_files
+
+
+def _survey(points, tag="@"):
+    """A polygon record followed by coordinate-only vertices."""
+    lines = [f"1 1_wall {tag} X {points[0][0]:.3f} Y {points[0][1]:.3f} Z {points[0][2]:.3f}"]
+    lines += [f"{n} {x:.3f} {y:.3f} {z:.3f}" for n, (x, y, z) in enumerate(points[1:], start=2)]
+    return "\n".join(lines) + "\n"
+
+def _ring(count, x0=3513030.0, y0=5279870.0):
+    return [(x0 + (n % 7) * 0.5, y0 + (n % 5) * 0.4, 399.5 + (n % 3) * 0.1) for n in range(count)]
+
+def test_robust_scores_per_group():
+    """Test that groups are scored separately and small groups not at all."""
+    values = np.array([10.0, 10.1, 9.9, 10.0, 10.2, 99.0, 500.0, 501.0, 499.0, 500.5, 500.0, 1.0])
+    groups = np.array([0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 1, 2])
+    scores, medians = robust_scores(values, groups)
+    assert np.flatnonzero(scores > 3.5).tolist() == [5]
+    assert medians[0] == 10.05 and medians[6] == 500.0
+    assert scores[11] == 0
+
+def test_constant_column_falls_back_to_mean_deviation():
+    """Test that a MAD of 0 (mostly equal values) still finds the odd one."""
+    scores, _ = robust_scores(np.array([400.0] * 9 + [4000.0]), np.zeros(10, dtype=int))
+    assert np.flatnonzero(scores > 3.5).tolist() == [9]
+
+def test_missing_digit(tmpdir):
+    """Test that a dropped digit is found on its axis and by the centroid check."""
+    points = _ring(40)
+    points[17] = (351303.1, points[17][1], points[17][2])
+    survey = tmpdir.join("survey.txt")
+    survey.write("66 Limits of area\n" + _survey(points))
+    report = find_outliers(str(survey), geom_tags=("@", "$", "."))
+    assert report.points == 40
+    assert {(outlier.line_number, outlier.check) for outlier in report.outliers} == {(19, "X"), (19, "centroid")}
+    assert report.outliers[0].group == "@"
+
+    report_path = tmpdir.join("outliers.txt")
+    write_outlier_report(report, str(report_path))
+    assert report_path.read().startswith("2 coordinate outlier(s) in 1 line(s) of 40 point(s)")
+
+def test_decimal_comma(tmpdir):
+    """Test coordinates written with the decimal point of the Process tab."""
+    points = _ring(20)
+    points[3] = (points[3][0], points[3][1], 3995.0)
+    survey = tmpdir.join("survey.txt")
+    survey.write(_survey(points).replace(".", ","))
+    report = find_outliers(str(survey), decimal_point=",")
+    assert [(outlier.line_number, outlier.check) for outlier in report.outliers] == [(4, "Z"), (4, "centroid")]
+
+def test_groups_by_input_file(tmpdir):
+    """Test that the line index keeps stations at different places apart."""
+    station_a = tmpdir.join("a.txt")
+    station_a.write(_survey(_ring(20)))
+    station_b = tmpdir.join("b.txt")
+    station_b.write(_survey(_ring(8, x0=3600000.0, y0=5300000.0)))
+    output = str(tmpdir.join("output.txt"))
+    normalize_files([str(station_a), str(station_b)], output, NormalizeOptions(write_index=True))
+
+    assert find_outliers(output, geom_tags=("@",)).outlier_count == 0
+    # Without the index both stations form one group and b looks far off
+    tmpdir.join("output.txt.idx").remove()
+    assert find_outliers(output, geom_tags=("@",)).outlier_count > 0
@@ -58,49 +58,22 @@ def test_run_normalize_missing_fields(data_normalizer, mock_parent_widget):
     )
 
 def test_run_normalize_success(data_normalizer, mock_parent_widget):
-    """Test the successful run of run_normalize."""
-    with patch.object(data_normalizer, '_concatenate_files'), \
-         patch.object(data_normalizer, '_clean_file_content'), \
-         patch.object(data_normalizer, '_copy_qml_files'), \
-         patch.object(data_normalizer, '_replace_geotag_symbols'), \
-         patch.object(data_normalizer, '_fix_line_numbering'), \
-         patch.object(data_normalizer, '_add_columns_after_line_number'):
-
-        # Check that all processing steps are called correctly
+    """Test that run_normalize hands the pipeline to the QGIS task manager."""
+    with patch(f'{DataNormalizer.__module__}.NormalizeTask') as normalize_task, \
+         patch(f'{DataNormalizer.__module__}.QgsApplication') as qgs_application, \
+         patch.object(data_normalizer, '_get_input_files', return_value=['input.txt']):
+
         data_normalizer.run_normalize()
-        data_normalizer._concatenate_files.assert_called_once()
-        data_normalizer._clean_file_content.assert_called_once()
+        normalize_task.assert_called_once()
+        qgs_application.taskManager().addTask.assert_called_once_with(normalize_task.return_value)
+
+def test_normalize_finished_copies_styles(data_normalizer, mock_parent_widget):
+    """Test that a finished task copies styles and fills the process input."""
+    task = MagicMock(output_file_path="/fake/output/dir/out.txt", error=None)
+    with patch.object(data_normalizer, '_copy_qml_files'):
+        data_normalizer._handle_normalize_finished(task, True)
         data_normalizer._copy_qml_files.assert_called()
-        data_normalizer._replace_geotag_symbols.assert_called()
-        data_normalizer._fix_line_numbering.assert_called()
-        data_normalizer._add_columns_after_line_number.assert_called()
-
-def test_concatenate_files(data_normalizer, mock_parent_widget, tmpdir):
-    """Test concatenating multiple input files."""
-    # Create temp files in the temp directory
-    input_file1 = tmpdir.join("file1.txt")
-    input_file1.write("Line 1\nLine 2\n")
-    input_file2 = tmpdir.join("file2.txt")
-    input_file2.write("Line 3\n")
-
-    mock_parent_widget.input_select.text.return_value = f"{input_file1}; {input_file2}"
-    mock_parent_widget.output_select_input.text.return_value = str(tmpdir)
-    mock_parent_widget.CONCAT_OUTPUT_NAME = "output.txt"
-
-    data_normalizer._concatenate_files()
-
-    # Check output file
-    output_file = tmpdir.join("output.txt")
-    assert output_file.read() == "Line 1\nLine 2\nLine 3\n"
-
-def test_clean_file_content(data_normalizer, tmpdir):
-    """Test cleaning file content to remove extra spaces and empty lines."""
-    input_file = tmpdir.join("uncleaned.txt")
-    input_file.write("  Line 1   \n\nLine    2\n  ")
-    data_normalizer._clean_file_content(str(input_file))
-
-    # Check cleaned content
-    assert input_file.read() == "Line 1\nLine 2\n"
+    mock_parent_widget.process_input_file_input.setText.assert_called_once_with("/fake/output/dir/out.txt")
 
 def test_copy_qml_files(data_normalizer, mock_parent_widget, tmpdir):
     """Test copying .qml files from styles directory to output directory."""
@@ -118,15 +91,3 @@ def test_copy_qml_files(data_normalizer, mock_parent_widget, tmpdir):
     # Verify files are copied
     assert output_dir.join("qml").join("style1.qml").check(file=True)
     assert output_dir.join("qml").join("style2.qml").check(file=True)
-
-def test_replace_geotag_symbols(data_normalizer, mock_parent_widget, tmpdir):
-    """Test replacing '&' with '$' in a file."""
-    output_file = tmpdir.join("concatenated_output.txt")
-    output_file.write("Sample & text\nAnother & line\n")
-
-    mock_parent_widget.output_select_input.text.return_value = str(tmpdir)
-    mock_parent_widget.CONCAT_OUTPUT_NAME = "concatenated_output.txt"
-
-    data_normalizer._replace_geotag_symbols()
-
-    assert output_file.read() == "Sample $ text\nAnother $ line\n"
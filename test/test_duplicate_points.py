@@ -0,0 +1,79 @@
+import random
+
+from ..components.duplicate_points import DuplicateDetector, duplicates_path_for
+from ..components.normalize_pipeline import LineBlock, NormalizeOptions, normalize_files
+from ..components.provenance import ProvenanceIndex, index_path_for
+
+
+def _detect(lines, tolerance=0.0, drop=False, tmpdir=None, block_size=3):
+    report = str(tmpdir.join("report.tsv"))
+    detector = DuplicateDetector(tolerance, drop, ["a.txt"], report)
+    kept = []
+    for start in range(0, len(lines), block_size):
+        kept.extend(detector(LineBlock(0, lines[start:start + block_size])).lines)
+    detector.close()
+    with open(report, encoding='utf-8') as report_file:
+        rows = [row.rstrip("\n").split("\t") for row in report_file][1:]
+    return kept, rows, detector
+
+def test_exact_duplicates(tmpdir):
+    """Test that a point shot twice is reported with both ids and lines."""
+    lines = ["1 find . 10.0 20.0 1.0", "2 find . 11 20 1", "3 find . 10 20 1.00"]
+    kept, rows, detector = _detect(lines, tmpdir=tmpdir)
+    assert kept == lines
+    assert detector.duplicates == detector.exact == 1
+    assert rows == [["3", "3", "a.txt", "10", "20", "1.00", "exact", "0", "1", "1", "a.txt", "kept"]]
+
+def test_near_duplicates_match_brute_force(tmpdir):
+    """Test the spatial hash against a pairwise check on random points."""
+    rng = random.Random(7)
+    points = [(rng.uniform(0, 5), rng.uniform(0, 5), 0.0) for _ in range(400)]
+    lines = [f"{n} p{n} . {x:.4f} {y:.4f} {z:.1f}" for n, (x, y, z) in enumerate(points, start=1)]
+    parsed = [(float(x), float(y)) for *_, x, y, _ in (line.split() for line in lines)]
+    tolerance = 0.05
+    expected = 0
+    for index, (x, y) in enumerate(parsed):
+        if any((x - other_x) ** 2 + (y - other_y) ** 2 <= tolerance ** 2 for other_x, other_y in parsed[:index]):
+            expected += 1
+    _, rows, detector = _detect(lines, tolerance, tmpdir=tmpdir, block_size=64)
+    assert expected > 0
+    assert detector.duplicates == len(rows) == expected
+    assert all(float(row[7]) <= tolerance for row in rows)
+
+def test_geometries_are_kept(tmpdir):
+    """Test that closing and shared vertices are kept, repeated ones dropped."""
+    lines = [
+        "1 wall @ 0 0", "2 1 0", "3 1 1", "4 1 1", "5 0 0",
+        "6 pit @ 1 0", "7 2 0", "8 2 1",
+        "9 wall @ 0 0", "10 1 0", "11 1 1",
+        "12 Limits of area",
+    ]
+    kept, rows, detector = _detect(lines, drop=True, tmpdir=tmpdir)
+    assert kept == ["1 wall @ 0 0", "2 1 0", "3 1 1", "5 0 0", "6 pit @ 1 0", "7 2 0", "8 2 1", "12 Limits of area"]
+    assert [(row[1], row[8], row[11]) for row in rows] == [
+        ("4", "3", "dropped"), ("6", "2", "kept"), ("9", "1", "dropped"),
+    ]
+    assert detector.dropped == 4
+
+def test_duplicates_in_pipeline(tmpdir):
+    """Test dropping across files with renumbering and the line index."""
+    station_a = tmpdir.join("a.txt")
+    station_a.write("10 find . 1.000 2.000\n11 find . 3 4\n")
+    station_b = tmpdir.join("b.txt")
+    station_b.write("20 find . 1.001 2.000\n21 find . 5 6\n")
+    output = str(tmpdir.join("output.txt"))
+    options = NormalizeOptions(fix_lines=True, write_index=True, find_duplicates=True,
+                               duplicate_tolerance=0.01, drop_duplicates=True, workers=2)
+    stats = normalize_files([str(station_a), str(station_b)], output, options)
+
+    with open(output, encoding='utf-8') as output_file:
+        assert output_file.read() == "1 find . 1.000 2.000\n2 find . 3 4\n3 find . 5 6\n"
+    assert stats.warnings[0].startswith("Found 1 duplicate point(s): 0 exact, 1 within 0.01; 1 line(s) dropped")
+    with ProvenanceIndex(index_path_for(output)) as index:
+        assert index.lookup(3).line_number == 2
+    assert tmpdir.join("output.txt.duplicates.tsv").check()
+
+    # Without the check the old report is removed
+    stats = normalize_files([str(station_a), str(station_b)], output, NormalizeOptions())
+    assert not tmpdir.join("output.txt.duplicates.tsv").check()
+    assert duplicates_path_for(output) == str(tmpdir.join("output.txt.duplicates.tsv"))
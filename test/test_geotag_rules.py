@@ -0,0 +1,45 @@
+import pytest
+
+from ..components.geotag_rules import GeotagRuleSet, parse_rules, rules_from_search_replace
+
+
+def test_legacy_fields_replace_token_by_token():
+    """Test that the classic search/replace fields map token to token."""
+    rule_set = GeotagRuleSet(rules_from_search_replace("@ $", "$ @"))
+    # Both tokens are swapped in one pass, a replaced text is not matched again
+    assert rule_set.apply("1 @ $ x") == "1 $ @ x"
+
+def test_legacy_fields_empty_replace_deletes():
+    """Test that an empty replace text deletes the search string."""
+    rule_set = GeotagRuleSet(rules_from_search_replace("ab", ""))
+    assert rule_set.apply("xaby") == "xy"
+
+def test_chars_rule_uses_translate_table():
+    """Test that single character rules compile to a translate table."""
+    rule_set = GeotagRuleSet(parse_rules("chars .$@ PLA"))
+    assert rule_set._table is not None
+    assert rule_set.apply_lines(["1 . 2", "3 $@ 4"]) == ["1 P 2", "3 LA 4"]
+
+def test_regex_rule_with_group_reference():
+    """Test that regex rules expand group references and stay per line."""
+    rule_set = GeotagRuleSet(parse_rules("# ids\nregex ^(\\d+)_ \\1-\nliteral @ $"))
+    assert rule_set.apply_lines(["12_a @", "b_c"]) == ["12-a $", "b_c"]
+
+def test_first_rule_wins():
+    """Test that at a given position the first matching rule wins."""
+    rule_set = GeotagRuleSet(parse_rules("literal ab X\nliteral a Y"))
+    assert rule_set.apply("aab") == "YX"
+
+@pytest.mark.parametrize("text", ["literal", "unknown a b", "chars ab x", "regex ( x",
+                                  "regex (a) \\2", "regex (a) \\g<x>"])
+def test_invalid_rules(text):
+    """Test that malformed rules are reported with their line number."""
+    with pytest.raises(ValueError, match="Rule line 1"):
+        parse_rules(text)
+
+def test_regex_backreference_with_literal_rules():
+    """Test that numbered backreferences in a regex rule keep their meaning next to literal rules."""
+    rule_set = GeotagRuleSet(parse_rules("literal @ $\nregex (\\d)\\1 X"))
+    assert rule_set.apply("a 11 @ 22 12") == "a X $ X 12"
+    assert rule_set.apply_lines(["11 @", "1", "1"]) == ["X $", "1", "1"]
+    assert GeotagRuleSet(parse_rules("regex (\\d)\\1 X")).apply("112") == "X2"
@@ -0,0 +1,58 @@
+import os
+
+from ..components.input_files import InputResolver, glob_regex, is_plain_file_list, split_glob
+
+
+def _tree(tmpdir):
+    """dig/{day1.dat, day2.txt, notes.pdf, north/day3.dat, north/old/day0.dat, south/day4.dat.gz}"""
+    dig = tmpdir.mkdir("dig")
+    for name in ("day1.dat", "day2.txt", "notes.pdf"):
+        dig.join(name).write("1 1_wall @ X 1.0 Y 2.0 Z 3.0\n")
+    north = dig.mkdir("north")
+    north.join("day3.dat").write("x\n")
+    north.mkdir("old").join("day0.dat").write("x\n")
+    dig.mkdir("south").join("day4.dat.gz").write("x\n")
+    return dig
+
+def _names(resolved):
+    return [os.path.basename(path) for path in resolved.paths]
+
+def test_glob_regex():
+    assert glob_regex("**/day*.dat").match("a/b/day1.dat")
+    assert glob_regex("**/day*.dat").match("day1.dat")
+    assert not glob_regex("*.dat").match("a/day1.dat")
+    assert glob_regex("day[0-2].dat").match("day2.dat")
+    assert not glob_regex("day[!0-2].dat").match("day2.dat")
+    assert split_glob("/dig/**/x.dat") == (os.path.normpath("/dig"), "**/x.dat")
+
+def test_directory_glob_and_excludes(tmpdir):
+    """Test recursive directories, glob patterns and both kinds of exclude patterns."""
+    dig = _tree(tmpdir)
+    resolver = InputResolver(workers=4)
+    assert _names(resolver.resolve(str(dig))) == ["day1.dat", "day2.txt", "day3.dat", "day0.dat", "day4.dat.gz"]
+    assert _names(resolver.resolve(f"{dig}; !old")) == ["day1.dat", "day2.txt", "day3.dat", "day4.dat.gz"]
+    assert _names(resolver.resolve(f"{dig}/*.dat")) == ["day1.dat"]
+    assert _names(resolver.resolve(f"{dig}/**/day?.dat")) == ["day1.dat", "day3.dat", "day0.dat"]
+    assert _names(resolver.resolve(f"{dig}/**/*.dat; !{dig}/north/**")) == ["day1.dat"]
+
+def test_files_and_missing(tmpdir):
+    dig = _tree(tmpdir)
+    resolved = InputResolver().resolve(f"{dig.join('day2.txt')}; {dig.join('day1.dat')}; {dig.join('gone.dat')}")
+    assert _names(resolved) == ["day1.dat", "day2.txt"]
+    assert resolved.missing == [str(dig.join("gone.dat"))]
+    assert resolved.entries[0].size == 29
+    assert is_plain_file_list([str(dig.join("day1.dat"))])
+    assert not is_plain_file_list([str(dig)])
+
+def test_cache_follows_directory_changes(tmpdir):
+    """Test that an unchanged tree comes from the cache and a new file is found."""
+    dig = _tree(tmpdir)
+    resolver = InputResolver()
+    text = f"{dig}; !old"
+    assert not resolver.resolve(text).cached
+    assert resolver.resolve(text).cached
+    dig.join("north", "day5.dat").write("x\n")
+    resolved = resolver.resolve(text)
+    assert not resolved.cached and "day5.dat" in _names(resolved)
+    os.remove(str(dig.join("north", "day5.dat")))
+    assert "day5.dat" not in _names(resolver.resolve(text))
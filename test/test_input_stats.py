@@ -0,0 +1,65 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ..components.input_stats import add_run, collect_input_stats, estimate_runtime, guess_crs, runtime_message
+
+
+SURVEY = """\
+1 1_wall @ X 3513030.000 Y 5279870.000 Z 399.500
+2 3513031.000 5279871.000 399.600
+3 3513032.000 5279870.000 399.700
+4 2_wall @ X 3513040.000 Y 5279880.000 Z 400.100
+5 3513041.000 5279881.000 400.200
+6 3_find . X 3513035.500 Y 5279875.500
+7 4_find . X 3513036.500 Y 5279876.500 Z 398.900
+8 5_line $ X 3513050.000 Y 5279890.000 Z 401.000
+9 3513051.000 5279891.000 401.000
+"""
+
+def test_counts_and_extent(tmpdir):
+    """Test line, point and object counts per geometry kind, extent and z range."""
+    survey = tmpdir.join("survey.txt")
+    survey.write("66 Limits of area\n" + SURVEY)
+    stats = collect_input_stats(str(survey), {"point": ".", "line": "$", "poly": "@"})
+    assert (stats.lines, stats.points, stats.points_with_z) == (10, 9, 8)
+    assert stats.objects == {"@": 2, ".": 2, "$": 1}
+    assert stats.object_summary() == "2 poly (@), 2 point (.), 1 line ($)"
+    assert stats.extent == (3513030.0, 5279870.0, 3513051.0, 5279891.0)
+    assert stats.z_range == (398.9, 401.0)
+    assert stats.crs_guess.epsg == 31467
+    assert len(stats.summary_lines()) == 5
+
+def test_decimal_comma_and_no_profile(tmpdir):
+    """Test coordinates with a decimal comma, counted without geometry kinds."""
+    survey = tmpdir.join("survey.txt")
+    survey.write(SURVEY.replace(".000", ",000").replace(".500", ",500").replace(".100", ",100")
+                 .replace(".200", ",200").replace(".600", ",600").replace(".700", ",700").replace(".900", ",900"))
+    stats = collect_input_stats(str(survey), decimal_point=",")
+    assert stats.points == 9
+    assert sum(stats.objects.values()) == 5
+    assert stats.extent[0] == 3513030.0
+
+@pytest.mark.parametrize("extent, epsg, label", [
+    ((3513030.0, 5279870.0, 3513051.0, 5279891.0), 31467, "zone 3"),
+    ((32512000.0, 5400000.0, 32513000.0, 5401000.0), 4647, "UTM zone 32N"),
+    ((11.5, 48.1, 11.6, 48.2), 4326, "WGS 84"),
+    ((1000.0, 2000.0, 1100.0, 2100.0), None, "site grid"),
+    ((5279870.0, 513030.0, 5279891.0, 513051.0), None, "swapped"),
+])
+def test_guess_crs(extent, epsg, label):
+    guess = guess_crs(extent)
+    assert guess.epsg == epsg
+    assert label in guess.label
+
+def test_runtime_estimate():
+    """Test the median throughput of past runs and the bounded history."""
+    assert estimate_runtime([], 1000) is None
+    assert "unknown" in runtime_message([], 1000)
+    history = []
+    for size, seconds in ((1000, 1.0), (4000, 2.0), (9000, 3.0), (0, 1.0)):
+        history = add_run(history, size, seconds)
+    assert len(history) == 3
+    seconds, throughput = estimate_runtime(history, 6000)
+    assert throughput == 2000 and seconds == 3.0
+    assert len(add_run(history, 10, 1.0, keep=2)) == 2
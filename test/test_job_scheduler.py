@@ -0,0 +1,148 @@
+import os
+
+from ..components.command_options import ParsedCommand
+from ..components.job_scheduler import (CACHED, COMMAND, DONE, FAILED, GEOPACKAGE, QUEUED, RUNNING, SKIPPED,
+                                        CommandJob, JobScheduler, default_parallel_runs, plan_jobs)
+
+
+def _scheduler(count, max_parallel, stop_on_error=True):
+    return JobScheduler([CommandJob(index, f"cmd {index}", name=f"n{index}") for index in range(count)],
+                        max_parallel, stop_on_error)
+
+def _command(output_dir, name, input_file="/data/input.txt", extra=""):
+    return ParsedCommand.parse(f'"/bin/survey2gis" -p "/p/parser.ini" -o "{output_dir}" -n {name}{extra} "{input_file}"')
+
+def test_pool_keeps_max_parallel_jobs_running():
+    scheduler = _scheduler(5, 2)
+    first = scheduler.take_ready()
+    assert [job.index for job in first] == [0, 1]
+    assert scheduler.take_ready() == []
+    scheduler.finish(first[1], True)
+    assert [job.index for job in scheduler.take_ready()] == [2]
+    for job in list(scheduler.running):
+        scheduler.finish(job, True)
+    assert [job.index for job in scheduler.take_ready()] == [3, 4]
+    assert not scheduler.is_finished
+    for job in list(scheduler.running):
+        scheduler.finish(job, True)
+    assert scheduler.is_finished and len(scheduler.succeeded) == 5 and not scheduler.failed
+
+def test_sequential_mode():
+    scheduler = _scheduler(3, 1)
+    order = []
+    while not scheduler.is_finished:
+        (job,) = scheduler.take_ready()
+        order.append(job.index)
+        scheduler.finish(job, True)
+    assert order == [0, 1, 2]
+
+def test_failure_stops_scheduler():
+    """Test that a failed job starts no further jobs and running ones can be canceled."""
+    scheduler = _scheduler(4, 2)
+    failing, other = scheduler.take_ready()
+    scheduler.finish(failing, False)
+    assert scheduler.stopped and [job.index for job in scheduler.skipped] == [2, 3]
+    assert scheduler.take_ready() == []
+    other.canceled = True
+    scheduler.finish(other, False)
+    assert scheduler.is_finished
+    assert scheduler.failed == [failing]
+    assert not scheduler.finish(other, True)
+
+def test_failure_without_stop_on_error():
+    scheduler = _scheduler(3, 3, stop_on_error=False)
+    jobs = scheduler.take_ready()
+    scheduler.finish(jobs[0], False)
+    assert not scheduler.stopped
+    for job in jobs[1:]:
+        scheduler.finish(job, True)
+    assert scheduler.is_finished and [job.label for job in scheduler.failed] == ["1 (n0)"]
+
+def test_plan_parses_commands(tmpdir):
+    out = str(tmpdir.join("out"))
+    logs = str(tmpdir.join("out", "logs"))
+    walls, finds = plan_jobs([_command(out, "walls"), _command(out, "finds", extra=' -l "/tmp/finds.log"')], logs)
+    assert (walls.kind, walls.name, walls.output_dir, walls.input_file) == (COMMAND, "walls", out, "/data/input.txt")
+    assert walls.parts[-2:] == ["-l", os.path.join(logs, "walls.log")]
+    assert finds.log_file == "/tmp/finds.log" and finds.parts.count("-l") == 1
+    assert not walls.after and not finds.after and not finds.needs
+
+def test_conflicting_writers_run_in_order(tmpdir):
+    """Test that commands writing the same -o and -n never run together, and other commands do."""
+    out, other = str(tmpdir.join("out")), str(tmpdir.join("other"))
+    jobs = plan_jobs([_command(out, "walls", "/a.txt"), _command(out, "finds"), _command(out, "walls", "/b.txt"),
+                      _command(other, "walls")], str(tmpdir.join("logs")))
+    assert jobs[2].after == {0}
+    assert not jobs[1].after
+    # Other output folder, but the same log file logs/walls.log
+    assert jobs[3].after == {2}
+    scheduler = JobScheduler(jobs, max_parallel=4, stop_on_error=False)
+    assert [job.index for job in scheduler.take_ready()] == [0, 1]
+    scheduler.finish(jobs[0], True)
+    assert scheduler.take_ready() == [jobs[2]]
+    scheduler.finish(jobs[2], False)
+    # Ordering only: a failed predecessor does not skip the next writer
+    assert scheduler.take_ready() == [jobs[3]]
+
+def test_geopackage_job_runs_once_its_shapefiles_exist(tmpdir):
+    """Test that a basename is converted once its writers are done, before the other commands finish."""
+    out = str(tmpdir.join("out"))
+    gpkg = str(tmpdir.join("out", "site.gpkg"))
+    jobs = plan_jobs([_command(out, "walls"), _command(out, "finds"), _command(out, "walls", "/b.txt")],
+                     str(tmpdir.join("logs")), gpkg)
+    walls_gpkg, finds_gpkg = jobs[3:]
+    assert (walls_gpkg.kind, walls_gpkg.name, walls_gpkg.label) == (GEOPACKAGE, "walls", "GeoPackage walls")
+    assert walls_gpkg.needs == {0, 2} and finds_gpkg.needs == {1}
+    # Both write the GeoPackage: not at the same time, but in any order
+    assert not finds_gpkg.after and finds_gpkg.locks == walls_gpkg.locks
+
+    scheduler = JobScheduler(jobs, max_parallel=2)
+    assert scheduler.take_ready() == [jobs[0], jobs[1]]
+    scheduler.finish(jobs[1], True)
+    # GeoPackage jobs take no process slot
+    assert scheduler.take_ready() == [finds_gpkg]
+    scheduler.finish(jobs[0], True)
+    assert scheduler.take_ready() == [jobs[2]]
+    scheduler.finish(jobs[2], True)
+    # Waits for the lock held by the finds GeoPackage job
+    assert scheduler.take_ready() == []
+    scheduler.finish(finds_gpkg, True)
+    assert scheduler.take_ready() == [walls_gpkg]
+
+def test_failed_writer_skips_geopackage_job(tmpdir):
+    out = str(tmpdir.join("out"))
+    jobs = plan_jobs([_command(out, "walls"), _command(out, "finds")], str(tmpdir.join("logs")),
+                     str(tmpdir.join("site.gpkg")))
+    scheduler = JobScheduler(jobs, max_parallel=2, stop_on_error=False)
+    scheduler.take_ready()
+    scheduler.finish(jobs[0], False)
+    scheduler.finish(jobs[1], True)
+    # The walls layer is not converted, the finds layer is
+    assert scheduler.take_ready() == [jobs[3]]
+    assert scheduler.skipped == [jobs[2]]
+    scheduler.finish(jobs[3], True)
+    assert scheduler.is_finished
+
+def test_default_parallel_runs():
+    assert default_parallel_runs() >= 1
+
+def test_job_states_and_summary():
+    """Test the states shown in the job table and the progress line with throughput."""
+    scheduler = _scheduler(4, 2)
+    jobs = scheduler.jobs
+    for index, job in enumerate(jobs):
+        job.input_bytes = 1024 * 1024 * (index + 1)
+    assert {job.state for job in jobs} == {QUEUED}
+    assert scheduler.summary() == "0/4 command(s) finished"
+    scheduler.take_ready()
+    assert [job.state for job in jobs] == [RUNNING, RUNNING, QUEUED, QUEUED]
+    jobs[0].cached = True
+    scheduler.finish(jobs[0], True)
+    assert scheduler.take_ready() == [jobs[2]]
+    scheduler.finish(jobs[2], False)
+    scheduler.finish(jobs[1], True)
+    assert [job.state for job in jobs] == [CACHED, DONE, FAILED, SKIPPED]
+    start = min(job.started_at for job in jobs[:3])
+    # 3 commands and 3 MB of input in 60 s
+    assert scheduler.summary(now=start + 60) == \
+        "3/4 command(s) finished, 1 cached, 1 failed, 1 skipped, 3.0 commands/min, 0.05 MB/s input"
@@ -0,0 +1,57 @@
+import pytest
+
+from ..components.kway_merge import KeyMerger, make_merge_key
+from ..components.normalize_pipeline import NormalizeOptions, normalize_files
+from ..components.provenance import ProvenanceIndex, index_path_for
+
+
+def _merge(sources, run_lines=100, column=1, numeric=True, tmpdir=None):
+    merger = KeyMerger(make_merge_key(column, numeric), run_lines, str(tmpdir) if tmpdir else None)
+    try:
+        for source, lines in enumerate(sources):
+            merger.add(source, lines)
+            merger.finish_source()
+        return [(line, source) for _, line, source, _, _ in merger.iter_entries()], merger.spilled_runs
+    finally:
+        merger.close()
+
+def test_interleave_sorted_files():
+    """Test that sorted inputs are interleaved, ties in file order."""
+    merged, spilled = _merge([["1 a", "3 a", "5 a"], ["2 b", "3 b", "10 b"]])
+    assert merged == [("1 a", 0), ("2 b", 1), ("3 a", 0), ("3 b", 1), ("5 a", 0), ("10 b", 1)]
+    assert spilled == 0
+
+def test_lines_without_key_stay_with_their_record():
+    """Test that coordinate-only lines keep the key of the line before."""
+    merged, _ = _merge([["x", "4 wall $", "1.5", "2.5"], ["2 pit ."]], column=2, numeric=False)
+    assert [line for line, _ in merged] == ["x", "2 pit .", "4 wall $", "1.5", "2.5"]
+
+def test_spilled_runs_match_in_memory_sort(tmpdir):
+    """Test that unsorted inputs larger than the run size are sorted stably."""
+    sources = [[f"{(n * 7919) % 50} s{source} {n}" for n in range(200)] for source in range(3)]
+    merged, spilled = _merge(sources, run_lines=16, tmpdir=tmpdir)
+    assert spilled > 0
+    assert tmpdir.listdir() == []
+    expected = sorted(((line, source) for source, lines in enumerate(sources) for line in lines),
+                      key=lambda entry: int(entry[0].split()[0]))
+    assert merged == expected
+
+def test_invalid_column():
+    """Test that the key column is 1-based."""
+    with pytest.raises(ValueError):
+        make_merge_key(0)
+
+def test_merge_in_pipeline(tmpdir):
+    """Test merge mode with renumbering and the line index."""
+    station_a = tmpdir.join("a.txt")
+    station_a.write("10 A @ 1\n30 A $ 3\n")
+    station_b = tmpdir.join("b.txt")
+    station_b.write("\n20 B @ 2\n")
+    output = str(tmpdir.join("output.txt"))
+    options = NormalizeOptions(fix_lines=True, merge_column=1, write_index=True, workers=2)
+    normalize_files([str(station_a), str(station_b)], output, options)
+    assert tmpdir.join("output.txt").read() == "1 A @ 1\n2 B @ 2\n3 A $ 3\n"
+    with ProvenanceIndex(index_path_for(output)) as index:
+        assert [(index.lookup(n).path, index.lookup(n).line_number) for n in (1, 2, 3)] == [
+            (str(station_a), 1), (str(station_b), 2), (str(station_a), 2)
+        ]
@@ -0,0 +1,40 @@
+import pytest
+
+from ..components.line_index import LineOffsetIndex
+
+
+def _index(tmpdir, content, stride=3):
+    path = tmpdir.join("normalized.txt")
+    path.write_binary(content)
+    return LineOffsetIndex(str(path), stride=stride).build()
+
+def test_lines_across_checkpoints(tmpdir):
+    """Test reading lines before, at and after the checkpoints."""
+    lines = [f"{number} A @ {number}.5" for number in range(1, 11)]
+    with _index(tmpdir, "\n".join(lines).encode() + b"\n") as index:
+        assert len(index) == 10
+        assert [index.line(number) for number in range(10)] == lines
+        assert index.line_offset(4) == len("\n".join(lines[:4])) + 1
+        with pytest.raises(IndexError):
+            index.line(10)
+
+def test_line_endings_and_last_line(tmpdir):
+    """Test CRLF line endings and a last line without a newline."""
+    with _index(tmpdir, b"a\r\nb\r\n\r\nc") as index:
+        assert [index.line(number) for number in range(len(index))] == ["a", "b", "", "c"]
+
+def test_empty_file(tmpdir):
+    """Test that an empty file has no lines and finds nothing."""
+    with _index(tmpdir, b"") as index:
+        assert len(index) == 0
+        assert index.find("a") == -1
+
+def test_find(tmpdir):
+    """Test searching forward from a line, with and without case."""
+    with _index(tmpdir, b"1 wall\n2 Pit\n3 wall\n4 pit\n", stride=2) as index:
+        assert index.find("wall") == 0
+        assert index.find("wall", 1) == 2
+        assert index.find("pit") == 1
+        assert index.find("pit", case_sensitive=True) == 3
+        assert index.find("pit", 4) == -1
+        assert index.line_at_offset(index.line_offset(3) + 2) == 3
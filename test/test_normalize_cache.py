@@ -0,0 +1,59 @@
+import os
+
+from ..components.normalize_cache import FragmentCache
+from ..components.normalize_pipeline import NormalizeOptions, normalize_files
+
+
+def _write_inputs(tmpdir, contents):
+    input_files = []
+    for index, content in enumerate(contents, start=1):
+        input_file = tmpdir.join(f"day{index}.dat")
+        input_file.write(content)
+        input_files.append(str(input_file))
+    return input_files
+
+def test_rerun_only_normalizes_changed_files(tmpdir):
+    """Test that unchanged inputs are served from the cache."""
+    cache = FragmentCache(str(tmpdir.mkdir("cache")))
+    input_files = _write_inputs(tmpdir, ["1 a\n2 b\n", "3 c\n"])
+    output = str(tmpdir.join("output.txt"))
+    options = NormalizeOptions(fix_lines=True, cols_after_id="x_")
+
+    first = normalize_files(input_files, output, options, cache=cache)
+    assert first.cached_files == 0
+    expected = open(output).read()
+
+    second = normalize_files(input_files, output, options, cache=cache)
+    assert second.cached_files == 2
+    assert open(output).read() == expected
+
+    tmpdir.join("day3.dat").write("4 d\n")
+    third = normalize_files(input_files + [str(tmpdir.join("day3.dat"))], output, options, cache=cache)
+    assert third.cached_files == 2
+    assert open(output).read() == expected + "4 x_d\n"
+
+def test_options_are_part_of_the_key(tmpdir):
+    """Test that changing the normalize options misses the cache."""
+    cache = FragmentCache(str(tmpdir.mkdir("cache")))
+    input_files = _write_inputs(tmpdir, ["1 a\n"])
+    output = str(tmpdir.join("output.txt"))
+
+    normalize_files(input_files, output, NormalizeOptions(), cache=cache)
+    stats = normalize_files(input_files, output, NormalizeOptions(fix_lines=True), cache=cache)
+    assert stats.cached_files == 0
+
+def test_eviction_and_clear(tmpdir):
+    """Test LRU eviction and explicit invalidation."""
+    cache_dir = tmpdir.mkdir("cache")
+    cache = FragmentCache(str(cache_dir), max_bytes=0)
+    input_files = _write_inputs(tmpdir, ["1 a\n", "2 b\n"])
+    normalize_files(input_files, str(tmpdir.join("output.txt")), NormalizeOptions(), cache=cache)
+    assert cache.manifest["entries"] == {}
+
+    cache.max_bytes = 1024
+    normalize_files(input_files, str(tmpdir.join("output.txt")), NormalizeOptions(), cache=cache)
+    assert len(cache.manifest["entries"]) == 2
+
+    cache.clear()
+    assert not [name for name in os.listdir(str(cache_dir)) if name.endswith(".frag")]
+    assert FragmentCache(str(cache_dir)).manifest["entries"] == {}
@@ -0,0 +1,137 @@
+import bz2
+import gzip
+
+import pytest
+
+from ..components.normalize_pipeline import (
+    NormalizeOptions, filter_input_files, iter_line_chunks, normalize_files, sniff_encoding
+)
+
+
+def _normalize(tmpdir, contents, **options):
+    """Write the given input files, normalize them and return the output."""
+    input_files = []
+    for index, content in enumerate(contents, start=1):
+        input_file = tmpdir.join(f"file{index}.txt")
+        input_file.write(content)
+        input_files.append(str(input_file))
+
+    output_file = tmpdir.join("output.txt")
+    normalize_files(input_files, str(output_file), NormalizeOptions(**options))
+    return output_file.read()
+
+def test_concatenate_files(tmpdir):
+    """Test concatenating multiple input files."""
+    assert _normalize(tmpdir, ["Line 1\nLine 2\n", "Line 3\n"]) == "Line 1\nLine 2\nLine 3\n"
+
+def test_concatenate_files_without_trailing_newline(tmpdir):
+    """Test that a missing final newline does not glue two files together."""
+    assert _normalize(tmpdir, ["Line 1", "Line 2"]) == "Line 1\nLine 2\n"
+
+def test_no_valid_input_files(tmpdir):
+    """Test that only .txt and .dat files are accepted."""
+    with pytest.raises(FileNotFoundError):
+        normalize_files(["input.csv"], str(tmpdir.join("output.txt")), NormalizeOptions())
+
+def test_clean_file_content(tmpdir):
+    """Test cleaning file content to remove extra spaces and empty lines."""
+    assert _normalize(tmpdir, ["  Line 1   \n\nLine    2\n  "]) == "Line 1\nLine 2\n"
+
+def test_replace_geotag_symbols(tmpdir):
+    """Test replacing '&' with '$'."""
+    output = _normalize(tmpdir, ["Sample & text\nAnother & line\n"],
+                        replace_geotags=True, search="&", replace="$")
+    assert output == "Sample $ text\nAnother $ line\n"
+
+def test_fix_line_numbering(tmpdir):
+    """Test that ids are renumbered across file boundaries."""
+    output = _normalize(tmpdir, ["7 a\n9 b\n", "3 c\nx\n"], fix_lines=True)
+    assert output == "1 a\n2 b\n3 c\nx\n"
+
+def test_add_columns_after_line_number(tmpdir):
+    """Test inserting columns after the line number."""
+    output = _normalize(tmpdir, ["1 a b\nx y\n"], cols_after_id="c1 ")
+    assert output == "1 c1 a b\nx y\n"
+
+def test_small_blocks_match_default(tmpdir):
+    """Test that the block size does not change the result."""
+    content = ["5 A @ 1\n6 B $ 2\n", "\n7 C . 3\n"]
+    options = dict(replace_geotags=True, search="@ $", replace="$ @",
+                   fix_lines=True, cols_after_id="x_")
+    assert (_normalize(tmpdir, content, block_size=1, **options) ==
+            _normalize(tmpdir, content, **options))
+
+def test_parallel_matches_sequential(tmpdir):
+    """Test that the process pool mode gives the same output as one process."""
+    content = ["5 A @ 1\n6 B\n", "  \n9 C . 3\n12\n", "x y z\n"]
+    options = dict(replace_geotags=True, search="@", replace="$",
+                   fix_lines=True, cols_after_id="x_")
+    assert (_normalize(tmpdir, content, workers=2, **options) ==
+            _normalize(tmpdir, content, **options))
+
+def test_geotag_rules(tmpdir):
+    """Test that rules from the rule editor are applied with the search/replace fields."""
+    output = _normalize(tmpdir, ["1 a @ .\n"], replace_geotags=True, search="@", replace="$",
+                        geotag_rules="chars . P")
+    assert output == "1 a $ P\n"
+
+def test_sniff_encoding():
+    """Test that UTF-8, cp1252 and latin-1 samples are told apart."""
+    assert sniff_encoding(b"1 a b\n") == "utf-8"
+    assert sniff_encoding("1 Mauer \u00e4\n".encode("utf-8")) == "utf-8"
+    assert sniff_encoding(b"\xef\xbb\xbf1 a\n") == "utf-8-sig"
+    assert sniff_encoding("1 \u00e4 \u20ac\n".encode("cp1252")) == "cp1252"
+    assert sniff_encoding(b"1 a\x81b\n") == "latin-1"
+    # A multibyte sequence cut off by the sample size is not a decode error
+    assert sniff_encoding("\u00e4".encode("utf-8")[:1]) == "utf-8"
+
+def test_cp1252_input(tmpdir):
+    """Test that cp1252 input is transcoded to UTF-8 output."""
+    input_file = tmpdir.join("field.txt")
+    input_file.write_binary("1  Mauer \u00e4\r\n2 \u20ac\r\n".encode("cp1252"))
+    output_file = tmpdir.join("output.txt")
+    stats = normalize_files([str(input_file)], str(output_file), NormalizeOptions())
+    assert output_file.read_binary().decode("utf-8") == "1 Mauer \u00e4\n2 \u20ac\n"
+    assert "field.txt (cp1252)" in stats.encoding_message()
+
+def test_forced_utf8_rejects_cp1252(tmpdir):
+    """Test that a forced encoding is not second-guessed."""
+    input_file = tmpdir.join("field.txt")
+    input_file.write_binary("1 \u00e4\n".encode("cp1252"))
+    with pytest.raises(UnicodeDecodeError):
+        normalize_files([str(input_file)], str(tmpdir.join("output.txt")), NormalizeOptions(encoding="utf-8"))
+    assert not tmpdir.join("output.txt").exists()
+
+def test_line_chunks_keep_crlf_together(tmpdir):
+    """Test that a \\r\\n split between two reads is one line end."""
+    input_file = tmpdir.join("field.txt")
+    input_file.write_binary(b"ab\r\ncd\ref")
+    with open(str(input_file), "rb") as f:
+        chunks = [chunk for chunk, _ in iter_line_chunks(f, chunk_size=3)]
+    assert b"".join(chunks) == b"ab\r\ncd\ref"
+    assert all(chunk.endswith((b"\n", b"\r")) for chunk in chunks[:-1])
+    assert not any(chunk.startswith(b"\n") for chunk in chunks)
+
+def test_filter_compressed_inputs():
+    """Test that compressed inputs count by their inner extension."""
+    assert filter_input_files(["b.dat.gz", "a.txt", "c.csv.gz", "d.bz2", "e.txt.zst"]) == [
+        "a.txt", "b.dat.gz", "e.txt.zst"
+    ]
+
+def test_compressed_inputs(tmpdir):
+    """Test that gzip and bzip2 inputs are read like the plain file."""
+    content = "\ufeff5 A @ 1\r\n\r\n6 B  $ 2\n".encode("utf-8")
+    plain = tmpdir.join("a.txt")
+    plain.write_binary(content)
+    gz_file = tmpdir.join("b.txt.gz")
+    gz_file.write_binary(gzip.compress(content))
+    bz2_file = tmpdir.join("c.dat.bz2")
+    bz2_file.write_binary(bz2.compress(content))
+    # Detected from the magic bytes, not the extension
+    disguised = tmpdir.join("d.dat")
+    disguised.write_binary(gzip.compress(content))
+
+    output_file = tmpdir.join("output.txt")
+    options = NormalizeOptions(fix_lines=True, write_index=True)
+    normalize_files([str(plain), str(gz_file), str(bz2_file), str(disguised)], str(output_file), options)
+    assert output_file.read() == "".join(f"{n} A @ 1\n{n + 1} B $ 2\n" for n in (1, 3, 5, 7))
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from ..components.parser_profile import (
+    ParserProfileError, ProfileValidator, load_parser_profile, validate_file
+)
+
+DEMO_DATA = os.path.join(os.path.dirname(__file__), '..', 'demo_data')
+
+MIN_PROFILE = """
+[Parser]
+tagging_mode = min
+tag_field = TAG
+key_field = ID
+key_unique = Yes
+geom_tag_point = "."
+geom_tag_line = "$"
+geom_tag_poly = "@"
+coor_x = X
+coor_y = Y
+comment_mark = #
+
+[Field]
+name = IDX
+type = integer
+persistent = Yes
+unique = Yes
+separator = space
+
+[Field]
+name = ID
+type = integer
+empty_allowed = No
+separator = _
+
+[Field]
+name = TYPE
+type = text
+empty_allowed = No
+separator = space
+
+[Field]
+name = TAG
+type = text
+separator = space
+
+[Field]
+name = X
+type = double
+separator = space
+
+[Field]
+name = Y
+type = double
+"""
+
+
+def _validate(tmpdir, profile_text, lines):
+    profile_file = tmpdir.join("parser.txt")
+    profile_file.write(profile_text)
+    validator = ProfileValidator(load_parser_profile(str(profile_file)))
+    for line_number, line in enumerate(lines, start=1):
+        validator.check_line(line_number, line)
+    return [str(issue) for issue in validator.finish().issues]
+
+def test_load_demo_profile():
+    """Test reading the demo parser description."""
+    profile = load_parser_profile(os.path.join(DEMO_DATA, 'parser_desc_min.txt'))
+    assert profile.tagging_mode == "min"
+    assert profile.geom_tags == {"point": ".", "line": "$", "poly": "@"}
+    # CONST1 is a pseudo field with a constant value
+    assert [spec.name for spec in profile.input_fields][:3] == ["IDX", "LEVEL", "TYPE"]
+
+def test_demo_data_duplicate_index():
+    """Test that duplicate values of a unique field are reported."""
+    profile = load_parser_profile(os.path.join(DEMO_DATA, 'parser_desc_min.txt'))
+    report = validate_file(os.path.join(DEMO_DATA, 'sample_data_min.dat.txt'), profile)
+    assert "line 32 [IDX]: value '70' must be unique, already used in line 12" in map(str, report.issues)
+
+def test_valid_min_mode_geometries(tmpdir):
+    """Test that complete records followed by coordinate records pass."""
+    lines = ["# comment", "1 7_wall $ 1.0 2.0", "2 1.5 2.5", "3 8_find . 4 5"]
+    assert _validate(tmpdir, MIN_PROFILE, lines) == []
+
+def test_field_errors(tmpdir):
+    """Test field count, type and empty value checks."""
+    lines = ["1 x_wall . 1.0 2.0", "2 _wall . 1.0 2.0", "3 9_wall", "4 10_wall . 1.0 2.0 3.0"]
+    assert _validate(tmpdir, MIN_PROFILE, lines) == [
+        "line 1 [ID]: 'x' is not a valid integer",
+        "line 2 [ID]: empty value is not allowed",
+        "line 3: expected 6 fields, the separators for some are missing",
+        "line 4 [Y]: more fields than the profile defines: '2.0 3.0'",
+    ]
+
+def test_geometry_checks(tmpdir):
+    """Test geometry tags, vertex counts and key uniqueness."""
+    lines = ["1 1_wall ? 1 2", "2 2_wall @ 1 2", "3 1 2", "4 2_pit . 1 2", "5 1 2"]
+    assert _validate(tmpdir, MIN_PROFILE, lines) == [
+        "line 1 [TAG]: unknown geometry tag '?'",
+        "line 2: poly geometry has 2 vertex(es), needs at least 3",
+        "line 4 [ID]: key '2' already used by the geometry in line 2",
+        "line 5: coordinates without a preceding line or polygon record",
+    ]
+
+def test_invalid_profile(tmpdir):
+    """Test that unusable parser descriptions are rejected."""
+    profile_file = tmpdir.join("parser.txt")
+    profile_file.write("[Parser]\ntagging_mode = none\n[Field]\nname = A\n[Field]\nname = B\n")
+    with pytest.raises(ParserProfileError, match="needs a separator"):
+        load_parser_profile(str(profile_file))
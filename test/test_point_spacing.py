@@ -0,0 +1,72 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ..components.point_spacing import (consecutive_spacing, grid_nearest, nearest_distances, nice_value,
+                                        suggest_spacing, suggest_tolerance)
+
+
+def _brute_force(xy):
+    distances = np.sqrt(((xy[:, None] - xy[None]) ** 2).sum(axis=-1))
+    np.fill_diagonal(distances, np.inf)
+    return distances.min(axis=1)
+
+def _walls(count, seed=1):
+    """Vertices about 0.5 apart plus every 20th point measured twice, 2 mm off."""
+    rng = np.random.default_rng(seed)
+    walk = np.cumsum(rng.normal(0, 0.35, (count, 2)), axis=0) + (3513000.0, 5279800.0)
+    repeated = walk[::20] + rng.normal(0, 0.002, (len(walk[::20]), 2))
+    return np.concatenate((walk, repeated))
+
+def test_nice_value():
+    assert [nice_value(v) for v in (0.0071, 0.0199, 0.3, 12.0, 1.0)] == [0.005, 0.01, 0.2, 10.0, 1.0]
+
+def test_grid_matches_brute_force():
+    """Test that the grid is exact up to its cell size and reports the rest as inf."""
+    xy = np.random.default_rng(0).uniform(0, 50, (1500, 2))
+    cell = consecutive_spacing(xy) / 10
+    distances = grid_nearest(xy, cell)
+    expected = _brute_force(xy)
+    close = expected <= cell
+    assert np.allclose(distances[close], expected[close])
+    assert np.isinf(distances[~close]).all()
+
+def test_grid_sample_and_duplicates():
+    xy = np.concatenate((_walls(3000), [[3513000.0, 5279800.0]] * 3))
+    queries = np.arange(0, len(xy), 7)
+    distances = grid_nearest(xy, consecutive_spacing(xy), queries)
+    found = np.isfinite(distances)
+    assert np.allclose(distances[found], _brute_force(xy)[queries][found])
+    assert (grid_nearest(xy, 1.0, np.array([len(xy) - 1])) == 0).all()
+
+def test_kdtree_matches_grid():
+    pytest.importorskip("scipy")
+    xy = _walls(4000)
+    kdtree, _ = nearest_distances(xy, use_kdtree=True)
+    grid, unresolved = nearest_distances(xy, use_kdtree=False)
+    assert unresolved == 0 or np.isfinite(grid).all()
+    assert np.allclose(np.sort(kdtree)[:len(grid)], np.sort(grid))
+
+def test_tolerance_in_gap():
+    """Test that the tolerance falls between repeated measurements and distinct vertices."""
+    distances, _ = nearest_distances(_walls(20000), use_kdtree=False)
+    tolerance = suggest_tolerance(distances)
+    assert tolerance.confidence in ("high", "medium")
+    assert 0.002 <= tolerance.value <= 0.02
+    # Evenly spread points have no gap
+    assert suggest_tolerance(np.random.default_rng(0).uniform(0.1, 1.0, 500)).confidence == "low"
+    assert suggest_tolerance(np.ones(5)) is None
+
+def test_suggest_spacing(tmpdir):
+    """Test the suggestions for a file with polygons and loose points."""
+    xy = _walls(2000)
+    lines = [f"1 1_wall @ X {xy[0, 0]:.4f} Y {xy[0, 1]:.4f} Z 399.500"]
+    lines += [f"{n} {x:.4f} {y:.4f} 399.500" for n, (x, y) in enumerate(xy[1:], start=2)]
+    lines += [f"{n} {n}_find . X {3513000.0 + n:.4f} Y 5279800.000" for n in range(len(xy) + 1, len(xy) + 40)]
+    survey = tmpdir.join("survey.txt")
+    survey.write("\n".join(lines) + "\n")
+    report = suggest_spacing(str(survey), {"point": ".", "line": "$", "poly": "@"}, use_kdtree=False)
+    assert report.points == len(xy) + 39
+    assert [histogram.name for histogram in report.histograms] == ["poly (@)", "point (.)"]
+    assert 0 < report.tolerance.value < report.snapping.value < 0.25
+    assert report.summary_lines()[-1].startswith(f"--snapping {report.snapping.text()}")
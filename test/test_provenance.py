@@ -0,0 +1,80 @@
+import gzip
+import os
+
+import pytest
+
+from ..components.normalize_cache import FragmentCache
+from ..components.normalize_pipeline import NormalizeOptions, normalize_files
+from ..components.provenance import ProvenanceIndex, index_path_for
+
+
+def _write_inputs(tmpdir, contents):
+    input_files = []
+    for index, content in enumerate(contents, start=1):
+        input_file = tmpdir.join(f"file{index}.txt")
+        input_file.write_binary(content)
+        input_files.append(str(input_file))
+    return input_files
+
+def _index_entries(output_file):
+    with ProvenanceIndex(index_path_for(output_file)) as index:
+        return [index.read_raw_line(line_number) for line_number in range(1, len(index) + 1)]
+
+def test_raw_lines_and_offsets(tmpdir):
+    """Test that every normalized line points at its raw line."""
+    input_files = _write_inputs(tmpdir, [b"\xef\xbb\xbf1 a\r\n\r\n  2   b\r\n", b"", b"3 c\r4 d"])
+    output = str(tmpdir.join("output.txt"))
+    normalize_files(input_files, output, NormalizeOptions(write_index=True))
+
+    entries = _index_entries(output)
+    assert [(os.path.basename(p.path), p.line_number, p.offset, raw) for p, raw in entries] == [
+        ("file1.txt", 1, 3, b"1 a"),
+        ("file1.txt", 3, 10, b"  2   b"),
+        ("file3.txt", 1, 0, b"3 c"),
+        ("file3.txt", 2, 4, b"4 d"),
+    ]
+
+def test_lookup_outside_the_file(tmpdir):
+    """Test that line numbers outside the normalized file are rejected."""
+    input_files = _write_inputs(tmpdir, [b"1 a\n"])
+    output = str(tmpdir.join("output.txt"))
+    normalize_files(input_files, output, NormalizeOptions(write_index=True))
+    with ProvenanceIndex(index_path_for(output)) as index:
+        with pytest.raises(IndexError):
+            index.lookup(2)
+
+@pytest.mark.parametrize("workers, use_cache", [(2, False), (1, True), (2, True)])
+def test_fragments_match_sequential(tmpdir, workers, use_cache):
+    """Test that the index is the same with worker processes and the cache."""
+    input_files = _write_inputs(tmpdir, [b"1 a\n\n2 b\n", b"\n\n", b"3 c\n4 d\n"])
+    expected_output = str(tmpdir.join("expected.txt"))
+    normalize_files(input_files, expected_output, NormalizeOptions(write_index=True))
+
+    output = str(tmpdir.join("output.txt"))
+    cache = FragmentCache(str(tmpdir.join("cache"))) if use_cache else None
+    options = NormalizeOptions(write_index=True, workers=workers)
+    normalize_files(input_files, output, options, cache=cache)
+    if cache is not None:
+        # The second run merges the cached fragment indexes
+        assert normalize_files(input_files, output, options, cache=cache).cached_files == 3
+    assert _index_entries(output) == _index_entries(expected_output)
+
+def test_stale_index_is_removed(tmpdir):
+    """Test that a run without the index drops the one from an earlier run."""
+    input_files = _write_inputs(tmpdir, [b"1 a\n"])
+    output = str(tmpdir.join("output.txt"))
+    normalize_files(input_files, output, NormalizeOptions(write_index=True))
+    assert os.path.exists(index_path_for(output))
+    normalize_files(input_files, output, NormalizeOptions())
+    assert not os.path.exists(index_path_for(output))
+
+def test_raw_line_of_compressed_input(tmpdir):
+    """Test that offsets into compressed inputs count decompressed bytes."""
+    input_file = tmpdir.join("field.dat.gz")
+    input_file.write_binary(gzip.compress(b"1 a\n\n2 b\n"))
+    output = str(tmpdir.join("output.txt"))
+    normalize_files([str(input_file)], output, NormalizeOptions(write_index=True))
+    with ProvenanceIndex(index_path_for(output)) as index:
+        provenance, raw = index.read_raw_line(2)
+        assert (provenance.line_number, provenance.offset, raw) == (3, 5, b"2 b")
+        assert index.read_raw_line(1)[1] == b"1 a"
@@ -0,0 +1,150 @@
+import os
+import stat
+import sys
+
+import pytest
+
+from ..components.command_options import CommandOptions, build_command, command_arguments, epsg_from_proj
+from ..components.normalize_pipeline import NormalizeOptions
+from ..components.recipe import (Recipe, RecipeCommand, RecipeError, dumps, load_recipe, loads,
+                                 recipe_from_dict, save_recipe)
+from ..components.recipe_runner import RecipeFailed, run_recipe
+
+
+def _recipe(base):
+    options = CommandOptions(parser_path=os.path.join(base, "parser", "standard.ini"), output_base_name="walls",
+                             additional_options={"--topology": "full", "--proj-out": "epsg:25832"},
+                             flag_options={"-c": True}, selections=["wall"])
+    return Recipe(name="Campaign", inputs=[os.path.join(base, "raw", "**", "*.dat"), "!backup"],
+                  output_directory=os.path.join(base, "out"), output_filename="campaign",
+                  normalize=NormalizeOptions(fix_lines=True, search=".", replace="PLA", duplicate_tolerance=0.01),
+                  epsg="25832", commands=[RecipeCommand(options)], stop_on_error=False)
+
+@pytest.mark.parametrize("name", ["recipe.json", "recipe.toml"])
+def test_save_and_load_round_trip(tmpdir, name):
+    """Test that a saved recipe loads back unchanged, with paths stored relative to the recipe."""
+    base = str(tmpdir)
+    recipe = _recipe(base)
+    path = os.path.join(base, name)
+    save_recipe(recipe, path)
+    text = open(path, encoding="utf-8").read()
+    assert base not in text
+    assert "raw/**/*.dat" in text
+
+    loaded = load_recipe(path)
+    assert loaded == recipe
+    assert loaded.normalized_file == os.path.join(base, "out", "campaign.txt")
+    assert loaded.command_input(loaded.commands[0]) == loaded.normalized_file
+
+def test_toml_example():
+    text = '''
+name = "Campaign 2024"
+inputs = ["raw/*.dat"]
+output_directory = "out"
+epsg = 25832
+
+[normalize]
+fix_lines = true
+duplicate_tolerance = 1
+
+[[commands]]
+parser = "parser.ini"
+name = "walls"
+flags = ["-c"]
+
+[commands.options]
+"--topology" = "full"
+
+[[commands]]
+name = "finds"
+input = "/data/finds.txt"
+output_directory = "/data/shp"
+'''
+    recipe = loads(text, "toml", "/campaign")
+    assert recipe.epsg == "25832"
+    assert recipe.normalize.fix_lines and recipe.normalize.duplicate_tolerance == 1.0
+    walls, finds = recipe.commands
+    assert walls.options.parser_path == os.path.normpath("/campaign/parser.ini")
+    assert walls.options.additional_options == {"--topology": "full"}
+    assert recipe.command_output_directory(walls) == os.path.normpath("/campaign/out")
+    assert recipe.command_input(finds) == "/data/finds.txt"
+
+@pytest.mark.parametrize("data, message", [
+    ({"normalise": {}}, "Unknown recipe key: normalise"),
+    ({"normalize": {"fix_line": True}}, "Unknown normalize option: fix_line"),
+    ({"normalize": {"fix_lines": "yes"}}, "normalize.fix_lines must be of type bool"),
+    ({"normalize": {"workers": True}}, "normalize.workers must be of type int"),
+    ({"commands": [{"parser": "p.ini"}]}, "needs a name"),
+    ({"commands": [{"name": "a", "flag": ["-c"]}]}, "Unknown key in commands[0]: flag"),
+])
+def test_invalid_recipes(data, message):
+    with pytest.raises(RecipeError, match=message.replace("[", r"\[").replace("]", r"\]")):
+        recipe_from_dict(data)
+
+def test_invalid_json():
+    with pytest.raises(RecipeError, match="Invalid JSON"):
+        loads("{", "json")
+
+def test_command_options_from_arguments():
+    """Test that a command line from the command field reads back into the same options."""
+    options = CommandOptions(parser_path="/p/parser.ini", label_mode="center", output_directory="/out",
+                             output_base_name="walls", additional_options={"--tolerance": "0.01"},
+                             flag_options={"-c": True}, selections=["wall", "pit 2"])
+    command = build_command("/bin/survey2gis", options, "/data/input file.txt")
+    assert command[0] == '"/bin/survey2gis"'
+    assert '"pit 2"' in command
+
+    parsed, input_file = CommandOptions.from_arguments(command[1:] + ["-l", "/out/logs/walls.log"])
+    assert input_file == ""
+    parsed, input_file = CommandOptions.from_arguments(command[1:])
+    assert input_file == "/data/input file.txt"
+    assert parsed.parser_path == os.path.normpath("/p/parser.ini")
+    assert parsed.output_directory == os.path.normpath("/out")
+    assert (parsed.label_mode, parsed.output_base_name) == ("center", "walls")
+    assert parsed.additional_options == {"--tolerance": "0.01"}
+    assert parsed.flag_options == {"-c": True}
+    assert parsed.selections == ["wall", "pit 2"]
+    assert command_arguments("/bin/survey2gis", parsed, input_file)[-1] == "/data/input file.txt"
+
+def test_epsg_from_proj():
+    assert epsg_from_proj("epsg:25832") == 25832
+    assert epsg_from_proj("31468") == 31468
+    assert epsg_from_proj("+proj=utm") is None
+    assert epsg_from_proj(None) is None
+
+def test_run_recipe_normalize_only(tmpdir):
+    """Test that a recipe without commands only normalizes, headless."""
+    raw = tmpdir.mkdir("raw")
+    raw.join("day1.dat").write("1 1_wall @ X 1.0 Y 2.0 Z 3.0\n")
+    raw.join("day2.dat").write("2 2_wall @ X 4.0 Y 5.0 Z 6.0\n")
+    recipe = Recipe(inputs=[str(raw)], output_directory=str(tmpdir.join("out")), output_filename="merged")
+    messages = []
+    result = run_recipe(recipe, log=lambda message, level: messages.append((level, message)))
+    assert result.ok and result.normalized_file == str(tmpdir.join("out", "merged.txt"))
+    assert len(open(result.normalized_file).read().splitlines()) == 2
+    assert not result.geopackage
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses a shell script as survey2gis")
+def test_run_recipe_stops_on_failed_command(tmpdir):
+    """Test that a failed survey2gis command is reported through its log and stops the recipe."""
+    binary = tmpdir.join("survey2gis")
+    # Writes an ERROR into the file given with -l
+    binary.write('#!/bin/sh\nwhile [ "$1" != "-l" ]; do shift; done\necho "ERROR: bad parser" > "$2"\n')
+    os.chmod(str(binary), os.stat(str(binary)).st_mode | stat.S_IEXEC)
+    input_file = tmpdir.join("input.txt")
+    input_file.write("1 1_wall @ X 1.0 Y 2.0 Z 3.0\n")
+    command = RecipeCommand(CommandOptions(output_base_name="walls"), str(input_file))
+    recipe = Recipe(output_directory=str(tmpdir.join("out")), commands=[command])
+    log = lambda message, level: None
+
+    with pytest.raises(RecipeFailed, match="walls"):
+        run_recipe(recipe, str(binary), log)
+    assert "ERROR" in tmpdir.join("out", "logs", "walls.log").read()
+
+    recipe.stop_on_error = False
+    result = run_recipe(recipe, str(binary), log)
+    assert result.failed == ["walls"] and not result.ok
+
+def test_dumps_leaves_out_defaults():
+    text = dumps(Recipe(name="empty"), "toml")
+    assert text.splitlines() == ['name = "empty"', 'stop_on_error = true', 'commands = []', '', '[normalize]']
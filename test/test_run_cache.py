@@ -0,0 +1,97 @@
+import os
+import time
+
+from ..components.command_options import CommandOptions
+from ..components.run_cache import RunCache
+from ..components.survey_output import basename_files
+
+
+def _files(tmpdir):
+    binary = tmpdir.join("survey2gis")
+    binary.write("binary")
+    parser = tmpdir.join("parser.ini")
+    parser.write("[Parser]\n")
+    input_file = tmpdir.join("input.txt")
+    input_file.write("1 1_wall @ X 1.0 Y 2.0 Z 3.0\n")
+    return str(binary), str(parser), str(input_file)
+
+def _arguments(parser, input_file, output_dir, *extra):
+    """(options, input file) as key_for() takes them."""
+    return CommandOptions.from_arguments(["-p", parser, "-o", output_dir, "-n", "walls", *extra,
+                                          "-l", os.path.join(output_dir, "walls.log"), input_file])
+
+def _write_run(output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    for name in ("walls_poly.shp", "walls_poly.dbf", "walls_line.shp"):
+        with open(os.path.join(output_dir, name), "w") as f:
+            f.write(name)
+    with open(os.path.join(output_dir, "walls.log"), "w") as f:
+        f.write("done\n")
+
+def test_key_ignores_output_folder_and_option_order(tmpdir):
+    binary, parser, input_file = _files(tmpdir)
+    cache = RunCache(str(tmpdir.join("cache")))
+    key = cache.key_for(binary, *_arguments(parser, input_file, "/a", "--tolerance=0.1", "-c"))
+    assert key == cache.key_for(binary, *_arguments(parser, input_file, "/b", "-c", "--tolerance=0.1"))
+    assert key != cache.key_for(binary, *_arguments(parser, input_file, "/a", "--tolerance=0.2", "-c"))
+    assert cache.key_for(binary, *_arguments(parser, str(tmpdir.join("missing.txt")), "/a")) is None
+
+def test_key_changes_with_input_parser_and_binary(tmpdir):
+    binary, parser, input_file = _files(tmpdir)
+    cache = RunCache(str(tmpdir.join("cache")))
+    arguments = _arguments(parser, input_file, "/out")
+    keys = {cache.key_for(binary, *arguments)}
+    for path, text in ((input_file, "changed\n"), (parser, "[Parser]\nchanged\n"), (binary, "new binary")):
+        with open(path, "w") as f:
+            f.write(text)
+        keys.add(cache.key_for(binary, *arguments))
+    assert len(keys) == 4
+
+def test_store_and_restore(tmpdir):
+    """Test that a stored run is restored into another folder and counted as hit."""
+    binary, parser, input_file = _files(tmpdir)
+    cache = RunCache(str(tmpdir.join("cache")))
+    run_dir = str(tmpdir.join("run"))
+    started = time.time()
+    _write_run(run_dir)
+    key = cache.key_for(binary, *_arguments(parser, input_file, run_dir))
+    assert cache.lookup(key) is None
+    assert cache.store(key, "walls", run_dir, os.path.join(run_dir, "walls.log"), since=started) == 3
+    cache.save()
+
+    reopened = RunCache(str(tmpdir.join("cache")))
+    other_dir = str(tmpdir.join("other"))
+    assert reopened.lookup(key) is not None
+    restored = reopened.restore(key, other_dir, os.path.join(other_dir, "logs", "walls.log"))
+    assert sorted(os.path.basename(path) for path in restored) == ["walls_line.shp", "walls_poly.dbf", "walls_poly.shp"]
+    assert open(os.path.join(other_dir, "logs", "walls.log")).read() == "done\n"
+    assert (reopened.hits, reopened.misses) == (1, 0)
+    assert reopened.summary() == "survey2gis result cache: 1 hit(s), 0 miss(es)"
+
+def test_lru_eviction(tmpdir):
+    binary, parser, input_file = _files(tmpdir)
+    cache = RunCache(str(tmpdir.join("cache")), max_bytes=60)
+    keys = []
+    for index in range(3):
+        run_dir = str(tmpdir.join(f"run{index}"))
+        _write_run(run_dir)
+        keys.append(cache.key_for(binary, *_arguments(parser, input_file, run_dir, f"--tolerance={index}")))
+        cache.store(keys[-1], "walls", run_dir, os.path.join(run_dir, "walls.log"))
+        cache.manifest["entries"][keys[-1]]["last_used"] = index
+    # Used recently, so the second entry goes first
+    cache.manifest["entries"][keys[0]]["last_used"] = 10
+    assert cache.evict() == 2
+    assert list(cache.manifest["entries"]) == [keys[0]]
+    assert not os.path.exists(str(tmpdir.join("cache", keys[1])))
+    cache.clear()
+    assert cache.lookup(keys[0]) is None
+
+def test_basename_files_skips_other_names_and_old_files(tmpdir):
+    _write_run(str(tmpdir))
+    tmpdir.join("walls_old_poly.shp").write("")
+    tmpdir.join("wallsx_poly.shp").write("")
+    old = tmpdir.join("walls_point.shp")
+    old.write("")
+    os.utime(str(old), (0, 0))
+    names = [os.path.basename(path) for path in basename_files(str(tmpdir), "walls", since=time.time() - 60)]
+    assert names == ["walls_line.shp", "walls_poly.dbf", "walls_poly.shp"]
@@ -0,0 +1,97 @@
+from ..components.settings_store import SettingsStore, coerce_value
+
+
+class DictSettings:
+    """The part of QSettings SettingsStore uses, backed by a dict."""
+
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+        self.reads = 0
+        self.syncs = 0
+
+    def value(self, key, default=None):
+        self.reads += 1
+        return self.values.get(key, default)
+
+    def setValue(self, key, value):
+        self.values[key] = value
+
+    def remove(self, key):
+        for known in list(self.values):
+            if known == key or known.startswith(key + '/'):
+                del self.values[known]
+
+    def sync(self):
+        self.syncs += 1
+
+def test_coerce_value():
+    """Test that strings from the settings file get the type of the default."""
+    assert coerce_value('false', True) is False
+    assert coerce_value('true', False) is True
+    assert coerce_value('3', 1) == 3
+    assert coerce_value('0.25', 0.0) == 0.25
+    assert coerce_value('x', 1) == 1
+    assert coerce_value(None, 'auto') == 'auto'
+
+def test_changes_are_written_on_flush():
+    """Test that key presses stay in memory and one flush writes the last value with one sync."""
+    backend = DictSettings()
+    store = SettingsStore(backend)
+    for text in ('d', 'di', 'dig'):
+        assert store.set_value('s2g_normalize/input_select', text)
+    assert backend.values == {} and backend.syncs == 0
+    assert store.value('s2g_normalize/input_select', '') == 'dig'
+
+    assert store.flush() == 1
+    assert backend.values == {'s2g_normalize/input_select': 'dig'} and backend.syncs == 1
+    # Nothing changed since
+    assert store.flush() == 0 and backend.syncs == 1
+    assert not store.set_value('s2g_normalize/input_select', 'dig')
+
+def test_values_are_read_once():
+    backend = DictSettings({'s2g_normalize/fix_lines_checkbox': 'true'})
+    store = SettingsStore(backend)
+    assert store.value('s2g_normalize/fix_lines_checkbox', False) is True
+    assert store.value('s2g_normalize/fix_lines_checkbox', False) is True
+    assert backend.reads == 1
+
+def test_remove_group():
+    """Test that removing a group drops its cached and pending keys and keeps the change order."""
+    backend = DictSettings({'s2g_normalize/epsg_input': '25832', 's2g_process/geopackage_name_input': 'dig'})
+    store = SettingsStore(backend)
+    store.set_value('s2g_normalize/search_character', '.')
+    store.remove('s2g_normalize')
+    assert store.value('s2g_normalize/epsg_input', '') == ''
+    store.set_value('s2g_normalize/persist_settings', False)
+    store.flush()
+    assert backend.values == {'s2g_process/geopackage_name_input': 'dig',
+                              's2g_normalize/persist_settings': False}
+
+def test_profiles():
+    """Test that profiles are saved, listed, switched without further reads and deleted."""
+    backend = DictSettings()
+    store = SettingsStore(backend)
+    store.save_profile('Campaign B', {'s2g_normalize/epsg_input': '31468'})
+    store.save_profile('campaign a', {'s2g_normalize/epsg_input': '25832'})
+    store.set_active_profile('Campaign B')
+    store.flush()
+
+    store = SettingsStore(backend)
+    assert store.profile_names() == ['campaign a', 'Campaign B']
+    reads = backend.reads
+    assert store.profile('campaign a') == {'s2g_normalize/epsg_input': '25832'}
+    assert store.profile('Campaign B') == {'s2g_normalize/epsg_input': '31468'}
+    assert store.profile('missing') is None
+    assert backend.reads == reads
+
+    assert store.active_profile() == 'Campaign B'
+    assert store.delete_profile('Campaign B')
+    assert not store.delete_profile('Campaign B')
+    assert store.active_profile() == ''
+    store.flush()
+    assert SettingsStore(backend).profile_names() == ['campaign a']
+
+def test_broken_profiles_value():
+    store = SettingsStore(DictSettings({'s2g_profiles/profiles': '{not json'}))
+    assert store.profile_names() == []
+    assert store.active_profile() == ''
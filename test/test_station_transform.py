@@ -0,0 +1,64 @@
+import pytest
+
+from ..components.station_transform import TransformTableError, parse_transform_table
+
+np = pytest.importorskip("numpy")
+
+from ..components.normalize_pipeline import NormalizeOptions, normalize_files
+
+
+def _transform(tmpdir, table, content, **options):
+    table_file = tmpdir.join("stations.csv")
+    table_file.write(table)
+    input_file = tmpdir.join("station_a.dat")
+    input_file.write(content)
+    output_file = tmpdir.join("output.txt")
+    normalize_files([str(input_file)], str(output_file),
+                    NormalizeOptions(transform_table=str(table_file), **options))
+    return output_file.read()
+
+def test_parse_table():
+    """Test delimiter detection, defaults and the dims column."""
+    transforms = parse_transform_table("# stations\nfile,type,tx,rotation,dims\na.dat,helmert2d,1.5,90,2\nb.dat,,,,\n")
+    assert transforms["a.dat"].kind == "helmert2d"
+    assert (transforms["a.dat"].tx, transforms["a.dat"].rotation, transforms["a.dat"].dims) == (1.5, 90.0, 2)
+    assert transforms["b.dat"].kind == "offset" and transforms["b.dat"].scale == 1.0
+
+@pytest.mark.parametrize("table", ["name;tx\na;1", "file;type\na;shift", "file;tx\na;east", "file;dims\na;4"])
+def test_invalid_table(table):
+    """Test that malformed tables are rejected."""
+    with pytest.raises(TransformTableError):
+        parse_transform_table(table)
+
+def test_offset_keeps_decimal_places(tmpdir):
+    """Test an offset on labelled, plain 3D and 2D coordinate lines."""
+    output = _transform(
+        tmpdir, "file;tx;ty;tz\nstation_a.dat;1000;2000;0.5\n",
+        "67 1_GR_W_0 @ X 37.664 Y 81.392 Z 399.5\n68 37.1 80.877 399.590\n5 8_find . 4 5\n66 Limits of area\n",
+    )
+    assert output == ("67 1_GR_W_0 @ X 1037.664 Y 2081.392 Z 400.0\n68 1037.1 2080.877 400.090\n"
+                      "5 8_find . 1004 2005\n66 Limits of area\n")
+
+def test_helmert2d_rotation(tmpdir):
+    """Test a 90 degree rotation with scale and translation."""
+    output = _transform(tmpdir, "file;type;tx;ty;rotation;scale\nstation_a.dat;helmert2d;10;20;90;2\n",
+                        "1 1.000 0.000 5.00\n")
+    assert output == "1 10.000 22.000 5.00\n"
+
+def test_helmert3d_matches_matrix(tmpdir):
+    """Test that the 3D rotations are applied as Rz * Ry * Rx."""
+    output = _transform(tmpdir, "file;type;rx;ry;rz\nstation_a.dat;helmert3d;90;0;90\n",
+                        "1 1.0000 2.0000 3.0000\n")
+    # Rx(90): (1, -3, 2), then Rz(90): (3, 1, 2)
+    assert output == "1 3.0000 1.0000 2.0000\n"
+
+def test_unlisted_file_is_reported(tmpdir):
+    """Test that files missing from the table pass through with a warning."""
+    table_file = tmpdir.join("stations.csv")
+    table_file.write("file;tx\nother.dat;5\n")
+    input_file = tmpdir.join("station_a.dat")
+    input_file.write("1 1.0 2.0\n")
+    stats = normalize_files([str(input_file)], str(tmpdir.join("output.txt")),
+                            NormalizeOptions(transform_table=str(table_file), workers=2))
+    assert tmpdir.join("output.txt").read() == "1 1.0 2.0\n"
+    assert any("station_a.dat" in warning for warning in stats.warnings)
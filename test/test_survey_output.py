@@ -0,0 +1,74 @@
+import os
+import struct
+from datetime import datetime
+
+from ..components.survey_output import (copy_styles, count_features, dbf_record_count, delete_intermediate_files,
+                                        filter_spatialfiles, geopackage_path, load_alias_mapping,
+                                        scan_spatialfiles)
+
+
+def _shapefile(directory, name):
+    for extension in (".shp", ".shx", ".dbf", ".prj"):
+        directory.join(name + extension).write("")
+    return str(directory.join(name + ".shp"))
+
+def test_scan_and_filter_spatialfiles(tmpdir):
+    """Test that shapefiles are grouped by basename, polygons before lines, points and labels."""
+    labels = _shapefile(tmpdir, "walls_labels")
+    point = _shapefile(tmpdir, "walls_point")
+    poly = _shapefile(tmpdir, "walls_poly")
+    finds = _shapefile(tmpdir, "finds_point")
+    _shapefile(tmpdir, "notes")
+    data = scan_spatialfiles(str(tmpdir))
+    assert data == {"shp": {"walls": [poly, point, labels], "finds": [finds]}}
+    assert filter_spatialfiles(data, ["finds"]) == {"shp": {"finds": [finds]}}
+
+def test_filter_spatialfiles_exact_basename(tmpdir):
+    """Test that the files of a basename do not include those of a longer basename it is a prefix of."""
+    walls = _shapefile(tmpdir, "walls_poly")
+    walls_b = _shapefile(tmpdir, "walls_b_poly")
+    walls_b_line = _shapefile(tmpdir, "walls_b_line")
+    data = scan_spatialfiles(str(tmpdir))
+    assert filter_spatialfiles(data, ["walls"]) == {"shp": {"walls": [walls]}}
+    assert filter_spatialfiles(data, ["walls_b"]) == {"shp": {"walls": [walls_b, walls_b_line]}}
+    assert filter_spatialfiles(data, []) == {"shp": {}}
+
+def test_delete_intermediate_files(tmpdir):
+    poly = _shapefile(tmpdir, "walls_poly")
+    tmpdir.join("other.dbf").write("")
+    delete_intermediate_files({"shp": {"walls": [poly]}})
+    assert sorted(os.listdir(str(tmpdir))) == ["other.dbf"]
+
+def test_geopackage_path():
+    assert geopackage_path("/out", "site", "merged") == os.path.join("/out", "site.gpkg")
+    assert geopackage_path("/out", "", "merged") == os.path.join("/out", "merged.gpkg")
+    assert geopackage_path("/out", today=datetime(2024, 5, 1)) == os.path.join("/out", "s2g_merged_data_2024-05-01.gpkg")
+
+def test_load_alias_mapping(tmpdir):
+    alias_file = tmpdir.join("aliases.ini")
+    alias_file.write("[aliases]\nfld1 = Befund\n")
+    assert load_alias_mapping(str(alias_file)) == {"fld1": "Befund"}
+    assert load_alias_mapping(str(tmpdir.join("missing.ini"))) == {}
+
+def test_copy_styles(tmpdir):
+    styles = tmpdir.mkdir("styles")
+    styles.join("walls.qml").write("<qgis/>")
+    styles.mkdir("svg").join("pit.svg").write("<svg/>")
+    output = tmpdir.mkdir("out")
+    messages = []
+    assert copy_styles(str(styles), str(output), lambda message, level: messages.append(level))
+    assert output.join("qml", "walls.qml").check(file=True)
+    assert output.join("qml", "svg", "pit.svg").check(file=True)
+    assert "error" not in messages
+    assert not copy_styles(str(tmpdir.join("missing")), str(output))
+
+def test_count_features(tmpdir):
+    """Test that the record counts of the .dbf headers are summed over the geometry types."""
+    for name, records in (("walls_poly", 3), ("walls_line", 2), ("finds_point", 7)):
+        tmpdir.join(name + ".dbf").write_binary(b"\x03\x18\x05\x01" + struct.pack('<I', records) + b"\x00" * 24)
+    tmpdir.join("walls_point.dbf").write_binary(b"\x03")
+    assert dbf_record_count(str(tmpdir.join("walls_poly.dbf"))) == 3
+    assert dbf_record_count(str(tmpdir.join("walls_point.dbf"))) is None
+    assert dbf_record_count(str(tmpdir.join("missing.dbf"))) is None
+    assert count_features(str(tmpdir), "walls") == 5
+    assert count_features(str(tmpdir), "notes") == 0
@@ -0,0 +1,55 @@
+import os
+
+from ..components.watch_folder import FolderChanges, FolderState, apply_changes, scan_folder
+
+
+def _touch(path, text="1 1_wall @ X 1.0 Y 2.0 Z 3.0\n", mtime=None):
+    path.write(text)
+    if mtime is not None:
+        os.utime(str(path), ns=(mtime, mtime))
+
+def test_scan_folder(tmpdir):
+    """Test that only input files count, without hidden, temporary and ignored ones."""
+    for name in ("day1.dat", "day2.txt.gz", "notes.pdf", ".day3.dat", "~day4.dat", "merged.txt"):
+        _touch(tmpdir.join(name))
+    tmpdir.mkdir("sub.dat")
+    snapshot = scan_folder(str(tmpdir), ignore=(str(tmpdir.join("merged.txt")),))
+    assert sorted(os.path.basename(path) for path in snapshot) == ["day1.dat", "day2.txt.gz"]
+    assert snapshot[os.path.normpath(str(tmpdir.join("day1.dat")))][0] == 29
+
+def test_new_file_is_reported_once_it_is_stable(tmpdir):
+    """Test that a file still being written is held back until two checks agree."""
+    _touch(tmpdir.join("day1.dat"))
+    state = FolderState(str(tmpdir))
+    assert not state.check()
+
+    new_file = tmpdir.join("day2.dat")
+    _touch(new_file, mtime=1_000_000_000)
+    changes = state.check()
+    assert not changes and changes.pending == [os.path.normpath(str(new_file))]
+    # Still growing
+    _touch(new_file, "1 1_wall @ X 1.0 Y 2.0 Z 3.0\n2 2.0 3.0 4.0\n", mtime=2_000_000_000)
+    assert state.check().pending
+    changes = state.check()
+    assert changes.added == [os.path.normpath(str(new_file))] and not changes.pending
+    assert not state.check()
+
+def test_modified_and_removed(tmpdir):
+    _touch(tmpdir.join("day1.dat"), mtime=1_000_000_000)
+    _touch(tmpdir.join("day2.dat"))
+    state = FolderState(str(tmpdir))
+    _touch(tmpdir.join("day1.dat"), "changed\n", mtime=3_000_000_000)
+    tmpdir.join("day2.dat").remove()
+    changes = state.check()
+    assert changes.removed == [os.path.normpath(str(tmpdir.join("day2.dat")))]
+    assert not changes.modified
+    changes = state.check()
+    assert changes.modified == [os.path.normpath(str(tmpdir.join("day1.dat")))]
+    assert changes.summary() == "1 changed"
+
+def test_apply_changes():
+    """Test that new files join the selection and removed ones leave it."""
+    selected = [os.path.normpath(path) for path in ("/dig/a.dat", "/dig/b.dat")]
+    changes = FolderChanges(added=[os.path.normpath("/dig/c.dat")], removed=[os.path.normpath("/dig/a.dat")])
+    assert apply_changes(selected, changes) == [os.path.normpath("/dig/b.dat"), os.path.normpath("/dig/c.dat")]
+    assert apply_changes(selected, FolderChanges()) == selected